@@ -0,0 +1,55 @@
+"""仓库克隆策略字段：clone_strategy、clone_depth、clone_filter、sparse_paths
+
+已有仓库记录按完整克隆处理（策略 FULL，深度 0）
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+from alembic import context, op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# 与模型中 Enum(CloneStrategy) 一致：按枚举成员名存储，类型名为类名小写
+clone_strategy_enum = sa.Enum("FULL", "SHALLOW", "BLOBLESS", "SPARSE", name="clonestrategy")
+
+
+COLUMN_NAMES = ("clone_strategy", "clone_depth", "clone_filter", "sparse_paths")
+
+
+def _existing_columns() -> set:
+    """
+    已有的列（按模型新建的库已包含这些列；SQLite、MySQL 不支持 ADD COLUMN IF NOT EXISTS）
+
+    离线模式（--sql）无法查询数据库，按升级前没有、降级前全部存在处理，由调用方区分
+    """
+    return {column["name"] for column in sa.inspect(op.get_bind()).get_columns("repo_records")}
+
+
+def upgrade() -> None:
+    offline = context.is_offline_mode()
+    # PostgreSQL 需先创建枚举类型，其它数据库为空操作；离线模式无法检查类型是否存在，直接输出 CREATE TYPE
+    clone_strategy_enum.create(op.get_bind(), checkfirst=not offline)
+    existing = set() if offline else _existing_columns()
+    for column in (
+        sa.Column("clone_strategy", clone_strategy_enum, nullable=True, server_default="FULL", comment="克隆策略"),
+        sa.Column("clone_depth", sa.Integer(), nullable=True, server_default="0", comment="浅克隆深度(0表示完整历史)"),
+        sa.Column("clone_filter", sa.String(), nullable=True, comment="部分克隆过滤器，如 blob:none"),
+        sa.Column("sparse_paths", sa.Text(), nullable=True, comment="稀疏检出路径规则(JSON列表)"),
+    ):
+        if column.name not in existing:
+            op.add_column("repo_records", column)
+
+
+def downgrade() -> None:
+    offline = context.is_offline_mode()
+    existing = set(COLUMN_NAMES) if offline else _existing_columns()
+    with op.batch_alter_table("repo_records") as batch_op:
+        for name in reversed(COLUMN_NAMES):
+            if name in existing:
+                batch_op.drop_column(name)
+    clone_strategy_enum.drop(op.get_bind(), checkfirst=not offline)
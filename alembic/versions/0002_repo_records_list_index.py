@@ -0,0 +1,27 @@
+"""仓库列表复合索引：(create_user_id, created_at, id)
+
+用户仓库列表按创建时间倒序的键集分页与 COUNT 只需扫描该用户的索引范围
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "idx_repo_user_created",
+        "repo_records",
+        ["create_user_id", "created_at", "id"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_repo_user_created", table_name="repo_records", if_exists=True)
@@ -0,0 +1,60 @@
+"""共享派生产物与仓库引用表
+
+相同远端仓库、相同提交的派生产物（目录、分类、概述等）在不同用户的仓库记录之间共享，按引用计数回收
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "shared_artifacts",
+        sa.Column("id", sa.String(64), primary_key=True),
+        sa.Column("remote_hash", sa.String(64), nullable=False),
+        sa.Column("commit_sha", sa.String(64), nullable=False),
+        sa.Column("kind", sa.String(64), nullable=False),
+        sa.Column("generator_version", sa.String(128), nullable=False),
+        sa.Column("storage_key", sa.String(), nullable=False),
+        sa.Column("content_sha256", sa.String(64), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("ref_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("last_used_at", sa.DateTime(), nullable=False),
+        if_not_exists=True,
+    )
+    op.create_index(
+        "idx_artifact_remote_commit",
+        "shared_artifacts",
+        ["remote_hash", "commit_sha"],
+        if_not_exists=True,
+    )
+    op.create_table(
+        "repo_artifact_refs",
+        sa.Column("repo_id", sa.String(), sa.ForeignKey("repo_records.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("kind", sa.String(64), primary_key=True),
+        sa.Column("artifact_id", sa.String(64), sa.ForeignKey("shared_artifacts.id"), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_repo_artifact_refs_artifact_id",
+        "repo_artifact_refs",
+        ["artifact_id"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_repo_artifact_refs_artifact_id", table_name="repo_artifact_refs", if_exists=True)
+    op.drop_table("repo_artifact_refs", if_exists=True)
+    op.drop_index("idx_artifact_remote_commit", table_name="shared_artifacts", if_exists=True)
+    op.drop_table("shared_artifacts", if_exists=True)
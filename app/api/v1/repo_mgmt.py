@@ -1,9 +1,16 @@
-from typing import List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form
+from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form, Response, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.settings import settings
 from app.infrastructure.database import get_db
-from app.domains.repo_mgmt.schemes.repo_mgmt import CreateRepositoryFromUrl, UpdateRepository, RepositoryInfo
+from app.domains.repo_mgmt.schemes.repo_mgmt import CreateRepositoryFromUrl, UpdateRepository, RepositoryInfo, \
+    CreateRepositoriesBatch, RepositoryBatchInfo, RepositoryBatchProgress, TaskQueuePosition
 from app.domains.repo_mgmt.services.repo_mgmt_service import RepoMgmtService
+from app.domains.repo_mgmt.services.archive_extractor import ArchiveExtractor
+from app.domains.repo_mgmt.services.progress_reporter import ProgressReporter
+from app.domains.repo_mgmt.services.batch_ingest_service import BatchProgress
+from app.infrastructure.celery.fair_scheduler import FairTaskScheduler
 
 router = APIRouter(tags=["仓库管理"])
 
@@ -26,6 +33,21 @@ async def create_repository_from_url(
             detail=str(e)
         )
 
+@router.post("/create/batch", response_model=RepositoryBatchInfo)
+async def create_repositories_batch(
+    batch_data: CreateRepositoriesBatch,
+    user_id: str = Query(..., description="用户ID"),
+    db: AsyncSession = Depends(get_db)
+):
+    """批量通过Git URL创建仓库，克隆、扫描目录、构建索引由流水线统一调度"""
+    try:
+        return await RepoMgmtService.create_repositories_from_urls(db, user_id, batch_data)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
 @router.post("/create/package", response_model=RepositoryInfo)
 async def create_repository_from_package(
     file: UploadFile = File(..., description="压缩包文件"),
@@ -37,10 +59,10 @@ async def create_repository_from_package(
     """通过上传压缩包创建仓库"""
     try:
         # 验证文件类型
-        if not file.filename.endswith(('.zip', '.tar.gz', '.tar')):
+        if not ArchiveExtractor.is_supported(file.filename):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="只支持zip、tar.gz、tar格式的压缩包"
+                detail="只支持zip、tar、tar.gz、tgz、tar.bz2、tar.xz格式的压缩包"
             )
         
         # 处理上传文件
@@ -77,6 +99,61 @@ async def create_repository_from_path(
             detail=str(e)
         )
 
+# 固定路径需在 /{repository_id} 之前注册，否则 /list 会被当作仓库ID匹配
+@router.get("/list", response_model=List[RepositoryInfo])
+async def get_repository_list(
+    response: Response,
+    user_id: str = Query(..., description="用户ID"),
+    page: int = Query(1, ge=1, description="页码（传入 cursor 时忽略）"),
+    page_size: int = Query(10, ge=1, le=100, description="每页数量"),
+    keyword: str = Query(None, description="搜索关键词"),
+    cursor: Optional[str] = Query(None, description="分页游标，取自上一页响应头 X-Next-Cursor"),
+    with_total: bool = Query(True, description="是否统计总数（响应头 X-Total-Count）"),
+    db: AsyncSession = Depends(get_db)
+):
+    """获取仓库列表"""
+    try:    
+        repositories, total, next_cursor = await RepoMgmtService.get_repository_list(
+            db, user_id, page, page_size, keyword, cursor, with_total
+        )
+        if total is not None:
+            response.headers["X-Total-Count"] = str(total)
+            # 总数达到统计上限时只是下限
+            if 0 < settings.repo_list_count_cap <= total:
+                response.headers["X-Total-Count-Capped"] = "true"
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return repositories
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"获取仓库列表失败: {str(e)}"
+        )
+
+@router.get("/batch/{batch_id}", response_model=RepositoryBatchProgress)
+async def get_repository_batch_progress(
+    batch_id: str,
+    user_id: str = Query(..., description="用户ID")
+):
+    """获取批量导入的聚合进度"""
+    progress = await BatchProgress.get(batch_id)
+    if not progress:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="批次不存在或已过期"
+        )
+    if progress.get("user_id") != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="无权限获取批次"
+        )
+    return progress
+
 @router.get("/{repository_id}", response_model=RepositoryInfo)
 async def get_repository(
     repository_id: str,
@@ -107,25 +184,75 @@ async def get_repository(
             detail=f"获取仓库失败: {str(e)}"
         )
 
-@router.get("/list", response_model=List[RepositoryInfo])
-async def get_repository_list(
+@router.get("/{repository_id}/progress/stream")
+async def stream_repository_progress(
+    repository_id: str,
+    request: Request,
     user_id: str = Query(..., description="用户ID"),
-    page: int = Query(1, ge=1, description="页码"),
-    page_size: int = Query(10, ge=1, le=100, description="每页数量"),
-    keyword: str = Query(None, description="搜索关键词"),
     db: AsyncSession = Depends(get_db)
 ):
-    """获取仓库列表"""
-    try:    
-        repositories, total = await RepoMgmtService.get_repository_list(
-            db, user_id, page, page_size, keyword
+    """以 Server-Sent Events 推送仓库处理进度，任务结束（完成或失败）后关闭连接"""
+    repository = await RepoMgmtService.get_repository_by_id(db, repository_id)
+    if not repository:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="仓库不存在"
         )
-        return repositories
-    except Exception as e:
+    if repository.create_user_id != user_id:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"获取仓库列表失败: {str(e)}"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="无权限获取仓库"
+        )
+
+    # Redis 中没有进度（任务未开始或记录已过期）时以数据库状态作为初始值
+    initial = {
+        "repo_id": repository.id,
+        "seq": 0,
+        "status": repository.processing_status.value if repository.processing_status else "",
+        "progress": repository.processing_progress or 0,
+        "message": repository.processing_message or "",
+        "error": repository.processing_error or "",
+        "updated_at": repository.updated_at.isoformat() if repository.updated_at else "",
+    }
+
+    async def _events():
+        async for snapshot in ProgressReporter.stream(repository_id, initial):
+            if await request.is_disconnected():
+                break
+            yield ProgressReporter.format_sse(snapshot)
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        # 禁止代理缓冲，保证事件实时送达
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/{repository_id}/queue", response_model=TaskQueuePosition)
+async def get_repository_queue_position(
+    repository_id: str,
+    user_id: str = Query(..., description="用户ID"),
+    db: AsyncSession = Depends(get_db)
+):
+    """获取仓库后台任务（克隆、索引构建）的排队位置"""
+    repository = await RepoMgmtService.get_repository_by_id(db, repository_id)
+    if not repository:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="仓库不存在"
+        )
+    if repository.create_user_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="无权限获取仓库"
+        )
+    position = await FairTaskScheduler.position(repository_id)
+    if not position:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="仓库没有排队或执行中的任务"
         )
+    return position
 
 @router.put("/{repository_id}", response_model=RepositoryInfo)
 async def update_repository(
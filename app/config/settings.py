@@ -96,6 +96,22 @@ class Settings(BaseSettings):
     redis_socket_timeout: int = Field(default=5, description="读写超时时间(秒)", env="REDIS_SOCKET_TIMEOUT")
     redis_retry_on_timeout: bool = Field(default=True, description="超时时是否重试", env="REDIS_RETRY_ON_TIMEOUT")
     redis_max_connections: int = Field(default=5, description="每个数据库的最大连接数", env="REDIS_MAX_CONNECTIONS")
+    
+    # Celery配置
+    celery_persistent_loop: bool = Field(default=True, description="Celery worker 进程是否复用常驻事件循环执行异步任务（关闭时每个任务 asyncio.run）", env="CELERY_PERSISTENT_LOOP")
+    celery_loop_init_timeout: float = Field(default=3.0, description="worker 进程初始化数据库、Redis 连接的超时时间(秒)，超时后在首个任务中懒加载", env="CELERY_LOOP_INIT_TIMEOUT")
+    celery_loop_shutdown_timeout: float = Field(default=10.0, description="worker 进程退出时关闭连接的超时时间(秒)", env="CELERY_LOOP_SHUTDOWN_TIMEOUT")
+    celery_git_io_concurrency: int = Field(default=8, description="git_io 队列（克隆、批量导入）worker 线程数", env="CELERY_GIT_IO_CONCURRENCY")
+    celery_git_io_time_limit: int = Field(default=2 * 3600, description="git_io 队列任务的最长执行时间(秒)", env="CELERY_GIT_IO_TIME_LIMIT")
+    celery_analysis_concurrency: int = Field(default=0, description="analysis 队列（代码索引）worker 进程数，0表示CPU核数", env="CELERY_ANALYSIS_CONCURRENCY")
+    celery_analysis_time_limit: int = Field(default=3600, description="analysis 队列任务的最长执行时间(秒)", env="CELERY_ANALYSIS_TIME_LIMIT")
+    celery_llm_concurrency: int = Field(default=4, description="llm 队列（wiki生成）worker 线程数", env="CELERY_LLM_CONCURRENCY")
+    celery_llm_time_limit: int = Field(default=4 * 3600, description="llm 队列任务的最长执行时间(秒)", env="CELERY_LLM_TIME_LIMIT")
+    celery_worker_nodes: int = Field(default=1, description="每个队列的 worker 节点数，公平调度按 节点数×并发数 控制已派发未完成的任务数", env="CELERY_WORKER_NODES")
+    fair_scheduler_enabled: bool = Field(default=True, description="后台任务是否按用户公平调度（关闭时直接投递到队列）", env="FAIR_SCHEDULER_ENABLED")
+    fair_user_concurrency: int = Field(default=2, description="公平调度下每个用户在同一队列中同时执行的任务数上限", env="FAIR_USER_CONCURRENCY")
+    fair_dispatch_interval: float = Field(default=60.0, description="定时派发公平调度排队任务的间隔(秒)，兜底派发失败与回收的名额", env="FAIR_DISPATCH_INTERVAL")
+    fair_job_ttl: int = Field(default=7 * 24 * 3600, description="Redis中排队任务状态的保留时间(秒)", env="FAIR_JOB_TTL")
 
 
     # =============================================================================
@@ -138,6 +154,19 @@ class Settings(BaseSettings):
     git_username: str = Field(default="your-git-username", description="Git用户名", env="GIT_USERNAME")
     git_password: str = Field(default="your-git-password", description="Git密码", env="GIT_PASSWORD")
     git_email: str = Field(default="koalawiki@example.com", description="Git邮箱", env="GIT_EMAIL")
+    git_clone_timeout: int = Field(default=3600, description="克隆、拉取等网络操作超时时间(秒)", env="GIT_CLONE_TIMEOUT")
+    git_command_timeout: int = Field(default=300, description="本地git命令超时时间(秒)", env="GIT_COMMAND_TIMEOUT")
+    git_log_max_count: int = Field(default=1000, description="拉取更新时返回的提交记录数上限", env="GIT_LOG_MAX_COUNT")
+    git_commit_memo_size: int = Field(default=10000, description="进程内缓存的提交元数据条数", env="GIT_COMMIT_MEMO_SIZE")
+    git_mirror_enabled: bool = Field(default=True, description="是否启用上游仓库本地镜像缓存", env="GIT_MIRROR_ENABLED")
+    git_mirror_path: str = Field(default="./repos/.mirrors", description="仓库镜像存储路径", env="GIT_MIRROR_PATH")
+    git_mirror_refresh_interval: int = Field(default=300, description="镜像最短刷新间隔(秒)", env="GIT_MIRROR_REFRESH_INTERVAL")
+    git_mirror_dissociate: bool = Field(default=False, description="克隆后是否复制镜像对象并解除引用（更独立，但占用更多磁盘）", env="GIT_MIRROR_DISSOCIATE")
+    git_mirror_lock_timeout: int = Field(default=3600, description="等待镜像更新锁的超时时间(秒)", env="GIT_MIRROR_LOCK_TIMEOUT")
+    git_object_reader_pool_size: int = Field(default=4, description="每个仓库常驻 git cat-file 进程数上限", env="GIT_OBJECT_READER_POOL_SIZE")
+    git_object_reader_max_repos: int = Field(default=32, description="保持 cat-file 进程的仓库数上限（按最近使用淘汰）", env="GIT_OBJECT_READER_MAX_REPOS")
+    git_object_reader_idle_timeout: int = Field(default=300, description="cat-file 进程空闲关闭时间(秒)", env="GIT_OBJECT_READER_IDLE_TIMEOUT")
+    git_tree_cache_size: int = Field(default=64, description="进程内缓存的目录树（按 tree sha）数量", env="GIT_TREE_CACHE_SIZE")
     
     # Mem0配置
     mem0_enable_mem0: bool = Field(default=False, description="是否启用Mem0", env="MEM0_ENABLE_MEM0")
@@ -149,6 +178,12 @@ class Settings(BaseSettings):
     repowik_enable_incremental_update: bool = Field(default=True, description="是否启用增量更新", env="REPOWIK_ENABLE_INCREMENTAL_UPDATE")
     repowik_enable_smart_filter: bool = Field(default=True, description="是否启用智能过滤", env="REPOWIK_ENABLE_SMART_FILTER")
     repowik_catalogue_format: str = Field(default="compact", description="目录格式", env="REPOWIK_CATALOGUE_FORMAT")
+    repowik_catalogue_max_items: int = Field(default=800, description="目录条目数超过该值时启用智能精简", env="REPOWIK_CATALOGUE_MAX_ITEMS")
+    repowik_catalogue_llm_refine: bool = Field(default=False, description="本地精简后是否再调用LLM精修目录（更慢，质量更高）", env="REPOWIK_CATALOGUE_LLM_REFINE")
+    repowik_catalogue_max_tokens: int = Field(default=0, description="目录结构Token预算，超出时折叠次要子树（0表示不限制）", env="REPOWIK_CATALOGUE_MAX_TOKENS")
+    repowik_catalogue_churn_weight: bool = Field(default=True, description="目录精简时是否将文件变更热度作为排序信号", env="REPOWIK_CATALOGUE_CHURN_WEIGHT")
+    repowik_classify_by_profile: bool = Field(default=True, description="是否优先使用本地仓库画像进行项目分类", env="REPOWIK_CLASSIFY_BY_PROFILE")
+    repowik_classify_min_confidence: float = Field(default=0.6, description="本地仓库画像分类的最低置信度，低于该值时使用AI分类", env="REPOWIK_CLASSIFY_MIN_CONFIDENCE")
     repowik_enable_warehouse_function_prompt_task: bool = Field(default=True, description="是否启用仓库函数提示任务", env="REPOWIK_ENABLE_WAREHOUSE_FUNCTION_PROMPT_TASK")
     repowik_enable_warehouse_description_task: bool = Field(default=True, description="是否启用仓库描述任务", env="REPOWIK_ENABLE_WAREHOUSE_DESCRIPTION_TASK")
     repowik_enable_file_commit: bool = Field(default=True, description="是否启用文件提交", env="REPOWIK_ENABLE_FILE_COMMIT")
@@ -164,7 +199,54 @@ class Settings(BaseSettings):
     # =============================================================================
     repo_storage_path: str = Field(default="./repos", description="代码仓存储路径", env="REPO_STORAGE_PATH")
     enable_code_dependency_analysis: bool = Field(default=False, description="是否启用代码依赖分析", env="ENABLE_CODE_DEPENDENCY_ANALYSIS")
-    
+    repo_enumerate_from_git_index: bool = Field(default=True, description="git仓库是否直接从索引枚举跟踪文件（否则扫描磁盘）", env="REPO_ENUMERATE_FROM_GIT_INDEX")
+    repo_scan_max_workers: int = Field(default=8, description="目录扫描并行线程数", env="REPO_SCAN_MAX_WORKERS")
+    repo_skip_generated_files: bool = Field(default=True, description="是否跳过第三方、生成、压缩文件（目录、依赖分析、代码读取均生效）", env="REPO_SKIP_GENERATED_FILES")
+    repo_clone_depth: int = Field(default=0, description="默认浅克隆深度（0表示完整历史）", env="REPO_CLONE_DEPTH")
+    repo_clone_filter: str = Field(default="", description="默认部分克隆过滤器（如 blob:none，空表示不过滤）", env="REPO_CLONE_FILTER")
+    repo_clone_deepen_step: int = Field(default=200, description="浅克隆按需加深时每次获取的提交数（逐轮翻倍）", env="REPO_CLONE_DEEPEN_STEP")
+    repo_clone_max_deepen_rounds: int = Field(default=4, description="浅克隆按需加深的最大轮数，超过后获取完整历史", env="REPO_CLONE_MAX_DEEPEN_ROUNDS")
+    upload_max_archive_size: int = Field(default=2 * 1024 ** 3, description="上传压缩包大小上限(字节)", env="UPLOAD_MAX_ARCHIVE_SIZE")
+    upload_max_extracted_size: int = Field(default=8 * 1024 ** 3, description="压缩包解压后总大小上限(字节)", env="UPLOAD_MAX_EXTRACTED_SIZE")
+    upload_max_entries: int = Field(default=200000, description="压缩包条目数量上限", env="UPLOAD_MAX_ENTRIES")
+    upload_max_compression_ratio: int = Field(default=100, description="压缩比上限，超过视为压缩炸弹", env="UPLOAD_MAX_COMPRESSION_RATIO")
+    catalogue_cache_local_size: int = Field(default=32, description="进程内目录快照缓存数量", env="CATALOGUE_CACHE_LOCAL_SIZE")
+    catalogue_cache_ttl: int = Field(default=7 * 24 * 3600, description="Redis目录快照缓存过期时间(秒)", env="CATALOGUE_CACHE_TTL")
+    repo_profile_max_read_bytes: int = Field(default=64 * 1024 * 1024, description="仓库画像统计行数时最多读取的字节数，超出部分按平均行长估算", env="REPO_PROFILE_MAX_READ_BYTES")
+    repo_snapshot_enabled: bool = Field(default=False, description="是否将仓库工作副本快照上传到对象存储，供其它节点水合（多节点部署时启用）", env="REPO_SNAPSHOT_ENABLED")
+    repo_snapshot_cache_path: str = Field(default="./repos/.snapshots", description="本地快照压缩包缓存路径", env="REPO_SNAPSHOT_CACHE_PATH")
+    repo_snapshot_cache_size: int = Field(default=20 * 1024 * 1024 * 1024, description="本地快照缓存容量上限(字节)", env="REPO_SNAPSHOT_CACHE_SIZE")
+    repo_snapshot_compress_level: int = Field(default=6, description="快照gzip压缩级别(1-9)", env="REPO_SNAPSHOT_COMPRESS_LEVEL")
+    repo_snapshot_lock_timeout: int = Field(default=3600, description="等待快照水合锁的超时时间(秒)", env="REPO_SNAPSHOT_LOCK_TIMEOUT")
+    workspace_max_bytes: int = Field(default=100 * 1024 * 1024 * 1024, description="本地工作副本总占用上限(字节)，超过时淘汰最久未访问的副本，0表示不限制", env="WORKSPACE_MAX_BYTES")
+    workspace_min_idle_seconds: int = Field(default=900, description="工作副本最短空闲时间(秒)，空闲不足的副本不会被淘汰", env="WORKSPACE_MIN_IDLE_SECONDS")
+    workspace_touch_interval: int = Field(default=60, description="同一工作副本访问时间的最短更新间隔(秒)", env="WORKSPACE_TOUCH_INTERVAL")
+    workspace_registry_path: str = Field(default="./repos/.workspaces", description="工作副本登记目录", env="WORKSPACE_REGISTRY_PATH")
+    workspace_lock_timeout: int = Field(default=3600, description="等待工作副本恢复锁的超时时间(秒)", env="WORKSPACE_LOCK_TIMEOUT")
+    artifact_share_enabled: bool = Field(default=True, description="相同远端仓库、相同提交的派生产物（分类、概述等）是否在仓库记录之间共享", env="ARTIFACT_SHARE_ENABLED")
+    artifact_lock_timeout: int = Field(default=600, description="等待其它节点生成同一共享产物的超时时间(秒)", env="ARTIFACT_LOCK_TIMEOUT")
+    repo_batch_max_size: int = Field(default=500, description="单次批量导入的仓库数上限", env="REPO_BATCH_MAX_SIZE")
+    repo_batch_clone_concurrency: int = Field(default=8, description="批量导入克隆阶段并发数", env="REPO_BATCH_CLONE_CONCURRENCY")
+    repo_batch_scan_concurrency: int = Field(default=4, description="批量导入目录扫描阶段并发数", env="REPO_BATCH_SCAN_CONCURRENCY")
+    repo_batch_index_concurrency: int = Field(default=2, description="批量导入时每个批次同时提交、等待中的索引构建任务数", env="REPO_BATCH_INDEX_CONCURRENCY")
+    repo_batch_host_concurrency: int = Field(default=4, description="同一远端主机的克隆并发数（所有任务与 worker 共享）", env="REPO_BATCH_HOST_CONCURRENCY")
+    repo_batch_host_rate: float = Field(default=30, description="同一远端主机每分钟最多开始的克隆数（所有任务与 worker 共享），0表示不限制", env="REPO_BATCH_HOST_RATE")
+    repo_batch_time_limit: int = Field(default=24 * 3600, description="批量导入任务的最长执行时间(秒)", env="REPO_BATCH_TIME_LIMIT")
+    repo_batch_state_ttl: int = Field(default=7 * 24 * 3600, description="Redis中批量导入进度的保留时间(秒)", env="REPO_BATCH_STATE_TTL")
+    file_history_cache_size: int = Field(default=8, description="进程内文件历史索引缓存数量", env="FILE_HISTORY_CACHE_SIZE")
+    repo_list_count_cap: int = Field(default=10000, description="仓库列表总数统计上限（超过时返回上限值，0表示精确计数）", env="REPO_LIST_COUNT_CAP")
+    progress_flush_interval: float = Field(default=5.0, description="任务进度写入数据库的最短间隔(秒)，状态变化时立即写入", env="PROGRESS_FLUSH_INTERVAL")
+    progress_ttl: int = Field(default=24 * 3600, description="Redis中任务进度的保留时间(秒)", env="PROGRESS_TTL")
+    progress_sse_heartbeat: float = Field(default=15.0, description="进度推送(SSE)心跳间隔(秒)", env="PROGRESS_SSE_HEARTBEAT")
+
+    # =============================================================================
+    # 代码检索配置 - Code Search
+    # =============================================================================
+    code_search_index_path: str = Field(default="./indexes/code_search", description="代码检索三元组索引存储路径", env="CODE_SEARCH_INDEX_PATH")
+    code_search_max_file_size: int = Field(default=1024 * 1024, description="参与索引的最大文件大小(字节)", env="CODE_SEARCH_MAX_FILE_SIZE")
+    code_search_max_segments: int = Field(default=8, description="索引段数量上限，超过后合并", env="CODE_SEARCH_MAX_SEGMENTS")
+    code_search_max_dead_ratio: float = Field(default=0.3, description="失效文档占比上限，超过后合并", env="CODE_SEARCH_MAX_DEAD_RATIO")
+
     class Config:
         env_file = "env"
         env_file_encoding = "utf-8"
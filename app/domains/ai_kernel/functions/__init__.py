@@ -4,10 +4,12 @@ from .rag_function import RAGFunction
 from .github_function import GitHubFunction
 from .gitee_function import GiteeFunction
 from .file_function import FileFunction
+from .code_search_function import CodeSearchFunction
 
 __all__ = [
     "RAGFunction",
     "GitHubFunction", 
     "GiteeFunction",
-    "FileFunction"
+    "FileFunction",
+    "CodeSearchFunction"
 ] 
\ No newline at end of file
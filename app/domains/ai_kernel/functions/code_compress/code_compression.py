@@ -1,5 +1,7 @@
 from typing import Dict, Optional
-from .utils.code_file_detector import CodeFileDetector
+from app.config.settings import settings
+from app.domains.repo_mgmt.services.file_classifier import FileClassifier
+from .code_file_detector import CodeFileDetector
 from .compressors.generic_compressor import GenericCompressor
 from .compressors.python_compressor import PythonCompressor
 from .compressors.javascript_compressor import JavaScriptCompressor
@@ -75,6 +77,11 @@ class CodeCompressionService:
         if not content:
             return content
         
+        # 生成代码、压缩产物只输出摘要
+        summary = self.summarize_skipped(content, file_path)
+        if summary is not None:
+            return summary
+        
         # 确定语言类型
         if language_type is None:
             if file_path is None:
@@ -87,4 +94,20 @@ class CodeCompressionService:
             compressor = self._compressors[language_type]
             return compressor.compress(content)
         
-        return self._generic_compressor.compress(content) 
\ No newline at end of file
+        return self._generic_compressor.compress(content)
+
+    def summarize_skipped(self, content: str, file_path: Optional[str]) -> Optional[str]:
+        """
+        第三方、生成、压缩文件返回摘要，普通文件返回 None
+        
+        Args:
+            content: 文件内容
+            file_path: 文件路径（相对仓库根目录）
+        """
+        if not file_path or not settings.repo_skip_generated_files:
+            return None
+        
+        classification = FileClassifier.classify_text(content, file_path)
+        if not classification.is_skippable:
+            return None
+        return FileClassifier.summarize(classification, file_path, content)
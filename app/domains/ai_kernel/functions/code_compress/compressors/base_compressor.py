@@ -1,9 +1,14 @@
 """
 基础压缩器接口
-定义所有压缩器必须实现的方法
+定义所有压缩器必须实现的方法，以及逐行压缩器共用的正则工具
 """
 
+import re
 from abc import ABC, abstractmethod
+from typing import Pattern, Sequence
+
+# 逐行判断的正则大多以行首空白开头
+_LINE_START = r'^\s*'
 
 
 class BaseCompressor(ABC):
@@ -20,4 +25,51 @@ class BaseCompressor(ABC):
         Returns:
             压缩后的代码内容
         """
-        pass 
\ No newline at end of file
+        pass
+
+
+def _has_top_level_branch(pattern: str) -> bool:
+    """正则顶层（分组、字符集之外）是否含 |，如 ^\\s*\\{|\\} 的第二个分支不受行首空白约束"""
+    depth, in_class, escaped = 0, False, False
+    for char in pattern:
+        if escaped:
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == '|' and depth == 0:
+            return True
+    return False
+
+
+def compile_alternation(patterns: Sequence[str], flags: int = 0) -> Pattern:
+    """
+    把逐条尝试的行首正则合并为一条预编译的交替式，一次 match 等价于 any(re.match(p, line) for p in patterns)
+
+    以 ^\\s* 开头的正则把行首空白提到交替式之外，各分支以字面字符开头，正则引擎按首字符直接跳过不可能命中的分支；
+    其余正则（含顶层 | 的）整条加非捕获分组作为独立分支
+
+    Args:
+        patterns: 正则列表
+        flags: 正则标志
+
+    Returns:
+        预编译的正则
+    """
+    anchored, others = [], []
+    for pattern in patterns:
+        if pattern.startswith(_LINE_START) and not _has_top_level_branch(pattern):
+            anchored.append(f'(?:{pattern[len(_LINE_START):]})')
+        else:
+            others.append(f'(?:{pattern})')
+    branches = others
+    if anchored:
+        branches = [f'{_LINE_START}(?:{"|".join(anchored)})'] + others
+    return re.compile('|'.join(branches), flags)
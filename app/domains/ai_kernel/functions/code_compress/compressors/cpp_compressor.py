@@ -5,7 +5,68 @@ C++代码压缩器
 """
 
 import re
-from .base_compressor import BaseCompressor
+from .base_compressor import BaseCompressor, compile_alternation
+
+
+_IMPORTANT_PATTERNS = [
+    r'^\s*#include\s+',                 # 头文件包含
+    r'^\s*#define\s+',                  # 宏定义
+    r'^\s*#if',                         # 条件编译开始
+    r'^\s*#else',                       # 条件编译else
+    r'^\s*#elif',                       # 条件编译elif
+    r'^\s*#endif',                      # 条件编译结束
+    r'^\s*#pragma',                     # 编译器指令
+    r'^\s*namespace\s+',                # 命名空间声明
+    r'^\s*using\s+',                    # using 声明
+    r'^\s*template\s*<',                # 模板声明
+    r'^\s*(class|struct|union|enum)\s+', # 类型声明
+    r'^\s*(public|private|protected):',  # 访问修饰符
+    r'^\s*(virtual|static|explicit|inline|constexpr|friend|extern|mutable)\s+', # 函数修饰符
+    r'^\s*(const|volatile|noexcept|throw|final|override|delete|default)\s+', # 函数特性
+    r'^\s*\w+::\w+\s*\(',               # 类方法实现
+    r'^\s*\w+\s*\([^)]*\)\s*(\{|const|override|final|noexcept|throw|->|=|;)', # 函数声明/定义
+    r'^\s*typedef\s+',                  # 类型定义
+    r'^\s*using\s+\w+\s*=',             # 类型别名
+    r'^\s*friend\s+',                   # 友元声明
+    r'^\s*operator\s*',                 # 运算符重载
+    r'^\s*~\w+\s*\(',                   # 析构函数
+    r'^\s*\w+\s*\(\)\s*:\s*',           # 构造函数初始化列表
+    r'^\s*static_assert\s*\(',          # 静态断言
+    r'^\s*concept\s+',                  # C++20 概念
+    r'^\s*requires\s+',                 # C++20 约束
+    r'^\s*export\s+',                   # 模块导出
+    r'^\s*import\s+',                   # 模块导入
+    r'^\s*module\s+',                   # 模块声明
+    r'^\s*\{',                          # 开始大括号
+    r'^\s*\}',                          # 结束大括号
+    r'^\s*};',                          # 类/结构体定义结束
+    r'^\s*auto\s+',                     # auto 关键字
+    r'^\s*decltype\s*\(',               # decltype 表达式
+    r'^\s*typeid\s*\(',                 # typeid 表达式
+    r'^\s*alignas\s*\(',                # alignas 说明符
+    r'^\s*alignof\s*\(',                # alignof 操作符
+    r'^\s*nullptr',                     # nullptr 关键字
+    r'^\s*override\s+',                 # override 说明符
+    r'^\s*final\s+',                    # final 说明符
+    r'^\s*delete\s+',                   # delete 说明符
+    r'^\s*default\s+',                  # default 说明符
+    r'^\s*noexcept\s*\(',               # noexcept 操作符
+    r'^\s*constexpr\s+',                # constexpr 说明符
+    r'^\s*consteval\s+',                # consteval 说明符（C++20）
+    r'^\s*constinit\s+',                # constinit 说明符（C++20）
+    r'^\s*co_await\s+',                 # co_await 表达式
+    r'^\s*co_yield\s+',                 # co_yield 表达式
+    r'^\s*co_return\s+',                # co_return 语句
+    r'^\s*requires\s+',                 # requires 子句
+    r'^\s*concept\s+',                  # concept 定义
+]
+_IMPORTANT_LINE = compile_alternation(_IMPORTANT_PATTERNS, re.IGNORECASE)
+_ALIAS_OR_MACRO = re.compile(r'^\s*(using|#define)')
+_FUNCTION_DECLARATION = re.compile(r'^\s*\w+\s*\([^)]*\)\s*(const|override|final|noexcept|throw)?\s*\{?\s*$')
+_TEMPLATE_DECLARATION = re.compile(r'^\s*template\s*<.*>\s*$')
+_CLASS_DECLARATION = re.compile(r'^(\s*(?:class|struct|union)\s+\w+)')
+_ENUM_DECLARATION = re.compile(r'^(\s*enum\s+\w+)')
+_NAMESPACE_DECLARATION = re.compile(r'^(\s*namespace\s+\w+)')
 
 
 class CppCompressor(BaseCompressor):
@@ -85,60 +146,7 @@ class CppCompressor(BaseCompressor):
         Returns:
             如果是重要的C++行返回 True
         """
-        important_patterns = [
-            r'^\s*#include\s+',                 # 头文件包含
-            r'^\s*#define\s+',                  # 宏定义
-            r'^\s*#if',                         # 条件编译开始
-            r'^\s*#else',                       # 条件编译else
-            r'^\s*#elif',                       # 条件编译elif
-            r'^\s*#endif',                      # 条件编译结束
-            r'^\s*#pragma',                     # 编译器指令
-            r'^\s*namespace\s+',                # 命名空间声明
-            r'^\s*using\s+',                    # using 声明
-            r'^\s*template\s*<',                # 模板声明
-            r'^\s*(class|struct|union|enum)\s+', # 类型声明
-            r'^\s*(public|private|protected):',  # 访问修饰符
-            r'^\s*(virtual|static|explicit|inline|constexpr|friend|extern|mutable)\s+', # 函数修饰符
-            r'^\s*(const|volatile|noexcept|throw|final|override|delete|default)\s+', # 函数特性
-            r'^\s*\w+::\w+\s*\(',               # 类方法实现
-            r'^\s*\w+\s*\([^)]*\)\s*(\{|const|override|final|noexcept|throw|->|=|;)', # 函数声明/定义
-            r'^\s*typedef\s+',                  # 类型定义
-            r'^\s*using\s+\w+\s*=',             # 类型别名
-            r'^\s*friend\s+',                   # 友元声明
-            r'^\s*operator\s*',                 # 运算符重载
-            r'^\s*~\w+\s*\(',                   # 析构函数
-            r'^\s*\w+\s*\(\)\s*:\s*',           # 构造函数初始化列表
-            r'^\s*static_assert\s*\(',          # 静态断言
-            r'^\s*concept\s+',                  # C++20 概念
-            r'^\s*requires\s+',                 # C++20 约束
-            r'^\s*export\s+',                   # 模块导出
-            r'^\s*import\s+',                   # 模块导入
-            r'^\s*module\s+',                   # 模块声明
-            r'^\s*\{',                          # 开始大括号
-            r'^\s*\}',                          # 结束大括号
-            r'^\s*};',                          # 类/结构体定义结束
-            r'^\s*auto\s+',                     # auto 关键字
-            r'^\s*decltype\s*\(',               # decltype 表达式
-            r'^\s*typeid\s*\(',                 # typeid 表达式
-            r'^\s*alignas\s*\(',                # alignas 说明符
-            r'^\s*alignof\s*\(',                # alignof 操作符
-            r'^\s*nullptr',                     # nullptr 关键字
-            r'^\s*override\s+',                 # override 说明符
-            r'^\s*final\s+',                    # final 说明符
-            r'^\s*delete\s+',                   # delete 说明符
-            r'^\s*default\s+',                  # default 说明符
-            r'^\s*noexcept\s*\(',               # noexcept 操作符
-            r'^\s*constexpr\s+',                # constexpr 说明符
-            r'^\s*consteval\s+',                # consteval 说明符（C++20）
-            r'^\s*constinit\s+',                # constinit 说明符（C++20）
-            r'^\s*co_await\s+',                 # co_await 表达式
-            r'^\s*co_yield\s+',                 # co_yield 表达式
-            r'^\s*co_return\s+',                # co_return 语句
-            r'^\s*requires\s+',                 # requires 子句
-            r'^\s*concept\s+',                  # concept 定义
-        ]
-        
-        return any(re.match(pattern, line, re.IGNORECASE) for pattern in important_patterns)
+        return _IMPORTANT_LINE.match(line) is not None
     
     def _normalize_cpp_line(self, line: str) -> str:
         """
@@ -164,39 +172,36 @@ class CppCompressor(BaseCompressor):
         equal_index = working.find('=')
         if equal_index >= 0 and '==' not in working and '<=' not in working and '>=' not in working and '!=' not in working:
             # 检查是否是类型别名或宏定义
-            if not re.match(r'^\s*(using|#define)', working[:equal_index]):
+            if not _ALIAS_OR_MACRO.match(working[:equal_index]):
                 prefix = working[:equal_index].rstrip()
                 if not prefix.endswith(';'):
                     prefix += ";"
                 return prefix
         
         # 处理函数声明，确保函数体为空
-        if re.match(r'^\s*\w+\s*\([^)]*\)\s*(const|override|final|noexcept|throw)?\s*\{?\s*$', working):
+        if _FUNCTION_DECLARATION.match(working):
             if not working.endswith('{'):
                 return working + " { }"
             else:
                 return working
         
         # 处理模板特化
-        if re.match(r'^\s*template\s*<.*>\s*$', working):
+        if _TEMPLATE_DECLARATION.match(working):
             return working
         
         # 处理类定义
-        if re.match(r'^\s*(class|struct|union)\s+\w+', working):
-            match = re.match(r'^(\s*(?:class|struct|union)\s+\w+)', working)
-            if match:
-                return match.group(1) + " { }"
+        match = _CLASS_DECLARATION.match(working)
+        if match:
+            return match.group(1) + " { }"
         
         # 处理枚举定义
-        if re.match(r'^\s*enum\s+', working):
-            match = re.match(r'^(\s*enum\s+\w+)', working)
-            if match:
-                return match.group(1) + " { }"
+        match = _ENUM_DECLARATION.match(working)
+        if match:
+            return match.group(1) + " { }"
         
         # 处理命名空间定义
-        if re.match(r'^\s*namespace\s+\w+', working):
-            match = re.match(r'^(\s*namespace\s+\w+)', working)
-            if match:
-                return match.group(1) + " { }"
+        match = _NAMESPACE_DECLARATION.match(working)
+        if match:
+            return match.group(1) + " { }"
         
         return working 
\ No newline at end of file
@@ -4,7 +4,19 @@ CSS代码压缩器
 """
 
 import re
-from .base_compressor import BaseCompressor
+from .base_compressor import BaseCompressor, compile_alternation
+
+
+_IMPORTANT_PATTERNS = [
+    r'^\s*@\w+',                          # @规则
+    r'^\s*[.#]?\w+\s*\{',                 # 选择器
+    r'^\s*\}',                            # 结束大括号
+    r'^\s*/\*',                           # 注释开始
+    r'^\s*\*/',                           # 注释结束
+]
+_IMPORTANT_LINE = compile_alternation(_IMPORTANT_PATTERNS)
+_SELECTOR = re.compile(r'^(\s*[.#]?\w+\s*\{)')
+_AT_RULE = re.compile(r'^(\s*@\w+)')
 
 
 class CssCompressor(BaseCompressor):
@@ -30,7 +42,7 @@ class CssCompressor(BaseCompressor):
                 continue
             
             # 保留注释
-            if trimmed_line.startswith('/*') or trimmed_line.startswith('*'):
+            if trimmed_line.startswith(('/*', '*')):
                 result.append(line)
                 continue
             
@@ -51,15 +63,7 @@ class CssCompressor(BaseCompressor):
         Returns:
             如果是重要的CSS行返回 True
         """
-        important_patterns = [
-            r'^\s*@\w+',                          # @规则
-            r'^\s*[.#]?\w+\s*\{',                 # 选择器
-            r'^\s*\}',                            # 结束大括号
-            r'^\s*/\*',                           # 注释开始
-            r'^\s*\*/',                           # 注释结束
-        ]
-        
-        return any(re.match(pattern, line) for pattern in important_patterns)
+        return _IMPORTANT_LINE.match(line) is not None
     
     def _normalize_css_line(self, line: str) -> str:
         """
@@ -74,15 +78,13 @@ class CssCompressor(BaseCompressor):
         working = line.rstrip()
         
         # 处理选择器，移除属性
-        if re.match(r'^\s*[.#]?\w+\s*\{', working):
-            match = re.match(r'^(\s*[.#]?\w+\s*\{)', working)
-            if match:
-                return match.group(1) + " }"
+        match = _SELECTOR.match(working)
+        if match:
+            return match.group(1) + " }"
         
         # 处理@规则
-        if re.match(r'^\s*@\w+', working):
-            match = re.match(r'^(\s*@\w+)', working)
-            if match:
-                return match.group(1) + " { }"
+        match = _AT_RULE.match(working)
+        if match:
+            return match.group(1) + " { }"
         
         return working 
\ No newline at end of file
@@ -5,7 +5,28 @@
 
 import re
 from typing import List
-from .base_compressor import BaseCompressor
+from .base_compressor import BaseCompressor, compile_alternation
+
+
+# 检查常见的结构性关键字
+_STRUCTURAL_PATTERNS = [
+    r'^\s*(class|interface|enum|struct|namespace|import|using|include|require|from|package)\s+',
+    r'^\s*(public|private|protected|internal|static|final|abstract|override|virtual|extern|const)\s+',
+    r'^\s*(function|def|func|sub|proc|method|procedure|fn|fun|async|await|export)\s+',
+    r'^\s*(var|let|const|dim|int|string|bool|float|double|void|auto|val|char)\s+',
+    r'^\s*(@|\[|#)\w+',  # 装饰器、特性、注解
+    r'^\s*<\w+',         # XML/HTML标签
+    r'^\s*\w+\s*\(',     # 函数调用
+    r'^\s*\{|\}|\(|\)|\[|\]', # 括号
+    r'^\s*#\w+',         # 预处理指令
+]
+_STRUCTURAL_LINE = compile_alternation(_STRUCTURAL_PATTERNS, re.IGNORECASE)
+_FUNCTION_SIGNATURE = re.compile(r'^\s*(\w+\s+)*\w+\s*\([^)]*\)\s*(\{|\=>)')
+_SIGNATURE_PREFIX = re.compile(r'^(.*?\([^)]*\))')
+_DECLARATION = re.compile(r'^\s*(\w+\s+)*\w+\s*=')
+_DECLARATION_PREFIX = re.compile(r'^(.*?)=')
+_FUNCTION_CALL = re.compile(r'\w+\s*\(')
+_CALL_ARGUMENTS = re.compile(r'(\w+\s*)\([^)]*\)')
 
 
 class GenericCompressor(BaseCompressor):
@@ -47,9 +68,7 @@ class GenericCompressor(BaseCompressor):
                 continue
             
             # 保留注释行
-            if (trimmed_line.startswith('//') or trimmed_line.startswith('#') or 
-                trimmed_line.startswith('/*') or trimmed_line.startswith('*') or
-                trimmed_line.startswith("'''") or trimmed_line.startswith('"""')):
+            if trimmed_line.startswith(('//', '#', '/*', '*', "'''", '"""')):
                 result.append(line)
                 continue
             
@@ -75,20 +94,7 @@ class GenericCompressor(BaseCompressor):
         Returns:
             如果是结构性行返回 True
         """
-        # 检查常见的结构性关键字
-        structural_patterns = [
-            r'^\s*(class|interface|enum|struct|namespace|import|using|include|require|from|package)\s+',
-            r'^\s*(public|private|protected|internal|static|final|abstract|override|virtual|extern|const)\s+',
-            r'^\s*(function|def|func|sub|proc|method|procedure|fn|fun|async|await|export)\s+',
-            r'^\s*(var|let|const|dim|int|string|bool|float|double|void|auto|val|char)\s+',
-            r'^\s*(@|\[|#)\w+',  # 装饰器、特性、注解
-            r'^\s*<\w+',         # XML/HTML标签
-            r'^\s*\w+\s*\(',     # 函数调用
-            r'^\s*\{|\}|\(|\)|\[|\]', # 括号
-            r'^\s*#\w+',         # 预处理指令
-        ]
-        
-        return any(re.match(pattern, line, re.IGNORECASE) for pattern in structural_patterns)
+        return _STRUCTURAL_LINE.match(line) is not None
     
     def _normalize_structural_line(self, line: str) -> str:
         """
@@ -101,14 +107,14 @@ class GenericCompressor(BaseCompressor):
             规范化后的代码行
         """
         # 保留函数/方法声明，但移除函数体
-        if re.match(r'^\s*(\w+\s+)*\w+\s*\([^)]*\)\s*(\{|\=>)', line):
-            match = re.match(r'^(.*?\([^)]*\))', line)
+        if _FUNCTION_SIGNATURE.match(line):
+            match = _SIGNATURE_PREFIX.match(line)
             if match:
                 return match.group(1) + " { }"
         
         # 保留变量声明，但移除初始化表达式
-        if re.match(r'^\s*(\w+\s+)*\w+\s*=', line):
-            match = re.match(r'^(.*?)=', line)
+        if _DECLARATION.match(line):
+            match = _DECLARATION_PREFIX.match(line)
             if match:
                 return match.group(1) + ";"
         
@@ -132,7 +138,7 @@ class GenericCompressor(BaseCompressor):
                 return parts[0] + ";"
         
         # 移除函数调用参数
-        if re.search(r'\w+\s*\(', line):
-            return re.sub(r'(\w+\s*)\([^)]*\)', r'\1();', line)
+        if _FUNCTION_CALL.search(line):
+            return _CALL_ARGUMENTS.sub(r'\1();', line)
         
         return line 
\ No newline at end of file
@@ -4,7 +4,19 @@ Go代码压缩器
 """
 
 import re
-from .base_compressor import BaseCompressor
+from .base_compressor import BaseCompressor, compile_alternation
+
+
+_IMPORTANT_PATTERNS = [
+    r'^\s*(package|import)\s+',           # package 和 import 语句
+    r'^\s*(type|func|var|const)\s+',      # 类型、函数、变量、常量定义
+    r'^\s*(interface|struct)\s+',          # 接口和结构体定义
+    r'^\s*(if|else|for|switch|case|default|select|go|defer|return|break|continue|fallthrough)\s',  # 控制语句
+    r'^\s*\{|\}',                         # 大括号
+]
+_IMPORTANT_LINE = compile_alternation(_IMPORTANT_PATTERNS)
+_FUNCTION_SIGNATURE = re.compile(r'^\s*func\s+\w+\s*\(')
+_TYPE_DECLARATION = re.compile(r'^(\s*type\s+\w+)')
 
 
 class GoCompressor(BaseCompressor):
@@ -30,7 +42,7 @@ class GoCompressor(BaseCompressor):
                 continue
             
             # 保留注释
-            if trimmed_line.startswith('//') or trimmed_line.startswith('/*'):
+            if trimmed_line.startswith(('//', '/*')):
                 result.append(line)
                 continue
             
@@ -51,15 +63,7 @@ class GoCompressor(BaseCompressor):
         Returns:
             如果是重要的Go行返回 True
         """
-        important_patterns = [
-            r'^\s*(package|import)\s+',           # package 和 import 语句
-            r'^\s*(type|func|var|const)\s+',      # 类型、函数、变量、常量定义
-            r'^\s*(interface|struct)\s+',          # 接口和结构体定义
-            r'^\s*(if|else|for|switch|case|default|select|go|defer|return|break|continue|fallthrough)\s',  # 控制语句
-            r'^\s*\{|\}',                         # 大括号
-        ]
-        
-        return any(re.match(pattern, line) for pattern in important_patterns)
+        return _IMPORTANT_LINE.match(line) is not None
     
     def _normalize_go_line(self, line: str) -> str:
         """
@@ -74,7 +78,7 @@ class GoCompressor(BaseCompressor):
         working = line.rstrip()
         
         # 处理函数定义
-        if re.match(r'^\s*func\s+\w+\s*\(', working):
+        if _FUNCTION_SIGNATURE.match(working):
             # 找到函数签名的结束位置
             paren_count = 0
             for i, char in enumerate(working):
@@ -86,9 +90,8 @@ class GoCompressor(BaseCompressor):
                         return working[:i+1] + " { }"
         
         # 处理类型定义
-        if re.match(r'^\s*type\s+\w+', working):
-            match = re.match(r'^(\s*type\s+\w+)', working)
-            if match:
-                return match.group(1) + " { }"
+        match = _TYPE_DECLARATION.match(working)
+        if match:
+            return match.group(1) + " { }"
         
         return working 
\ No newline at end of file
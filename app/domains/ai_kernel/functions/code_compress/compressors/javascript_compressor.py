@@ -3,8 +3,33 @@ JavaScript/TypeScript代码压缩器
 专门用于压缩JavaScript和TypeScript代码，保留重要的结构和注释
 """
 
-import re
-from .base_compressor import BaseCompressor
+from .base_compressor import BaseCompressor, compile_alternation
+
+
+# 这组正则表达式旨在更精确地捕获结构性代码
+_IMPORTANT_PATTERNS = [
+    # ES6+ 模块导入/导出
+    r'^\s*(import|export)\s+',
+
+    # 类、接口、枚举、类型别名声明 (支持 public/private/protected 等 TS 修饰符)
+    r'^\s*((public|private|protected|static|readonly|abstract|async)\s+)*\s*(class|interface|enum|type)\s+\w+',
+
+    # 标准函数声明 (function foo() {}) 和生成器函数 (function* foo() {})
+    r'^\s*(async\s+)?function\*?\s+\w+\s*\(',
+
+    # 变量/常量声明，且其值为函数表达式或箭头函数
+    r'^\s*(const|let|var)\s+[\w\d_]+\s*[:=]\s*(async\s+)?(\([^)]*\)|[\w\d_]+)\s*=>',  # const myFunc = (a) => ...
+    r'^\s*(const|let|var)\s+[\w\d_]+\s*=\s*(async\s+)?function\*?',  # const myFunc = function...
+
+    # 类或对象中的方法定义
+    r'^\s*(static\s+|get\s+|set\s+|async\s+)?\*?[\w\d_]+\s*\([^)]*\)\s*\{',  # myMethod(args) {
+    r'^\s*[\w\d_]+\s*:\s*(async\s+)?(function\*?\(|\([^)]*\)\s*=>)',  # myProp: function() 或 myProp: () =>
+
+    # 独立的大括号
+    r'^\s*\{',
+    r'^\s*\}'
+]
+_IMPORTANT_LINE = compile_alternation(_IMPORTANT_PATTERNS)
 
 
 class JavaScriptCompressor(BaseCompressor):
@@ -31,7 +56,7 @@ class JavaScriptCompressor(BaseCompressor):
                 continue
             
             # 保留注释
-            if trimmed_line.startswith('//') or trimmed_line.startswith('/*'):
+            if trimmed_line.startswith(('//', '/*')):
                 result.append(line)
                 continue
             
@@ -104,28 +129,4 @@ class JavaScriptCompressor(BaseCompressor):
         Returns:
             如果是重要的JavaScript行返回 True
         """
-        # 这组正则表达式旨在更精确地捕获结构性代码
-        important_patterns = [
-            # ES6+ 模块导入/导出
-            r'^\s*(import|export)\s+',
-            
-            # 类、接口、枚举、类型别名声明 (支持 public/private/protected 等 TS 修饰符)
-            r'^\s*((public|private|protected|static|readonly|abstract|async)\s+)*\s*(class|interface|enum|type)\s+\w+',
-            
-            # 标准函数声明 (function foo() {}) 和生成器函数 (function* foo() {})
-            r'^\s*(async\s+)?function\*?\s+\w+\s*\(',
-            
-            # 变量/常量声明，且其值为函数表达式或箭头函数
-            r'^\s*(const|let|var)\s+[\w\d_]+\s*[:=]\s*(async\s+)?(\([^)]*\)|[\w\d_]+)\s*=>',  # const myFunc = (a) => ...
-            r'^\s*(const|let|var)\s+[\w\d_]+\s*=\s*(async\s+)?function\*?',  # const myFunc = function...
-            
-            # 类或对象中的方法定义
-            r'^\s*(static\s+|get\s+|set\s+|async\s+)?\*?[\w\d_]+\s*\([^)]*\)\s*\{',  # myMethod(args) {
-            r'^\s*[\w\d_]+\s*:\s*(async\s+)?(function\*?\(|\([^)]*\)\s*=>)',  # myProp: function() 或 myProp: () =>
-            
-            # 独立的大括号
-            r'^\s*\{',
-            r'^\s*\}'
-        ]
-        
-        return any(re.match(pattern, line) for pattern in important_patterns) 
\ No newline at end of file
+        return _IMPORTANT_LINE.match(line) is not None 
\ No newline at end of file
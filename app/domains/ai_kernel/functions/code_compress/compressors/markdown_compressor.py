@@ -4,7 +4,25 @@ Markdown代码压缩器
 """
 
 import re
-from .base_compressor import BaseCompressor
+from .base_compressor import BaseCompressor, compile_alternation
+
+
+_IMPORTANT_PATTERNS = [
+    r'^\s*#{1,6}\s+',                     # 标题
+    r'^\s*[-*+]\s+',                      # 无序列表
+    r'^\s*\d+\.\s+',                      # 有序列表
+    r'^\s*>\s+',                          # 引用
+    r'^\s*```',                           # 代码块
+    r'^\s*\[.*\]\(.*\)',                  # 链接
+    r'^\s*!\[.*\]\(.*\)',                 # 图片
+    r'^\s*\|.*\|',                        # 表格
+    r'^\s*---+\s*$',                      # 分隔线
+]
+_IMPORTANT_LINE = compile_alternation(_IMPORTANT_PATTERNS)
+_HEADING = re.compile(r'^(\s*#{1,6}\s+[^\n]*)')
+_UNORDERED_ITEM = re.compile(r'^(\s*[-*+]\s+)')
+_ORDERED_ITEM = re.compile(r'^(\s*\d+\.\s+)')
+_QUOTE = re.compile(r'^(\s*>\s+)')
 
 
 class MarkdownCompressor(BaseCompressor):
@@ -46,19 +64,7 @@ class MarkdownCompressor(BaseCompressor):
         Returns:
             如果是重要的Markdown行返回 True
         """
-        important_patterns = [
-            r'^\s*#{1,6}\s+',                     # 标题
-            r'^\s*[-*+]\s+',                      # 无序列表
-            r'^\s*\d+\.\s+',                      # 有序列表
-            r'^\s*>\s+',                          # 引用
-            r'^\s*```',                           # 代码块
-            r'^\s*\[.*\]\(.*\)',                  # 链接
-            r'^\s*!\[.*\]\(.*\)',                 # 图片
-            r'^\s*\|.*\|',                        # 表格
-            r'^\s*---+\s*$',                      # 分隔线
-        ]
-        
-        return any(re.match(pattern, line) for pattern in important_patterns)
+        return _IMPORTANT_LINE.match(line) is not None
     
     def _normalize_markdown_line(self, line: str) -> str:
         """
@@ -73,27 +79,23 @@ class MarkdownCompressor(BaseCompressor):
         working = line.rstrip()
         
         # 处理标题，保留标题级别和名称
-        if re.match(r'^\s*#{1,6}\s+', working):
-            match = re.match(r'^(\s*#{1,6}\s+[^\n]*)', working)
-            if match:
-                return match.group(1)
+        match = _HEADING.match(working)
+        if match:
+            return match.group(1)
         
         # 处理列表项，保留列表标记
-        if re.match(r'^\s*[-*+]\s+', working):
-            match = re.match(r'^(\s*[-*+]\s+)', working)
-            if match:
-                return match.group(1) + "..."
+        match = _UNORDERED_ITEM.match(working)
+        if match:
+            return match.group(1) + "..."
         
         # 处理有序列表
-        if re.match(r'^\s*\d+\.\s+', working):
-            match = re.match(r'^(\s*\d+\.\s+)', working)
-            if match:
-                return match.group(1) + "..."
+        match = _ORDERED_ITEM.match(working)
+        if match:
+            return match.group(1) + "..."
         
         # 处理引用
-        if re.match(r'^\s*>\s+', working):
-            match = re.match(r'^(\s*>\s+)', working)
-            if match:
-                return match.group(1) + "..."
+        match = _QUOTE.match(working)
+        if match:
+            return match.group(1) + "..."
         
         return working 
\ No newline at end of file
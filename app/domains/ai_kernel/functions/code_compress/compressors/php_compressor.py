@@ -4,7 +4,22 @@ PHP代码压缩器
 """
 
 import re
-from .base_compressor import BaseCompressor
+from .base_compressor import BaseCompressor, compile_alternation
+
+
+_IMPORTANT_PATTERNS = [
+    r'^\s*<\?php',                        # PHP开始标签
+    r'^\s*\?>',                           # PHP结束标签
+    r'^\s*(namespace|use)\s+',            # namespace 和 use 语句
+    r'^\s*(class|interface|trait|abstract|final)\s+',  # 类、接口、特性定义
+    r'^\s*(public|private|protected|static|const|var)\s+',  # 修饰符
+    r'^\s*function\s+\w+\s*\(',          # 函数定义
+    r'^\s*\{|\}',                         # 大括号
+    r'^\s*(if|else|for|while|foreach|switch|case|default|try|catch|finally|throw|return|break|continue)\s',  # 控制语句
+]
+_IMPORTANT_LINE = compile_alternation(_IMPORTANT_PATTERNS)
+_FUNCTION_SIGNATURE = re.compile(r'^\s*function\s+\w+\s*\(')
+_CLASS_DECLARATION = re.compile(r'^(\s*(?:class|interface|trait)\s+\w+)')
 
 
 class PhpCompressor(BaseCompressor):
@@ -30,8 +45,7 @@ class PhpCompressor(BaseCompressor):
                 continue
             
             # 保留注释
-            if (trimmed_line.startswith('//') or trimmed_line.startswith('/*') or 
-                trimmed_line.startswith('*') or trimmed_line.startswith('#')):
+            if trimmed_line.startswith(('//', '/*', '*', '#')):
                 result.append(line)
                 continue
             
@@ -52,18 +66,7 @@ class PhpCompressor(BaseCompressor):
         Returns:
             如果是重要的PHP行返回 True
         """
-        important_patterns = [
-            r'^\s*<\?php',                        # PHP开始标签
-            r'^\s*\?>',                           # PHP结束标签
-            r'^\s*(namespace|use)\s+',            # namespace 和 use 语句
-            r'^\s*(class|interface|trait|abstract|final)\s+',  # 类、接口、特性定义
-            r'^\s*(public|private|protected|static|const|var)\s+',  # 修饰符
-            r'^\s*function\s+\w+\s*\(',          # 函数定义
-            r'^\s*\{|\}',                         # 大括号
-            r'^\s*(if|else|for|while|foreach|switch|case|default|try|catch|finally|throw|return|break|continue)\s',  # 控制语句
-        ]
-        
-        return any(re.match(pattern, line) for pattern in important_patterns)
+        return _IMPORTANT_LINE.match(line) is not None
     
     def _normalize_php_line(self, line: str) -> str:
         """
@@ -78,13 +81,12 @@ class PhpCompressor(BaseCompressor):
         working = line.rstrip()
         
         # 处理类定义
-        if re.match(r'^\s*(class|interface|trait)\s+\w+', working):
-            match = re.match(r'^(\s*(?:class|interface|trait)\s+\w+)', working)
-            if match:
-                return match.group(1) + " { }"
+        match = _CLASS_DECLARATION.match(working)
+        if match:
+            return match.group(1) + " { }"
         
         # 处理函数定义
-        if re.match(r'^\s*function\s+\w+\s*\(', working):
+        if _FUNCTION_SIGNATURE.match(working):
             # 找到函数签名的结束位置
             paren_count = 0
             for i, char in enumerate(working):
@@ -4,7 +4,23 @@ Python代码压缩器
 """
 
 import re
-from .base_compressor import BaseCompressor
+from .base_compressor import BaseCompressor, compile_alternation
+
+
+_IMPORTANT_PATTERNS = [
+    r'^\s*import\s+',                   # import 语句
+    r'^\s*from\s+.*import',             # from import 语句
+    r'^\s*def\s+',                      # 函数定义
+    r'^\s*class\s+',                    # 类定义
+    r'^\s*@\w+',                        # 装饰器
+    r'^\s*if\s+__name__\s*==',          # 主程序入口
+    r'^\s*(if|elif|else|for|while|try|except|finally|with)[\s:]', # 控制结构
+    r'^\s*return\s+',                   # return
+    r'^\s*print\s*\('                   # print
+]
+_IMPORTANT_LINE = compile_alternation(_IMPORTANT_PATTERNS)
+_BLOCK_LINE = re.compile(r'^\s*(def|class)\s+', re.IGNORECASE)
+_INDENT = re.compile(r'^\s*')
 
 
 class PythonCompressor(BaseCompressor):
@@ -40,8 +56,8 @@ class PythonCompressor(BaseCompressor):
                 result.append(trimmed_line)
                 
                 # 对于 def/class，插入占位 pass 保持语法有效
-                if re.match(r'^\s*(def|class)\s+', trimmed_line, re.IGNORECASE):
-                    indent = re.match(r'^\s*', trimmed_line).group()
+                if _BLOCK_LINE.match(trimmed_line):
+                    indent = _INDENT.match(trimmed_line).group()
                     result.append(indent + "    pass")
                 continue
         
@@ -57,16 +73,4 @@ class PythonCompressor(BaseCompressor):
         Returns:
             如果是重要的Python行返回 True
         """
-        important_patterns = [
-            r'^\s*import\s+',                   # import 语句
-            r'^\s*from\s+.*import',             # from import 语句
-            r'^\s*def\s+',                      # 函数定义
-            r'^\s*class\s+',                    # 类定义
-            r'^\s*@\w+',                        # 装饰器
-            r'^\s*if\s+__name__\s*==',          # 主程序入口
-            r'^\s*(if|elif|else|for|while|try|except|finally|with)[\s:]', # 控制结构
-            r'^\s*return\s+',                   # return
-            r'^\s*print\s*\('                   # print
-        ]
-        
-        return any(re.match(pattern, line) for pattern in important_patterns) 
\ No newline at end of file
+        return _IMPORTANT_LINE.match(line) is not None 
\ No newline at end of file
@@ -4,7 +4,21 @@ Ruby代码压缩器
 """
 
 import re
-from .base_compressor import BaseCompressor
+from .base_compressor import BaseCompressor, compile_alternation
+
+
+_IMPORTANT_PATTERNS = [
+    r'^\s*(require|require_relative|load|include|extend)\s+',  # 加载和包含语句
+    r'^\s*(class|module)\s+',              # 类和模块定义
+    r'^\s*(def|alias|undef)\s+',           # 方法定义
+    r'^\s*(attr_accessor|attr_reader|attr_writer)\s+',  # 属性定义
+    r'^\s*(public|private|protected)\s*$', # 访问修饰符
+    r'^\s*(if|unless|elsif|else|case|when|for|while|until|begin|rescue|ensure|retry|return|break|next|redo)\s',  # 控制语句
+    r'^\s*end\s*$',                        # end 关键字
+]
+_IMPORTANT_LINE = compile_alternation(_IMPORTANT_PATTERNS)
+_CLASS_DECLARATION = re.compile(r'^(\s*(?:class|module)\s+\w+)')
+_METHOD_DECLARATION = re.compile(r'^(\s*def\s+\w+)')
 
 
 class RubyCompressor(BaseCompressor):
@@ -30,7 +44,7 @@ class RubyCompressor(BaseCompressor):
                 continue
             
             # 保留注释
-            if trimmed_line.startswith('#') or trimmed_line.startswith('=begin'):
+            if trimmed_line.startswith(('#', '=begin')):
                 result.append(line)
                 continue
             
@@ -51,17 +65,7 @@ class RubyCompressor(BaseCompressor):
         Returns:
             如果是重要的Ruby行返回 True
         """
-        important_patterns = [
-            r'^\s*(require|require_relative|load|include|extend)\s+',  # 加载和包含语句
-            r'^\s*(class|module)\s+',              # 类和模块定义
-            r'^\s*(def|alias|undef)\s+',           # 方法定义
-            r'^\s*(attr_accessor|attr_reader|attr_writer)\s+',  # 属性定义
-            r'^\s*(public|private|protected)\s*$', # 访问修饰符
-            r'^\s*(if|unless|elsif|else|case|when|for|while|until|begin|rescue|ensure|retry|return|break|next|redo)\s',  # 控制语句
-            r'^\s*end\s*$',                        # end 关键字
-        ]
-        
-        return any(re.match(pattern, line) for pattern in important_patterns)
+        return _IMPORTANT_LINE.match(line) is not None
     
     def _normalize_ruby_line(self, line: str) -> str:
         """
@@ -76,15 +80,13 @@ class RubyCompressor(BaseCompressor):
         working = line.rstrip()
         
         # 处理类定义
-        if re.match(r'^\s*(class|module)\s+\w+', working):
-            match = re.match(r'^(\s*(?:class|module)\s+\w+)', working)
-            if match:
-                return match.group(1)
+        match = _CLASS_DECLARATION.match(working)
+        if match:
+            return match.group(1)
         
         # 处理方法定义
-        if re.match(r'^\s*def\s+\w+', working):
-            match = re.match(r'^(\s*def\s+\w+)', working)
-            if match:
-                return match.group(1)
+        match = _METHOD_DECLARATION.match(working)
+        if match:
+            return match.group(1)
         
         return working 
\ No newline at end of file
@@ -4,7 +4,19 @@ Rust代码压缩器
 """
 
 import re
-from .base_compressor import BaseCompressor
+from .base_compressor import BaseCompressor, compile_alternation
+
+
+_IMPORTANT_PATTERNS = [
+    r'^\s*(use|mod|extern|crate)\s+',     # use、mod、extern、crate 语句
+    r'^\s*(pub|pub\(crate\)|pub\(super\)|pub\(in\s+\w+\))\s+',  # 可见性修饰符
+    r'^\s*(fn|struct|enum|trait|impl|type|const|static|macro_rules!)\s+',  # 定义关键字
+    r'^\s*(if|else|for|while|loop|match|if\s+let|while\s+let)\s',  # 控制语句
+    r'^\s*\{|\}',                         # 大括号
+]
+_IMPORTANT_LINE = compile_alternation(_IMPORTANT_PATTERNS)
+_FUNCTION_SIGNATURE = re.compile(r'^\s*fn\s+\w+\s*\(')
+_TYPE_DECLARATION = re.compile(r'^(\s*(?:struct|enum)\s+\w+)')
 
 
 class RustCompressor(BaseCompressor):
@@ -30,7 +42,7 @@ class RustCompressor(BaseCompressor):
                 continue
             
             # 保留注释
-            if trimmed_line.startswith('//') or trimmed_line.startswith('/*'):
+            if trimmed_line.startswith(('//', '/*')):
                 result.append(line)
                 continue
             
@@ -51,15 +63,7 @@ class RustCompressor(BaseCompressor):
         Returns:
             如果是重要的Rust行返回 True
         """
-        important_patterns = [
-            r'^\s*(use|mod|extern|crate)\s+',     # use、mod、extern、crate 语句
-            r'^\s*(pub|pub\(crate\)|pub\(super\)|pub\(in\s+\w+\))\s+',  # 可见性修饰符
-            r'^\s*(fn|struct|enum|trait|impl|type|const|static|macro_rules!)\s+',  # 定义关键字
-            r'^\s*(if|else|for|while|loop|match|if\s+let|while\s+let)\s',  # 控制语句
-            r'^\s*\{|\}',                         # 大括号
-        ]
-        
-        return any(re.match(pattern, line) for pattern in important_patterns)
+        return _IMPORTANT_LINE.match(line) is not None
     
     def _normalize_rust_line(self, line: str) -> str:
         """
@@ -74,7 +78,7 @@ class RustCompressor(BaseCompressor):
         working = line.rstrip()
         
         # 处理函数定义
-        if re.match(r'^\s*fn\s+\w+\s*\(', working):
+        if _FUNCTION_SIGNATURE.match(working):
             # 找到函数签名的结束位置
             paren_count = 0
             for i, char in enumerate(working):
@@ -86,9 +90,8 @@ class RustCompressor(BaseCompressor):
                         return working[:i+1] + " { }"
         
         # 处理结构体和枚举定义
-        if re.match(r'^\s*(struct|enum)\s+\w+', working):
-            match = re.match(r'^(\s*(?:struct|enum)\s+\w+)', working)
-            if match:
-                return match.group(1) + " { }"
+        match = _TYPE_DECLARATION.match(working)
+        if match:
+            return match.group(1) + " { }"
         
         return working 
\ No newline at end of file
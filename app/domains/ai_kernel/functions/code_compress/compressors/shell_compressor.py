@@ -4,7 +4,20 @@ Shell代码压缩器
 """
 
 import re
-from .base_compressor import BaseCompressor
+from .base_compressor import BaseCompressor, compile_alternation
+
+
+_IMPORTANT_PATTERNS = [
+    r'^\s*#!/',                           # shebang
+    r'^\s*(source|\.)\s+',                # source 命令
+    r'^\s*(export|declare|readonly|local)\s+',  # 变量声明
+    r'^\s*(function\s+\w+|function\s*\(\s*\)|\(\s*\)\s*\{)',  # 函数定义
+    r'^\s*(if|elif|else|fi|for|while|until|do|done|case|esac|select)\s',  # 控制语句
+    r'^\s*\{|\}',                         # 大括号
+]
+_IMPORTANT_LINE = compile_alternation(_IMPORTANT_PATTERNS)
+_ANONYMOUS_FUNCTION = re.compile(r'^\s*\(\s*\)\s*\{')
+_FUNCTION_DECLARATION = re.compile(r'^(\s*function\s+\w+)')
 
 
 class ShellCompressor(BaseCompressor):
@@ -51,16 +64,7 @@ class ShellCompressor(BaseCompressor):
         Returns:
             如果是重要的Shell行返回 True
         """
-        important_patterns = [
-            r'^\s*#!/',                           # shebang
-            r'^\s*(source|\.)\s+',                # source 命令
-            r'^\s*(export|declare|readonly|local)\s+',  # 变量声明
-            r'^\s*(function\s+\w+|function\s*\(\s*\)|\(\s*\)\s*\{)',  # 函数定义
-            r'^\s*(if|elif|else|fi|for|while|until|do|done|case|esac|select)\s',  # 控制语句
-            r'^\s*\{|\}',                         # 大括号
-        ]
-        
-        return any(re.match(pattern, line) for pattern in important_patterns)
+        return _IMPORTANT_LINE.match(line) is not None
     
     def _normalize_shell_line(self, line: str) -> str:
         """
@@ -75,13 +79,12 @@ class ShellCompressor(BaseCompressor):
         working = line.rstrip()
         
         # 处理函数定义
-        if re.match(r'^\s*function\s+\w+', working):
-            match = re.match(r'^(\s*function\s+\w+)', working)
-            if match:
-                return match.group(1) + " { }"
+        match = _FUNCTION_DECLARATION.match(working)
+        if match:
+            return match.group(1) + " { }"
         
         # 处理匿名函数
-        if re.match(r'^\s*\(\s*\)\s*\{', working):
+        if _ANONYMOUS_FUNCTION.match(working):
             return "() { }"
         
         return working 
\ No newline at end of file
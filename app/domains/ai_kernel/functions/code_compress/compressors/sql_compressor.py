@@ -4,7 +4,21 @@ SQL代码压缩器
 """
 
 import re
-from .base_compressor import BaseCompressor
+from .base_compressor import BaseCompressor, compile_alternation
+
+
+_IMPORTANT_PATTERNS = [
+    r'^\s*(SELECT|INSERT|UPDATE|DELETE|CREATE|DROP|ALTER|GRANT|REVOKE|COMMIT|ROLLBACK|BEGIN|END)\s',  # DDL/DML语句
+    r'^\s*(FROM|WHERE|GROUP\s+BY|ORDER\s+BY|HAVING|JOIN|LEFT\s+JOIN|RIGHT\s+JOIN|INNER\s+JOIN|OUTER\s+JOIN)\s',  # 子句
+    r'^\s*(UNION|INTERSECT|EXCEPT)\s',    # 集合操作
+    r'^\s*(WITH|CTE)\s',                  # CTE
+    r'^\s*(IF|CASE|WHEN|THEN|ELSE|END)\s',  # 条件语句
+    r'^\s*\(|\)',                         # 括号
+]
+_IMPORTANT_LINE = compile_alternation(_IMPORTANT_PATTERNS, re.IGNORECASE)
+_SELECT_STATEMENT = re.compile(r'^\s*SELECT\s+', re.IGNORECASE)
+_FROM_CLAUSE = re.compile(r'\s+FROM\s+', re.IGNORECASE)
+_CREATE_STATEMENT = re.compile(r'^(\s*CREATE\s+\w+)', re.IGNORECASE)
 
 
 class SqlCompressor(BaseCompressor):
@@ -30,7 +44,7 @@ class SqlCompressor(BaseCompressor):
                 continue
             
             # 保留注释
-            if trimmed_line.startswith('--') or trimmed_line.startswith('/*'):
+            if trimmed_line.startswith(('--', '/*')):
                 result.append(line)
                 continue
             
@@ -51,16 +65,7 @@ class SqlCompressor(BaseCompressor):
         Returns:
             如果是重要的SQL行返回 True
         """
-        important_patterns = [
-            r'^\s*(SELECT|INSERT|UPDATE|DELETE|CREATE|DROP|ALTER|GRANT|REVOKE|COMMIT|ROLLBACK|BEGIN|END)\s',  # DDL/DML语句
-            r'^\s*(FROM|WHERE|GROUP\s+BY|ORDER\s+BY|HAVING|JOIN|LEFT\s+JOIN|RIGHT\s+JOIN|INNER\s+JOIN|OUTER\s+JOIN)\s',  # 子句
-            r'^\s*(UNION|INTERSECT|EXCEPT)\s',    # 集合操作
-            r'^\s*(WITH|CTE)\s',                  # CTE
-            r'^\s*(IF|CASE|WHEN|THEN|ELSE|END)\s',  # 条件语句
-            r'^\s*\(|\)',                         # 括号
-        ]
-        
-        return any(re.match(pattern, line, re.IGNORECASE) for pattern in important_patterns)
+        return _IMPORTANT_LINE.match(line) is not None
     
     def _normalize_sql_line(self, line: str) -> str:
         """
@@ -75,17 +80,16 @@ class SqlCompressor(BaseCompressor):
         working = line.rstrip()
         
         # 处理SELECT语句，保留基本结构
-        if re.match(r'^\s*SELECT\s+', working, re.IGNORECASE):
+        if _SELECT_STATEMENT.match(working):
             # 简化SELECT语句，只保留基本结构
             if 'FROM' in working.upper():
-                parts = re.split(r'\s+FROM\s+', working, flags=re.IGNORECASE, maxsplit=1)
+                parts = _FROM_CLAUSE.split(working, maxsplit=1)
                 if len(parts) > 1:
                     return parts[0] + " FROM ..."
         
         # 处理CREATE语句
-        if re.match(r'^\s*CREATE\s+', working, re.IGNORECASE):
-            match = re.match(r'^(\s*CREATE\s+\w+)', working, re.IGNORECASE)
-            if match:
-                return match.group(1) + " ..."
+        match = _CREATE_STATEMENT.match(working)
+        if match:
+            return match.group(1) + " ..."
         
         return working 
\ No newline at end of file
@@ -4,7 +4,23 @@ Swift代码压缩器
 """
 
 import re
-from .base_compressor import BaseCompressor
+from .base_compressor import BaseCompressor, compile_alternation
+
+
+_IMPORTANT_PATTERNS = [
+    r'^\s*(import|@import)\s+',           # import 语句
+    r'^\s*(class|struct|enum|protocol|extension)\s+',  # 类型定义
+    r'^\s*(public|private|internal|fileprivate|open)\s+',  # 访问修饰符
+    r'^\s*(static|class|final|mutating|nonmutating)\s+',  # 其他修饰符
+    r'^\s*func\s+\w+\s*\(',               # 函数定义
+    r'^\s*var\s+\w+',                     # 变量定义
+    r'^\s*let\s+\w+',                     # 常量定义
+    r'^\s*\{|\}',                         # 大括号
+    r'^\s*(if|else|for|while|repeat|switch|case|default|guard|defer|return|break|continue|fallthrough)\s',  # 控制语句
+]
+_IMPORTANT_LINE = compile_alternation(_IMPORTANT_PATTERNS)
+_FUNCTION_SIGNATURE = re.compile(r'^\s*func\s+\w+\s*\(')
+_TYPE_DECLARATION = re.compile(r'^(\s*(?:class|struct|enum|protocol)\s+\w+)')
 
 
 class SwiftCompressor(BaseCompressor):
@@ -30,7 +46,7 @@ class SwiftCompressor(BaseCompressor):
                 continue
             
             # 保留注释
-            if trimmed_line.startswith('//') or trimmed_line.startswith('/*'):
+            if trimmed_line.startswith(('//', '/*')):
                 result.append(line)
                 continue
             
@@ -51,19 +67,7 @@ class SwiftCompressor(BaseCompressor):
         Returns:
             如果是重要的Swift行返回 True
         """
-        important_patterns = [
-            r'^\s*(import|@import)\s+',           # import 语句
-            r'^\s*(class|struct|enum|protocol|extension)\s+',  # 类型定义
-            r'^\s*(public|private|internal|fileprivate|open)\s+',  # 访问修饰符
-            r'^\s*(static|class|final|mutating|nonmutating)\s+',  # 其他修饰符
-            r'^\s*func\s+\w+\s*\(',               # 函数定义
-            r'^\s*var\s+\w+',                     # 变量定义
-            r'^\s*let\s+\w+',                     # 常量定义
-            r'^\s*\{|\}',                         # 大括号
-            r'^\s*(if|else|for|while|repeat|switch|case|default|guard|defer|return|break|continue|fallthrough)\s',  # 控制语句
-        ]
-        
-        return any(re.match(pattern, line) for pattern in important_patterns)
+        return _IMPORTANT_LINE.match(line) is not None
     
     def _normalize_swift_line(self, line: str) -> str:
         """
@@ -78,13 +82,12 @@ class SwiftCompressor(BaseCompressor):
         working = line.rstrip()
         
         # 处理类、结构体、枚举定义
-        if re.match(r'^\s*(class|struct|enum|protocol)\s+\w+', working):
-            match = re.match(r'^(\s*(?:class|struct|enum|protocol)\s+\w+)', working)
-            if match:
-                return match.group(1) + " { }"
+        match = _TYPE_DECLARATION.match(working)
+        if match:
+            return match.group(1) + " { }"
         
         # 处理函数定义
-        if re.match(r'^\s*func\s+\w+\s*\(', working):
+        if _FUNCTION_SIGNATURE.match(working):
             # 找到函数签名的结束位置
             paren_count = 0
             for i, char in enumerate(working):
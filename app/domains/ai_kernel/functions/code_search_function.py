@@ -0,0 +1,120 @@
+import json
+import asyncio
+import logging
+from semantic_kernel import kernel_function
+from app.domains.code_search.code_search_service import CodeSearchService
+from app.domains.task_context.document_context import DocumentContextManager
+
+
+# 代码检索函数
+class CodeSearchFunction:
+    """代码检索函数类
+
+    基于仓库本地三元组索引提供全文检索能力，供AI模型快速定位符号、用法和文本，
+    避免逐个读取文件查找
+    """
+
+    # 单次检索返回结果上限
+    MAX_RESULTS_LIMIT = 200
+    # 上下文行数上限
+    MAX_CONTEXT_LINES = 10
+
+    def __init__(self, git_local_path: str):
+        """
+        初始化代码检索函数
+
+        Args:
+            git_local_path: Git仓库的本地路径
+        """
+        self.git_local_path = git_local_path
+
+    @kernel_function(
+        name="SearchCode",
+        description="""Search the repository for a literal string or a regular expression, like grep. Use this first to locate definitions, usages and text instead of reading many files. Matching is line based.
+
+        Returns:
+        Return a JSON object with the matches (file path, line number, matched line and surrounding context lines), the number of candidate files and whether the results were truncated.""",
+        parameters=[
+            {
+                "name": "query",
+                "type": "string",
+                "description": "literal text or regular expression to search for"
+            },
+            {
+                "name": "is_regex",
+                "type": "boolean",
+                "description": "treat query as a regular expression"
+            },
+            {
+                "name": "case_sensitive",
+                "type": "boolean",
+                "description": "match case sensitively"
+            },
+            {
+                "name": "path_pattern",
+                "type": "string",
+                "description": "optional glob to filter file paths, e.g. src/*.py"
+            },
+            {
+                "name": "max_results",
+                "type": "integer",
+                "description": "maximum number of matching lines to return"
+            },
+            {
+                "name": "context_lines",
+                "type": "integer",
+                "description": "number of context lines before and after each match"
+            }
+        ]
+    )
+    async def search_code_async(
+        self,
+        query: str,
+        is_regex: bool = False,
+        case_sensitive: bool = False,
+        path_pattern: str = "",
+        max_results: int = 50,
+        context_lines: int = 2
+    ) -> str:
+        """
+        检索仓库代码
+
+        Args:
+            query: 检索内容（字面量或正则）
+            is_regex: 是否按正则解析
+            case_sensitive: 是否区分大小写
+            path_pattern: 路径过滤
+            max_results: 最大返回匹配行数
+            context_lines: 上下文行数
+
+        Returns:
+            JSON格式的检索结果
+        """
+        try:
+            logging.info(f"search_code: {query} regex={is_regex}")
+
+            max_results = max(1, min(int(max_results), self.MAX_RESULTS_LIMIT))
+            context_lines = max(0, min(int(context_lines), self.MAX_CONTEXT_LINES))
+
+            # 索引读取与文件验证为同步IO，放到线程中执行
+            result = await asyncio.to_thread(
+                CodeSearchService.search,
+                self.git_local_path,
+                query,
+                is_regex,
+                case_sensitive,
+                path_pattern or None,
+                max_results,
+                context_lines
+            )
+
+            # 记录到上下文
+            DocumentContextManager.add_files(sorted({m.path for m in result.matches}))
+
+            return json.dumps(result.to_dict(), ensure_ascii=False)
+
+        except ValueError as e:
+            return f"Invalid search query: {str(e)}"
+        except Exception as e:
+            logging.error(f"Error searching code: {e}")
+            return f"Error searching code: {str(e)}"
@@ -4,8 +4,9 @@ import logging
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 from semantic_kernel import kernel_function
-from app.domains.repo_mgmt.services.local_repo_service import LocalRepoService
-from app.domains.repo_mgmt.services.file_tree_service import FileTreeService
+from app.domains.repo_mgmt.services.catalogue_cache import CatalogueCache
+from app.domains.repo_mgmt.services.workspace_manager import WorkspaceManager
+from app.domains.repo_mgmt.services.git_object_reader import GitObjectReader
 from app.domains.ai_kernel.functions.code_compress.code_file_detector import CodeFileDetector
 from app.domains.ai_kernel.functions.code_compress.code_compression import CodeCompressionService
 from app.config.settings import settings  
@@ -23,36 +24,54 @@ class ReadFileItemInput:
 class FileFunction:
     """文件操作函数类，提供AI内核与本地文件系统交互的功能"""
     
-    def __init__(self, git_local_path: str):
+    def __init__(self, git_local_path: str, revision: Optional[str] = None):
         """
         初始化文件操作函数
         
         Args:
             git_local_path: Git仓库的本地路径
+            revision: 读取的版本（分支、标签或提交）；为空时读取工作区，否则直接从对象库读取，不需要检出
         """
         self.git_local_path = git_local_path
+        self.revision = revision
         self._code_compression_service = CodeCompressionService()  # 代码压缩服务
     
-    def get_tree(self) -> str:
+    async def _get_size(self, file_path: str) -> Optional[int]:
+        """文件大小，不存在时返回 None"""
+        if self.revision:
+            entry = await GitObjectReader.stat(self.git_local_path, file_path, self.revision)
+            return entry.size if entry else None
+        full_path = os.path.join(self.git_local_path, file_path.lstrip('/'))
+        if not os.path.isfile(full_path):
+            return None
+        return os.stat(full_path).st_size
+
+    async def _read_content(self, file_path: str) -> Optional[str]:
+        """读取文件文本内容，不存在时返回 None"""
+        if self.revision:
+            return await GitObjectReader.read_text(self.git_local_path, file_path, self.revision)
+        full_path = os.path.join(self.git_local_path, file_path.lstrip('/'))
+        if not os.path.isfile(full_path):
+            return None
+        with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
+            return f.read()
+
+    async def get_tree(self) -> str:
         """
-        获取当前仓库的压缩目录结构
+        获取当前仓库（指定 revision 时为该版本）的压缩目录结构
         
         Returns:
             压缩后的目录结构字符串
         """
         try:
-            # 步骤1：获取忽略文件列表
-            ignore_files = LocalRepoService.get_ignore_files(self.git_local_path)
-            path_infos = []
-            
-            # 步骤2：递归扫描目录
-            LocalRepoService.scan_directory(self.git_local_path, path_infos, ignore_files)
-            
-            # 步骤3：构建文件树
-            file_tree = FileTreeService.build_tree(path_infos, self.git_local_path)
-            
-            # 步骤4：转换为压缩字符串
-            return FileTreeService.to_compact_string(file_tree)
+            if self.revision:
+                # 直接读取对象库中该版本的目录树，按解析后的提交缓存
+                snapshot = await CatalogueCache.get_snapshot_at(self.git_local_path, self.revision)
+                if snapshot is None:
+                    return f"版本不存在: {self.revision}"
+                return snapshot.compact_string
+            # 按提交缓存的目录快照，HEAD 未变化时不再扫描磁盘
+            return CatalogueCache.get_snapshot_local(self.git_local_path).compact_string
             
         except Exception as e:
             logging.error(f"获取目录结构失败: {e}")
@@ -72,7 +91,7 @@ class FileFunction:
             }
         ]
     )
-    def get_file_info_async(self, file_paths: List[str]) -> str:
+    async def get_file_info_async(self, file_paths: List[str]) -> str:
         """
         获取文件基本信息
         
@@ -94,16 +113,13 @@ class FileFunction:
             
             # 步骤4：批量处理文件信息
             for file_path in file_paths:
-                full_path = os.path.join(self.git_local_path, file_path.lstrip('/'))
-                
-                if not os.path.exists(full_path):
+                file_size = await self._get_size(file_path)
+                if file_size is None:
                     result_dict[file_path] = "File not found"
                     continue
                 
                 try:
-                    stat = os.stat(full_path)
-                    # 文件大小
-                    file_size = stat.st_size
+                    full_path = os.path.join(self.git_local_path, file_path.lstrip('/'))
                     # 文件名
                     file_name = os.path.basename(full_path)
                     # 文件扩展名
@@ -111,8 +127,12 @@ class FileFunction:
                     
                     # 获取文件行数（优化版本）
                     try:
-                        with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            total_lines = sum(1 for _ in f)  # 逐行计数，不加载整个文件到内存
+                        if self.revision:
+                            content = await GitObjectReader.read(self.git_local_path, file_path, self.revision)
+                            total_lines = content.count(b"\n") + (1 if content and not content.endswith(b"\n") else 0) if content else 0
+                        else:
+                            with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
+                                total_lines = sum(1 for _ in f)  # 逐行计数，不加载整个文件到内存
                     except Exception:
                         total_lines = 0  # 如果无法读取行数，设为0
                     
@@ -152,6 +172,7 @@ class FileFunction:
         try:
             # 步骤1：去重处理
             file_paths = list(set(file_paths))
+            WorkspaceManager.touch(self.git_local_path)
 
             # 记录到上下文
             DocumentContextManager.add_files(file_paths)
@@ -160,25 +181,24 @@ class FileFunction:
             result_dict = {}
             
             for file_path in file_paths:
-                full_path = os.path.join(self.git_local_path, file_path.lstrip('/'))
-                
-                if not os.path.exists(full_path):
-                    continue
-                
                 try:
-                    stat = os.stat(full_path)
+                    file_size = await self._get_size(file_path)
+                    if file_size is None:
+                        continue
                     
                     # 大文件处理
-                    if stat.st_size > 1024 * 100:
+                    if file_size > 1024 * 100:
                         result_dict[file_path] = "If the file exceeds 100KB, you should use ReadFileFromLineAsync to read the file content line by line"
                     else:
                         # 读取文件内容
-                        with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            content = f.read()
+                        content = await self._read_content(file_path) or ""
                         
-                        # 代码压缩处理
-                        if settings.document.enable_code_compression and CodeFileDetector.is_code_file(file_path):
-                            content = self._code_compression_service.compress_code(content, file_path)
+                        # 生成代码、压缩产物只输出摘要；其余按配置压缩
+                        summary = self._code_compression_service.summarize_skipped(content, file_path)
+                        if summary is not None:
+                            content = summary
+                        elif settings.repowik_enable_code_compression and CodeFileDetector.is_code_file(file_path):
+                            content = self._code_compression_service.compress_code(content, file_path=file_path)
                         
                         result_dict[file_path] = content
                         
@@ -209,25 +229,25 @@ class FileFunction:
         try:         
             # 记录到上下文
             DocumentContextManager.add_file(file_path)
+            WorkspaceManager.touch(self.git_local_path)
 
-            full_path = os.path.join(self.git_local_path, file_path.lstrip('/'))
-            
-            if not os.path.exists(full_path):
+            file_size = await self._get_size(file_path)
+            if file_size is None:
                 return f"File not found: {file_path}"
             
-            stat = os.stat(full_path)
-            
             # 大文件检测
-            if stat.st_size > 1024 * 100:
-                return f"File too large: {file_path} ({stat.st_size // 1024 // 100}KB)"
+            if file_size > 1024 * 100:
+                return f"File too large: {file_path} ({file_size // 1024 // 100}KB)"
             
             # 读取文件内容
-            with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
+            content = await self._read_content(file_path) or ""
             
-            # 代码压缩处理
-            if settings.document.enable_code_compression and CodeFileDetector.is_code_file(file_path):
-                content = self._code_compression_service.compress_code(content, file_path)
+            # 生成代码、压缩产物只输出摘要；其余按配置压缩
+            summary = self._code_compression_service.summarize_skipped(content, file_path)
+            if summary is not None:
+                return summary
+            if settings.repowik_enable_code_compression and CodeFileDetector.is_code_file(file_path):
+                content = self._code_compression_service.compress_code(content, file_path=file_path)
             
             return content
             
@@ -282,9 +302,8 @@ class FileFunction:
             带行号的文件内容字符串
         """
         try:
-            full_path = os.path.join(self.git_local_path, file_path.lstrip('/'))
-            
-            if not os.path.exists(full_path):
+            WorkspaceManager.touch(self.git_local_path)
+            if await self._get_size(file_path) is None:
                 return f"File not found: {file_path}"
             
             # 特殊参数处理
@@ -295,12 +314,14 @@ class FileFunction:
                 limit = float('inf')
             
             # 读取文件内容
-            with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-                file_content = f.read()
-            
-            # 代码压缩处理
-            if settings.document.enable_code_compression and CodeFileDetector.is_code_file(file_path):
-                file_content = self._compress_code(file_content, file_path)
+            file_content = await self._read_content(file_path) or ""
+            
+            # 生成代码、压缩产物只输出摘要；其余按配置压缩
+            summary = self._code_compression_service.summarize_skipped(file_content, file_path)
+            if summary is not None:
+                return summary
+            if settings.repowik_enable_code_compression and CodeFileDetector.is_code_file(file_path):
+                file_content = self._code_compression_service.compress_code(file_content, file_path=file_path)
             
             # 按行分割内容
             lines = file_content.split('\n')
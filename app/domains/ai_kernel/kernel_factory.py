@@ -12,6 +12,7 @@ from app.config.settings import settings
 from app.infrastructure.llm.llms.chat_models.factory import llm_factory
 from .functions.file_function import FileFunction
 from .functions.code_analyze_function import CodeAnalyzeFunction
+from .functions.code_search_function import CodeSearchFunction
 
 
 class KernelFactory:
@@ -73,6 +74,17 @@ class KernelFactory:
                 logging.info("加载文件操作插件")
             except Exception as e:
                 logging.error(f"配置文件操作插件失败: {e}")
+
+            # 配置代码检索插件
+            try:
+                code_search_function = CodeSearchFunction(git_local_path)
+                kernel.add_plugin(
+                    plugin_name="CodeSearchFunction",
+                    plugin_instance=code_search_function
+                )
+                logging.info("加载代码检索插件")
+            except Exception as e:
+                logging.error(f"配置代码检索插件失败: {e}")
             
             # 配置代码依赖分析插件
             if settings.enable_code_dependency_analysis:
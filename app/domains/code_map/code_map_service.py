@@ -3,6 +3,10 @@ import re
 import asyncio
 from dataclasses import dataclass, field
 from typing import Dict, List, Set, Optional
+from app.config.settings import settings
+from app.domains.repo_mgmt.services.file_classifier import FileClassifier
+from app.domains.repo_mgmt.services.git_index_reader import GitIndexReader
+from app.domains.repo_mgmt.services.workspace_manager import WorkspaceManager
 from .parsers.BaseParser import BaseParser, Function
 from .parsers.JavaScriptParser import JavaScriptParser
 from .parsers.PythonParser import PythonParser
@@ -112,6 +116,7 @@ class DependencyAnalyzer:
         self._semantic_analyzers: Dict[str, GoSemanticAnalyzer] = {}
         # 项目根目录
         self._base_path = base_path
+        WorkspaceManager.touch(base_path)
         # 初始化状态标志
         self._is_initialized = False
         # 语义分析模型
@@ -595,20 +600,41 @@ class DependencyAnalyzer:
             path: 要扫描的目录路径
             
         Returns:
-            源文件路径列表（已过滤 .gitignore 规则）
+            源文件路径列表（已过滤 .gitignore 规则及第三方、生成、压缩文件）
         """
         # 支持的源文件扩展名
         extensions = {".cs", ".js", ".py", ".java", ".cpp", ".h", ".hpp", ".cc", ".go"}
+        skip_generated = settings.repo_skip_generated_files
         all_files = []
         
+        # git 仓库直接读取索引中的跟踪文件，忽略规则与 git 一致
+        entries = GitIndexReader.read_entries(path) if settings.repo_enumerate_from_git_index else None
+        if entries is not None:
+            for entry in entries:
+                if os.path.splitext(entry.path)[1].lower() not in extensions:
+                    continue
+                full = os.path.join(path, entry.path)
+                # 已知 blob 哈希时分类结果可直接命中缓存
+                if skip_generated and FileClassifier.classify(full, entry.path, blob_sha=entry.sha).is_skippable:
+                    continue
+                all_files.append(full)
+            return all_files
+        
         # 递归遍历目录
-        for root, _, files in os.walk(path):
+        for root, dirs, files in os.walk(path):
+            # 第三方依赖目录直接剪枝，不再向下遍历
+            if skip_generated:
+                dirs[:] = [d for d in dirs if not FileClassifier.is_vendored_dir(d)]
             for f in files:
                 if os.path.splitext(f)[1].lower() in extensions:
                     full = os.path.join(root, f)
                     # 检查是否被 .gitignore 忽略
-                    if not self._is_ignored_by_gitignore(full):
-                        all_files.append(full)
+                    if self._is_ignored_by_gitignore(full):
+                        continue
+                    # 生成代码、压缩产物不参与依赖分析
+                    if skip_generated and FileClassifier.classify(full, os.path.relpath(full, path)).is_skippable:
+                        continue
+                    all_files.append(full)
                         
         return all_files
 
@@ -0,0 +1,12 @@
+from .code_search_service import CodeSearchService, CodeSearchResult, CodeSearchMatch
+from .trigram_index import TrigramIndex, TrigramQuery, IndexUpdateStats, build_query
+
+__all__ = [
+    "CodeSearchService",
+    "CodeSearchResult",
+    "CodeSearchMatch",
+    "TrigramIndex",
+    "TrigramQuery",
+    "IndexUpdateStats",
+    "build_query"
+]
@@ -0,0 +1,215 @@
+import os
+import fnmatch
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from app.config.settings import settings
+from app.domains.repo_mgmt.services.local_repo_service import LocalRepoService
+from app.domains.code_search.trigram_index import TrigramIndex, IndexUpdateStats, build_query
+
+
+@dataclass
+class CodeSearchMatch:
+    """单条匹配结果"""
+    path: str
+    line_number: int
+    line: str
+    before: List[str] = field(default_factory=list)
+    after: List[str] = field(default_factory=list)
+
+    def to_dict(self):
+        return {
+            "path": self.path,
+            "line_number": self.line_number,
+            "line": self.line,
+            "before": self.before,
+            "after": self.after,
+        }
+
+
+@dataclass
+class CodeSearchResult:
+    """检索结果"""
+    matches: List[CodeSearchMatch] = field(default_factory=list)
+    candidate_files: int = 0
+    matched_files: int = 0
+    truncated: bool = False
+
+    def to_dict(self):
+        return {
+            "matches": [m.to_dict() for m in self.matches],
+            "candidate_files": self.candidate_files,
+            "matched_files": self.matched_files,
+            "truncated": self.truncated,
+        }
+
+
+class CodeSearchService:
+    """基于本地三元组索引的代码全文检索服务"""
+
+    # 进程内已加载索引缓存：索引目录 -> (清单修改时间, 索引)
+    _loaded: "OrderedDict[str, Tuple[int, TrigramIndex]]" = OrderedDict()
+    _max_loaded = 8
+    # 每个索引目录一把锁，避免同进程内并发构建
+    _locks: Dict[str, threading.Lock] = {}
+    _locks_guard = threading.Lock()
+
+    # 单行输出长度限制
+    MAX_LINE_LENGTH = 500
+
+    @staticmethod
+    def get_index_dir(repo_path: str) -> str:
+        """获取仓库对应的索引目录"""
+        key = hashlib.sha1(os.path.abspath(repo_path).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(settings.code_search_index_path, key)
+
+    @staticmethod
+    def _get_lock(index_dir: str) -> threading.Lock:
+        with CodeSearchService._locks_guard:
+            if index_dir not in CodeSearchService._locks:
+                CodeSearchService._locks[index_dir] = threading.Lock()
+            return CodeSearchService._locks[index_dir]
+
+    @staticmethod
+    def _list_entries(repo_path: str) -> List[Tuple[str, int, int]]:
+        """列出参与索引的文件：(相对路径, 大小, 修改时间ns)"""
+        entries = []
+        for info in LocalRepoService.get_folders_and_files(repo_path):
+            if info.is_directory:
+                continue
+            rel_path = os.path.relpath(info.path, repo_path).replace("\\", "/")
+            if rel_path.startswith("."):
+                continue
+            try:
+                stat = os.stat(info.path)
+            except OSError:
+                continue
+            entries.append((rel_path, stat.st_size, stat.st_mtime_ns))
+        return entries
+
+    @staticmethod
+    def update_index(repo_path: str) -> IndexUpdateStats:
+        """
+        增量构建仓库索引（克隆/拉取后调用）
+
+        仅重新读取新增或变更的文件，已删除文件的文档被标记失效
+        """
+        index_dir = CodeSearchService.get_index_dir(repo_path)
+        with CodeSearchService._get_lock(index_dir):
+            try:
+                index = TrigramIndex(index_dir).load()
+            except Exception as e:
+                logging.warning(f"加载代码索引失败，将重建 {index_dir}: {e}")
+                index = TrigramIndex(index_dir)
+
+            stats = index.update(
+                repo_path,
+                CodeSearchService._list_entries(repo_path),
+                max_file_size=settings.code_search_max_file_size,
+                max_segments=settings.code_search_max_segments,
+                max_dead_ratio=settings.code_search_max_dead_ratio,
+            )
+            CodeSearchService._remember(index_dir, index)
+
+        logging.info(
+            f"代码索引更新完成 {repo_path}: 新增{stats.added}, 删除{stats.removed}, "
+            f"未变{stats.unchanged}, 跳过{stats.skipped}, 合并{stats.compacted}"
+        )
+        return stats
+
+    @staticmethod
+    def _remember(index_dir: str, index: TrigramIndex) -> None:
+        try:
+            mtime = os.stat(index.manifest_path).st_mtime_ns
+        except OSError:
+            return
+        CodeSearchService._loaded[index_dir] = (mtime, index)
+        CodeSearchService._loaded.move_to_end(index_dir)
+        while len(CodeSearchService._loaded) > CodeSearchService._max_loaded:
+            CodeSearchService._loaded.popitem(last=False)
+
+    @staticmethod
+    def get_index(repo_path: str) -> TrigramIndex:
+        """获取仓库索引；不存在时即时构建，清单变化时重新加载"""
+        index_dir = CodeSearchService.get_index_dir(repo_path)
+        index = TrigramIndex(index_dir)
+        if not index.exists():
+            CodeSearchService.update_index(repo_path)
+
+        mtime = os.stat(index.manifest_path).st_mtime_ns
+        cached = CodeSearchService._loaded.get(index_dir)
+        if cached and cached[0] == mtime:
+            CodeSearchService._loaded.move_to_end(index_dir)
+            return cached[1]
+
+        with CodeSearchService._get_lock(index_dir):
+            index = TrigramIndex(index_dir).load()
+            CodeSearchService._remember(index_dir, index)
+        return index
+
+    @staticmethod
+    def search(
+        repo_path: str,
+        query: str,
+        is_regex: bool = False,
+        case_sensitive: bool = False,
+        path_pattern: Optional[str] = None,
+        max_results: int = 50,
+        context_lines: int = 2,
+    ) -> CodeSearchResult:
+        """
+        检索代码
+
+        流程：三元组索引缩小候选文件 -> 逐行正则验证 -> 附加上下文行
+
+        Args:
+            repo_path: 仓库根目录
+            query: 检索内容（字面量或正则）
+            is_regex: 是否按正则解析
+            case_sensitive: 是否区分大小写
+            path_pattern: 路径过滤（glob，如 src/**/*.py）
+            max_results: 最大返回匹配行数
+            context_lines: 匹配行前后的上下文行数
+        """
+        if not query:
+            raise ValueError("检索内容不能为空")
+
+        plan = build_query(query, is_regex=is_regex, case_sensitive=case_sensitive)
+        index = CodeSearchService.get_index(repo_path)
+
+        candidates = index.candidates(plan)
+        if path_pattern:
+            candidates = [d for d in candidates if fnmatch.fnmatch(d.path, path_pattern)]
+
+        result = CodeSearchResult(candidate_files=len(candidates))
+        context_lines = max(0, context_lines)
+
+        for doc in candidates:
+            try:
+                with open(os.path.join(repo_path, doc.path), "r", encoding="utf-8", errors="ignore") as f:
+                    lines = f.read().splitlines()
+            except OSError:
+                continue
+
+            file_matched = False
+            for i, line in enumerate(lines):
+                if not plan.regex.search(line):
+                    continue
+                if len(result.matches) >= max_results:
+                    result.truncated = True
+                    return result
+                file_matched = True
+                result.matches.append(CodeSearchMatch(
+                    path=doc.path,
+                    line_number=i + 1,
+                    line=line[:CodeSearchService.MAX_LINE_LENGTH],
+                    before=[l[:CodeSearchService.MAX_LINE_LENGTH] for l in lines[max(0, i - context_lines):i]],
+                    after=[l[:CodeSearchService.MAX_LINE_LENGTH] for l in lines[i + 1:i + 1 + context_lines]],
+                ))
+            if file_matched:
+                result.matched_files += 1
+
+        return result
@@ -0,0 +1,420 @@
+import os
+import re
+import sys
+import json
+import bisect
+import logging
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+
+# 索引文件格式版本
+INDEX_VERSION = 1
+# 段文件魔数
+SEGMENT_MAGIC = b"TGI1"
+# 判断二进制文件时检查的头部字节数
+BINARY_SNIFF_SIZE = 8000
+
+
+@dataclass
+class IndexedDoc:
+    """索引中的文档（文件）信息"""
+    doc_id: int
+    path: str          # 相对仓库根目录的路径（/分隔）
+    size: int
+    mtime_ns: int
+
+
+@dataclass
+class IndexUpdateStats:
+    """索引增量更新统计"""
+    added: int = 0
+    removed: int = 0
+    unchanged: int = 0
+    skipped: int = 0
+    compacted: bool = False
+
+
+@dataclass
+class TrigramQuery:
+    """
+    三元组查询计划
+
+    required 中的所有三元组都必须出现在候选文件中；为空表示无法缩小范围（全量验证）
+    """
+    regex: re.Pattern
+    required: Set[int] = field(default_factory=set)
+
+
+class _Segment:
+    """
+    只读索引段
+
+    文件布局（小端序）：
+    magic(4) | trigram_count(uint32) | trigrams(uint32 * n) | offsets(uint64 * (n+1)) | postings(uint32 ...)
+    每个三元组的倒排列表为升序的文档ID
+    """
+
+    def __init__(self, name: str, data: bytes):
+        self.name = name
+        if data[:4] != SEGMENT_MAGIC:
+            raise ValueError(f"无效的索引段文件: {name}")
+        count = int.from_bytes(data[4:8], "little")
+        pos = 8
+        self.trigrams = array("I")
+        self.trigrams.frombytes(data[pos:pos + 4 * count])
+        pos += 4 * count
+        self.offsets = array("Q")
+        self.offsets.frombytes(data[pos:pos + 8 * (count + 1)])
+        pos += 8 * (count + 1)
+        self._postings = memoryview(data)[pos:]
+        if sys.byteorder != "little":
+            self.trigrams.byteswap()
+            self.offsets.byteswap()
+
+    def postings(self, trigram: int) -> array:
+        """获取三元组的倒排列表"""
+        result = array("I")
+        i = bisect.bisect_left(self.trigrams, trigram)
+        if i < len(self.trigrams) and self.trigrams[i] == trigram:
+            result.frombytes(self._postings[self.offsets[i] * 4:self.offsets[i + 1] * 4])
+            if sys.byteorder != "little":
+                result.byteswap()
+        return result
+
+    def posting_size(self, trigram: int) -> int:
+        """获取三元组倒排列表长度（用于查询排序）"""
+        i = bisect.bisect_left(self.trigrams, trigram)
+        if i < len(self.trigrams) and self.trigrams[i] == trigram:
+            return self.offsets[i + 1] - self.offsets[i]
+        return 0
+
+    def items(self) -> Iterable[Tuple[int, array]]:
+        """遍历全部三元组及其倒排列表（用于段合并）"""
+        for trigram in self.trigrams:
+            yield trigram, self.postings(trigram)
+
+    @staticmethod
+    def write(path: str, postings: Dict[int, List[int]]) -> None:
+        """将倒排表写入段文件"""
+        trigrams = array("I", sorted(postings))
+        offsets = array("Q", [0])
+        blob = array("I")
+        for trigram in trigrams:
+            blob.extend(postings[trigram])
+            offsets.append(len(blob))
+        if sys.byteorder != "little":
+            trigrams.byteswap()
+            offsets.byteswap()
+            blob.byteswap()
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(SEGMENT_MAGIC)
+            f.write(len(trigrams).to_bytes(4, "little"))
+            f.write(trigrams.tobytes())
+            f.write(offsets.tobytes())
+            f.write(blob.tobytes())
+        os.replace(tmp_path, path)
+
+
+class TrigramIndex:
+    """
+    单个仓库的三元组倒排索引（codesearch/Zoekt 风格）
+
+    - 索引按小写字节建立，三元组编码为24位整数
+    - 增量更新：变更文件分配新的文档ID写入新段，旧ID视为失效
+    - 段数量或失效比例超过阈值时合并为单个段
+    """
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        self._next_doc_id = 0
+        self._docs: Dict[str, IndexedDoc] = {}
+        self._segment_names: List[str] = []
+        self._segments: List[_Segment] = []
+        self._id_to_doc: Dict[int, IndexedDoc] = {}
+
+    # =============================================================================
+    # 加载与持久化
+    # =============================================================================
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.index_dir, "manifest.json")
+
+    def exists(self) -> bool:
+        """索引是否已构建"""
+        return os.path.isfile(self.manifest_path)
+
+    def load(self) -> "TrigramIndex":
+        """从磁盘加载索引"""
+        if not self.exists():
+            return self
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != INDEX_VERSION:
+            logging.warning(f"代码索引版本不匹配，将重建: {self.index_dir}")
+            return self
+
+        self._next_doc_id = manifest["next_doc_id"]
+        self._docs = {
+            path: IndexedDoc(doc_id=doc_id, path=path, size=size, mtime_ns=mtime_ns)
+            for path, (doc_id, size, mtime_ns) in manifest["docs"].items()
+        }
+        self._id_to_doc = {doc.doc_id: doc for doc in self._docs.values()}
+        self._segment_names = list(manifest["segments"])
+        self._segments = []
+        for name in self._segment_names:
+            with open(os.path.join(self.index_dir, name), "rb") as f:
+                self._segments.append(_Segment(name, f.read()))
+        return self
+
+    def _save_manifest(self) -> None:
+        """原子写入清单文件"""
+        manifest = {
+            "version": INDEX_VERSION,
+            "next_doc_id": self._next_doc_id,
+            "segments": self._segment_names,
+            "docs": {path: [doc.doc_id, doc.size, doc.mtime_ns] for path, doc in self._docs.items()},
+        }
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.manifest_path)
+
+    def _remove_unreferenced_segments(self) -> None:
+        """删除清单中不再引用的段文件"""
+        referenced = set(self._segment_names)
+        for name in os.listdir(self.index_dir):
+            if name.startswith("seg-") and name not in referenced:
+                try:
+                    os.remove(os.path.join(self.index_dir, name))
+                except OSError:
+                    pass
+
+    # =============================================================================
+    # 构建与增量更新
+    # =============================================================================
+
+    @property
+    def docs(self) -> Dict[str, IndexedDoc]:
+        return self._docs
+
+    @property
+    def dead_ratio(self) -> float:
+        """失效文档ID占比"""
+        if self._next_doc_id == 0:
+            return 0.0
+        return 1 - len(self._docs) / self._next_doc_id
+
+    def update(self, repo_path: str, entries: Iterable[Tuple[str, int, int]],
+               max_file_size: int, max_segments: int, max_dead_ratio: float) -> IndexUpdateStats:
+        """
+        增量更新索引
+
+        Args:
+            repo_path: 仓库根目录
+            entries: (相对路径, 文件大小, 修改时间ns) 列表，代表当前仓库全部候选文件
+            max_file_size: 参与索引的最大文件大小
+            max_segments: 段数量上限
+            max_dead_ratio: 失效文档占比上限
+        """
+        os.makedirs(self.index_dir, exist_ok=True)
+        stats = IndexUpdateStats()
+
+        current: Dict[str, Tuple[int, int]] = {}
+        for rel_path, size, mtime_ns in entries:
+            if size > max_file_size:
+                stats.skipped += 1
+                continue
+            current[rel_path] = (size, mtime_ns)
+
+        # 已删除文件直接失效
+        for rel_path in list(self._docs):
+            if rel_path not in current:
+                del self._docs[rel_path]
+                stats.removed += 1
+
+        # 新增或变更的文件写入新段
+        postings: Dict[int, List[int]] = {}
+        for rel_path in sorted(current):
+            size, mtime_ns = current[rel_path]
+            doc = self._docs.get(rel_path)
+            if doc and doc.size == size and doc.mtime_ns == mtime_ns:
+                stats.unchanged += 1
+                continue
+
+            trigrams = self._read_trigrams(os.path.join(repo_path, rel_path))
+            if trigrams is None:
+                # 二进制或无法读取的文件
+                if doc:
+                    del self._docs[rel_path]
+                    stats.removed += 1
+                stats.skipped += 1
+                continue
+
+            doc_id = self._next_doc_id
+            self._next_doc_id += 1
+            self._docs[rel_path] = IndexedDoc(doc_id=doc_id, path=rel_path, size=size, mtime_ns=mtime_ns)
+            for trigram in trigrams:
+                postings.setdefault(trigram, []).append(doc_id)
+            stats.added += 1
+
+        if postings:
+            name = f"seg-{self._next_doc_id:010d}"
+            _Segment.write(os.path.join(self.index_dir, name), postings)
+            with open(os.path.join(self.index_dir, name), "rb") as f:
+                self._segments.append(_Segment(name, f.read()))
+            self._segment_names.append(name)
+
+        self._id_to_doc = {doc.doc_id: doc for doc in self._docs.values()}
+
+        if len(self._segments) > max_segments or self.dead_ratio > max_dead_ratio:
+            self._compact()
+            stats.compacted = True
+
+        self._save_manifest()
+        self._remove_unreferenced_segments()
+        return stats
+
+    def _compact(self) -> None:
+        """合并全部段并丢弃失效文档"""
+        # 重新编号，使文档ID连续
+        remap: Dict[int, int] = {}
+        for new_id, doc in enumerate(sorted(self._docs.values(), key=lambda d: d.doc_id)):
+            remap[doc.doc_id] = new_id
+            doc.doc_id = new_id
+
+        merged: Dict[int, List[int]] = {}
+        for segment in self._segments:
+            for trigram, doc_ids in segment.items():
+                live = [remap[d] for d in doc_ids if d in remap]
+                if live:
+                    merged.setdefault(trigram, []).extend(live)
+        for doc_ids in merged.values():
+            doc_ids.sort()
+
+        self._next_doc_id = len(remap)
+        name = f"seg-{self._next_doc_id:010d}-c"
+        self._segments = []
+        self._segment_names = []
+        if merged:
+            _Segment.write(os.path.join(self.index_dir, name), merged)
+            with open(os.path.join(self.index_dir, name), "rb") as f:
+                self._segments.append(_Segment(name, f.read()))
+            self._segment_names.append(name)
+        self._id_to_doc = {doc.doc_id: doc for doc in self._docs.values()}
+
+    @staticmethod
+    def _read_trigrams(full_path: str) -> Optional[Set[int]]:
+        """读取文件并提取小写字节三元组；二进制文件返回 None"""
+        try:
+            with open(full_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if b"\0" in data[:BINARY_SNIFF_SIZE]:
+            return None
+        return extract_trigrams(data.lower())
+
+    # =============================================================================
+    # 查询
+    # =============================================================================
+
+    def candidates(self, query: TrigramQuery) -> List[IndexedDoc]:
+        """根据三元组缩小候选文件范围"""
+        if not query.required:
+            return sorted(self._docs.values(), key=lambda d: d.path)
+
+        # 先处理倒排列表最短的三元组，尽早收敛
+        ordered = sorted(query.required, key=lambda t: sum(s.posting_size(t) for s in self._segments))
+        result: Optional[Set[int]] = None
+        for trigram in ordered:
+            ids: Set[int] = set()
+            for segment in self._segments:
+                ids.update(segment.postings(trigram))
+            result = ids if result is None else result & ids
+            if not result:
+                return []
+
+        docs = [self._id_to_doc[d] for d in result if d in self._id_to_doc]
+        return sorted(docs, key=lambda d: d.path)
+
+
+def extract_trigrams(data: bytes) -> Set[int]:
+    """提取字节序列的全部三元组（24位整数编码）"""
+    if len(data) < 3:
+        return set()
+    return {(a << 16) | (b << 8) | c for a, b, c in set(zip(data, data[1:], data[2:]))}
+
+
+def build_query(pattern: str, is_regex: bool = False, case_sensitive: bool = False) -> TrigramQuery:
+    """
+    构建查询计划：编译正则，并从中提取所有必需出现的字面量片段转换为三元组
+
+    Raises:
+        ValueError: 正则表达式无效
+    """
+    source = pattern if is_regex else re.escape(pattern)
+    flags = 0 if case_sensitive else re.IGNORECASE
+    try:
+        regex = re.compile(source, flags)
+        parsed = sre_parse.parse(source, flags)
+    except re.error as e:
+        raise ValueError(f"无效的正则表达式: {e}")
+
+    ignore_case = bool(regex.flags & re.IGNORECASE)
+    required: Set[int] = set()
+    for literal in _required_literals(parsed, ignore_case):
+        required.update(extract_trigrams(literal.encode("utf-8").lower()))
+    return TrigramQuery(regex=regex, required=required)
+
+
+def _required_literals(parsed, ignore_case: bool) -> List[str]:
+    """
+    从正则语法树中提取必须出现的连续字面量片段
+
+    只做保守推导：分支、字符类、可选重复等位置会切断片段，保证不会漏掉匹配
+    """
+    runs: List[str] = []
+    current: List[str] = []
+
+    def flush():
+        if current:
+            runs.append("".join(current))
+            current.clear()
+
+    for op, av in parsed:
+        if op is sre_constants.LITERAL:
+            ch = chr(av)
+            # 非ASCII字符在忽略大小写时无法与小写字节索引对齐
+            if ignore_case and not ch.isascii():
+                flush()
+            else:
+                current.append(ch)
+        elif op is sre_constants.AT:
+            # 零宽断言不影响相邻字面量的连续性
+            continue
+        elif op is sre_constants.SUBPATTERN:
+            flush()
+            sub_flags = av[1] if len(av) > 1 else 0
+            runs.extend(_required_literals(av[-1], ignore_case or bool(sub_flags & re.IGNORECASE)))
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            flush()
+            min_count, _, sub = av
+            if min_count >= 1:
+                runs.extend(_required_literals(sub, ignore_case))
+        else:
+            flush()
+
+    flush()
+    return [run for run in runs if len(run) >= 3]
@@ -0,0 +1,360 @@
+import os
+import re
+import math
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+from app.domains.repo_mgmt.services.file_tree_service import PathInfo
+from app.domains.repo_mgmt.services.file_classifier import FileClassifier
+from app.domains.repo_mgmt.services.catalogue_cache import CatalogueSnapshot
+
+
+@dataclass
+class FileScore:
+    """单个文件的评分明细"""
+    path: str
+    score: float
+    components: Dict[str, float] = field(default_factory=dict)
+
+    def to_dict(self):
+        return {"path": self.path, "score": round(self.score, 4),
+                "components": {k: round(v, 4) for k, v in self.components.items()}}
+
+
+@dataclass
+class ReductionReport:
+    """目录精简评分报告"""
+    total_files: int = 0
+    kept_files: int = 0
+    kept_dirs: int = 0
+    max_items: int = 0
+    elapsed_ms: float = 0.0
+    dropped: Dict[str, int] = field(default_factory=dict)    # 丢弃原因 -> 数量
+    top_files: List[FileScore] = field(default_factory=list)
+    cutoff_score: float = 0.0
+
+    def to_dict(self):
+        return {
+            "total_files": self.total_files,
+            "kept_files": self.kept_files,
+            "kept_dirs": self.kept_dirs,
+            "max_items": self.max_items,
+            "elapsed_ms": round(self.elapsed_ms, 2),
+            "dropped": self.dropped,
+            "cutoff_score": round(self.cutoff_score, 4),
+            "top_files": [f.to_dict() for f in self.top_files],
+        }
+
+    def to_text(self) -> str:
+        lines = [
+            f"目录精简: {self.total_files} 个文件 -> 保留 {self.kept_files} 个文件/{self.kept_dirs} 个目录"
+            f"（上限 {self.max_items}，阈值分 {self.cutoff_score:.3f}，耗时 {self.elapsed_ms:.1f}ms）",
+            "丢弃原因: " + ", ".join(f"{k}={v}" for k, v in sorted(self.dropped.items())),
+        ]
+        for item in self.top_files:
+            detail = " ".join(f"{k}={v:.2f}" for k, v in item.components.items())
+            lines.append(f"  {item.score:8.3f}  {item.path}  [{detail}]")
+        return "\n".join(lines)
+
+
+@dataclass
+class CatalogueReduction:
+    """目录精简结果"""
+    catalogue: str
+    kept_paths: List[str]
+    report: ReductionReport
+
+
+class CatalogueReducer:
+    """
+    本地确定性目录精简
+
+    替代 CodeDirSimplifier 的 LLM 调用：对每个文件按以下因子相乘打分，按分数保留前 N 项并补齐父目录
+    - 文件类型权重：入口/构建清单 > 源码 > 文档 > 配置 > 数据/资源
+    - 目录扇出：同目录文件越多，单个文件权重越低（大量同类文件只需少数代表）
+    - 引用中心度：被其他源码 import/include 的次数
+    - 测试/第三方识别：第三方、生成文件直接排除，测试与示例降权
+    - README 提及、目录深度
+    同样的输入总是产生同样的输出
+    """
+
+    # 入口文件与构建清单
+    KEY_FILE_NAMES = frozenset({
+        "package.json", "pyproject.toml", "setup.py", "setup.cfg", "requirements.txt", "pipfile",
+        "go.mod", "cargo.toml", "pom.xml", "build.gradle", "build.gradle.kts", "settings.gradle",
+        "cmakelists.txt", "makefile", "dockerfile", "docker-compose.yml", "docker-compose.yaml",
+        "composer.json", "gemfile", "program.cs", "startup.cs", "tsconfig.json", "vite.config.ts",
+        "webpack.config.js", "next.config.js", "manage.py", "main.py", "app.py", "__main__.py",
+        "main.go", "main.rs", "lib.rs", "index.js", "index.ts", "app.js", "app.ts", "server.js",
+        "main.ts", "main.java", "application.java", "main.cpp", "main.c",
+    })
+
+    SOURCE_EXTENSIONS = frozenset({
+        ".py", ".js", ".jsx", ".ts", ".tsx", ".mjs", ".cjs", ".go", ".java", ".kt", ".kts", ".scala",
+        ".cs", ".fs", ".vb", ".c", ".h", ".cc", ".cpp", ".hpp", ".cxx", ".rs", ".swift", ".m", ".mm",
+        ".php", ".rb", ".lua", ".dart", ".ex", ".exs", ".erl", ".clj", ".hs", ".ml", ".r", ".jl",
+        ".vue", ".svelte", ".sql", ".proto", ".graphql", ".sh", ".ps1",
+    })
+    DOC_EXTENSIONS = frozenset({".md", ".rst", ".adoc", ".txt"})
+    CONFIG_EXTENSIONS = frozenset({".json", ".yaml", ".yml", ".toml", ".ini", ".cfg", ".conf", ".xml", ".properties", ".env", ".csproj", ".sln", ".gradle"})
+    ASSET_EXTENSIONS = frozenset({
+        ".png", ".jpg", ".jpeg", ".gif", ".svg", ".ico", ".webp", ".bmp", ".ttf", ".otf", ".woff", ".woff2",
+        ".eot", ".mp3", ".mp4", ".wav", ".pdf", ".zip", ".gz", ".jar", ".dll", ".so", ".exe", ".bin",
+        ".csv", ".tsv", ".parquet", ".lock", ".snap", ".po", ".mo",
+    })
+
+    TEST_DIR_NAMES = frozenset({"test", "tests", "__tests__", "spec", "specs", "testdata", "testing", "e2e", "fixtures", "mocks", "__mocks__"})
+    EXAMPLE_DIR_NAMES = frozenset({"examples", "example", "samples", "sample", "demo", "demos", "benchmarks", "bench", "docs", "doc"})
+    TEST_FILE_PATTERN = re.compile(r"(^test_.*\.py$|_test\.(py|go)$|\.(test|spec)\.[jt]sx?$|Tests?\.(java|cs|kt)$|_spec\.rb$)", re.IGNORECASE)
+
+    # 源码中的引用语句（只提取模块名的最后一段用于匹配文件名）
+    IMPORT_PATTERN = re.compile(
+        r"""^\s*(?:from\s+([\w.]+)\s+import|import\s+([\w.]+))"""                      # python
+        r"""|(?:import|export)\s[^'"\n]*?from\s+['"]([^'"]+)['"]"""                     # js/ts
+        r"""|require\(\s*['"]([^'"]+)['"]\s*\)"""                                         # commonjs
+        r"""|^\s*import\s+['"]([^'"]+)['"]"""                                            # js side-effect / go 单行
+        r"""|^\s*#\s*include\s+["<]([^">]+)[">]"""                                      # c/c++
+        r"""|^\s*(?:import|using)\s+(?:static\s+)?([\w.]+)\s*;""",                        # java/c#
+        re.MULTILINE,
+    )
+
+    # 中心度分析读取的文件上限与单文件大小上限
+    MAX_CENTRALITY_FILES = 5000
+    MAX_CENTRALITY_FILE_SIZE = 256 * 1024
+    # 报告中展示的文件数
+    REPORT_TOP_N = 30
+
+    @staticmethod
+    def reduce(
+        root: str,
+        path_infos: List[PathInfo],
+        readme: str = "",
+        max_items: int = 800,
+        format: str = "compact",
+        extra_weights: Optional[Dict[str, float]] = None,
+    ) -> CatalogueReduction:
+        """
+        精简目录
+
+        Args:
+            root: 仓库根目录
+            path_infos: 目录文件列表
+            readme: README 内容（用于识别被提及的文件）
+            max_items: 保留的条目上限（文件+目录）
+            format: 输出格式，与 catalogue_format 一致
+            extra_weights: 额外的按文件乘数（相对路径 -> 权重），如变更热度
+
+        Returns:
+            精简后的目录、保留的路径及评分报告
+        """
+        start = time.perf_counter()
+        report = ReductionReport(max_items=max_items)
+
+        files = [
+            (os.path.relpath(info.path, root).replace("\\", "/"), info)
+            for info in path_infos if not info.is_directory
+        ]
+        files = [(rel, info) for rel, info in files if not rel.startswith(".")]
+        report.total_files = len(files)
+
+        # 目录扇出
+        fan_out = Counter(rel.rsplit("/", 1)[0] if "/" in rel else "" for rel, _ in files)
+
+        # 引用中心度
+        centrality = CatalogueReducer._compute_centrality(root, files)
+
+        readme_lower = (readme or "").lower()
+        dropped = Counter()
+        scores: List[FileScore] = []
+
+        for rel, info in files:
+            components = CatalogueReducer._score_components(rel, fan_out, centrality, readme_lower)
+            if components is None:
+                dropped["vendored_or_generated"] += 1
+                continue
+            if extra_weights and rel in extra_weights:
+                components["extra"] = extra_weights[rel]
+
+            score = 1.0
+            for value in components.values():
+                score *= value
+            scores.append(FileScore(path=rel, score=score, components=components))
+
+        # 分数降序，同分按路径排序保证确定性
+        scores.sort(key=lambda s: (-s.score, s.path))
+
+        kept_files: List[str] = []
+        kept_dirs: Set[str] = set()
+        for item in scores:
+            parents = CatalogueReducer._parent_dirs(item.path)
+            new_dirs = [d for d in parents if d not in kept_dirs]
+            if len(kept_files) + len(kept_dirs) + len(new_dirs) + 1 > max_items:
+                dropped["low_score"] += 1
+                continue
+            kept_files.append(item.path)
+            kept_dirs.update(new_dirs)
+            report.cutoff_score = item.score
+
+        # 还原为原目录顺序输出
+        kept_set = set(kept_files) | kept_dirs
+        kept_infos = [
+            info for info in path_infos
+            if os.path.relpath(info.path, root).replace("\\", "/") in kept_set
+        ]
+        catalogue = CatalogueSnapshot.from_path_infos(root, None, kept_infos).render(format)
+
+        report.kept_files = len(kept_files)
+        report.kept_dirs = len(kept_dirs)
+        report.dropped = dict(dropped)
+        report.top_files = scores[:CatalogueReducer.REPORT_TOP_N]
+        report.elapsed_ms = (time.perf_counter() - start) * 1000
+
+        return CatalogueReduction(catalogue=catalogue, kept_paths=sorted(kept_set), report=report)
+
+    @staticmethod
+    def _parent_dirs(rel_path: str) -> List[str]:
+        parts = rel_path.split("/")[:-1]
+        return ["/".join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+    @staticmethod
+    def _score_components(rel_path: str, fan_out: Counter, centrality: Dict[str, float], readme_lower: str) -> Optional[Dict[str, float]]:
+        """计算评分因子；第三方、生成文件返回 None"""
+        if FileClassifier.classify_path(rel_path):
+            return None
+
+        parts = rel_path.split("/")
+        name = parts[-1]
+        lower_name = name.lower()
+        ext = os.path.splitext(lower_name)[1]
+        dirs = [p.lower() for p in parts[:-1]]
+
+        components: Dict[str, float] = {}
+
+        # 文件类型权重
+        if lower_name in CatalogueReducer.KEY_FILE_NAMES:
+            components["type"] = 3.0
+        elif lower_name.startswith("readme"):
+            components["type"] = 3.0 if not dirs else 1.5
+        elif ext in CatalogueReducer.SOURCE_EXTENSIONS:
+            components["type"] = 1.0
+        elif ext in CatalogueReducer.DOC_EXTENSIONS:
+            components["type"] = 0.7
+        elif ext in CatalogueReducer.CONFIG_EXTENSIONS:
+            components["type"] = 0.5
+        elif ext in CatalogueReducer.ASSET_EXTENSIONS:
+            components["type"] = 0.05
+        else:
+            components["type"] = 0.3
+
+        # 目录扇出：同目录文件越多单个文件越不重要
+        siblings = fan_out.get("/".join(parts[:-1]), 1)
+        components["fan_out"] = 1.0 / (1.0 + math.log2(1.0 + siblings / 16.0))
+
+        # 目录深度
+        components["depth"] = 0.9 ** len(dirs)
+
+        # 引用中心度
+        in_degree = centrality.get(rel_path, 0)
+        if in_degree:
+            components["centrality"] = 1.0 + math.log2(1 + in_degree)
+
+        # 测试与示例降权
+        if any(d in CatalogueReducer.TEST_DIR_NAMES for d in dirs) or CatalogueReducer.TEST_FILE_PATTERN.search(name):
+            components["test"] = 0.3
+        elif any(d in CatalogueReducer.EXAMPLE_DIR_NAMES for d in dirs):
+            components["example"] = 0.6
+
+        # README 中提及
+        if readme_lower and (rel_path.lower() in readme_lower or (len(lower_name) > 6 and lower_name in readme_lower)):
+            components["readme"] = 2.0
+
+        return components
+
+    @staticmethod
+    def _compute_centrality(root: str, files: List[tuple]) -> Dict[str, float]:
+        """
+        统计源码文件被引用的次数（按份额累加，可为小数）
+
+        引用目标按模块路径解析：相对引用按引用方所在目录解析；多段模块名（a.b.c、x/y.h）按路径后缀匹配；
+        单段模块名只匹配仓库顶层（或 src/lib 下）的模块，避免把标准库、第三方包误认为仓库文件。
+        同一目标匹配多个文件时平分引用数
+        """
+        full_index: Dict[str, List[str]] = defaultdict(list)
+        suffix_index: Dict[str, List[str]] = defaultdict(list)
+        sources = []
+        for rel, info in files:
+            stem, ext = os.path.splitext(rel)
+            if ext.lower() not in CatalogueReducer.SOURCE_EXTENSIONS:
+                continue
+            module_paths = [stem]
+            parts = stem.split("/")
+            if parts[-1] in ("__init__", "index", "mod") and len(parts) > 1:
+                # 包入口也可通过所在目录引用
+                module_paths.append("/".join(parts[:-1]))
+            for module_path in module_paths:
+                full_index[module_path].append(rel)
+                segments = module_path.split("/")
+                for i in range(1, len(segments) - 1):
+                    suffix_index["/".join(segments[i:])].append(rel)
+                if segments[0] in ("src", "lib") and len(segments) == 2:
+                    full_index[segments[1]].append(rel)
+            if info.size <= CatalogueReducer.MAX_CENTRALITY_FILE_SIZE:
+                sources.append((rel, info.path))
+
+        references: Counter = Counter()
+        for rel, full_path in sources[:CatalogueReducer.MAX_CENTRALITY_FILES]:
+            try:
+                with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
+                    content = f.read()
+            except OSError:
+                continue
+
+            importer_dir = rel.rsplit("/", 1)[0] if "/" in rel else ""
+            # 同一文件多次引用同一目标只计一次，取其中最大的份额
+            targets: Dict[str, float] = {}
+            for match in CatalogueReducer.IMPORT_PATTERN.finditer(content):
+                candidates = [c for c in CatalogueReducer._resolve_import(match, importer_dir, full_index, suffix_index)
+                              if c != rel]
+                for candidate in candidates:
+                    targets[candidate] = max(targets.get(candidate, 0.0), 1.0 / len(candidates))
+
+            for target, share in targets.items():
+                references[target] += share
+
+        return dict(references)
+
+    @staticmethod
+    def _resolve_import(match: "re.Match", importer_dir: str, full_index: Dict[str, List[str]],
+                        suffix_index: Dict[str, List[str]]) -> List[str]:
+        """把一条引用语句解析为仓库内的文件列表"""
+        dotted = match.group(1) or match.group(2) or match.group(7)
+        if dotted:
+            level = len(dotted) - len(dotted.lstrip("."))
+            module_path = dotted.lstrip(".").replace(".", "/")
+            if level:
+                # python 相对导入：一个点表示当前包
+                base = importer_dir.split("/") if importer_dir else []
+                base = base[:len(base) - (level - 1)] if level > 1 else base
+                module_path = "/".join(base + ([module_path] if module_path else []))
+                return full_index.get(module_path, [])
+        else:
+            target = match.group(3) or match.group(4) or match.group(5) or match.group(6)
+            if not target:
+                return []
+            stem, ext = os.path.splitext(target)
+            if ext.lower() in CatalogueReducer.SOURCE_EXTENSIONS:
+                target = stem
+            if target.startswith("./") or target.startswith("../"):
+                module_path = os.path.normpath(os.path.join(importer_dir, target)).replace("\\", "/")
+                return full_index.get(module_path, [])
+            module_path = target.strip("/")
+
+        if not module_path:
+            return []
+        resolved = full_index.get(module_path)
+        if resolved:
+            return resolved
+        if "/" in module_path:
+            return suffix_index.get(module_path, [])
+        return []
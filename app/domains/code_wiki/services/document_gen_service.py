@@ -1,18 +1,26 @@
 import uuid
 import re
+import hashlib
 import json
 import asyncio
 import logging
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 from celery import Celery
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, delete, insert
-from git import Repo
+from app.domains.repo_mgmt.services.remote_git_service import RemoteGitService
 from app.config.settings import settings
 from app.domains.repo_mgmt.services.local_repo_service import LocalRepoService
-from app.domains.code_wiki.models.wiki_document import WikiDocument
+from app.domains.repo_mgmt.services.catalogue_cache import CatalogueCache
+from app.domains.repo_mgmt.services.file_history_index import FileHistoryIndexer
+from app.domains.repo_mgmt.services.workspace_manager import WorkspaceManager
+from app.domains.repo_mgmt.services.artifact_store import ArtifactScope
+from app.domains.code_wiki.services.catalogue_reducer import CatalogueReducer
+from app.domains.code_wiki.models.wiki_document import WikiDocument, RepoClassify
+from app.domains.code_wiki.services.repo_profile_service import RepoProfileService
 from app.domains.ai_kernel.kernel_factory import KernelFactory
+from app.infrastructure.llm.llms.chat_models.factory import llm_factory
 from app.domains.repo_mgmt.services.repo_mgmt_service import RepoMgmtService
 from semantic_kernel.functions import KernelArguments
 from semantic_kernel.kernel import PromptTemplateConfig
@@ -37,23 +45,27 @@ class DocumentGenService:
 
             # 获取仓库的本地路径，用于文件系统操作
             git_local_path = document.path
+            if not await WorkspaceManager.ensure_local(session, repo_record):
+                raise ValueError(f"仓库 {document.repo_id} 本地工作副本不可用")
             git_repository = repo_record.repo_url.replace(".git", "")           
+            # 相同远端仓库、相同提交的 LLM 产物在仓库记录之间共享
+            artifacts = ArtifactScope(repo_record)
                                                       
             # 步骤1: 读取或生成README
             readme = await DocumentGenService.generate_readme(document, git_local_path, session)
             
             # 步骤2: 读取并且生成目录结构
-            catalogue = await DocumentGenService.generate_catalogue(warehouse, git_local_path, readme, db)
+            catalogue = await DocumentGenService.generate_catalogue(warehouse, git_local_path, readme, db, artifacts=artifacts)
             
             # 步骤3: 读取或生成项目类别
-            classify = await DocumentGenService.generate_classify(warehouse, git_local_path, catalogue, readme, db)
+            classify = await DocumentGenService.generate_classify(warehouse, git_local_path, catalogue, readme, db, artifacts=artifacts)
             
             # 步骤4: 生成知识图谱
             minmap = await MiniMapService.generate_mini_map(warehouse, git_local_path, catalogue, db)
             
             # 步骤5: 生成项目概述
             overview = await DocumentGenService.generate_overview(warehouse, document, catalogue, 
-                                git_repository, readme, classify, db)
+                                git_repository, readme, classify, db, artifacts=artifacts)
             
             # 步骤6: 生成目录结构
             document_catalogs = await RepoWikiContentService.generate_wiki_catalogs_structure(warehouse, document, 
@@ -119,7 +131,7 @@ class DocumentGenService:
             if not readme:
                 # 2.1 获取目录结构（紧凑格式）
                 try:
-                    catalogue = await LocalRepoService.get_catalogue(path)
+                    catalogue = (await CatalogueCache.get_snapshot(path, document.repo_id)).catalogue
                 except Exception as e:
                     logging.warning(f"获取目录结构失败，将使用空目录结构。错误: {e}")
                     catalogue = ""
@@ -182,90 +194,58 @@ class DocumentGenService:
             return ""
 
 
-    async def _generate_catalogue(warehouse: Warehouse, path: str, readme: str, db: AsyncSession) -> str:
+    async def _generate_catalogue(warehouse: Warehouse, path: str, readme: str, db: AsyncSession,
+                                  artifacts: Optional[ArtifactScope] = None) -> str:
         """步骤2: 生成目录结构
         - 扫描目录统计条目数；小于阈值或未启用智能过滤时，直接构建优化目录结构
-        - 否则启用 AI 智能过滤：使用 CodeAnalysis/CodeDirSimplifier 插件，支持重试与解析结果
+        - 否则使用本地评分精简目录（CatalogueReducer），毫秒级完成且结果确定
+        - 启用 LLM 精修时，再将精简后的目录交给 CodeAnalysis/CodeDirSimplifier 插件进一步筛选
         - 成功后写入 warehouse.optimized_directory_structure
         """
         try:
             # 获取配置参数
-            enable_smart_filter = (getattr(settings, "document", None) and settings.document.enable_smart_filter) is True
-            catalogue_format = (getattr(settings, "document", None) and settings.document.catalogue_format) or "compact"
-
-            # 获取目录文件列表
-            path_infos = LocalRepoService.get_folders_and_files(path)
-            total_items = len(path_infos)
-
-            catalogue = LocalRepoService.get_catalogue_optimized(path, catalogue_format)
-
-            if total_items > 800 and enable_smart_filter:
-                # 启动AI智能过滤
-                kernel_factory = KernelFactory()
-                kernel = await kernel_factory.get_kernel(git_local_path=path, is_code_analysis=True)
-
-                if kernel is not None:
-                    result_text = ""
-                    max_retries = 5
-                    last_exception = None
-
-                    for retry_idx in range(max_retries):
-                        try:
-                            simplify_fn = kernel.get_plugin("CodeAnalysis").get_function("CodeDirSimplifier")
-                            if simplify_fn is not None:
-                                stream_chunks = []
-                                async for stream_message in kernel.invoke_stream(
-                                    function=simplify_fn,
-                                    arguments=KernelArguments(
-                                        settings=PromptExecutionSettings(
-                                            function_choice_behavior=FunctionChoiceBehavior.Auto()
-                                        )
-                                    ),
-                                    kwargs={
-                                        "code_files": catalogue,
-                                        "readme": readme or ""
-                                    }
-                                ):
-                                    # 兼容多种流式消息类型，尽量抽取文本内容
-                                    try:
-                                        if hasattr(stream_message, "content") and stream_message.content:
-                                            stream_chunks.append(str(stream_message.content))
-                                        elif isinstance(stream_message, list):
-                                            for m in stream_message:
-                                                if hasattr(m, "content") and m.content:
-                                                    stream_chunks.append(str(m.content))
-                                        else:
-                                            stream_chunks.append(str(stream_message))
-                                    except Exception:
-                                        # 异常时尽量不影响主流程
-                                        stream_chunks.append(str(stream_message))
-                                result_text = "".join(stream_chunks)
-                                last_exception = None
-                                break
-                            else:
-                                logging.warning("未发现语义插件 CodeAnalysis/CodeDirSimplifier，回退为直接构建目录结构。")
-                                break
-                        except Exception as ex:
-                            last_exception = ex
-                            logging.error(f"优化目录结构失败，重试第{retry_idx + 1}次：{ex}")
-                            await asyncio.sleep(5 * (retry_idx + 1))
-
-                    if last_exception is not None:
-                        logger.error(f"优化目录结构失败，已重试{max_retries}次：{last_exception}")
-
-                    # 3.2 解析 AI 输出，或在失败时回退
-                    if result_text:
-                        # 解析 <response_file>...</response_file>
-                        match = re.search(r"<response_file>(.*?)</response_file>", result_text, re.DOTALL | re.IGNORECASE)
-                        if match:
-                            catalogue = match.group(1)
-                        else:
-                            # 解析 ```json ... ```
-                            json_match = re.search(r"```json(.*?)```", result_text, re.DOTALL | re.IGNORECASE)
-                            if json_match:
-                                catalogue = json_match.group(1).strip()
-                            else:
-                                catalogue = result_text
+            enable_smart_filter = settings.repowik_enable_smart_filter
+            catalogue_format = settings.repowik_catalogue_format or "compact"
+
+            # 获取目录快照（按提交缓存，未变化时不再扫描磁盘）
+            snapshot = await CatalogueCache.get_snapshot(path)
+            total_items = snapshot.total_items
+
+            catalogue = snapshot.render(catalogue_format, settings.repowik_catalogue_max_tokens)
+
+            if total_items > settings.repowik_catalogue_max_items and enable_smart_filter:
+                # 变更热度作为额外排序信号（git 仓库，索引按 HEAD 增量维护）
+                churn_weights = None
+                if settings.repowik_catalogue_churn_weight:
+                    churn_weights = await FileHistoryIndexer.get_churn_weights(path)
+
+                # 本地评分精简（读取源码统计引用关系，放到线程中执行）
+                reduction = await asyncio.to_thread(
+                    CatalogueReducer.reduce,
+                    path,
+                    snapshot.path_infos,
+                    readme or "",
+                    settings.repowik_catalogue_max_items,
+                    catalogue_format,
+                    churn_weights,
+                )
+                logging.info(reduction.report.to_text())
+                catalogue = reduction.catalogue
+
+                # 可选：LLM 精修
+                if settings.repowik_catalogue_llm_refine:
+                    reduced = catalogue
+                    refine = lambda: DocumentGenService._refine_catalogue_with_llm(path, reduced, readme)
+                    if artifacts is not None:
+                        refined = await artifacts.get_or_create_text(
+                            "catalogue_refined",
+                            DocumentGenService._generator_version("CodeDirSimplifier", reduced, readme),
+                            refine,
+                        )
+                    else:
+                        refined = await refine()
+                    if refined:
+                        catalogue = refined
 
             # 4) 写入数据库
             if catalogue:
@@ -286,24 +266,39 @@ class DocumentGenService:
             return ""
 
 
-    async def _generate_classify(warehouse: Warehouse, path: str, catalogue: str, readme: str, db: AsyncSession):
-        """步骤3: 生成项目类别"""
-        try:
-            # 如果数据库中没有项目分类，则使用AI进行分类分析
-            classify = warehouse.classify
-            if not classify:
-                # 启动AI智能过滤
-                kernel_factory = KernelFactory()
-                kernel = await kernel_factory.get_kernel(git_local_path=path, is_code_analysis=False)
+    @staticmethod
+    def _generator_version(name: str, *inputs: str) -> str:
+        """共享产物的生成器版本：当前模型 + 提示词/插件名与全部输入的哈希，输入不同的结果不会互相复用"""
+        _, model_name = llm_factory.get_default_model()
+        digest = hashlib.sha256("\0".join((name,) + tuple(i or "" for i in inputs)).encode("utf-8")).hexdigest()
+        return f"{(model_name or '')[:64]}:{digest[:32]}"
 
-                prompt = await PromptTemplate.get_prompt_template("Warehouse/RepositoryClassification.md")
+    @staticmethod
+    async def _refine_catalogue_with_llm(path: str, catalogue: str, readme: str) -> str:
+        """使用 CodeAnalysis/CodeDirSimplifier 插件精修已精简的目录，失败时返回空字符串"""
+        kernel_factory = KernelFactory()
+        kernel = await kernel_factory.get_kernel(git_local_path=path, is_code_analysis=True)
+        if kernel is None:
+            return ""
+
+        result_text = ""
+        max_retries = 2
+        last_exception = None
+
+        for retry_idx in range(max_retries):
+            try:
+                simplify_fn = kernel.get_plugin("CodeAnalysis").get_function("CodeDirSimplifier")
+                if simplify_fn is None:
+                    logging.warning("未发现语义插件 CodeAnalysis/CodeDirSimplifier，使用本地精简结果。")
+                    return ""
 
                 stream_chunks = []
-                async for stream_message in kernel.invoke_prompt_stream(
-                    prompt=prompt,
-                    arguments=KernelArguments(                    
-                        temperature=0.1,
-                        max_tokens=settings.llm.get_default_model().max_context_tokens,
+                async for stream_message in kernel.invoke_stream(
+                    function=simplify_fn,
+                    arguments=KernelArguments(
+                        settings=PromptExecutionSettings(
+                            function_choice_behavior=FunctionChoiceBehavior.Auto()
+                        )
                     ),
                     kwargs={
                         "code_files": catalogue,
@@ -323,20 +318,102 @@ class DocumentGenService:
                     except Exception:
                         # 异常时尽量不影响主流程
                         stream_chunks.append(str(stream_message))
-
                 result_text = "".join(stream_chunks)
+                last_exception = None
+                break
+            except Exception as ex:
+                last_exception = ex
+                logging.error(f"精修目录结构失败，重试第{retry_idx + 1}次：{ex}")
+                await asyncio.sleep(1)
+
+        if last_exception is not None:
+            logging.error(f"精修目录结构失败，已重试{max_retries}次，使用本地精简结果：{last_exception}")
+            return ""
+
+        # 解析 <response_file>...</response_file> 或 ```json ... ```
+        match = re.search(r"<response_file>(.*?)</response_file>", result_text, re.DOTALL | re.IGNORECASE)
+        if match:
+            return match.group(1)
+        json_match = re.search(r"```json(.*?)```", result_text, re.DOTALL | re.IGNORECASE)
+        if json_match:
+            return json_match.group(1).strip()
+        return result_text
 
-                classify = None
-                if result_text:
-                    match = re.search(r"<classify>(.*?)</classify>", result_text, re.DOTALL | re.IGNORECASE)
-                    if match:
-                        extracted = match.group(1) or ""
-                        extracted = re.sub(r"^\s*classifyName\s*:\s*", "", extracted, flags=re.IGNORECASE).strip()
-                        if extracted:
-                            try:
-                                classify = getattr(ClassifyType, extracted)
-                            except AttributeError:
-                                pass
+
+    async def _generate_classify(warehouse: Warehouse, path: str, catalogue: str, readme: str, db: AsyncSession,
+                                 artifacts: Optional[ArtifactScope] = None):
+        """步骤3: 生成项目类别"""
+        try:
+            # 如果数据库中没有项目分类，则使用AI进行分类分析
+            classify = warehouse.classify
+            if not classify and settings.repowik_classify_by_profile:
+                # 先用本地仓库画像做确定性分类，置信度足够时不再调用AI
+                try:
+                    profile = await RepoProfileService.get_profile(path, getattr(warehouse, "id", None))
+                    if profile.classify and profile.confidence >= settings.repowik_classify_min_confidence:
+                        classify = profile.classify
+                        logging.info(f"仓库画像分类: {classify} (置信度 {profile.confidence:.2f})，依据: {'; '.join(profile.signals)}")
+                    else:
+                        logging.info(f"仓库画像分类置信度不足 ({profile.classify}, {profile.confidence:.2f})，使用AI分类")
+                except Exception as e:
+                    logging.warning(f"仓库画像分类失败，使用AI分类: {e}")
+            if not classify:
+                prompt = await PromptTemplate.get_prompt_template("Warehouse/RepositoryClassification.md")
+
+                async def classify_with_llm() -> Optional[str]:
+                    # 启动AI智能过滤
+                    kernel_factory = KernelFactory()
+                    kernel = await kernel_factory.get_kernel(git_local_path=path, is_code_analysis=False)
+
+                    stream_chunks = []
+                    async for stream_message in kernel.invoke_prompt_stream(
+                        prompt=prompt,
+                        arguments=KernelArguments(                    
+                            temperature=0.1,
+                            max_tokens=settings.llm.get_default_model().max_context_tokens,
+                        ),
+                        kwargs={
+                            "code_files": catalogue,
+                            "readme": readme or ""
+                        }
+                    ):
+                        # 兼容多种流式消息类型，尽量抽取文本内容
+                        try:
+                            if hasattr(stream_message, "content") and stream_message.content:
+                                stream_chunks.append(str(stream_message.content))
+                            elif isinstance(stream_message, list):
+                                for m in stream_message:
+                                    if hasattr(m, "content") and m.content:
+                                        stream_chunks.append(str(m.content))
+                            else:
+                                stream_chunks.append(str(stream_message))
+                        except Exception:
+                            # 异常时尽量不影响主流程
+                            stream_chunks.append(str(stream_message))
+
+                    result_text = "".join(stream_chunks)
+
+                    classify = None
+                    if result_text:
+                        match = re.search(r"<classify>(.*?)</classify>", result_text, re.DOTALL | re.IGNORECASE)
+                        if match:
+                            extracted = match.group(1) or ""
+                            extracted = re.sub(r"^\s*classifyName\s*:\s*", "", extracted, flags=re.IGNORECASE).strip()
+                            if extracted:
+                                try:
+                                    classify = getattr(RepoClassify, extracted)
+                                except AttributeError:
+                                    pass
+                    return classify
+
+                if artifacts is not None:
+                    classify = await artifacts.get_or_create_text(
+                        "classify",
+                        DocumentGenService._generator_version("RepositoryClassification", prompt, catalogue, readme),
+                        classify_with_llm,
+                    )
+                else:
+                    classify = await classify_with_llm()
 
             # 将项目分类结果保存到数据库
             await db.execute(
@@ -352,61 +429,74 @@ class DocumentGenService:
             return None
 
     async def _generate_overview(warehouse: Warehouse, document: Document, catalogue: str, 
-                            git_repository: str, readme: str, classify, db: AsyncSession):
+                            git_repository: str, readme: str, classify, db: AsyncSession,
+                            artifacts: Optional[ArtifactScope] = None):
         """步骤5: 生成项目概述"""
         try:
-            # 启动AI智能过滤
-            kernel_factory = KernelFactory()
-            kernel = await kernel_factory.get_kernel(git_local_path=warehouse.local_path, is_code_analysis=True)
-
             prompt_name = "Overview" + classify
             prompt = await PromptTemplate.get_prompt_template(f"Warehouse/{prompt_name}.md")
 
-            # 流式调用，聚合文本
-            stream_chunks: List[str] = []
-            async for stream_message in kernel.invoke_prompt_stream(
-                prompt=prompt,
-                arguments=KernelArguments(
-                    settings=PromptExecutionSettings(
-                        function_choice_behavior=FunctionChoiceBehavior.Auto()
+            async def overview_with_llm() -> str:
+                # 启动AI智能过滤
+                kernel_factory = KernelFactory()
+                kernel = await kernel_factory.get_kernel(git_local_path=warehouse.local_path, is_code_analysis=True)
+
+                # 流式调用，聚合文本
+                stream_chunks: List[str] = []
+                async for stream_message in kernel.invoke_prompt_stream(
+                    prompt=prompt,
+                    arguments=KernelArguments(
+                        settings=PromptExecutionSettings(
+                            function_choice_behavior=FunctionChoiceBehavior.Auto()
+                        ),
+                        max_tokens=settings.llm.get_default_model().max_context_tokens,
                     ),
-                    max_tokens=settings.llm.get_default_model().max_context_tokens,
-                ),
-                kwargs={
-                    "catalogue": catalogue,
-                    "git_repository": (warehouse.repository_url or "").replace(".git", ""),
-                    "branch": warehouse.branch or "",
-                    "readme": readme
-                },
-            ):
-                try:
-                    if hasattr(stream_message, "content") and stream_message.content:
-                        stream_chunks.append(str(stream_message.content))
-                    elif isinstance(stream_message, list):
-                        for m in stream_message:
-                            if hasattr(m, "content") and m.content:
-                                stream_chunks.append(str(m.content))
-                    else:
+                    kwargs={
+                        "catalogue": catalogue,
+                        "git_repository": (warehouse.repository_url or "").replace(".git", ""),
+                        "branch": warehouse.branch or "",
+                        "readme": readme
+                    },
+                ):
+                    try:
+                        if hasattr(stream_message, "content") and stream_message.content:
+                            stream_chunks.append(str(stream_message.content))
+                        elif isinstance(stream_message, list):
+                            for m in stream_message:
+                                if hasattr(m, "content") and m.content:
+                                    stream_chunks.append(str(m.content))
+                        else:
+                            stream_chunks.append(str(stream_message))
+                    except Exception:
+                        # 容错处理，尽量不中断主流程
                         stream_chunks.append(str(stream_message))
-                except Exception:
-                    # 容错处理，尽量不中断主流程
-                    stream_chunks.append(str(stream_message))
-
-            overview_text = "".join(stream_chunks)
-
-            # 删除<thinking>...</thinking>内容
-            overview_text = re.sub(r"<blog>(.*?)</blog>", "", overview_text, flags=re.DOTALL | re.IGNORECASE).strip()
 
-            # 清理项目分析标签内容（某些模型会生成不需要的标签）
-            project_analysis = re.search(r"<project_analysis>(.*?)</project_analysis>", overview_text, re.DOTALL | re.IGNORECASE)
-            if project_analysis:
-                overview_text = overview_text.replace(project_analysis.group(1), "")
-
-            # 提取blog标签中的内容（某些模型会包装在blog标签中）
-            overview_match = re.search(r"<blog>(.*?)</blog>", overview_text, re.DOTALL | re.IGNORECASE)
-            if overview_match:
-                # 提取blog标签内的内容
-                overview = overview_match.group(1)
+                overview_text = "".join(stream_chunks)
+
+                # 删除<thinking>...</thinking>内容
+                overview_text = re.sub(r"<blog>(.*?)</blog>", "", overview_text, flags=re.DOTALL | re.IGNORECASE).strip()
+
+                # 清理项目分析标签内容（某些模型会生成不需要的标签）
+                project_analysis = re.search(r"<project_analysis>(.*?)</project_analysis>", overview_text, re.DOTALL | re.IGNORECASE)
+                if project_analysis:
+                    overview_text = overview_text.replace(project_analysis.group(1), "")
+
+                # 提取blog标签中的内容（某些模型会包装在blog标签中）
+                overview_match = re.search(r"<blog>(.*?)</blog>", overview_text, re.DOTALL | re.IGNORECASE)
+                if overview_match:
+                    # 提取blog标签内的内容
+                    return overview_match.group(1)
+                return overview_text
+
+            if artifacts is not None:
+                overview = await artifacts.get_or_create_text(
+                    "overview",
+                    DocumentGenService._generator_version(prompt_name, prompt, catalogue, readme,
+                                                          warehouse.repository_url or "", warehouse.branch or ""),
+                    overview_with_llm,
+                ) or ""
+            else:
+                overview = await overview_with_llm()
 
             # 删除旧的概述数据
             await db.execute(
@@ -441,14 +531,15 @@ class DocumentGenService:
                 delete(DocumentCommitRecord).where(DocumentCommitRecord.warehouse_id == warehouse.id)
             )
 
-            # 读取git log
-            repo = Repo(git_path)
-            logs = repo.commits.order_by(lambda x: x.committer.when).take(20).order_by(lambda x: x.committer.when).to_list()
+            # 读取最近 20 条提交记录（按时间正序）
+            logs = await RemoteGitService.get_commit_log(git_path, max_count=20)
+            logs.reverse()
 
             commit_message = ""
             for commit in logs:
-                commit_message += "提交人：" + commit.committer.name + "\n提交内容\n<message>\n" + commit.message + "<message>"
-                commit_message += "\n提交时间：" + commit.committer.when.strftime("%Y-%m-%d %H:%M:%S") + "\n"
+                commit_time = datetime.fromisoformat(commit['committed_datetime'])
+                commit_message += "提交人：" + commit['author'] + "\n提交内容\n<message>\n" + commit['message'] + "<message>"
+                commit_message += "\n提交时间：" + commit_time.strftime("%Y-%m-%d %H:%M:%S") + "\n"
 
             kernel_factory = KernelFactory()
             kernel = await kernel_factory.get_kernel(git_local_path=git_path, is_code_analysis=True)
@@ -0,0 +1,486 @@
+import os
+import re
+import json
+import time
+import hashlib
+import asyncio
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+from app.config.settings import settings
+from app.infrastructure.redis import REDIS_CONN, RedisSpaceEnum
+from app.domains.repo_mgmt.services.catalogue_cache import CatalogueCache
+from app.domains.repo_mgmt.services.file_classifier import FileClassifier
+from app.domains.code_wiki.services.catalogue_reducer import CatalogueReducer
+from app.domains.code_wiki.models.wiki_document import RepoClassify
+from app.domains.ai_kernel.functions.code_compress.code_file_detector import CodeFileDetector
+
+try:
+    import tomllib
+except ImportError:  # Python 3.10
+    tomllib = None
+
+
+@dataclass
+class LanguageStats:
+    """单个语言的统计"""
+    files: int = 0
+    bytes: int = 0
+    lines: int = 0
+
+    def to_dict(self):
+        return {"files": self.files, "bytes": self.bytes, "lines": self.lines}
+
+
+@dataclass
+class RepoProfile:
+    """仓库画像"""
+    commit: Optional[str] = None
+    total_files: int = 0
+    skipped_files: int = 0                                   # 第三方、生成、二进制等未统计的文件
+    languages: Dict[str, LanguageStats] = field(default_factory=dict)
+    manifests: List[str] = field(default_factory=list)      # 构建清单相对路径
+    frameworks: List[str] = field(default_factory=list)     # 识别到的框架/依赖指纹
+    source_files: int = 0
+    test_files: int = 0
+    doc_files: int = 0
+    doc_bytes: int = 0
+    source_bytes: int = 0
+    infra_files: int = 0                                     # Dockerfile、CI、IaC、编排配置
+    classify: Optional[str] = None
+    confidence: float = 0.0
+    signals: List[str] = field(default_factory=list)        # 分类依据
+    elapsed_ms: float = 0.0
+
+    @property
+    def primary_language(self) -> Optional[str]:
+        code = [(name, stats) for name, stats in self.languages.items() if name not in RepoProfileService.NON_CODE_LANGUAGES]
+        if not code:
+            return None
+        return max(code, key=lambda item: (item[1].bytes, item[0]))[0]
+
+    @property
+    def test_ratio(self) -> float:
+        return self.test_files / self.source_files if self.source_files else 0.0
+
+    @property
+    def doc_ratio(self) -> float:
+        total = self.doc_bytes + self.source_bytes
+        return self.doc_bytes / total if total else 0.0
+
+    def to_dict(self):
+        return {
+            "commit": self.commit,
+            "total_files": self.total_files,
+            "skipped_files": self.skipped_files,
+            "languages": {name: stats.to_dict() for name, stats in self.languages.items()},
+            "primary_language": self.primary_language,
+            "manifests": self.manifests,
+            "frameworks": self.frameworks,
+            "source_files": self.source_files,
+            "test_files": self.test_files,
+            "doc_files": self.doc_files,
+            "doc_bytes": self.doc_bytes,
+            "source_bytes": self.source_bytes,
+            "infra_files": self.infra_files,
+            "test_ratio": round(self.test_ratio, 4),
+            "doc_ratio": round(self.doc_ratio, 4),
+            "classify": self.classify,
+            "confidence": round(self.confidence, 4),
+            "signals": self.signals,
+            "elapsed_ms": round(self.elapsed_ms, 2),
+        }
+
+    @staticmethod
+    def from_dict(data: dict) -> "RepoProfile":
+        profile = RepoProfile(**{
+            key: data.get(key, default) for key, default in (
+                ("commit", None), ("total_files", 0), ("skipped_files", 0), ("manifests", []),
+                ("frameworks", []), ("source_files", 0), ("test_files", 0), ("doc_files", 0),
+                ("doc_bytes", 0), ("source_bytes", 0), ("infra_files", 0), ("classify", None),
+                ("confidence", 0.0), ("signals", []), ("elapsed_ms", 0.0),
+            )
+        })
+        profile.languages = {name: LanguageStats(**stats) for name, stats in data.get("languages", {}).items()}
+        return profile
+
+    def to_text(self) -> str:
+        """画像摘要（可作为 LLM 分类的补充上下文）"""
+        top = sorted(self.languages.items(), key=lambda item: -item[1].bytes)[:5]
+        lines = [
+            "语言: " + ", ".join(f"{name}({stats.files} 文件/{stats.lines} 行)" for name, stats in top),
+            "构建清单: " + (", ".join(self.manifests[:10]) or "无"),
+            "框架: " + (", ".join(self.frameworks) or "无"),
+            f"源码 {self.source_files} / 测试 {self.test_files} / 文档 {self.doc_files} / 基础设施 {self.infra_files}",
+        ]
+        return "\n".join(lines)
+
+
+class RepoProfileService:
+    """
+    本地仓库画像与确定性分类
+
+    基于目录快照一次遍历统计各语言的文件数、字节数与行数，识别构建清单、框架依赖、测试与文档占比，
+    按规则给出项目分类与置信度；结果按提交缓存。置信度不足时由调用方回退到 LLM 分类
+    """
+
+    # 画像格式版本，规则变化时递增使旧缓存失效
+    PROFILE_VERSION = 1
+    KEY_PREFIX = "repo:profile"
+
+    # 不计入主语言的数据/文档格式
+    NON_CODE_LANGUAGES = frozenset({"json", "xml", "yaml", "toml", "ini", "markdown", "rst", "asciidoc", "html", "css", "scss", "sass", "less"})
+
+    # 构建清单文件名（小写）-> 生态
+    MANIFESTS = {
+        "package.json": "node", "pyproject.toml": "python", "setup.py": "python", "setup.cfg": "python",
+        "requirements.txt": "python", "pipfile": "python", "go.mod": "go", "cargo.toml": "rust",
+        "pom.xml": "java", "build.gradle": "java", "build.gradle.kts": "java", "composer.json": "php",
+        "gemfile": "ruby", "pubspec.yaml": "dart", "cmakelists.txt": "cpp", "package.swift": "swift",
+        "mix.exs": "elixir",
+    }
+    # 只读取浅层目录中的构建清单（深层通常是示例、测试夹具或子包）
+    MANIFEST_MAX_DEPTH = 2
+    MANIFEST_MAX_SIZE = 512 * 1024
+
+    # 应用框架（依赖名 -> 展示名）
+    APP_FRAMEWORKS = {
+        "express": "Express", "koa": "Koa", "fastify": "Fastify", "@nestjs/core": "NestJS", "next": "Next.js",
+        "nuxt": "Nuxt", "@angular/core": "Angular", "@sveltejs/kit": "SvelteKit", "electron": "Electron",
+        "react-native": "React Native", "expo": "Expo", "react-dom": "React", "vue": "Vue",
+        "fastapi": "FastAPI", "django": "Django", "flask": "Flask", "streamlit": "Streamlit", "gradio": "Gradio",
+        "tornado": "Tornado", "aiohttp": "aiohttp", "sanic": "Sanic",
+        "github.com/gin-gonic/gin": "Gin", "github.com/labstack/echo": "Echo", "github.com/gofiber/fiber": "Fiber",
+        "spring-boot-starter-web": "Spring Boot", "spring-boot-starter-webflux": "Spring WebFlux",
+        "actix-web": "Actix Web", "axum": "Axum", "rocket": "Rocket", "tauri": "Tauri",
+        "laravel/framework": "Laravel", "symfony/framework-bundle": "Symfony", "rails": "Rails", "flutter": "Flutter",
+    }
+    # 命令行框架
+    CLI_FRAMEWORKS = {
+        "commander": "Commander", "yargs": "yargs", "@oclif/core": "oclif", "oclif": "oclif", "meow": "meow",
+        "click": "Click", "typer": "Typer", "fire": "Fire",
+        "github.com/spf13/cobra": "Cobra", "github.com/urfave/cli": "urfave/cli", "clap": "clap", "structopt": "StructOpt",
+        "thor": "Thor", "picocli": "picocli",
+    }
+    # 开发工具的宿主（作为 peerDependency 时说明本项目是其插件）
+    TOOL_HOSTS = frozenset({"webpack", "rollup", "vite", "eslint", "babel-core", "@babel/core", "prettier", "postcss", "typescript", "jest", "pytest", "esbuild"})
+    TOOL_NAME_PATTERN = re.compile(r"(^|[/-])(eslint-(plugin|config)|babel-(plugin|preset)|vite-plugin|rollup-plugin|webpack-plugin|postcss-|prettier-plugin|pytest-|flake8-|[a-z]+-loader$)", re.IGNORECASE)
+
+    # 基础设施文件
+    INFRA_FILE_NAMES = frozenset({"dockerfile", "docker-compose.yml", "docker-compose.yaml", "compose.yml", "compose.yaml",
+                                  "chart.yaml", "values.yaml", "kustomization.yaml", "jenkinsfile", "vagrantfile",
+                                  ".gitlab-ci.yml", "playbook.yml", "site.yml", "ansible.cfg"})
+    INFRA_EXTENSIONS = frozenset({".tf", ".tfvars", ".hcl", ".nomad"})
+    INFRA_DIR_NAMES = frozenset({"k8s", "kubernetes", "helm", "charts", "terraform", "ansible", "roles", "manifests", "deploy", "deployment", ".github", ".circleci"})
+
+    # 判定为文档类项目的最大源码文件数
+    DOC_PROJECT_MAX_SOURCE_FILES = 20
+
+    @staticmethod
+    async def get_profile(path: str, repo_id: Optional[str] = None) -> RepoProfile:
+        """获取仓库画像（按提交缓存在 Redis，无法确定版本时不缓存）"""
+        version = CatalogueCache.get_version(path)
+        key = None
+        if version:
+            repo_key = repo_id or hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+            key = f"{RepoProfileService.KEY_PREFIX}:v{RepoProfileService.PROFILE_VERSION}:{repo_key}:{version}"
+            cached = await REDIS_CONN.get(key, space=RedisSpaceEnum.BUSINESS)
+            if cached:
+                try:
+                    return RepoProfile.from_dict(json.loads(cached))
+                except Exception as e:
+                    logging.warning(f"仓库画像缓存数据损坏，将重新计算 {key}: {e}")
+
+        snapshot = await CatalogueCache.get_snapshot(path, repo_id)
+        profile = await asyncio.to_thread(RepoProfileService.build_profile, path, snapshot.entries, version)
+        if key:
+            await REDIS_CONN.set_obj(key, profile.to_dict(), exp=settings.catalogue_cache_ttl, space=RedisSpaceEnum.BUSINESS)
+        return profile
+
+    @staticmethod
+    def build_profile(root: str, entries: List[Tuple[str, bool, int]], commit: Optional[str] = None) -> RepoProfile:
+        """
+        统计仓库画像并分类（同步，读取源码统计行数，应在线程中调用）
+
+        Args:
+            root: 仓库根目录
+            entries: 目录快照条目 (相对路径, 是否目录, 大小)
+            commit: 仓库版本
+        """
+        start = time.perf_counter()
+        profile = RepoProfile(commit=commit)
+        read_budget = settings.repo_profile_max_read_bytes
+        # 超出读取预算的文件按同语言已读文件的平均行长估算行数
+        sampled_bytes: Dict[str, int] = defaultdict(int)
+        sampled_lines: Dict[str, int] = defaultdict(int)
+        unsampled: Dict[str, int] = defaultdict(int)
+        manifests: List[str] = []
+
+        for rel_path, is_dir, size in entries:
+            if is_dir or rel_path.startswith("."):
+                if not is_dir and RepoProfileService._is_infra(rel_path):
+                    profile.infra_files += 1
+                continue
+            profile.total_files += 1
+            if FileClassifier.classify_path(rel_path):
+                profile.skipped_files += 1
+                continue
+
+            parts = rel_path.split("/")
+            name = parts[-1]
+            lower_name = name.lower()
+            ext = os.path.splitext(lower_name)[1]
+            dirs = [p.lower() for p in parts[:-1]]
+
+            if lower_name in RepoProfileService.MANIFESTS and len(parts) <= RepoProfileService.MANIFEST_MAX_DEPTH:
+                manifests.append(rel_path)
+            if RepoProfileService._is_infra(rel_path):
+                profile.infra_files += 1
+
+            if ext in CatalogueReducer.DOC_EXTENSIONS:
+                profile.doc_files += 1
+                profile.doc_bytes += size
+            elif ext in CatalogueReducer.SOURCE_EXTENSIONS:
+                profile.source_files += 1
+                profile.source_bytes += size
+                if any(d in CatalogueReducer.TEST_DIR_NAMES for d in dirs) or CatalogueReducer.TEST_FILE_PATTERN.search(name):
+                    profile.test_files += 1
+
+            language = CodeFileDetector.get_language_type(rel_path)
+            if not language:
+                continue
+            stats = profile.languages.setdefault(language, LanguageStats())
+            stats.files += 1
+            stats.bytes += size
+            if size <= read_budget:
+                lines = RepoProfileService._count_lines(os.path.join(root, rel_path))
+                if lines is not None:
+                    read_budget -= size
+                    stats.lines += lines
+                    sampled_bytes[language] += size
+                    sampled_lines[language] += lines
+                    continue
+            unsampled[language] += size
+
+        for language, size in unsampled.items():
+            bytes_per_line = sampled_bytes[language] / sampled_lines[language] if sampled_lines[language] else 40
+            profile.languages[language].lines += int(size / max(bytes_per_line, 1))
+
+        profile.manifests = sorted(manifests, key=lambda p: (p.count("/"), p))
+        facts = RepoProfileService._read_manifests(root, profile.manifests, entries)
+        profile.frameworks = sorted(facts["app"] | facts["cli"])
+        RepoProfileService._classify(profile, facts)
+        profile.elapsed_ms = (time.perf_counter() - start) * 1000
+        return profile
+
+    @staticmethod
+    def _is_infra(rel_path: str) -> bool:
+        parts = rel_path.lower().split("/")
+        name = parts[-1]
+        if name in RepoProfileService.INFRA_FILE_NAMES or name.startswith("dockerfile") or \
+                os.path.splitext(name)[1] in RepoProfileService.INFRA_EXTENSIONS:
+            return True
+        return any(d in RepoProfileService.INFRA_DIR_NAMES for d in parts[:-1]) and name.endswith((".yml", ".yaml", ".tf", ".j2"))
+
+    @staticmethod
+    def _count_lines(full_path: str) -> Optional[int]:
+        try:
+            with open(full_path, "rb") as f:
+                content = f.read()
+        except OSError:
+            return None
+        if not content:
+            return 0
+        return content.count(b"\n") + (0 if content.endswith(b"\n") else 1)
+
+    @staticmethod
+    def _read_text(root: str, rel_path: str) -> str:
+        full_path = os.path.join(root, rel_path)
+        try:
+            if os.path.getsize(full_path) > RepoProfileService.MANIFEST_MAX_SIZE:
+                return ""
+            with open(full_path, "r", encoding="utf-8", errors="replace") as f:
+                return f.read()
+        except OSError:
+            return ""
+
+    @staticmethod
+    def _load_toml(text: str) -> dict:
+        if tomllib is None or not text:
+            return {}
+        try:
+            return tomllib.loads(text)
+        except Exception:
+            return {}
+
+    @staticmethod
+    def _read_manifests(root: str, manifests: List[str], entries: List[Tuple[str, bool, int]]) -> dict:
+        """
+        解析构建清单，提取依赖与项目形态
+
+        Returns:
+            {"deps": 依赖名集合, "app": 应用框架, "cli": 命令行框架, "tool_hosts": 插件宿主,
+             "executables": 声明的可执行入口, "library": 声明为库的清单, "private": 私有（不发布）包,
+             "tool_names": 符合开发工具命名的包名}
+        """
+        facts = {key: set() for key in ("deps", "app", "cli", "tool_hosts", "executables", "library", "private", "tool_names")}
+        files = {rel for rel, is_dir, _ in entries if not is_dir}
+
+        for rel_path in manifests:
+            name = rel_path.rsplit("/", 1)[-1].lower()
+            prefix = rel_path[:-len(name)]
+            text = RepoProfileService._read_text(root, rel_path)
+            if not text:
+                continue
+            deps: Set[str] = set()
+
+            if name == "package.json":
+                try:
+                    data = json.loads(text)
+                except ValueError:
+                    continue
+                for section in ("dependencies", "devDependencies", "optionalDependencies"):
+                    deps.update((data.get(section) or {}).keys())
+                peers = set((data.get("peerDependencies") or {}).keys())
+                deps.update(peers)
+                facts["tool_hosts"].update(peers & RepoProfileService.TOOL_HOSTS)
+                if data.get("bin"):
+                    facts["executables"].add(rel_path)
+                if data.get("private"):
+                    facts["private"].add(rel_path)
+                elif any(data.get(k) for k in ("main", "module", "exports", "types", "typings")):
+                    facts["library"].add(rel_path)
+                if RepoProfileService.TOOL_NAME_PATTERN.search(str(data.get("name") or "")):
+                    facts["tool_names"].add(str(data["name"]))
+
+            elif name == "pyproject.toml":
+                data = RepoProfileService._load_toml(text)
+                project = data.get("project") or {}
+                poetry = (data.get("tool") or {}).get("poetry") or {}
+                for dep in project.get("dependencies") or []:
+                    deps.add(re.split(r"[\s\[<>=!~;]", dep, 1)[0])
+                deps.update((poetry.get("dependencies") or {}).keys())
+                if project.get("scripts") or poetry.get("scripts") or "[project.scripts]" in text or "[tool.poetry.scripts]" in text:
+                    facts["executables"].add(rel_path)
+                elif project.get("name") or poetry.get("name"):
+                    facts["library"].add(rel_path)
+                package_name = str(project.get("name") or poetry.get("name") or "")
+                if RepoProfileService.TOOL_NAME_PATTERN.search(package_name):
+                    facts["tool_names"].add(package_name)
+
+            elif name in ("setup.py", "setup.cfg"):
+                if "console_scripts" in text or "scripts=" in text:
+                    facts["executables"].add(rel_path)
+                else:
+                    facts["library"].add(rel_path)
+                deps.update(re.findall(r"['\"]([A-Za-z][\w.-]*)\s*(?:[<>=!~][^'\"]*)?['\"]", text))
+
+            elif name in ("requirements.txt", "pipfile"):
+                for line in text.splitlines():
+                    line = line.strip()
+                    if line and not line.startswith(("#", "-", "[")):
+                        deps.add(re.split(r"[\s\[<>=!~;]", line, 1)[0])
+
+            elif name == "go.mod":
+                deps.update(re.findall(r"^\s*(?:require\s+)?([\w.-]+\.[\w.-]+/[\w./-]+)\s+v", text, re.MULTILINE))
+                # 依赖路径去掉主版本后缀（github.com/urfave/cli/v2 -> github.com/urfave/cli）
+                deps.update(re.sub(r"/v\d+$", "", dep) for dep in list(deps))
+                has_main = f"{prefix}main.go" in files or any(f.startswith(f"{prefix}cmd/") and f.endswith(".go") for f in files)
+                (facts["executables"] if has_main else facts["library"]).add(rel_path)
+
+            elif name == "cargo.toml":
+                data = RepoProfileService._load_toml(text)
+                for section in ("dependencies", "dev-dependencies"):
+                    deps.update((data.get(section) or {}).keys())
+                if data.get("bin") or f"{prefix}src/main.rs" in files:
+                    facts["executables"].add(rel_path)
+                if data.get("lib") or f"{prefix}src/lib.rs" in files:
+                    facts["library"].add(rel_path)
+
+            elif name in ("pom.xml", "build.gradle", "build.gradle.kts"):
+                deps.update(re.findall(r"<artifactId>\s*([\w.-]+)\s*</artifactId>", text))
+                deps.update(re.findall(r"['\"][\w.-]+:([\w.-]+)(?::[^'\"]*)?['\"]", text))
+                if re.search(r"<packaging>\s*(jar|bundle)\s*</packaging>", text) and "spring-boot-maven-plugin" not in text:
+                    facts["library"].add(rel_path)
+                if "java-library" in text or "maven-publish" in text:
+                    facts["library"].add(rel_path)
+
+            elif name == "composer.json":
+                try:
+                    data = json.loads(text)
+                except ValueError:
+                    continue
+                deps.update((data.get("require") or {}).keys())
+                if data.get("bin"):
+                    facts["executables"].add(rel_path)
+                if data.get("type") == "library":
+                    facts["library"].add(rel_path)
+                elif data.get("type") == "project":
+                    facts["private"].add(rel_path)
+
+            elif name == "gemfile":
+                deps.update(re.findall(r"^\s*gem\s+['\"]([\w-]+)['\"]", text, re.MULTILINE))
+
+            elif name == "pubspec.yaml":
+                if re.search(r"^\s*flutter\s*:", text, re.MULTILINE):
+                    deps.add("flutter")
+
+            lowered = {dep.lower() for dep in deps}
+            facts["deps"].update(lowered)
+            facts["app"].update(label for dep, label in RepoProfileService.APP_FRAMEWORKS.items() if dep in lowered)
+            facts["cli"].update(label for dep, label in RepoProfileService.CLI_FRAMEWORKS.items() if dep in lowered)
+
+        return facts
+
+    @staticmethod
+    def _classify(profile: RepoProfile, facts: dict) -> None:
+        """按信号累计各分类得分，置信度 = 最高分占比 × 证据强度"""
+        scores: Dict[str, float] = defaultdict(float)
+        signals: List[str] = []
+
+        def vote(category: str, weight: float, reason: str):
+            scores[category] += weight
+            signals.append(f"{category}+{weight:g}: {reason}")
+
+        code_files = profile.source_files
+        if profile.doc_ratio >= 0.7 and code_files <= RepoProfileService.DOC_PROJECT_MAX_SOURCE_FILES:
+            vote(RepoClassify.Documentation, 3, f"文档占比 {profile.doc_ratio:.0%}，源码文件 {code_files} 个")
+        elif profile.doc_files and not code_files:
+            vote(RepoClassify.Documentation, 2, "没有源码文件")
+
+        non_doc_files = profile.total_files - profile.skipped_files - profile.doc_files
+        if profile.infra_files and non_doc_files and profile.infra_files / non_doc_files >= 0.5 and not facts["app"]:
+            vote(RepoClassify.DevOpsConfiguration, 3, f"基础设施文件占比 {profile.infra_files / non_doc_files:.0%}")
+
+        if facts["tool_names"]:
+            vote(RepoClassify.DevelopmentTools, 3, f"开发工具插件命名: {', '.join(sorted(facts['tool_names']))}")
+        if facts["tool_hosts"]:
+            vote(RepoClassify.DevelopmentTools, 1.5, f"以 {', '.join(sorted(facts['tool_hosts']))} 为宿主依赖")
+
+        if facts["app"]:
+            vote(RepoClassify.Applications, 2 + 0.5 * min(len(facts["app"]) - 1, 2), f"应用框架: {', '.join(sorted(facts['app']))}")
+        if facts["private"]:
+            vote(RepoClassify.Applications, 1, "清单声明为私有项目（不发布）")
+
+        if facts["executables"]:
+            weight = 2 if not facts["app"] else 1
+            vote(RepoClassify.CLITools, weight, f"声明了可执行入口: {', '.join(sorted(facts['executables']))}")
+        if facts["cli"]:
+            # 与应用框架并存时命令行库多为运维脚本或间接依赖（如 Flask 依赖 Click）
+            weight = 1.5 if not facts["app"] else 0.5
+            vote(RepoClassify.CLITools, weight, f"命令行框架: {', '.join(sorted(facts['cli']))}")
+
+        if facts["library"] and not facts["executables"] and not facts["private"]:
+            weight = 2 if not (facts["app"] or facts["tool_names"]) else 0.5
+            vote(RepoClassify.Libraries, weight, f"清单声明为可发布的库: {', '.join(sorted(facts['library']))}")
+
+        profile.signals = signals
+        if not scores:
+            profile.classify, profile.confidence = None, 0.0
+            return
+        category, top = max(scores.items(), key=lambda item: item[1])
+        total = sum(scores.values())
+        # 证据不足 3 分时按比例降低置信度
+        profile.classify = category
+        profile.confidence = (top / total) * min(1.0, top / 3)
@@ -1,31 +1,27 @@
 import asyncio
 import logging
-from datetime import datetime
-from sqlalchemy import select, update
+from sqlalchemy import select
 from app.infrastructure.celery.app import celery_app
+from app.infrastructure.celery.event_loop import run_async
+from app.infrastructure.celery.queues import WorkloadQueue, task_options
 from app.infrastructure.database.factory import get_db
 from app.domains.repo_mgmt.models.repository import RepoRecord, ProcessingStatus
+from app.domains.repo_mgmt.services.progress_reporter import ProgressReporter
+from app.domains.repo_mgmt.services.workspace_manager import WorkspaceManager
 
 
-@celery_app.task(bind=True)
+@celery_app.task(bind=True, **task_options(WorkloadQueue.LLM))
 def generate_wiki_task(self, repo_id: str):
     """异步生成仓库wiki任务"""
     
     async def _generate_wiki():
         async for session in get_db():
             try:
+                # 进度写入 Redis 并推送，数据库只在状态变化或按间隔写入
+                reporter = ProgressReporter(session, repo_id)
+                
                 # 更新状态为生成wiki中
-                await session.execute(
-                    update(RepoRecord)
-                    .where(RepoRecord.id == repo_id)
-                    .values(
-                        processing_status=ProcessingStatus.WIKI_GENERATING,
-                        processing_progress=10,
-                        processing_message="开始生成wiki",
-                        updated_at=datetime.utcnow()
-                    )
-                )
-                await session.commit()
+                await reporter.transition(ProcessingStatus.WIKI_GENERATING, 10, "开始生成wiki")
                 
                 # 获取仓库信息
                 result = await session.execute(
@@ -35,19 +31,14 @@ def generate_wiki_task(self, repo_id: str):
                 if not repo_record:
                     raise Exception(f"仓库 {repo_id} 不存在")
                 
+                # 仓库可能在其它节点克隆或已被磁盘配额淘汰，本地没有工作副本时从快照或远端恢复
+                if not await WorkspaceManager.ensure_local(session, repo_record):
+                    raise Exception(f"仓库 {repo_id} 本地工作副本不可用")
+
                 logging.info(f"开始为仓库 {repo_record.repo_name} 生成wiki")
                 
                 # 更新进度
-                await session.execute(
-                    update(RepoRecord)
-                    .where(RepoRecord.id == repo_id)
-                    .values(
-                        processing_progress=30,
-                        processing_message="wiki文档已创建，开始分析代码",
-                        updated_at=datetime.utcnow()
-                    )
-                )
-                await session.commit()
+                await reporter.update(30, "wiki文档已创建，开始分析代码")
                 
                 # TODO: 执行代码分析任务
                 # 这里可以调用代码分析服务
@@ -58,52 +49,24 @@ def generate_wiki_task(self, repo_id: str):
                 await asyncio.sleep(2)  # 模拟分析耗时
                 
                 # 更新进度
-                await session.execute(
-                    update(RepoRecord)
-                    .where(RepoRecord.id == repo_id)
-                    .values(
-                        processing_progress=80,
-                        processing_message="代码分析完成，正在生成wiki内容",
-                        updated_at=datetime.utcnow()
-                    )
-                )
-                await session.commit()
+                await reporter.update(80, "代码分析完成，正在生成wiki内容")
                 
                 # 模拟生成wiki内容
                 await asyncio.sleep(1)  # 模拟生成耗时
                 
                 # 更新仓库状态为完成
-                await session.execute(
-                    update(RepoRecord)
-                    .where(RepoRecord.id == repo_id)
-                    .values(
-                        processing_status=ProcessingStatus.COMPLETED,
-                        processing_progress=100,
-                        processing_message="wiki生成完成",
-                        is_wiki_generated=True,
-                        updated_at=datetime.utcnow()
-                    )
+                await reporter.transition(
+                    ProcessingStatus.COMPLETED, 100, "wiki生成完成",
+                    is_wiki_generated=True
                 )
-                await session.commit()
                 
                 logging.info(f"仓库 {repo_record.repo_name} wiki生成完成")
                 
-            except Exception as e:
+            except (Exception, asyncio.CancelledError) as e:
                 # 更新状态为失败
-                await session.execute(
-                    update(RepoRecord)
-                    .where(RepoRecord.id == repo_id)
-                    .values(
-                        processing_status=ProcessingStatus.FAILED,
-                        processing_progress=0,
-                        processing_message="wiki生成失败",
-                        processing_error=str(e),
-                        updated_at=datetime.utcnow()
-                    )
-                )
-                await session.commit()
+                await ProgressReporter(session, repo_id).fail("wiki生成失败", str(e) or "任务超时或被取消")
                 logging.error(f"仓库 {repo_id} wiki生成失败: {e}")
                 raise
     
     # 运行异步任务
-    asyncio.run(_generate_wiki())
\ No newline at end of file
+    run_async(_generate_wiki(), timeout=self.soft_time_limit)
\ No newline at end of file
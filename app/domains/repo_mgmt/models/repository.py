@@ -1,8 +1,9 @@
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import Column, String, DateTime, Boolean, Text, Integer, ForeignKey, Enum
+from sqlalchemy import Column, String, DateTime, Boolean, Text, Integer, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 import enum
+import json
 
 
 class ProcessingStatus(str, enum.Enum):
@@ -15,6 +16,14 @@ class ProcessingStatus(str, enum.Enum):
     FAILED = "failed"        # 失败
 
 
+class CloneStrategy(str, enum.Enum):
+    """克隆策略枚举"""
+    FULL = "full"            # 完整克隆
+    SHALLOW = "shallow"      # 浅克隆（仅最近 N 个提交）
+    BLOBLESS = "blobless"    # 部分克隆（按需下载文件内容）
+    SPARSE = "sparse"        # 稀疏检出（仅检出匹配的路径）
+
+
 class RepoRecord:
     """仓库模型"""
     __tablename__ = "repo_records"
@@ -33,6 +42,12 @@ class RepoRecord:
     # 本地路径信息
     local_path = Column(String, nullable=True, comment="本地路径")
     version = Column(String, nullable=True, comment="版本")
+
+    # 克隆策略（可组合：浅克隆深度 + 部分克隆过滤器 + 稀疏检出路径）
+    clone_strategy = Column(Enum(CloneStrategy), default=CloneStrategy.FULL, comment="克隆策略")
+    clone_depth = Column(Integer, default=0, comment="浅克隆深度(0表示完整历史)")
+    clone_filter = Column(String, nullable=True, comment="部分克隆过滤器，如 blob:none")
+    sparse_paths = Column(Text, nullable=True, comment="稀疏检出路径规则(JSON列表)")
     
     # 处理状态
     processing_status = Column(Enum(ProcessingStatus), default=ProcessingStatus.INIT, comment="处理状态")
@@ -54,6 +69,11 @@ class RepoRecord:
     
     # 关联关系
     commit_records = relationship("DocumentCommitRecord", back_populates="repo_record", cascade="all, delete-orphan")
+
+    # 用户仓库列表按 (创建时间, ID) 倒序的键集分页与计数
+    __table_args__ = (
+        Index('idx_repo_user_created', 'create_user_id', 'created_at', 'id'),
+    )
     
     def to_dict(self):
         return {
@@ -67,6 +87,10 @@ class RepoRecord:
             "repo_branch": self.repo_branch,
             "local_path": self.local_path,
             "version": self.version,
+            "clone_strategy": self.clone_strategy.value if self.clone_strategy else None,
+            "clone_depth": self.clone_depth,
+            "clone_filter": self.clone_filter,
+            "sparse_paths": json.loads(self.sparse_paths) if self.sparse_paths else [],
             "processing_status": self.processing_status.value if self.processing_status else None,
             "processing_progress": self.processing_progress,
             "processing_message": self.processing_message,
@@ -0,0 +1,49 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Index
+
+
+class SharedArtifact:
+    """跨仓库记录共享的派生产物（目录、分类、概述等），按 (远端地址哈希, 提交, 类型, 生成器版本) 内容寻址"""
+    __tablename__ = "shared_artifacts"
+
+    id = Column(String(64), primary_key=True, comment="产物键 sha256(远端地址哈希, 提交, 类型, 生成器版本)")
+    remote_hash = Column(String(64), nullable=False, comment="规范化远端地址的 sha256")
+    commit_sha = Column(String(64), nullable=False, comment="提交")
+    kind = Column(String(64), nullable=False, comment="产物类型")
+    generator_version = Column(String(128), nullable=False, comment="生成器版本（模型、提示词等）")
+
+    storage_key = Column(String, nullable=False, comment="对象存储键")
+    content_sha256 = Column(String(64), nullable=False, comment="内容 sha256")
+    size = Column(Integer, default=0, nullable=False, comment="内容字节数")
+    ref_count = Column(Integer, default=0, nullable=False, comment="引用该产物的仓库记录数")
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_used_at = Column(DateTime, default=datetime.utcnow, nullable=False, comment="最近一次被引用时间")
+
+    __table_args__ = (
+        Index('idx_artifact_remote_commit', 'remote_hash', 'commit_sha'),
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "remote_hash": self.remote_hash,
+            "commit_sha": self.commit_sha,
+            "kind": self.kind,
+            "generator_version": self.generator_version,
+            "size": self.size,
+            "ref_count": self.ref_count,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "last_used_at": self.last_used_at.isoformat() if self.last_used_at else None,
+        }
+
+
+class RepoArtifactRef:
+    """仓库记录对共享产物的引用：每个仓库每种产物只引用一个（最新提交的）版本"""
+    __tablename__ = "repo_artifact_refs"
+
+    repo_id = Column(String, ForeignKey("repo_records.id", ondelete="CASCADE"), primary_key=True, comment="仓库ID")
+    kind = Column(String(64), primary_key=True, comment="产物类型")
+    artifact_id = Column(String(64), ForeignKey("shared_artifacts.id"), nullable=False, index=True, comment="共享产物ID")
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
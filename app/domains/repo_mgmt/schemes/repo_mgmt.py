@@ -1,13 +1,42 @@
+import re
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field, validator
 
 
+# 部分克隆过滤器白名单
+CLONE_FILTER_PATTERN = re.compile(r"^(blob:none|tree:0|blob:limit=\d+[kmg]?)$")
+
+
+def check_clone_filter(v: Optional[str]) -> Optional[str]:
+    """校验部分克隆过滤器"""
+    if v is None:
+        return v
+    v = v.strip()
+    if v and not CLONE_FILTER_PATTERN.match(v):
+        raise ValueError("不支持的部分克隆过滤器，可选 blob:none、tree:0、blob:limit=<n>")
+    return v
+
+
+def check_sparse_paths(v: Optional[List[str]]) -> Optional[List[str]]:
+    """校验稀疏检出路径规则"""
+    if v is None:
+        return v
+    paths = [p.strip() for p in v if p and p.strip()]
+    for p in paths:
+        if p.startswith("-") or ".." in p.split("/"):
+            raise ValueError(f"无效的稀疏检出路径: {p}")
+    return paths
+
+
 class CreateRepositoryFromUrl(BaseModel):
     """通过Git URL创建仓库"""
     repo_url: str = Field(..., description="Git仓库URL")
     branch: str = Field(default="main", description="分支名称")
     description: str = Field(default="", description="仓库描述")
+    clone_depth: Optional[int] = Field(None, ge=0, description="浅克隆深度，0表示完整历史，不传使用系统默认值")
+    clone_filter: Optional[str] = Field(None, description="部分克隆过滤器（blob:none、tree:0、blob:limit=<n>），不传使用系统默认值")
+    sparse_paths: Optional[List[str]] = Field(None, description="稀疏检出路径规则（gitignore语法），为空表示检出全部文件")
     
     @validator('repo_url')
     def validate_repo_url(cls, v):
@@ -23,11 +52,58 @@ class CreateRepositoryFromUrl(BaseModel):
             raise ValueError("分支名称不能为空")
         return v.strip()
 
+    @validator('clone_filter')
+    def validate_clone_filter(cls, v):
+        return check_clone_filter(v)
+
+    @validator('sparse_paths')
+    def validate_sparse_paths(cls, v):
+        return check_sparse_paths(v)
+
+
+class CreateRepositoriesBatch(BaseModel):
+    """批量通过Git URL创建仓库"""
+    repos: List[CreateRepositoryFromUrl] = Field(..., min_length=1, description="仓库列表")
+
+
+class RejectedRepository(BaseModel):
+    """批量创建时未能创建的仓库"""
+    repo_url: str = Field(..., description="Git仓库URL")
+    error: str = Field(..., description="原因")
+
+
+class RepositoryBatchInfo(BaseModel):
+    """批量导入批次"""
+    batch_id: str = Field(..., description="批次ID")
+    total: int = Field(..., description="已创建并进入导入流水线的仓库数")
+    repo_ids: List[str] = Field(default_factory=list, description="已创建的仓库ID")
+    rejected: List[RejectedRepository] = Field(default_factory=list, description="未能创建的仓库")
+
+
+class RepositoryBatchProgress(BaseModel):
+    """批量导入聚合进度"""
+    batch_id: str = Field(..., description="批次ID")
+    status: str = Field(..., description="批次状态：pending、running、completed")
+    total: int = Field(..., description="仓库数")
+    counts: Dict[str, int] = Field(default_factory=dict, description="各状态（pending、cloning、scanning、indexing、completed、failed）的仓库数")
+    repos: Dict[str, str] = Field(default_factory=dict, description="各仓库当前状态")
+    repo_errors: Dict[str, str] = Field(default_factory=dict, description="失败仓库的错误信息")
+    rejected: List[RejectedRepository] = Field(default_factory=list, description="未能创建的仓库")
+
+
+class TaskQueuePosition(BaseModel):
+    """后台任务排队位置"""
+    queue: str = Field(..., description="任务队列")
+    state: str = Field(..., description="状态：queued（排队中）、running（已派发执行）")
+    user_position: int = Field(0, description="在本用户任务中的排队位置，从1开始，执行中为0")
+    position: int = Field(0, description="按轮转调度估算的整体排队位置，从1开始，执行中为0")
+
 
 class UpdateRepository(BaseModel):
     """更新仓库"""
     description: Optional[str] = Field(None, description="仓库描述")
     branch: Optional[str] = Field(None, description="分支名称")
+    sparse_paths: Optional[List[str]] = Field(None, description="稀疏检出路径规则，传空列表表示恢复完整检出")
     
     @validator('branch')
     def validate_branch(cls, v):
@@ -35,6 +111,10 @@ class UpdateRepository(BaseModel):
             raise ValueError("分支名称不能为空")
         return v.strip() if v else v
 
+    @validator('sparse_paths')
+    def validate_sparse_paths(cls, v):
+        return check_sparse_paths(v)
+
 class RepositoryInfo(BaseModel):
     """仓库信息"""
     id: str = Field(..., description="仓库ID")
@@ -51,6 +131,11 @@ class RepositoryInfo(BaseModel):
     # 路径信息
     local_path: Optional[str] = Field(None, description="本地路径")
     version: Optional[str] = Field(None, description="版本")
+
+    # 克隆策略
+    clone_strategy: Optional[str] = Field(None, description="克隆策略")
+    clone_depth: int = Field(0, description="浅克隆深度")
+    clone_filter: Optional[str] = Field(None, description="部分克隆过滤器")
     
     # 处理标志
     is_embedded: bool = Field(..., description="是否嵌入完成")
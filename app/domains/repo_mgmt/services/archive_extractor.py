@@ -0,0 +1,240 @@
+import os
+import stat
+import asyncio
+import hashlib
+import logging
+import tarfile
+import zipfile
+from typing import IO, Dict, List, Optional
+from fastapi import UploadFile
+from app.config.settings import settings
+from app.domains.repo_mgmt.services.file_tree_service import PathInfo
+
+
+class ArchiveError(ValueError):
+    """压缩包不合法或超出限制"""
+
+
+class ArchiveExtractor:
+    """
+    上传压缩包的流式保存与逐条解压
+
+    - 上传内容按块写入磁盘，边写边计算 sha256 作为内容指纹，内存占用与文件大小无关
+    - 解压逐条进行，限制解压总大小、条目数量与压缩比（防止压缩炸弹）
+    - 拒绝绝对路径与 .. 路径穿越，跳过符号链接、硬链接与设备文件
+    - 解压时记录每个文件与目录的信息，首次生成目录结构时无需再遍历磁盘
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+    ZIP_EXTENSIONS = (".zip",)
+    TAR_EXTENSIONS = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+    # 压缩比检查的最小文件大小，小文件高压缩比很常见（如空白较多的文本）
+    RATIO_CHECK_MIN_SIZE = 1024 * 1024
+
+    @staticmethod
+    def is_supported(filename: str) -> bool:
+        name = (filename or "").lower()
+        return name.endswith(ArchiveExtractor.ZIP_EXTENSIONS + ArchiveExtractor.TAR_EXTENSIONS)
+
+    @staticmethod
+    async def save_upload(file: UploadFile, target_path: str) -> str:
+        """
+        分块保存上传文件
+
+        Returns:
+            文件内容的 sha256
+
+        Raises:
+            ArchiveError: 超过上传大小上限
+        """
+        digest = hashlib.sha256()
+        written = 0
+        with open(target_path, "wb") as buffer:
+            while True:
+                chunk = await file.read(ArchiveExtractor.CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > settings.upload_max_archive_size:
+                    raise ArchiveError(f"压缩包超过大小上限 {settings.upload_max_archive_size} 字节")
+                digest.update(chunk)
+                # 磁盘写入放到线程中，避免阻塞事件循环
+                await asyncio.to_thread(buffer.write, chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def extract(archive_path: str, extract_path: str, filename: Optional[str] = None) -> List[PathInfo]:
+        """
+        逐条解压压缩包（同步，应在线程中调用）
+
+        Args:
+            archive_path: 压缩包路径
+            extract_path: 解压目录
+            filename: 原始文件名，用于判断格式（默认取 archive_path）
+
+        Returns:
+            解压出的文件与目录信息（含所有中间目录）
+
+        Raises:
+            ArchiveError: 格式不支持、路径非法或超出限制
+        """
+        name = (filename or archive_path).lower()
+        os.makedirs(extract_path, exist_ok=True)
+        state = _ExtractState(extract_path, os.path.getsize(archive_path))
+
+        if name.endswith(ArchiveExtractor.ZIP_EXTENSIONS):
+            ArchiveExtractor._extract_zip(archive_path, state)
+        elif name.endswith(ArchiveExtractor.TAR_EXTENSIONS):
+            ArchiveExtractor._extract_tar(archive_path, state)
+        else:
+            raise ArchiveError("不支持的压缩包格式")
+
+        logging.info(f"压缩包解压完成: {state.entry_count} 个条目, {state.total_size} 字节 -> {extract_path}")
+        return state.infos
+
+    @staticmethod
+    def _extract_zip(archive_path: str, state: "_ExtractState") -> None:
+        with zipfile.ZipFile(archive_path, "r") as zip_ref:
+            members = zip_ref.infolist()
+            # 先按中央目录声明的大小快速拒绝，实际写入时再按真实字节数校验
+            state.check_entry_count(len(members))
+            state.check_total(sum(m.file_size for m in members))
+
+            for member in members:
+                state.count_entry()
+                if member.flag_bits & 0x1:
+                    raise ArchiveError(f"不支持加密的压缩包条目: {member.filename}")
+
+                mode = member.external_attr >> 16
+                if stat.S_ISLNK(mode):
+                    logging.warning(f"跳过压缩包中的符号链接: {member.filename}")
+                    continue
+
+                rel_path = state.resolve(member.filename)
+                if rel_path is None:
+                    continue
+                if member.is_dir():
+                    state.add_directory(rel_path)
+                    continue
+
+                if member.file_size >= ArchiveExtractor.RATIO_CHECK_MIN_SIZE and \
+                        member.file_size > max(member.compress_size, 1) * settings.upload_max_compression_ratio:
+                    raise ArchiveError(f"压缩比异常，疑似压缩炸弹: {member.filename}")
+
+                with zip_ref.open(member) as source:
+                    state.write_file(rel_path, source)
+
+    @staticmethod
+    def _extract_tar(archive_path: str, state: "_ExtractState") -> None:
+        # 流式模式按顺序读取条目，不需要随机访问，也不会一次性加载成员列表
+        with tarfile.open(archive_path, "r|*") as tar_ref:
+            for member in tar_ref:
+                state.count_entry()
+
+                if member.issym() or member.islnk():
+                    logging.warning(f"跳过压缩包中的链接: {member.name}")
+                    continue
+                if not (member.isfile() or member.isdir()):
+                    logging.warning(f"跳过压缩包中的特殊文件: {member.name}")
+                    continue
+
+                rel_path = state.resolve(member.name)
+                if rel_path is None:
+                    continue
+                if member.isdir():
+                    state.add_directory(rel_path)
+                    continue
+
+                source = tar_ref.extractfile(member)
+                if source is None:
+                    continue
+                with source:
+                    state.write_file(rel_path, source)
+                # tar 条目大小即解压大小，整体压缩比相对压缩包大小计算
+                state.check_ratio()
+
+
+class _ExtractState:
+    """解压过程中的统计与限制检查"""
+
+    def __init__(self, extract_path: str, archive_size: int):
+        self.root = os.path.abspath(extract_path)
+        self._real_root = os.path.realpath(extract_path)
+        self.archive_size = max(archive_size, 1)
+        self.total_size = 0
+        self.entry_count = 0
+        self._dirs: Dict[str, PathInfo] = {}
+        self._files: Dict[str, PathInfo] = {}
+
+    @property
+    def infos(self) -> List[PathInfo]:
+        return list(self._dirs.values()) + list(self._files.values())
+
+    def count_entry(self) -> None:
+        self.entry_count += 1
+        self.check_entry_count(self.entry_count)
+
+    def check_entry_count(self, count: int) -> None:
+        if count > settings.upload_max_entries:
+            raise ArchiveError(f"压缩包条目数超过上限 {settings.upload_max_entries}")
+
+    def check_total(self, total_size: int) -> None:
+        if total_size > settings.upload_max_extracted_size:
+            raise ArchiveError(f"解压后大小超过上限 {settings.upload_max_extracted_size} 字节")
+
+    def check_ratio(self) -> None:
+        if self.total_size >= ArchiveExtractor.RATIO_CHECK_MIN_SIZE and \
+                self.total_size > self.archive_size * settings.upload_max_compression_ratio:
+            raise ArchiveError("压缩比异常，疑似压缩炸弹")
+
+    def resolve(self, name: str) -> Optional[str]:
+        """
+        校验条目路径，返回规范化后的相对路径（/ 分隔）；空路径返回 None
+
+        Raises:
+            ArchiveError: 绝对路径或路径穿越
+        """
+        normalized = name.replace("\\", "/")
+        if normalized.startswith("/") or (len(normalized) > 1 and normalized[1] == ":"):
+            raise ArchiveError(f"压缩包包含绝对路径: {name}")
+        parts = [p for p in normalized.split("/") if p and p != "."]
+        if any(p == ".." for p in parts):
+            raise ArchiveError(f"压缩包包含非法路径: {name}")
+        if not parts:
+            return None
+
+        rel_path = "/".join(parts)
+        full_path = os.path.realpath(os.path.join(self._real_root, rel_path))
+        if full_path != self._real_root and not full_path.startswith(self._real_root + os.sep):
+            raise ArchiveError(f"压缩包包含非法路径: {name}")
+        return rel_path
+
+    def add_directory(self, rel_path: str) -> None:
+        """创建目录并记录（含所有中间目录）"""
+        parts = rel_path.split("/")
+        for i in range(1, len(parts) + 1):
+            dir_path = "/".join(parts[:i])
+            if dir_path in self._dirs:
+                continue
+            full_path = os.path.join(self.root, dir_path)
+            os.makedirs(full_path, exist_ok=True)
+            self._dirs[dir_path] = PathInfo(path=full_path, name=parts[i - 1], is_directory=True, size=0)
+
+    def write_file(self, rel_path: str, source: IO[bytes]) -> None:
+        """按块写入文件，实时校验解压总大小（同名条目以最后一个为准）"""
+        if "/" in rel_path:
+            self.add_directory(rel_path.rsplit("/", 1)[0])
+
+        full_path = os.path.join(self.root, rel_path)
+        size = 0
+        with open(full_path, "wb") as target:
+            while True:
+                chunk = source.read(ArchiveExtractor.CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                self.total_size += len(chunk)
+                self.check_total(self.total_size)
+                target.write(chunk)
+
+        self._files[rel_path] = PathInfo(path=full_path, name=rel_path.rsplit("/", 1)[-1], is_directory=False, size=size)
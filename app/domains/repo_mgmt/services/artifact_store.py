@@ -0,0 +1,302 @@
+import io
+import re
+import uuid
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional
+from urllib.parse import urlsplit
+from sqlalchemy import select, update, delete, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.settings import settings
+from app.infrastructure.redis import REDIS_CONN, RedisSpaceEnum
+from app.infrastructure.storage import STORAGE_CONN
+from app.infrastructure.database.factory import get_db
+from app.domains.repo_mgmt.models.shared_artifact import SharedArtifact, RepoArtifactRef
+from app.domains.repo_mgmt.services.git_ref_reader import GitRefReader
+
+
+# scp 风格的远端地址：git@host:org/repo.git
+_SCP_URL = re.compile(r"^(?:[^@/]+@)?([^:/]+):(?!//)(.+)$")
+_COMMIT_SHA = re.compile(r"^[0-9a-f]{40}([0-9a-f]{24})?$")
+
+
+@dataclass(frozen=True)
+class ArtifactKey:
+    """共享产物键"""
+    remote_hash: str
+    commit: str
+    kind: str
+    generator_version: str
+
+    @property
+    def id(self) -> str:
+        raw = "\0".join((self.remote_hash, self.commit, self.kind, self.generator_version))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ArtifactStore:
+    """
+    跨仓库记录共享的派生产物存储
+
+    不同用户导入同一远端仓库的同一提交时，目录精修、分类、概述等派生产物只生成一次：
+    内容写入对象存储，数据库记录产物键与引用计数，仓库记录通过 repo_artifact_refs 引用产物（每种产物一个版本）。
+    仓库切换到新提交或被删除时释放旧引用，计数归零的产物连同对象一并删除。
+
+    访问控制：只有用户自己的工作副本已检出该提交（即已能读取这些源码）时才会命中共享产物，
+    上传的仓库没有远端地址，不参与共享；稀疏检出的仓库按检出规则区分产物
+    """
+
+    LOCK_PREFIX = "artifact:lock"
+
+    @staticmethod
+    def normalize_remote(url: str) -> str:
+        """规范化远端地址：去掉凭据、协议、默认端口与 .git 后缀，主机名小写"""
+        url = (url or "").strip()
+        match = _SCP_URL.match(url) if "://" not in url else None
+        if match:
+            host, path = match.group(1), match.group(2)
+        else:
+            parts = urlsplit(url)
+            host = parts.hostname or ""
+            if parts.port and parts.port not in (22, 80, 443):
+                host = f"{host}:{parts.port}"
+            path = parts.path
+        path = path.strip("/")
+        if path.endswith(".git"):
+            path = path[:-4]
+        return f"{host.lower()}/{path}"
+
+    @staticmethod
+    def remote_hash(url: str) -> str:
+        return hashlib.sha256(ArtifactStore.normalize_remote(url).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def build_key(repo_record, commit: Optional[str], kind: str, generator_version: str) -> Optional[ArtifactKey]:
+        """
+        构造仓库记录的产物键
+
+        Returns:
+            产物键；未启用共享、没有远端地址或提交不是完整 sha 时返回 None（不共享）
+        """
+        if not settings.artifact_share_enabled:
+            return None
+        if not repo_record.repo_url or not commit or not _COMMIT_SHA.match(commit):
+            return None
+        if repo_record.sparse_paths:
+            digest = hashlib.sha1(repo_record.sparse_paths.encode("utf-8")).hexdigest()[:12]
+            generator_version = f"{generator_version}+sparse:{digest}"
+        return ArtifactKey(ArtifactStore.remote_hash(repo_record.repo_url), commit, kind, generator_version)
+
+    @staticmethod
+    async def load(session: AsyncSession, key: ArtifactKey) -> Optional[bytes]:
+        """读取产物内容；不存在或对象缺失、校验失败时返回 None"""
+        result = await session.execute(select(SharedArtifact).where(SharedArtifact.id == key.id))
+        artifact = result.scalar_one_or_none()
+        if artifact is None:
+            return None
+        stream = await STORAGE_CONN.get(artifact.storage_key)
+        if stream is None:
+            logging.warning(f"共享产物对象缺失 {artifact.kind} {artifact.storage_key}")
+            return None
+        try:
+            content = await asyncio.to_thread(stream.read)
+        finally:
+            await asyncio.to_thread(stream.close)
+        if hashlib.sha256(content).hexdigest() != artifact.content_sha256:
+            logging.warning(f"共享产物校验失败 {artifact.kind} {artifact.storage_key}")
+            return None
+        return content
+
+    @staticmethod
+    async def store(session: AsyncSession, repo_id: str, key: ArtifactKey, content: bytes,
+                    content_type: str = "application/octet-stream") -> None:
+        """写入产物并由仓库记录引用；其它节点已写入相同键时使用已有产物（会提交或回滚 session，应传入独立会话）"""
+        storage_key = f"artifact-{key.id}-{uuid.uuid4().hex[:8]}"
+        await STORAGE_CONN.put(storage_key, io.BytesIO(content), content_type=content_type,
+                               metadata={"kind": key.kind, "commit": key.commit})
+        now = datetime.utcnow()
+        try:
+            await session.execute(insert(SharedArtifact).values(
+                id=key.id,
+                remote_hash=key.remote_hash,
+                commit_sha=key.commit,
+                kind=key.kind,
+                generator_version=key.generator_version,
+                storage_key=storage_key,
+                content_sha256=hashlib.sha256(content).hexdigest(),
+                size=len(content),
+                ref_count=0,
+                created_at=now,
+                last_used_at=now,
+            ))
+            await ArtifactStore.attach(session, repo_id, key)
+        except IntegrityError:
+            await session.rollback()
+            await STORAGE_CONN.delete(storage_key)
+            await ArtifactStore.attach(session, repo_id, key)
+
+    @staticmethod
+    async def attach(session: AsyncSession, repo_id: str, key: ArtifactKey) -> bool:
+        """
+        仓库记录引用产物，替换同类型的旧引用（旧产物计数归零时删除）并提交
+
+        Returns:
+            是否引用成功（产物在此期间被回收时返回 False）
+        """
+        result = await session.execute(
+            select(RepoArtifactRef).where(RepoArtifactRef.repo_id == repo_id, RepoArtifactRef.kind == key.kind)
+        )
+        ref = result.scalar_one_or_none()
+        now = datetime.utcnow()
+        if ref is not None and ref.artifact_id == key.id:
+            await session.execute(update(SharedArtifact).where(SharedArtifact.id == key.id).values(last_used_at=now))
+            await session.commit()
+            return True
+
+        result = await session.execute(
+            update(SharedArtifact)
+            .where(SharedArtifact.id == key.id)
+            .values(ref_count=SharedArtifact.ref_count + 1, last_used_at=now)
+        )
+        if result.rowcount == 0:
+            await session.rollback()
+            return False
+
+        collected: List[str] = []
+        if ref is None:
+            await session.execute(insert(RepoArtifactRef).values(repo_id=repo_id, kind=key.kind, artifact_id=key.id, created_at=now))
+        else:
+            old_id = ref.artifact_id
+            await session.execute(
+                update(RepoArtifactRef)
+                .where(RepoArtifactRef.repo_id == repo_id, RepoArtifactRef.kind == key.kind)
+                .values(artifact_id=key.id, created_at=now)
+            )
+            collected += await ArtifactStore._unref(session, [old_id])
+        await session.commit()
+        await ArtifactStore._delete_objects(collected)
+        return True
+
+    @staticmethod
+    async def release(session: AsyncSession, repo_id: str) -> int:
+        """
+        释放仓库记录的全部引用（删除仓库时调用），计数归零的产物连同对象删除
+
+        Returns:
+            释放的引用数
+        """
+        result = await session.execute(select(RepoArtifactRef.artifact_id).where(RepoArtifactRef.repo_id == repo_id))
+        artifact_ids = [row[0] for row in result.all()]
+        if not artifact_ids:
+            return 0
+        await session.execute(delete(RepoArtifactRef).where(RepoArtifactRef.repo_id == repo_id))
+        collected = await ArtifactStore._unref(session, artifact_ids)
+        await session.commit()
+        await ArtifactStore._delete_objects(collected)
+        return len(artifact_ids)
+
+    @staticmethod
+    async def _unref(session: AsyncSession, artifact_ids: List[str]) -> List[str]:
+        """引用计数减一并删除计数归零的产物记录，返回需要删除的对象存储键（提交后删除）"""
+        collected = []
+        for artifact_id in artifact_ids:
+            await session.execute(
+                update(SharedArtifact)
+                .where(SharedArtifact.id == artifact_id)
+                .values(ref_count=SharedArtifact.ref_count - 1)
+            )
+            result = await session.execute(select(SharedArtifact.storage_key).where(SharedArtifact.id == artifact_id))
+            storage_key = result.scalar_one_or_none()
+            result = await session.execute(
+                delete(SharedArtifact).where(SharedArtifact.id == artifact_id, SharedArtifact.ref_count <= 0)
+            )
+            if result.rowcount and storage_key:
+                collected.append(storage_key)
+        return collected
+
+    @staticmethod
+    async def _delete_objects(storage_keys: List[str]) -> None:
+        for storage_key in storage_keys:
+            try:
+                await STORAGE_CONN.delete(storage_key)
+            except Exception as e:
+                logging.warning(f"删除共享产物对象失败 {storage_key}: {e}")
+
+
+class ArtifactScope:
+    """
+    绑定仓库记录与当前检出提交的产物读写入口
+
+    仓库不参与共享（未启用、上传仓库、非 git 工作副本）时直接调用生成函数。
+    产物的读取与引用登记使用独立的数据库会话提交，不会提交或回滚调用方会话中未提交的修改
+    """
+
+    def __init__(self, repo_record, commit: Optional[str] = None):
+        self.repo_record = repo_record
+        # 以工作副本实际检出的提交为准：用户能读取该提交的源码，才允许复用其派生产物
+        self.commit = commit or GitRefReader.read_head_sha(repo_record.local_path or "")
+
+    async def get_or_create(self, kind: str, generator_version: str,
+                            producer: Callable[[], Awaitable[Optional[bytes]]],
+                            content_type: str = "application/octet-stream") -> Optional[bytes]:
+        """
+        读取共享产物，不存在时调用 producer 生成并写入
+
+        同一产物键在集群内同一时间只有一个生成者，其余等待后直接读取；
+        producer 返回空内容时不写入（生成失败的结果不共享）
+        """
+        key = ArtifactStore.build_key(self.repo_record, self.commit, kind, generator_version)
+        if key is None:
+            return await producer()
+
+        content = await self._load_and_attach(key)
+        if content is not None:
+            return content
+
+        lock = REDIS_CONN.get_lock(f"{ArtifactStore.LOCK_PREFIX}:{key.id}", timeout=settings.artifact_lock_timeout,
+                                   space=RedisSpaceEnum.BUSINESS)
+        acquired = await lock.spin_acquire(max_wait_time=settings.artifact_lock_timeout)
+        try:
+            if acquired:
+                # 等锁期间其它节点可能已生成
+                content = await self._load_and_attach(key)
+                if content is not None:
+                    return content
+            content = await producer()
+            if content:
+                try:
+                    async for session in get_db():
+                        await ArtifactStore.store(session, self.repo_record.id, key, content, content_type)
+                except Exception as e:
+                    logging.warning(f"写入共享产物失败 {kind} {self.commit}: {e}")
+            return content
+        finally:
+            await lock.release()
+
+    async def get_or_create_text(self, kind: str, generator_version: str,
+                                 producer: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+        async def produce() -> Optional[bytes]:
+            text = await producer()
+            return text.encode("utf-8") if text else None
+
+        content = await self.get_or_create(kind, generator_version, produce, "text/plain; charset=utf-8")
+        return content.decode("utf-8") if content is not None else None
+
+    async def _load_and_attach(self, key: ArtifactKey) -> Optional[bytes]:
+        try:
+            content = None
+            async for session in get_db():
+                content = await ArtifactStore.load(session, key)
+                if content is not None and not await ArtifactStore.attach(session, self.repo_record.id, key):
+                    content = None
+            if content is None:
+                return None
+        except Exception as e:
+            logging.warning(f"读取共享产物失败 {key.kind} {key.commit}: {e}")
+            return None
+        logging.info(f"仓库 {self.repo_record.id} 复用共享产物 {key.kind} ({key.commit[:8]}, {len(content)} 字节)")
+        return content
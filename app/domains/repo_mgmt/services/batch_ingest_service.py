@@ -0,0 +1,223 @@
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from app.config.settings import settings
+from app.infrastructure.redis import REDIS_CONN, RedisSpaceEnum
+from app.infrastructure.database.factory import get_db
+from app.domains.repo_mgmt.models.repository import RepoRecord, ProcessingStatus
+from app.domains.repo_mgmt.services.progress_reporter import ProgressReporter
+from app.domains.repo_mgmt.services.repo_ingest_service import RepoIngestService
+from app.infrastructure.celery.fair_scheduler import FairTaskScheduler
+from app.domains.repo_mgmt.tasks.index_task import index_repository_task
+
+
+class BatchProgress:
+    """
+    批量导入的聚合进度
+
+    各仓库状态在流水线进程内汇总，按 progress_flush_interval 合并写入 Redis 哈希并推送；
+    单个仓库的细粒度进度仍由 ProgressReporter 上报
+    """
+
+    KEY_PREFIX = "repo:batch"
+    STATES = ("pending", "cloning", "scanning", "indexing", "completed", "failed")
+
+    def __init__(self, batch_id: str, repo_ids: List[str]):
+        self.batch_id = batch_id
+        self.states: Dict[str, str] = {repo_id: "pending" for repo_id in repo_ids}
+        self.errors: Dict[str, str] = {}
+        self.started_at = datetime.utcnow().isoformat()
+        self._last_flush = 0.0
+
+    @staticmethod
+    def key(batch_id: str) -> str:
+        return f"{BatchProgress.KEY_PREFIX}:{batch_id}"
+
+    def counts(self) -> Dict[str, int]:
+        counts = {state: 0 for state in BatchProgress.STATES}
+        for state in self.states.values():
+            counts[state] += 1
+        return counts
+
+    async def set(self, repo_id: str, state: str, error: Optional[str] = None) -> None:
+        self.states[repo_id] = state
+        if error:
+            self.errors[repo_id] = error
+        await self.flush(force=state in ("completed", "failed") and self.done)
+
+    @property
+    def done(self) -> bool:
+        return all(state in ("completed", "failed") for state in self.states.values())
+
+    async def flush(self, force: bool = False) -> None:
+        """写入 Redis 并推送（Redis 操作失败只记录警告，不影响流水线）"""
+        if not force and time.monotonic() - self._last_flush < settings.progress_flush_interval:
+            return
+        self._last_flush = time.monotonic()
+        snapshot = {
+            "batch_id": self.batch_id,
+            "status": "completed" if self.done else "running",
+            "total": len(self.states),
+            "counts": self.counts(),
+            "repos": self.states,
+            "repo_errors": self.errors,
+            "started_at": self.started_at,
+            "updated_at": datetime.utcnow().isoformat(),
+        }
+        key = BatchProgress.key(self.batch_id)
+        await REDIS_CONN.hset_mapping(key, snapshot, exp=settings.repo_batch_state_ttl, space=RedisSpaceEnum.BUSINESS)
+        await REDIS_CONN.publish(key, snapshot, space=RedisSpaceEnum.BUSINESS)
+
+    @staticmethod
+    async def init(batch_id: str, user_id: str, repo_ids: List[str], errors: List[Dict[str, Any]]) -> None:
+        """创建批次时写入初始状态（含未能创建的条目）"""
+        snapshot = {
+            "batch_id": batch_id,
+            "user_id": user_id,
+            "status": "pending" if repo_ids else "completed",
+            "total": len(repo_ids),
+            "counts": {state: len(repo_ids) if state == "pending" else 0 for state in BatchProgress.STATES},
+            "repos": {repo_id: "pending" for repo_id in repo_ids},
+            "rejected": errors,
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        await REDIS_CONN.hset_mapping(BatchProgress.key(batch_id), snapshot, exp=settings.repo_batch_state_ttl,
+                                      space=RedisSpaceEnum.BUSINESS)
+
+    @staticmethod
+    async def get(batch_id: str) -> Optional[Dict[str, Any]]:
+        """读取批次进度；不存在或已过期时返回 None"""
+        snapshot = await REDIS_CONN.hgetall(BatchProgress.key(batch_id), space=RedisSpaceEnum.BUSINESS)
+        if not snapshot:
+            return None
+        # 哈希中的值按 JSON 解析，数字形式的字符串字段还原为字符串
+        result = dict(snapshot)
+        for field in ("batch_id", "user_id", "status"):
+            result[field] = "" if result.get(field) is None else str(result[field])
+        try:
+            result["total"] = int(result.get("total") or 0)
+        except (TypeError, ValueError):
+            result["total"] = 0
+        return result
+
+
+@dataclass
+class _BatchItem:
+    """流水线阶段之间传递的仓库"""
+    record: RepoRecord
+    version: Optional[str] = None
+
+
+class BatchIngestPipeline:
+    """
+    批量导入流水线
+
+    克隆、扫描目录、构建索引三个阶段各有独立的并发上限，通过队列衔接，
+    一个仓库克隆完成即进入扫描，与其余仓库的克隆重叠执行；克隆按远端主机限制并发与启动速率。
+    构建索引为 CPU 密集任务，不在本进程执行：上传快照、登记工作副本后提交到 analysis 队列的 index_repository_task，
+    索引阶段的并发上限即同时等待中的索引任务数。
+    已完成克隆的仓库（任务重试时）直接跳过，单个仓库失败不影响其它仓库
+    """
+
+    def __init__(self, batch_id: str, repo_ids: List[str]):
+        self.batch_id = batch_id
+        self.repo_ids = repo_ids
+        self.progress = BatchProgress(batch_id, repo_ids)
+        self._clone_queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._scan_queue: "asyncio.Queue[_BatchItem]" = asyncio.Queue()
+        self._index_queue: "asyncio.Queue[_BatchItem]" = asyncio.Queue()
+
+    async def run(self) -> Dict[str, int]:
+        """执行整个批次，返回各状态的仓库数"""
+        start = time.perf_counter()
+        for repo_id in self.repo_ids:
+            self._clone_queue.put_nowait(repo_id)
+        await self.progress.flush(force=True)
+
+        workers = (
+            [asyncio.create_task(self._worker(self._clone_queue, self._clone)) for _ in range(settings.repo_batch_clone_concurrency)]
+            + [asyncio.create_task(self._worker(self._scan_queue, self._scan)) for _ in range(settings.repo_batch_scan_concurrency)]
+            + [asyncio.create_task(self._worker(self._index_queue, self._index)) for _ in range(settings.repo_batch_index_concurrency)]
+        )
+        try:
+            # 上游阶段在 task_done 之前把仓库放入下游队列，按顺序等待即可保证全部处理完
+            await self._clone_queue.join()
+            await self._scan_queue.join()
+            await self._index_queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        await self.progress.flush(force=True)
+
+        counts = self.progress.counts()
+        logging.info(f"批量导入 {self.batch_id} 完成: {len(self.repo_ids)} 个仓库，"
+                     f"成功 {counts['completed']}，失败 {counts['failed']}，耗时 {time.perf_counter() - start:.0f}s")
+        return counts
+
+    async def _worker(self, queue: asyncio.Queue, handler) -> None:
+        while True:
+            item = await queue.get()
+            try:
+                await handler(item)
+            except Exception as e:
+                repo_id = item if isinstance(item, str) else item.record.id
+                logging.error(f"批量导入 {self.batch_id} 仓库 {repo_id} 失败: {e}")
+                await self.progress.set(repo_id, "failed", str(e))
+                try:
+                    async for session in get_db():
+                        await ProgressReporter(session, repo_id).fail("导入失败", str(e))
+                except Exception as report_error:
+                    logging.warning(f"仓库 {repo_id} 失败状态写入失败: {report_error}")
+            finally:
+                queue.task_done()
+
+    async def _clone(self, repo_id: str) -> None:
+        item = None
+        async for session in get_db():
+            record = await RepoIngestService.get_record(session, repo_id)
+            # 任务重试时已完成的仓库不再重复导入
+            if not (record.is_cloned and record.processing_status == ProcessingStatus.COMPLETED):
+                await self.progress.set(repo_id, "cloning")
+                reporter = ProgressReporter(session, repo_id)
+                # 按远端主机的并发与速率限制在 RepoIngestService.clone 中生效，与其它批次、单仓库克隆任务共享
+                version = await RepoIngestService.clone(session, record, reporter)
+                await reporter.update(95, "克隆完成，等待扫描目录")
+                item = _BatchItem(record, version)
+        if item is None:
+            await self.progress.set(repo_id, "completed")
+            return
+        await self._scan_queue.put(item)
+
+    async def _scan(self, item: _BatchItem) -> None:
+        await self.progress.set(item.record.id, "scanning")
+        total_items = await RepoIngestService.scan(item.record)
+        logging.debug(f"仓库 {item.record.id} 目录扫描完成: {total_items} 项")
+        await self._index_queue.put(item)
+
+    async def _index(self, item: _BatchItem) -> None:
+        record = item.record
+        await self.progress.set(record.id, "indexing")
+        await RepoIngestService.publish(record)
+        async for session in get_db():
+            await ProgressReporter(session, record.id).transition(
+                ProcessingStatus.CHUNKING, 95, "克隆完成，等待构建代码索引",
+                version=item.version,
+                is_cloned=True
+            )
+        await FairTaskScheduler.submit(index_repository_task, record.create_user_id,
+                                       args=[record.id, item.version], job_id=record.id)
+
+        # 等待索引任务结束（任务的成功或失败都会写入仓库进度）
+        async for snapshot in ProgressReporter.stream(record.id):
+            if snapshot is None:
+                continue
+            if snapshot["status"] == ProcessingStatus.COMPLETED.value:
+                await self.progress.set(record.id, "completed")
+                return
+            if snapshot["status"] == ProcessingStatus.FAILED.value:
+                await self.progress.set(record.id, "failed", snapshot["error"] or snapshot["message"])
+                return
@@ -0,0 +1,286 @@
+import os
+import json
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from functools import cached_property
+from typing import List, Optional, Tuple
+from app.config.settings import settings
+from app.infrastructure.redis import REDIS_CONN, RedisSpaceEnum
+from app.domains.repo_mgmt.services.file_tree_service import FileTreeService, FileTreeNode, PathInfo
+from app.domains.repo_mgmt.services.local_repo_service import LocalRepoService
+from app.domains.repo_mgmt.services.git_ref_reader import GitRefReader
+from app.domains.repo_mgmt.services.workspace_manager import WorkspaceManager
+from app.domains.repo_mgmt.services.git_object_reader import GitObjectReader
+
+
+class CatalogueSnapshot:
+    """
+    仓库目录快照
+
+    只保存 (相对路径, 是否目录, 大小) 列表；PathInfo、文件树以及各种格式的序列化结果
+    在首次访问时生成并缓存在快照对象上
+    """
+
+    def __init__(self, root: str, commit: Optional[str], entries: List[Tuple[str, bool, int]]):
+        self.root = root
+        self.commit = commit
+        self.entries = entries
+        self._budgeted = {}
+
+    @property
+    def total_items(self) -> int:
+        return len(self.entries)
+
+    @cached_property
+    def path_infos(self) -> List[PathInfo]:
+        return [
+            PathInfo(path=os.path.join(self.root, rel_path), name=rel_path.rsplit("/", 1)[-1], is_directory=is_dir, size=size)
+            for rel_path, is_dir, size in self.entries
+        ]
+
+    @cached_property
+    def tree(self) -> FileTreeNode:
+        return FileTreeService.build_tree(self.path_infos, self.root)
+
+    @cached_property
+    def catalogue(self) -> str:
+        """相对路径列表（与 LocalRepoService.get_catalogue 一致）"""
+        return "\n".join(rel_path for rel_path, _, _ in self.entries if not rel_path.startswith("."))
+
+    @cached_property
+    def compact_string(self) -> str:
+        return FileTreeService.to_compact_string(self.tree)
+
+    @cached_property
+    def compact_json(self) -> str:
+        return FileTreeService.to_compact_json(self.tree)
+
+    @cached_property
+    def path_list(self) -> str:
+        return FileTreeService.to_path_list(self.tree)
+
+    @cached_property
+    def unix_tree(self) -> str:
+        return FileTreeService.to_unix_tree(self.tree)
+
+    def render(self, format: str = "compact", max_tokens: int = 0) -> str:
+        """
+        按格式输出目录结构（与 LocalRepoService.get_catalogue_optimized 一致）
+
+        max_tokens 大于 0 时按 Token 预算折叠子树（json 格式不支持折叠）
+        """
+        if max_tokens > 0 and format in ("compact", "unix", "pathlist"):
+            key = (format, max_tokens)
+            if key not in self._budgeted:
+                self._budgeted[key] = FileTreeService.to_budgeted_string(self.tree, max_tokens, format)
+            return self._budgeted[key]
+
+        if format == "json":
+            return self.compact_json
+        elif format == "unix":
+            return self.unix_tree
+        elif format == "pathlist":
+            return self.path_list
+        elif format == "compact":
+            return self.compact_string
+        else:
+            return ""
+
+    def to_payload(self) -> str:
+        return json.dumps(
+            {"commit": self.commit, "entries": [[p, 1 if d else 0, s] for p, d, s in self.entries]},
+            ensure_ascii=False, separators=(",", ":"),
+        )
+
+    @staticmethod
+    def from_payload(root: str, payload: str) -> "CatalogueSnapshot":
+        data = json.loads(payload)
+        return CatalogueSnapshot(root, data.get("commit"), [(p, bool(d), s) for p, d, s in data["entries"]])
+
+    @staticmethod
+    def from_path_infos(root: str, commit: Optional[str], path_infos: List[PathInfo]) -> "CatalogueSnapshot":
+        entries = [
+            (os.path.relpath(info.path, root).replace("\\", "/"), info.is_directory, info.size)
+            for info in path_infos
+        ]
+        return CatalogueSnapshot(root, commit, entries)
+
+
+class CatalogueCache:
+    """
+    按提交缓存的仓库目录结构
+
+    缓存键：(仓库ID或路径, HEAD sha, 忽略规则哈希)。查询顺序：进程内 LRU -> Redis -> 扫描磁盘。
+    HEAD 不变时直接命中进程内缓存；非 git 目录使用写入的内容指纹作为版本，没有指纹时不做缓存
+    """
+
+    # 快照格式版本，扫描规则变化时递增使旧缓存失效
+    SNAPSHOT_VERSION = 2
+    KEY_PREFIX = "repo:catalogue"
+
+    _local: "OrderedDict[str, CatalogueSnapshot]" = OrderedDict()
+    _local_lock = threading.Lock()
+
+    @staticmethod
+    def _ignore_config_hash(path: str) -> str:
+        """忽略规则哈希：.gitignore 内容 + 扫描配置"""
+        digest = hashlib.sha1()
+        digest.update(f"{CatalogueCache.SNAPSHOT_VERSION}|{settings.repo_skip_generated_files}|{settings.repo_enumerate_from_git_index}".encode("utf-8"))
+        try:
+            with open(os.path.join(path, ".gitignore"), "rb") as f:
+                digest.update(f.read())
+        except OSError:
+            pass
+        return digest.hexdigest()[:16]
+
+    @staticmethod
+    def _fingerprint_path(path: str) -> str:
+        """内容指纹文件（放在目录旁边，不出现在目录结构中）"""
+        return f"{os.path.normpath(os.path.abspath(path))}.fingerprint"
+
+    @staticmethod
+    def write_fingerprint(path: str, fingerprint: str) -> None:
+        """
+        记录非 git 目录的内容指纹（如上传压缩包的哈希）
+
+        写入指纹的目录视为不可变，目录内容变化时需要重新写入或删除指纹
+        """
+        with open(CatalogueCache._fingerprint_path(path), "w", encoding="utf-8") as f:
+            f.write(fingerprint)
+
+    @staticmethod
+    def remove_fingerprint(path: str) -> None:
+        try:
+            os.remove(CatalogueCache._fingerprint_path(path))
+        except OSError:
+            pass
+
+    @staticmethod
+    def _read_fingerprint(path: str) -> Optional[str]:
+        try:
+            with open(CatalogueCache._fingerprint_path(path), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    @staticmethod
+    def get_version(path: str) -> Optional[str]:
+        """仓库版本：git 仓库为 HEAD sha，否则为写入的内容指纹；都没有时返回 None"""
+        return GitRefReader.read_head_sha(path) or CatalogueCache._read_fingerprint(path)
+
+    @staticmethod
+    def build_key(path: str, repo_id: Optional[str] = None) -> Optional[str]:
+        """构造缓存键；无法确定仓库版本（既不是 git 仓库也没有内容指纹）时返回 None"""
+        commit = CatalogueCache.get_version(path)
+        if not commit:
+            return None
+        repo_key = repo_id or hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+        return f"{CatalogueCache.KEY_PREFIX}:{repo_key}:{commit}:{CatalogueCache._ignore_config_hash(path)}"
+
+    @staticmethod
+    def _get_local(key: str) -> Optional[CatalogueSnapshot]:
+        with CatalogueCache._local_lock:
+            snapshot = CatalogueCache._local.get(key)
+            if snapshot is not None:
+                CatalogueCache._local.move_to_end(key)
+            return snapshot
+
+    @staticmethod
+    def _put_local(key: str, snapshot: CatalogueSnapshot) -> None:
+        with CatalogueCache._local_lock:
+            CatalogueCache._local[key] = snapshot
+            CatalogueCache._local.move_to_end(key)
+            while len(CatalogueCache._local) > settings.catalogue_cache_local_size:
+                CatalogueCache._local.popitem(last=False)
+
+    @staticmethod
+    def _scan(path: str) -> CatalogueSnapshot:
+        return CatalogueSnapshot.from_path_infos(path, GitRefReader.read_head_sha(path), LocalRepoService.get_folders_and_files(path))
+
+    @staticmethod
+    def get_snapshot_local(path: str, repo_id: Optional[str] = None) -> CatalogueSnapshot:
+        """获取目录快照（同步，仅使用进程内缓存）"""
+        WorkspaceManager.touch(path)
+        key = CatalogueCache.build_key(path, repo_id)
+        if key:
+            snapshot = CatalogueCache._get_local(key)
+            if snapshot is not None:
+                return snapshot
+
+        snapshot = CatalogueCache._scan(path)
+        if key:
+            CatalogueCache._put_local(key, snapshot)
+        return snapshot
+
+    @staticmethod
+    async def get_snapshot(path: str, repo_id: Optional[str] = None) -> CatalogueSnapshot:
+        """获取目录快照（进程内缓存 -> Redis -> 扫描磁盘）"""
+        WorkspaceManager.touch(path)
+        key = CatalogueCache.build_key(path, repo_id)
+        if key:
+            snapshot = CatalogueCache._get_local(key)
+            if snapshot is not None:
+                return snapshot
+
+            payload = await REDIS_CONN.get(key, space=RedisSpaceEnum.BUSINESS)
+            if payload:
+                try:
+                    snapshot = CatalogueSnapshot.from_payload(path, payload)
+                    CatalogueCache._put_local(key, snapshot)
+                    return snapshot
+                except Exception as e:
+                    logging.warning(f"目录缓存数据损坏，将重新扫描 {key}: {e}")
+
+        snapshot = await asyncio.to_thread(CatalogueCache._scan, path)
+        if key:
+            CatalogueCache._put_local(key, snapshot)
+            await REDIS_CONN.set(key, snapshot.to_payload(), exp=settings.catalogue_cache_ttl, space=RedisSpaceEnum.BUSINESS)
+        return snapshot
+
+    @staticmethod
+    async def get_snapshot_at(path: str, rev: str, repo_id: Optional[str] = None) -> Optional[CatalogueSnapshot]:
+        """
+        获取指定版本（分支、标签或提交）的目录快照，直接读取对象库中的目录树，不需要检出
+
+        按解析后的提交缓存（进程内 LRU -> Redis）；版本不存在时返回 None
+        """
+        WorkspaceManager.touch(path)
+        commit = await GitObjectReader.resolve(path, rev)
+        if commit is None:
+            return None
+        repo_key = repo_id or hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+        key = f"{CatalogueCache.KEY_PREFIX}:{repo_key}:tree:{commit}:{CatalogueCache._ignore_config_hash(path)}"
+        snapshot = CatalogueCache._get_local(key)
+        if snapshot is not None:
+            return snapshot
+
+        payload = await REDIS_CONN.get(key, space=RedisSpaceEnum.BUSINESS)
+        if payload:
+            try:
+                snapshot = CatalogueSnapshot.from_payload(path, payload)
+                CatalogueCache._put_local(key, snapshot)
+                return snapshot
+            except Exception as e:
+                logging.warning(f"目录缓存数据损坏，将重新读取 {key}: {e}")
+
+        entries = await GitObjectReader.ls_tree(path, commit)
+        if entries is None:
+            return None
+        info_list = LocalRepoService.path_infos_from_entries(path, entries)
+        info_list.sort(key=lambda info: os.path.relpath(info.path, path).replace("\\", "/").split("/"))
+        snapshot = CatalogueSnapshot.from_path_infos(path, commit, info_list)
+        CatalogueCache._put_local(key, snapshot)
+        await REDIS_CONN.set(key, snapshot.to_payload(), exp=settings.catalogue_cache_ttl, space=RedisSpaceEnum.BUSINESS)
+        return snapshot
+
+    @staticmethod
+    async def put_snapshot(path: str, snapshot: CatalogueSnapshot, repo_id: Optional[str] = None) -> None:
+        """写入已计算好的快照（如克隆/解压过程中顺带统计的结果）"""
+        key = CatalogueCache.build_key(path, repo_id)
+        if not key:
+            return
+        CatalogueCache._put_local(key, snapshot)
+        await REDIS_CONN.set(key, snapshot.to_payload(), exp=settings.catalogue_cache_ttl, space=RedisSpaceEnum.BUSINESS)
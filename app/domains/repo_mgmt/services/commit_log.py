@@ -0,0 +1,182 @@
+import json
+import base64
+import threading
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from app.config.settings import settings
+from app.domains.repo_mgmt.services.git_driver import AsyncGitDriver
+
+
+# 提交记录格式：字段以 \x1f 分隔，记录以 \x1e 结尾
+LOG_FORMAT = "%H%x1f%an%x1f%ae%x1f%cI%x1f%B%x1e"
+
+
+class CommitLog:
+    """
+    流式、可分页的提交记录读取
+
+    先用 `git rev-list` 流式列出提交 sha（支持起始提交、数量与路径过滤），
+    再按批通过 `git log --no-walk --stdin` 读取元数据；提交元数据不可变，按 sha 缓存在进程内 LRU 中，
+    重复翻页或查询不同文件的历史时只读取未缓存的提交
+    """
+
+    # 每批读取元数据的提交数
+    BATCH_SIZE = 256
+
+    _memo: "OrderedDict[str, dict]" = OrderedDict()
+    _memo_lock = threading.Lock()
+
+    @staticmethod
+    def parse_log(output: str) -> List[dict]:
+        """解析 LOG_FORMAT 格式的 git log 输出"""
+        commits = []
+        for record in output.split("\x1e"):
+            record = record.lstrip("\n")
+            if not record:
+                continue
+            fields = record.split("\x1f", 4)
+            if len(fields) < 5:
+                continue
+            commits.append({
+                'sha': fields[0],
+                'author': fields[1],
+                'email': fields[2],
+                'message': fields[4],
+                'committed_datetime': fields[3]
+            })
+        return commits
+
+    @staticmethod
+    async def iter_commits(
+        repo_path: str,
+        rev: str = "HEAD",
+        since_sha: Optional[str] = None,
+        max_count: int = 0,
+        paths: Optional[List[str]] = None,
+        skip: int = 0,
+    ) -> AsyncIterator[dict]:
+        """
+        按时间倒序流式产出提交记录
+
+        Args:
+            repo_path: 仓库路径
+            rev: 起始版本
+            since_sha: 只返回该提交之后的提交（不含该提交）
+            max_count: 最多返回的提交数，0 表示不限制
+            paths: 只返回修改了这些路径的提交
+            skip: 跳过的提交数（用于分页）
+        """
+        args = ["rev-list"]
+        if max_count > 0:
+            args.append(f"--max-count={max_count}")
+        if skip > 0:
+            args.append(f"--skip={skip}")
+        args.append(rev)
+        if since_sha:
+            args.append(f"^{since_sha}")
+        args.append("--")
+        if paths:
+            args += paths
+
+        batch: List[str] = []
+        async for line in AsyncGitDriver.iter_records(args, cwd=repo_path, timeout=settings.git_command_timeout):
+            sha = line.decode("ascii").strip()
+            if not sha:
+                continue
+            batch.append(sha)
+            if len(batch) >= CommitLog.BATCH_SIZE:
+                for commit in await CommitLog.resolve(repo_path, batch):
+                    yield commit
+                batch = []
+        if batch:
+            for commit in await CommitLog.resolve(repo_path, batch):
+                yield commit
+
+    @staticmethod
+    async def list_commits(repo_path: str, **kwargs) -> List[dict]:
+        """获取提交记录列表（参数同 iter_commits）"""
+        return [commit async for commit in CommitLog.iter_commits(repo_path, **kwargs)]
+
+    @staticmethod
+    async def get_page(
+        repo_path: str,
+        cursor: Optional[str] = None,
+        page_size: int = 50,
+        since_sha: Optional[str] = None,
+        paths: Optional[List[str]] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        分页获取提交记录
+
+        游标记录首页的 HEAD 与偏移量，翻页期间有新提交也不会出现重复或遗漏
+
+        Returns:
+            (本页提交, 下一页游标)；没有更多数据时游标为 None
+        """
+        if cursor:
+            head, offset = CommitLog.decode_cursor(cursor)
+        else:
+            head = await AsyncGitDriver.output(["rev-parse", "HEAD"], cwd=repo_path, timeout=settings.git_command_timeout)
+            offset = 0
+
+        # 多取一条判断是否还有下一页
+        commits = await CommitLog.list_commits(
+            repo_path, rev=head, since_sha=since_sha, max_count=page_size + 1, paths=paths, skip=offset,
+        )
+        next_cursor = None
+        if len(commits) > page_size:
+            commits = commits[:page_size]
+            next_cursor = CommitLog.encode_cursor(head, offset + page_size)
+        return commits, next_cursor
+
+    @staticmethod
+    def encode_cursor(head: str, offset: int) -> str:
+        payload = json.dumps({"head": head, "offset": offset}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[str, int]:
+        """
+        Raises:
+            ValueError: 游标格式错误
+        """
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            head, offset = str(data["head"]), int(data["offset"])
+        except Exception:
+            raise ValueError("无效的分页游标")
+        if offset < 0 or not all(c in "0123456789abcdef" for c in head):
+            raise ValueError("无效的分页游标")
+        return head, offset
+
+    @staticmethod
+    async def resolve(repo_path: str, shas: List[str]) -> List[dict]:
+        """按 sha 获取提交元数据，保持输入顺序"""
+        found: Dict[str, dict] = {}
+        missing: List[str] = []
+        with CommitLog._memo_lock:
+            for sha in shas:
+                commit = CommitLog._memo.get(sha)
+                if commit is not None:
+                    CommitLog._memo.move_to_end(sha)
+                    found[sha] = commit
+                else:
+                    missing.append(sha)
+
+        if missing:
+            result = await AsyncGitDriver.run(
+                ["log", "--no-walk=unsorted", "--stdin", f"--format={LOG_FORMAT}"],
+                cwd=repo_path,
+                stdin=("\n".join(missing) + "\n").encode("ascii"),
+                timeout=settings.git_command_timeout,
+            )
+            with CommitLog._memo_lock:
+                for commit in CommitLog.parse_log(result.stdout):
+                    found[commit['sha']] = commit
+                    CommitLog._memo[commit['sha']] = commit
+                while len(CommitLog._memo) > settings.git_commit_memo_size:
+                    CommitLog._memo.popitem(last=False)
+
+        # 返回副本，避免调用方修改缓存内容
+        return [dict(found[sha]) for sha in shas if sha in found]
@@ -0,0 +1,233 @@
+import os
+import re
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+from loguru import logger
+from app.domains.repo_mgmt.services.file_tree_service import PathInfo
+from app.domains.repo_mgmt.services.file_classifier import FileClassifier
+
+
+class IgnoreMatcher:
+    """
+    .gitignore 规则匹配器
+
+    与原逐条匹配逻辑一致（按名称匹配、* 通配、大小写不敏感、以 / 结尾仅匹配目录），
+    但规则只在构造时编译一次
+    """
+
+    def __init__(self, patterns: List[str]):
+        self._file_literals = set()
+        self._dir_literals = set()
+        file_regexes = []
+        dir_regexes = []
+
+        for pattern in patterns:
+            if not pattern or pattern.startswith('#'):
+                continue
+            trimmed = pattern.strip()
+            dir_only = trimmed.endswith('/')
+            if dir_only:
+                trimmed = trimmed.rstrip('/')
+            if not trimmed:
+                continue
+
+            if '*' in trimmed:
+                regex = re.escape(trimmed).replace("\\*", ".*")
+                dir_regexes.append(regex)
+                if not dir_only:
+                    file_regexes.append(regex)
+            else:
+                self._dir_literals.add(trimmed.lower())
+                if not dir_only:
+                    self._file_literals.add(trimmed.lower())
+
+        self._file_regex = self._combine(file_regexes)
+        self._dir_regex = self._combine(dir_regexes)
+
+    @staticmethod
+    def _combine(regexes: List[str]) -> Optional["re.Pattern"]:
+        if not regexes:
+            return None
+        return re.compile("^(?:" + "|".join(regexes) + ")$", re.IGNORECASE)
+
+    def is_ignored(self, name: str, is_directory: bool) -> bool:
+        """检查名称是否被忽略"""
+        literals, regex = (self._dir_literals, self._dir_regex) if is_directory else (self._file_literals, self._file_regex)
+        if name.lower() in literals:
+            return True
+        return bool(regex and regex.match(name))
+
+
+class DirectoryScanner:
+    """
+    基于 os.scandir 的并行目录扫描器
+
+    - 复用 DirEntry 缓存的类型信息，文件只额外 stat 一次获取大小
+    - 被忽略的目录在入队前剪枝，不会被打开
+    - 子目录分发到线程池并行扫描，按目录批量产出结果
+    - 提供同步迭代与异步迭代两种流式接口，调用方无需等待遍历结束
+
+    同一目录内的条目按名称排序；父目录的批次总是先于其子目录产出
+    """
+
+    def __init__(
+        self,
+        root: str,
+        ignore_patterns: Optional[List[str]] = None,
+        max_file_size: int = 1024 * 1024,
+        skip_generated: bool = True,
+        max_workers: int = 8,
+    ):
+        """
+        Args:
+            root: 扫描根目录
+            ignore_patterns: .gitignore 规则列表
+            max_file_size: 文件大小上限（字节），达到上限的文件被忽略
+            skip_generated: 是否跳过第三方、生成、压缩文件
+            max_workers: 并行扫描线程数
+        """
+        self.root = root
+        self.matcher = IgnoreMatcher(ignore_patterns or [])
+        self.max_file_size = max_file_size
+        self.skip_generated = skip_generated
+        self.max_workers = max(1, max_workers)
+
+    def _scan_one(self, path: str) -> Tuple[List[PathInfo], List[str]]:
+        """扫描单个目录，返回 (本层条目, 需要继续扫描的子目录)"""
+        items: List[PathInfo] = []
+        subdirs: List[str] = []
+
+        try:
+            with os.scandir(path) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except PermissionError:
+            logger.warning(f"没有权限访问目录: {path}")
+            return items, subdirs
+        except OSError as e:
+            logger.error(f"扫描目录失败 {path}: {e}")
+            return items, subdirs
+
+        for entry in entries:
+            name = entry.name
+            try:
+                # 符号链接目录不跟随，避免循环
+                if entry.is_dir(follow_symlinks=False):
+                    if not self.accept_directory(name):
+                        continue
+                    items.append(PathInfo(path=entry.path, name=name, is_directory=True, size=0))
+                    subdirs.append(entry.path)
+                elif entry.is_file():
+                    if not self.accept_file_name(name):
+                        continue
+                    size = entry.stat().st_size
+                    if size >= self.max_file_size:
+                        continue
+                    items.append(PathInfo(path=entry.path, name=name, is_directory=False, size=size))
+            except OSError:
+                continue
+
+        return items, subdirs
+
+    def accept_directory(self, name: str) -> bool:
+        """目录是否参与扫描"""
+        if name.startswith("."):
+            return False
+        if self.skip_generated and FileClassifier.is_vendored_dir(name):
+            return False
+        return not self.matcher.is_ignored(name, True)
+
+    def accept_file_name(self, name: str) -> bool:
+        """文件名是否参与扫描（不含大小检查）"""
+        if self.matcher.is_ignored(name, False):
+            return False
+        return not (self.skip_generated and FileClassifier.classify_path(name))
+
+    def filter_entries(self, infos: List[PathInfo]) -> List[PathInfo]:
+        """
+        按扫描规则过滤已知的条目列表（如解压时记录的文件信息），结果与扫描磁盘一致
+
+        条目需位于扫描根目录下；目录被排除时其下所有条目一并排除
+        """
+        rejected_dirs = set()
+        accepted: List[PathInfo] = []
+        # 父目录路径更短，按路径排序可保证父目录先于子项处理
+        for info in sorted(infos, key=lambda i: os.path.relpath(i.path, self.root).replace("\\", "/").split("/")):
+            rel_path = os.path.relpath(info.path, self.root).replace("\\", "/")
+            parent = rel_path.rsplit("/", 1)[0] if "/" in rel_path else ""
+            if parent and parent in rejected_dirs:
+                if info.is_directory:
+                    rejected_dirs.add(rel_path)
+                continue
+            if info.is_directory:
+                if self.accept_directory(info.name):
+                    accepted.append(info)
+                else:
+                    rejected_dirs.add(rel_path)
+            elif self.accept_file_name(info.name) and info.size < self.max_file_size:
+                accepted.append(info)
+        return accepted
+
+    def iter_batches(self, stop_event: Optional[threading.Event] = None) -> Iterator[List[PathInfo]]:
+        """按目录批量产出扫描结果（同步）"""
+        if not os.path.isdir(self.root):
+            return
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="dir-scan")
+        try:
+            pending = {pool.submit(self._scan_one, self.root)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    items, subdirs = future.result()
+                    if stop_event is not None and stop_event.is_set():
+                        return
+                    for subdir in subdirs:
+                        pending.add(pool.submit(self._scan_one, subdir))
+                    if items:
+                        yield items
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def scan(self) -> Iterator[PathInfo]:
+        """流式产出扫描结果（同步）"""
+        for batch in self.iter_batches():
+            yield from batch
+
+    async def aiter_batches(self) -> AsyncIterator[List[PathInfo]]:
+        """按目录批量产出扫描结果（异步），扫描在后台线程进行"""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop_event = threading.Event()
+        done_marker = object()
+
+        def produce():
+            error = None
+            try:
+                for batch in self.iter_batches(stop_event):
+                    loop.call_soon_threadsafe(queue.put_nowait, batch)
+            except BaseException as e:
+                error = e
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, (done_marker, error))
+
+        producer = loop.run_in_executor(None, produce)
+        try:
+            while True:
+                batch = await queue.get()
+                if isinstance(batch, tuple) and batch and batch[0] is done_marker:
+                    if batch[1] is not None:
+                        raise batch[1]
+                    break
+                yield batch
+        finally:
+            # 调用方提前退出时通知后台线程停止
+            stop_event.set()
+            await asyncio.wait([producer])
+
+    async def aiter_entries(self) -> AsyncIterator[PathInfo]:
+        """流式产出扫描结果（异步）"""
+        async for batch in self.aiter_batches():
+            for info in batch:
+                yield info
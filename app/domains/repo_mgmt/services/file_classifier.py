@@ -0,0 +1,283 @@
+import os
+import re
+import math
+import enum
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+
+class FileCategory(str, enum.Enum):
+    """文件类别枚举"""
+    SOURCE = "source"          # 普通源码/文档，正常处理
+    VENDORED = "vendored"      # 第三方依赖代码
+    GENERATED = "generated"    # 工具生成代码（protobuf、代码生成器等）
+    MINIFIED = "minified"      # 压缩/打包产物
+    LOCKFILE = "lockfile"      # 依赖锁文件
+    BINARY = "binary"          # 二进制文件
+
+
+@dataclass(frozen=True)
+class FileClassification:
+    """文件分类结果"""
+    category: FileCategory
+    reason: str = ""
+
+    @property
+    def is_skippable(self) -> bool:
+        """是否应被跳过（排除或仅输出摘要）"""
+        return self.category != FileCategory.SOURCE
+
+
+_SOURCE = FileClassification(FileCategory.SOURCE)
+
+
+class FileClassifier:
+    """
+    第三方、生成、压缩文件识别器
+
+    参考 GitHub linguist 的 vendor.yml / generated.rb 规则，依次使用：
+    1. 路径规则（目录名、锁文件、生成文件命名约定）—— 无需读取文件
+    2. 文件头部的生成标记（"Code generated ... DO NOT EDIT" 等）
+    3. 行长度与字节熵统计（识别压缩产物、内嵌数据）
+    内容分类结果按 git blob 哈希缓存，同一内容只分析一次
+    """
+
+    # 第三方依赖目录（任意层级匹配）
+    VENDORED_DIR_NAMES = frozenset({
+        "node_modules", "bower_components", "jspm_packages", "vendor", "vendors",
+        "third_party", "thirdparty", "third-party", "3rdparty", "external_libs",
+        "Pods", "Carthage", "site-packages", "dist-packages", "__pypackages__",
+        "dist", ".yarn", ".pnpm-store",
+    })
+
+    # 依赖锁文件
+    LOCKFILE_NAMES = frozenset({
+        "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml",
+        "bun.lockb", "composer.lock", "Gemfile.lock", "Pipfile.lock", "poetry.lock",
+        "pdm.lock", "uv.lock", "Cargo.lock", "go.sum", "Podfile.lock", "packages.lock.json",
+        "flake.lock", "mix.lock", "pubspec.lock", "gradle.lockfile",
+    })
+
+    # 生成文件命名约定
+    GENERATED_NAME_PATTERN = re.compile(
+        r"(\.pb\.(go|cc|h|c|swift|dart)$"
+        r"|_pb2(_grpc)?\.pyi?$"
+        r"|\.pb\.gw\.go$"
+        r"|_grpc\.pb\.go$"
+        r"|\.g\.dart$|\.freezed\.dart$"
+        r"|\.(designer|generated|g|g\.i)\.cs$"
+        r"|_generated\.(go|rs|ts|js|py)$"
+        r"|\.generated\.(ts|js)$"
+        r"|\.d\.ts\.map$|\.(js|css)\.map$"
+        r"|(^|/)zz_generated[^/]*\.go$"
+        r"|\.pbobjc\.[hm]$"
+        r")",
+        re.IGNORECASE,
+    )
+
+    # 压缩产物命名约定
+    MINIFIED_NAME_PATTERN = re.compile(r"[.-]min\.(js|mjs|css)$|\.bundle\.js$|\.chunk\.js$", re.IGNORECASE)
+
+    # 生成文件头部标记（只检查文件前若干行）
+    GENERATED_HEADER_PATTERN = re.compile(
+        r"(code generated .{0,80}do not edit"
+        r"|@generated"
+        r"|generated by the protocol buffer compiler"
+        r"|<auto-generated"
+        r"|this file (is|was) (automatically|auto-?) ?generated"
+        r"|auto-?generated (file|code|by)"
+        r"|generated by (thrift|swig|flatc|cython|antlr|bison|jison|the \S+ tool)"
+        r"|do not (edit|modify) (this file|manually|by hand))",
+        re.IGNORECASE,
+    )
+
+    # 头部检查范围
+    HEADER_LINES = 20
+    # 统计分析最多读取的字节数
+    SAMPLE_SIZE = 64 * 1024
+    # 压缩判定：平均行长度阈值（linguist 使用 110）
+    MINIFIED_AVG_LINE_LENGTH = 110
+    # 超长单行阈值
+    LONG_LINE_LENGTH = 5000
+    # 高熵数据判定阈值（bit/byte）
+    HIGH_ENTROPY = 5.8
+    # 受压缩判定影响的扩展名
+    MINIFIABLE_EXTENSIONS = frozenset({".js", ".mjs", ".cjs", ".css", ".json", ".svg", ".html", ".htm"})
+
+    # 按内容哈希缓存分类结果
+    _cache: "OrderedDict[str, FileClassification]" = OrderedDict()
+    _cache_size = 50000
+    _cache_lock = threading.Lock()
+
+    # =============================================================================
+    # 路径规则
+    # =============================================================================
+
+    @staticmethod
+    def is_vendored_dir(name: str) -> bool:
+        """目录名是否为第三方依赖目录（用于扫描时提前剪枝）"""
+        return name in FileClassifier.VENDORED_DIR_NAMES
+
+    @staticmethod
+    def classify_path(rel_path: str) -> Optional[FileClassification]:
+        """
+        仅根据路径分类，不读取文件
+
+        Args:
+            rel_path: 相对仓库根目录的路径
+
+        Returns:
+            命中规则时返回分类结果，否则返回 None（需结合内容判断）
+        """
+        normalized = rel_path.replace("\\", "/")
+        parts = normalized.split("/")
+        name = parts[-1]
+
+        for part in parts[:-1]:
+            if part in FileClassifier.VENDORED_DIR_NAMES:
+                return FileClassification(FileCategory.VENDORED, f"vendored directory: {part}")
+
+        if name in FileClassifier.LOCKFILE_NAMES:
+            return FileClassification(FileCategory.LOCKFILE, f"lockfile: {name}")
+
+        if FileClassifier.MINIFIED_NAME_PATTERN.search(name):
+            return FileClassification(FileCategory.MINIFIED, "minified file name")
+
+        if FileClassifier.GENERATED_NAME_PATTERN.search(normalized):
+            return FileClassification(FileCategory.GENERATED, "generated file name")
+
+        return None
+
+    # =============================================================================
+    # 内容规则
+    # =============================================================================
+
+    @staticmethod
+    def blob_sha(content: bytes) -> str:
+        """计算与 git 一致的 blob 哈希，作为缓存键"""
+        header = f"blob {len(content)}\0".encode("ascii")
+        return hashlib.sha1(header + content).hexdigest()
+
+    @staticmethod
+    def classify(full_path: str, rel_path: Optional[str] = None,
+                 content: Optional[bytes] = None, blob_sha: Optional[str] = None) -> FileClassification:
+        """
+        综合路径与内容对文件分类
+
+        Args:
+            full_path: 文件绝对路径
+            rel_path: 相对仓库根目录的路径（用于路径规则，缺省使用文件名）
+            content: 已读取的文件内容（可选，避免重复读取）
+            blob_sha: 已知的 git blob 哈希（可选，来自 git 索引时无需读取文件即可命中缓存）
+        """
+        by_path = FileClassifier.classify_path(rel_path or os.path.basename(full_path))
+        if by_path:
+            return by_path
+
+        if blob_sha:
+            cached = FileClassifier._get_cached(blob_sha)
+            if cached:
+                return cached
+
+        if content is None:
+            try:
+                with open(full_path, "rb") as f:
+                    content = f.read()
+            except OSError:
+                return _SOURCE
+
+        key = blob_sha or FileClassifier.blob_sha(content)
+        cached = FileClassifier._get_cached(key)
+        if cached:
+            return cached
+
+        result = FileClassifier.classify_content(content, os.path.splitext(full_path)[1].lower())
+        FileClassifier._put_cached(key, result)
+        return result
+
+    @staticmethod
+    def classify_text(text: str, file_path: str) -> FileClassification:
+        """对已解码的文本内容分类（供压缩服务等只持有字符串的调用方使用）"""
+        by_path = FileClassifier.classify_path(file_path)
+        if by_path:
+            return by_path
+        return FileClassifier.classify(file_path, file_path, content=text.encode("utf-8", errors="ignore"))
+
+    @staticmethod
+    def classify_content(content: bytes, extension: str = "") -> FileClassification:
+        """根据内容特征分类（不使用缓存）"""
+        sample = content[:FileClassifier.SAMPLE_SIZE]
+        if b"\0" in sample[:8000]:
+            return FileClassification(FileCategory.BINARY, "binary content")
+
+        text = sample.decode("utf-8", errors="ignore")
+        lines = text.split("\n")
+
+        header = "\n".join(lines[:FileClassifier.HEADER_LINES])
+        match = FileClassifier.GENERATED_HEADER_PATTERN.search(header)
+        if match:
+            return FileClassification(FileCategory.GENERATED, f"generated header: {match.group(0).strip()[:60]}")
+
+        avg_length, max_length = FileClassifier._line_stats(lines)
+        if extension in FileClassifier.MINIFIABLE_EXTENSIONS and avg_length > FileClassifier.MINIFIED_AVG_LINE_LENGTH:
+            return FileClassification(FileCategory.MINIFIED, f"average line length {avg_length:.0f}")
+
+        if max_length > FileClassifier.LONG_LINE_LENGTH:
+            entropy = FileClassifier._entropy(sample)
+            if entropy > FileClassifier.HIGH_ENTROPY or avg_length > FileClassifier.MINIFIED_AVG_LINE_LENGTH * 4:
+                return FileClassification(FileCategory.MINIFIED, f"long lines ({max_length}) entropy {entropy:.2f}")
+
+        return _SOURCE
+
+    @staticmethod
+    def _line_stats(lines) -> Tuple[float, int]:
+        """计算非空行的平均长度与最大长度"""
+        total = 0
+        count = 0
+        max_length = 0
+        for line in lines:
+            length = len(line)
+            if length == 0:
+                continue
+            total += length
+            count += 1
+            if length > max_length:
+                max_length = length
+        return (total / count if count else 0.0), max_length
+
+    @staticmethod
+    def _entropy(data: bytes) -> float:
+        """香农熵（bit/byte）"""
+        if not data:
+            return 0.0
+        total = len(data)
+        return -sum((n / total) * math.log2(n / total) for n in Counter(data).values())
+
+    # =============================================================================
+    # 缓存
+    # =============================================================================
+
+    @staticmethod
+    def _get_cached(key: str) -> Optional[FileClassification]:
+        with FileClassifier._cache_lock:
+            result = FileClassifier._cache.get(key)
+            if result is not None:
+                FileClassifier._cache.move_to_end(key)
+            return result
+
+    @staticmethod
+    def _put_cached(key: str, result: FileClassification) -> None:
+        with FileClassifier._cache_lock:
+            FileClassifier._cache[key] = result
+            while len(FileClassifier._cache) > FileClassifier._cache_size:
+                FileClassifier._cache.popitem(last=False)
+
+    @staticmethod
+    def summarize(classification: FileClassification, file_path: str, content: str) -> str:
+        """为被跳过的文件生成摘要，替代完整内容输出"""
+        line_count = content.count("\n") + 1 if content else 0
+        return (f"[{classification.category.value} file omitted: {file_path}, "
+                f"{line_count} lines, {len(content)} chars; {classification.reason}]")
@@ -0,0 +1,391 @@
+import os
+import json
+import math
+import asyncio
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from app.config.settings import settings
+from app.domains.repo_mgmt.services.git_driver import AsyncGitDriver
+from app.domains.repo_mgmt.services.git_ref_reader import GitRefReader
+
+
+# git 路径引用中的转义字符
+_ESCAPES = {"a": "\a", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t", "v": "\v"}
+
+
+@dataclass
+class FileChurn:
+    """单个文件的变更统计"""
+    path: str
+    commits: int
+    added: int
+    deleted: int
+    last_modified: int
+    last_sha: str
+
+    @property
+    def churn(self) -> int:
+        return self.added + self.deleted
+
+    def to_dict(self) -> dict:
+        return {
+            "path": self.path,
+            "commits": self.commits,
+            "added": self.added,
+            "deleted": self.deleted,
+            "churn": self.churn,
+            "last_modified": self.last_modified,
+            "last_sha": self.last_sha,
+        }
+
+
+class FileHistoryIndex:
+    """
+    仓库的文件历史索引：路径 -> 修改过该文件的提交
+
+    commits 按提交时间正序保存 (sha, 提交时间戳)；files 保存每个路径的
+    [提交序号列表, 新增行数, 删除行数, 是否已删除]。合并提交不计入（与 git log -- path 默认行为一致），
+    不跟踪重命名
+    """
+
+    # 索引格式版本，格式变化时递增使旧索引失效
+    VERSION = 1
+
+    def __init__(self, last_indexed_sha: Optional[str] = None,
+                 commits: Optional[List[Tuple[str, int]]] = None,
+                 files: Optional[Dict[str, list]] = None):
+        self.last_indexed_sha = last_indexed_sha
+        self.commits = commits or []
+        self.files = files or {}
+
+    def get_file_commits(self, file_path: str, max_count: int = 0) -> List[str]:
+        """文件的提交 sha，按时间倒序（max_count 为 0 时返回全部）"""
+        entry = self.files.get(file_path)
+        if not entry:
+            return []
+        indexes = entry[0][::-1]
+        if max_count > 0:
+            indexes = indexes[:max_count]
+        return [self.commits[i][0] for i in indexes]
+
+    def get_churn(self, file_path: str) -> Optional[FileChurn]:
+        entry = self.files.get(file_path)
+        if not entry:
+            return None
+        return self._to_churn(file_path, entry)
+
+    def hot_files(self, limit: int = 20, since: int = 0) -> List[FileChurn]:
+        """
+        变更最频繁的文件（不含已删除文件），按提交数、变更行数降序
+
+        Args:
+            limit: 返回数量
+            since: 只统计该时间戳之后的提交，0 表示全部历史
+        """
+        result = []
+        for path, entry in self.files.items():
+            if entry[3]:
+                continue
+            if since:
+                recent = sum(1 for i in entry[0] if self.commits[i][1] >= since)
+                if not recent:
+                    continue
+                churn = self._to_churn(path, entry)
+                churn.commits = recent
+            else:
+                churn = self._to_churn(path, entry)
+            result.append(churn)
+        result.sort(key=lambda c: (-c.commits, -c.churn, c.path))
+        return result[:limit]
+
+    def churn_weights(self, max_weight: float = 1.5) -> Dict[str, float]:
+        """
+        按提交数计算的文件权重（对数缩放到 1 ~ max_weight），用作目录精简的排序信号
+        """
+        counts = {path: len(entry[0]) for path, entry in self.files.items() if not entry[3]}
+        if not counts:
+            return {}
+        scale = math.log1p(max(counts.values()))
+        if scale <= 0:
+            return {}
+        return {
+            path: 1.0 + (max_weight - 1.0) * math.log1p(count) / scale
+            for path, count in counts.items()
+        }
+
+    def _to_churn(self, path: str, entry: list) -> FileChurn:
+        last_sha, last_time = self.commits[entry[0][-1]]
+        return FileChurn(path=path, commits=len(entry[0]), added=entry[1], deleted=entry[2],
+                         last_modified=last_time, last_sha=last_sha)
+
+    def copy(self) -> "FileHistoryIndex":
+        return FileHistoryIndex(
+            last_indexed_sha=self.last_indexed_sha,
+            commits=list(self.commits),
+            files={path: [list(entry[0]), entry[1], entry[2], entry[3]] for path, entry in self.files.items()},
+        )
+
+    def apply_log(self, records) -> int:
+        """
+        按时间正序合并 git log 记录
+
+        Args:
+            records: [(sha, 时间戳, [(路径, 新增行数, 删除行数)], {路径: 是否删除})]
+
+        Returns:
+            合并的提交数
+        """
+        count = 0
+        for sha, timestamp, numstat, summary in records:
+            index = len(self.commits)
+            self.commits.append((sha, timestamp))
+            for path, added, deleted in numstat:
+                entry = self.files.get(path)
+                if entry is None:
+                    entry = self.files[path] = [[], 0, 0, False]
+                entry[0].append(index)
+                entry[1] += added
+                entry[2] += deleted
+            for path, removed in summary.items():
+                if path in self.files:
+                    self.files[path][3] = removed
+            self.last_indexed_sha = sha
+            count += 1
+        return count
+
+    def to_payload(self) -> str:
+        return json.dumps(
+            {
+                "version": FileHistoryIndex.VERSION,
+                "last_indexed_sha": self.last_indexed_sha,
+                "commits": self.commits,
+                "files": {path: [entry[0], entry[1], entry[2], 1 if entry[3] else 0] for path, entry in self.files.items()},
+            },
+            ensure_ascii=False, separators=(",", ":"),
+        )
+
+    @staticmethod
+    def from_payload(payload: str) -> Optional["FileHistoryIndex"]:
+        """解析索引；格式版本不匹配时返回 None"""
+        data = json.loads(payload)
+        if data.get("version") != FileHistoryIndex.VERSION:
+            return None
+        return FileHistoryIndex(
+            last_indexed_sha=data.get("last_indexed_sha"),
+            commits=[(sha, ts) for sha, ts in data["commits"]],
+            files={path: [indexes, added, deleted, bool(removed)] for path, (indexes, added, deleted, removed) in data["files"].items()},
+        )
+
+
+class FileHistoryIndexer:
+    """
+    文件历史索引的构建与读取
+
+    一次 `git log --numstat --summary` 遍历生成全部文件的历史，保存在仓库 git 目录中；
+    HEAD 变化后从上次索引的提交增量追加（历史被改写时重建）。文件历史与热点文件查询变为查表
+    """
+
+    INDEX_FILE = "koala-file-history.json"
+
+    _local: "OrderedDict[str, FileHistoryIndex]" = OrderedDict()
+    _local_lock = threading.Lock()
+    _build_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Lock]]" = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    async def get_index(repo_path: str) -> Optional[FileHistoryIndex]:
+        """
+        获取与当前 HEAD 一致的索引（必要时构建或增量更新）
+
+        Returns:
+            索引；非 git 仓库返回 None
+        """
+        head_sha = GitRefReader.read_head_sha(repo_path)
+        if not head_sha:
+            return None
+        key = os.path.realpath(repo_path)
+
+        index = FileHistoryIndexer._get_local(key)
+        if index is not None and index.last_indexed_sha == head_sha:
+            return index
+
+        # asyncio.Lock 只能在创建它的事件循环中使用（Celery 任务每次 asyncio.run 都会新建事件循环）
+        loop_locks = FileHistoryIndexer._build_locks.setdefault(asyncio.get_running_loop(), {})
+        lock = loop_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            index = FileHistoryIndexer._get_local(key)
+            if index is None:
+                index = await asyncio.to_thread(FileHistoryIndexer._load, repo_path)
+            if index is None or index.last_indexed_sha != head_sha:
+                index = await FileHistoryIndexer._update(repo_path, index, head_sha)
+            FileHistoryIndexer._put_local(key, index)
+            return index
+
+    @staticmethod
+    async def get_file_commits(repo_path: str, file_path: str, max_count: int = 0) -> Optional[List[str]]:
+        """文件的提交 sha（时间倒序）；无法建立索引时返回 None"""
+        index = await FileHistoryIndexer.get_index(repo_path)
+        if index is None:
+            return None
+        return index.get_file_commits(file_path.replace("\\", "/").lstrip("/"), max_count)
+
+    @staticmethod
+    async def get_hot_files(repo_path: str, limit: int = 20, since: int = 0) -> List[FileChurn]:
+        index = await FileHistoryIndexer.get_index(repo_path)
+        return index.hot_files(limit, since) if index else []
+
+    @staticmethod
+    async def get_churn_weights(repo_path: str) -> Dict[str, float]:
+        """文件变更热度权重；非 git 仓库或索引失败时返回空字典"""
+        try:
+            index = await FileHistoryIndexer.get_index(repo_path)
+        except Exception as e:
+            logging.warning(f"构建文件历史索引失败 {repo_path}: {AsyncGitDriver.redact(str(e))}")
+            return {}
+        return index.churn_weights() if index else {}
+
+    @staticmethod
+    def invalidate(repo_path: str) -> None:
+        """删除索引（仓库删除或重新克隆时调用）"""
+        with FileHistoryIndexer._local_lock:
+            FileHistoryIndexer._local.pop(os.path.realpath(repo_path), None)
+        index_path = FileHistoryIndexer._index_path(repo_path)
+        if index_path:
+            try:
+                os.remove(index_path)
+            except OSError:
+                pass
+
+    @staticmethod
+    async def _update(repo_path: str, index: Optional[FileHistoryIndex], head_sha: str) -> FileHistoryIndex:
+        rev_range = head_sha
+        if index is not None and index.last_indexed_sha:
+            # 上次索引的提交仍是 HEAD 的祖先时只读取新增提交，否则（强制推送等）重建
+            if await AsyncGitDriver.succeeds(["merge-base", "--is-ancestor", index.last_indexed_sha, head_sha],
+                                             cwd=repo_path, timeout=settings.git_command_timeout):
+                rev_range = f"{index.last_indexed_sha}..{head_sha}"
+            else:
+                logging.info(f"仓库历史已改写，重建文件历史索引: {repo_path}")
+                index = None
+        if index is None:
+            index = FileHistoryIndex()
+
+        records = await FileHistoryIndexer._read_log(repo_path, rev_range)
+        # 在副本上合并，不影响正在被其它协程读取的缓存索引
+        index = await asyncio.to_thread(index.copy)
+        count = await asyncio.to_thread(index.apply_log, records)
+        # 没有新的非合并提交时（如只合并了分支），也记录当前 HEAD
+        index.last_indexed_sha = head_sha
+        logging.info(f"文件历史索引已更新: {repo_path}，新增 {count} 个提交，共 {len(index.files)} 个文件")
+        await asyncio.to_thread(FileHistoryIndexer._save, repo_path, index)
+        return index
+
+    @staticmethod
+    async def _read_log(repo_path: str, rev_range: str) -> list:
+        """流式读取 git log，返回按时间正序的提交记录"""
+        args = ["-c", "core.quotePath=false", "log", "--numstat", "--summary", "--no-renames",
+                "--format=%x1e%H%x1f%ct", rev_range]
+        records = []
+        async for record in AsyncGitDriver.iter_records(args, cwd=repo_path, separator=b"\x1e",
+                                                        timeout=settings.git_clone_timeout):
+            parsed = FileHistoryIndexer._parse_record(record.decode("utf-8", errors="replace"))
+            if parsed:
+                records.append(parsed)
+        records.reverse()
+        return records
+
+    @staticmethod
+    def _parse_record(record: str):
+        lines = record.split("\n")
+        header = lines[0].split("\x1f")
+        if len(header) < 2:
+            return None
+        numstat: List[Tuple[str, int, int]] = []
+        summary: Dict[str, bool] = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            if line.startswith(" "):
+                # 摘要行：" create mode 100644 path" / " delete mode 100644 path"
+                parts = line.strip().split(" ", 3)
+                if len(parts) == 4 and parts[0] in ("create", "delete") and parts[1] == "mode":
+                    summary[FileHistoryIndexer._unquote(parts[3])] = parts[0] == "delete"
+                continue
+            fields = line.split("\t", 2)
+            if len(fields) != 3:
+                continue
+            # 二进制文件的行数为 "-"
+            added = int(fields[0]) if fields[0].isdigit() else 0
+            deleted = int(fields[1]) if fields[1].isdigit() else 0
+            numstat.append((FileHistoryIndexer._unquote(fields[2]), added, deleted))
+        return header[0], int(header[1]), numstat, summary
+
+    @staticmethod
+    def _unquote(path: str) -> str:
+        """还原 git 对含特殊字符路径的 C 风格引用（如 "a\\tb"、"\\344\\270\\255"）"""
+        if len(path) < 2 or not (path.startswith('"') and path.endswith('"')):
+            return path
+        body = path[1:-1]
+        result = bytearray()
+        i = 0
+        while i < len(body):
+            char = body[i]
+            if char != "\\" or i + 1 >= len(body):
+                result += char.encode("utf-8")
+                i += 1
+                continue
+            escaped = body[i + 1]
+            if len(body) - i >= 4 and all(c in "01234567" for c in body[i + 1:i + 4]):
+                result.append(int(body[i + 1:i + 4], 8))
+                i += 4
+                continue
+            result += _ESCAPES.get(escaped, escaped).encode("utf-8")
+            i += 2
+        return result.decode("utf-8", errors="replace")
+
+    @staticmethod
+    def _index_path(repo_path: str) -> Optional[str]:
+        git_dir = GitRefReader.get_git_dir(repo_path)
+        return os.path.join(git_dir, FileHistoryIndexer.INDEX_FILE) if git_dir else None
+
+    @staticmethod
+    def _load(repo_path: str) -> Optional[FileHistoryIndex]:
+        index_path = FileHistoryIndexer._index_path(repo_path)
+        if not index_path or not os.path.isfile(index_path):
+            return None
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                return FileHistoryIndex.from_payload(f.read())
+        except Exception as e:
+            logging.warning(f"文件历史索引损坏，将重新构建 {index_path}: {e}")
+            return None
+
+    @staticmethod
+    def _save(repo_path: str, index: FileHistoryIndex) -> None:
+        index_path = FileHistoryIndexer._index_path(repo_path)
+        if not index_path:
+            return
+        # 多个 worker 可能同时写入，临时文件按进程区分
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(index.to_payload())
+        os.replace(tmp_path, index_path)
+
+    @staticmethod
+    def _get_local(key: str) -> Optional[FileHistoryIndex]:
+        with FileHistoryIndexer._local_lock:
+            index = FileHistoryIndexer._local.get(key)
+            if index is not None:
+                FileHistoryIndexer._local.move_to_end(key)
+            return index
+
+    @staticmethod
+    def _put_local(key: str, index: FileHistoryIndex) -> None:
+        with FileHistoryIndexer._local_lock:
+            FileHistoryIndexer._local[key] = index
+            FileHistoryIndexer._local.move_to_end(key)
+            while len(FileHistoryIndexer._local) > settings.file_history_cache_size:
+                FileHistoryIndexer._local.popitem(last=False)
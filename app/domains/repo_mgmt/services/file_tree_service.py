@@ -1,16 +1,26 @@
 import os
-from typing import List, Optional
+import sys
+import heapq
+import io
+from collections import Counter
+from typing import List, Optional, Callable
 from enum import Enum
 import json
 from typing import Dict
 
+try:
+    from app.infrastructure.llm.llms.utils import num_tokens_from_string as _num_tokens_from_string
+except ImportError:
+    _num_tokens_from_string = None
+
 
 class PathInfo:
-    def __init__(self, path: str = "", name: str = "", is_directory: bool = False, size: int = 0):
+    def __init__(self, path: str = "", name: str = "", is_directory: bool = False, size: int = 0, sha: Optional[str] = None):
         self.path = path
         self.name = name
         self.is_directory = is_directory
         self.size = size
+        self.sha = sha  # git blob 哈希（来自 git 索引时才有）
 
 # 定义FileNode的类型枚举
 class FileTreeNodeType(Enum):
@@ -19,6 +29,10 @@ class FileTreeNodeType(Enum):
 
 
 class FileTreeNode:
+    """文件树（字典树）节点，每个节点只保存一段路径名，名称经过 intern 在整棵树中共享"""
+
+    __slots__ = ("name", "type", "children")
+
     def __init__(self, name: str = "", node_type: FileTreeNodeType = FileTreeNodeType.Directory):
         self.name = name
         self.type = node_type
@@ -35,9 +49,38 @@ class FileTreeNode:
         return self.type == FileTreeNodeType.Directory
 
 
+class _DirStats:
+    """Token 预算折叠时的目录统计"""
+
+    __slots__ = ("node", "parent", "depth", "files", "extensions", "cost", "pending_dirs")
+
+    def __init__(self, node: FileTreeNode, parent: Optional["_DirStats"], depth: int):
+        self.node = node
+        self.parent = parent
+        self.depth = depth
+        self.files = 0                  # 子树文件数
+        self.extensions = Counter()     # 子树扩展名分布
+        self.cost = 0                   # 子树展开后的输出字符数（不含自身）
+        self.pending_dirs = 0           # 尚未折叠的直接子目录数
+
+
+def _sort_key(item):
+    """目录优先，然后按名称排序"""
+    return (item[1].is_file, item[0])
+
+
 # 本地目录下的目录+文件树处理服务
 class FileTreeService:
-    """基于本地仓库文件的目录操作和文件操作"""    
+    """基于本地仓库文件的目录操作和文件操作
+
+    序列化均使用显式栈迭代并写入同一个缓冲区，深层目录不会触发递归深度限制
+    """
+
+    # 预算折叠时优先折叠的目录（视为更深两层）
+    LOW_PRIORITY_DIR_NAMES = frozenset({
+        "test", "tests", "__tests__", "spec", "specs", "testdata", "fixtures", "mocks",
+        "docs", "doc", "examples", "example", "samples", "sample", "benchmarks", "bench",
+    })
 
     @staticmethod
     def build_tree(path_infos: List[PathInfo], base_path: str) -> FileTreeNode:
@@ -46,39 +89,51 @@ class FileTreeService:
         root = FileTreeNode(name="/", node_type=FileTreeNodeType.Directory)
         
         for path_info in path_infos:
-            # 计算相对路径
-            relative_path = path_info.path.replace(base_path, "").lstrip('\\/')
-            
-            # 过滤.开头的文件
-            if relative_path.startswith("."):
-                continue
-            
-            # 分割路径
-            parts = [part for part in relative_path.replace('\\', '/').split('/') if part]
-            
-            # 从根节点开始构建路径
-            current_node = root
-            
-            # 样例：
-            # 输入路径: "src/components/Header.tsx" (文件)
-            #
-            # FillTree树结构：
-            # root("/")
-            # └── src(D)
-            #     └── components(D)
-            #         └── Header.tsx(F)            
-            for i, part in enumerate(parts):
-                is_last_part = i == len(parts) - 1
-                
-                if part not in current_node.children:
-                    current_node.children[part] = FileTreeNode(
-                        name=part,
-                        node_type=FileTreeNodeType.File if (is_last_part and not path_info.is_directory) else FileTreeNodeType.Directory
-                    )
-                
-                current_node = current_node.children[part]
+            FileTreeService.add_path(root, path_info, base_path)
         
         return root
+
+    @staticmethod
+    def add_path(root: FileTreeNode, path_info: PathInfo, base_path: str) -> None:
+        """向文件树中插入单个路径（支持边扫描边构建）"""
+
+        # 计算相对路径
+        path = path_info.path
+        if base_path and path.startswith(base_path):
+            relative_path = path[len(base_path):].lstrip('\\/')
+        else:
+            relative_path = path.replace(base_path, "").lstrip('\\/')
+        
+        # 过滤.开头的文件
+        if relative_path.startswith("."):
+            return
+        
+        # 分割路径
+        parts = [part for part in relative_path.replace('\\', '/').split('/') if part]
+        
+        # 从根节点开始构建路径
+        current_node = root
+        
+        # 样例：
+        # 输入路径: "src/components/Header.tsx" (文件)
+        #
+        # FillTree树结构：
+        # root("/")
+        # └── src(D)
+        #     └── components(D)
+        #         └── Header.tsx(F)            
+        last_index = len(parts) - 1
+        for i, part in enumerate(parts):
+            child = current_node.children.get(part)
+            if child is None:
+                part = sys.intern(part)
+                child = FileTreeNode(
+                    name=part,
+                    node_type=FileTreeNodeType.File if (i == last_index and not path_info.is_directory) else FileTreeNodeType.Directory
+                )
+                current_node.children[part] = child
+            
+            current_node = child
     
     @staticmethod
     def get_all_paths(node: FileTreeNode, current_path: str = "") -> List[str]:
@@ -99,25 +154,28 @@ class FileTreeService:
         """
         all_paths = []
         
-        # 遍历子节点，不排序（与C#版本一致）
-        for child_name, child_node in node.children.items():
-            # 构建子节点路径
-            child_path = child_name if not current_path else f"{current_path}/{child_name}"
+        # 遍历子节点，不排序（与C#版本一致）；逆序入栈以保持先序输出
+        stack = [(child_node, child_name if not current_path else f"{current_path}/{child_name}")
+                 for child_name, child_node in reversed(list(node.children.items()))]
+        while stack:
+            child_node, child_path = stack.pop()
             
             # 添加当前路径（目录也要记录）
             node_type = "D" if child_node.is_directory else "F"
             all_paths.append(f"{child_path}({node_type})")
             
-            # 如果是目录且有子节点，递归获取子路径
+            # 如果是目录且有子节点，继续获取子路径
             if child_node.is_directory and child_node.children:
-                all_paths.extend(FileTreeService.get_all_paths(child_node, child_path))
+                for name, grandchild in reversed(list(child_node.children.items())):
+                    stack.append((grandchild, f"{child_path}/{name}"))
         
         return all_paths
     
     @staticmethod
-    def to_compact_string(node: FileTreeNode, indent: int = 0) -> str:
+    def to_compact_string(node: FileTreeNode, indent: int = 0, collapsed: Optional[Dict[int, str]] = None) -> str:
         """将文件树转换为紧凑的字符串表示
             level 结构层级(空格个数)
+            collapsed 被折叠的目录（id(node) -> 摘要），只输出摘要不再展开
 
             处理后的格式：
             /
@@ -133,29 +191,37 @@ class FileTreeService:
             utils/D
                 helper.js/F
         """
-        result = []
-        indent_str = "  " * indent
+        buffer = io.StringIO()
         
         # 根节点特殊处理
         if indent == 0:
-            result.append("/")
+            buffer.write("/")
+        first = indent != 0
         
         # 按照目录优先，然后按名称排序的方式遍历子节点
-        sorted_children = sorted(node.children.items(), 
-                               key=lambda x: (x[1].is_file, x[0]))
-        
-        for child_name, child_node in sorted_children:
+        stack = [(child_node, child_name, indent) for child_name, child_node in
+                 reversed(sorted(node.children.items(), key=_sort_key))]
+        while stack:
+            child_node, child_name, level = stack.pop()
+            
             # 输出当前节点信息
-            node_type = "D" if child_node.is_directory else "F"
-            result.append(f"{indent_str}{child_name}/{node_type}")
+            if not first:
+                buffer.write("\n")
+            first = False
+            buffer.write("  " * level)
+            buffer.write(child_name)
+            buffer.write("/D" if child_node.is_directory else "/F")
             
-            # 如果是目录，递归处理子目录
+            # 如果是目录，继续处理子目录
             if child_node.is_directory:
-                child_content = FileTreeService.to_compact_string(child_node, indent + 1)
-                if child_content.strip():
-                    result.append(child_content)
+                if collapsed and id(child_node) in collapsed:
+                    buffer.write(" ")
+                    buffer.write(collapsed[id(child_node)])
+                    continue
+                for name, grandchild in reversed(sorted(child_node.children.items(), key=_sort_key)):
+                    stack.append((grandchild, name, level + 1))
         
-        return "\n".join(result)
+        return buffer.getvalue()
     
     @staticmethod
     def to_compact_json(node: FileTreeNode) -> str:
@@ -163,24 +229,40 @@ class FileTreeService:
         样例：
         {"public":{"favicon.ico":"F","images":{"logo.png":"F"}},"README.md":"F","src":{"components":{"Footer.tsx":"F","Header.tsx":"F"},"utils":{"helper.js":"F"}}}
         """
-        def serialize_node_compact(node: FileTreeNode):
-            # 如果当前节点是文件，直接返回 "F"
-            if node.is_file:
-                return "F"
-            
-            result = {}
-            
-            # 遍历子节点（注意这里忽略掉了/根节点）
-            for name, child in node.children.items():
-                result[name] = serialize_node_compact(child)
+        # 如果当前节点是文件，直接返回 "F"
+        if node.is_file:
+            return '"F"'
+        
+        buffer = io.StringIO()
+        buffer.write("{")
+        
+        # 栈元素：[子节点迭代器, 是否已输出元素]；遍历子节点（注意这里忽略掉了/根节点）
+        stack = [[iter(node.children.items()), False]]
+        while stack:
+            frame = stack[-1]
+            item = next(frame[0], None)
+            if item is None:
+                buffer.write("}")
+                stack.pop()
+                continue
             
-            return result
+            name, child = item
+            if frame[1]:
+                buffer.write(",")
+            frame[1] = True
+            buffer.write(json.dumps(name, ensure_ascii=False))
+            buffer.write(":")
+            if child.is_file:
+                buffer.write('"F"')
+            else:
+                buffer.write("{")
+                stack.append([iter(child.children.items()), False])
         
-        return json.dumps(serialize_node_compact(node), ensure_ascii=False, separators=(',', ':'))
+        return buffer.getvalue()
     
 
     @staticmethod
-    def to_path_list(node: FileTreeNode, current_path: str = "") -> str:
+    def to_path_list(node: FileTreeNode, current_path: str = "", collapsed: Optional[Dict[int, str]] = None) -> str:
         """将文件树转换为路径列表
         样例：
         public/
@@ -195,33 +277,40 @@ class FileTreeService:
         src/utils/
         src/utils/helper.js
         """
-        paths = []
+        buffer = io.StringIO()
+        first = True
         
         # 遍历子节点，不排序（与C#版本一致）
-        for child_name, child_node in node.children.items():
-            # 构建子节点路径
-            child_path = child_name if not current_path else f"{current_path}/{child_name}"
+        stack = [(child_node, child_name if not current_path else f"{current_path}/{child_name}")
+                 for child_name, child_node in reversed(list(node.children.items()))]
+        while stack:
+            child_node, child_path = stack.pop()
+            is_collapsed = bool(collapsed) and id(child_node) in collapsed
             
             if child_node.is_file:
-                paths.append(child_path)
-            else:
+                line = child_path
+            elif is_collapsed:
+                line = f"{child_path}/ {collapsed[id(child_node)]}"
+            elif len(child_node.children) == 1:
                 # 如果目录只有一个子节点，可以压缩路径
-                if len(child_node.children) == 1:
-                    sub_paths = FileTreeService.to_path_list(child_node, child_path).split('\n')
-                    if sub_paths == ['']:  # 处理空字符串分割结果
-                        sub_paths = []
-                    paths.extend(sub_paths)
-                else:
-                    paths.append(f"{child_path}/")
-                    sub_paths = FileTreeService.to_path_list(child_node, child_path).split('\n')
-                    if sub_paths == ['']:  # 处理空字符串分割结果
-                        sub_paths = []
-                    paths.extend(sub_paths)
+                line = None
+            else:
+                line = f"{child_path}/"
+            
+            if line is not None:
+                if not first:
+                    buffer.write("\n")
+                first = False
+                buffer.write(line)
+            
+            if child_node.is_directory and not is_collapsed:
+                for name, grandchild in reversed(list(child_node.children.items())):
+                    stack.append((grandchild, f"{child_path}/{name}"))
         
-        return "\n".join(paths)
+        return buffer.getvalue()
 
     @staticmethod
-    def to_unix_tree(node: FileTreeNode, prefix: str = "", is_last: bool = True) -> str:
+    def to_unix_tree(node: FileTreeNode, prefix: str = "", is_last: bool = True, collapsed: Optional[Dict[int, str]] = None) -> str:
         """将文件树转换为Unix树形格式
         样例：
         .
@@ -237,43 +326,169 @@ class FileTreeService:
             └── utils/
                 └── helper.js
         """
-        result = []
+        buffer = io.StringIO()
         
         # 根节点处理
         if not prefix:
-            result.append(".")
-            sorted_children = sorted(node.children.items(), 
-                                   key=lambda x: (x[1].is_file, x[0]))
-            
-            for child_name, child_node in sorted_children:
-                is_last_child = child_name == sorted_children[-1][0]
-                result.append(FileTreeService._to_unix_tree_recursive(child_node, "", is_last_child, child_name))
+            buffer.write(".")
+            sorted_children = sorted(node.children.items(), key=_sort_key)
+            last_index = len(sorted_children) - 1
+            stack = [(sorted_children[i][1], "", i == last_index, sorted_children[i][0])
+                     for i in range(last_index, -1, -1)]
+            first = False
         else:
             # 非根节点处理
-            result.append(FileTreeService._to_unix_tree_recursive(node, prefix, is_last, node.name))
-        
-        return "\n".join(result)
-    
-    @staticmethod
-    def _to_unix_tree_recursive(node: FileTreeNode, prefix: str, is_last: bool, node_name: str) -> str:
-        """Unix风格树形结构的递归实现"""
-        result = []
-        
-        # 当前节点的连接符
-        connector = "└── " if is_last else "├── "
-        
-        # 输出当前节点
-        node_suffix = "/" if node.is_directory else ""
-        result.append(f"{prefix}{connector}{node_name}{node_suffix}")
+            stack = [(node, prefix, is_last, node.name)]
+            first = True
         
-        # 如果是目录且有子节点，递归处理子节点
-        if node.is_directory and node.children:
-            child_prefix = prefix + ("    " if is_last else "│   ")
-            sorted_children = sorted(node.children.items(), 
-                                   key=lambda x: (x[1].is_file, x[0]))
+        while stack:
+            current, current_prefix, current_is_last, name = stack.pop()
             
-            for i, (child_name, child_node) in enumerate(sorted_children):
-                is_last_child = i == len(sorted_children) - 1
-                result.append(FileTreeService._to_unix_tree_recursive(child_node, child_prefix, is_last_child, child_name))
+            # 输出当前节点
+            if not first:
+                buffer.write("\n")
+            first = False
+            buffer.write(current_prefix)
+            buffer.write("└── " if current_is_last else "├── ")
+            buffer.write(name)
+            if not current.is_directory:
+                continue
+            buffer.write("/")
+            if collapsed and id(current) in collapsed:
+                buffer.write(" ")
+                buffer.write(collapsed[id(current)])
+                continue
+            
+            # 如果是目录且有子节点，处理子节点
+            if current.children:
+                child_prefix = current_prefix + ("    " if current_is_last else "│   ")
+                sorted_children = sorted(current.children.items(), key=_sort_key)
+                last_index = len(sorted_children) - 1
+                for i in range(last_index, -1, -1):
+                    child_name, child_node = sorted_children[i]
+                    stack.append((child_node, child_prefix, i == last_index, child_name))
         
-        return "\n".join(result)
\ No newline at end of file
+        return buffer.getvalue()
+
+    # =============================================================================
+    # Token 预算折叠
+    # =============================================================================
+
+    @staticmethod
+    def to_budgeted_string(node: FileTreeNode, max_tokens: int, format: str = "compact",
+                           count_tokens: Optional[Callable[[str], int]] = None) -> str:
+        """
+        在 Token 预算内输出目录结构
+
+        超出预算时，逐步把最不重要的子树折叠为摘要（如 `src/ (312 files, .ts)`），直到满足预算或只剩根目录的直接子项。
+        优先折叠层级深、体积大的目录，测试/文档/示例类目录视为更深两层。
+
+        Args:
+            node: 文件树根节点
+            max_tokens: Token 预算
+            format: 输出格式 compact / unix / pathlist
+            count_tokens: Token 计数函数，缺省使用 tiktoken，不可用时按 4 字符/Token 估算
+        """
+        count_tokens = count_tokens or FileTreeService.count_tokens
+        collapsed: Dict[int, str] = {}
+
+        def render() -> str:
+            if format == "unix":
+                return FileTreeService.to_unix_tree(node, collapsed=collapsed)
+            elif format == "pathlist":
+                return FileTreeService.to_path_list(node, collapsed=collapsed)
+            return FileTreeService.to_compact_string(node, collapsed=collapsed)
+
+        text = render()
+        tokens = count_tokens(text)
+        if tokens <= max_tokens:
+            return text
+
+        heap = FileTreeService._build_collapse_heap(node)
+        while tokens > max_tokens and heap:
+            # 按当前实际的 字符/Token 比例估算还需节省的字符数
+            chars_per_token = len(text) / max(tokens, 1)
+            excess = (tokens - max_tokens) * chars_per_token
+            saved = 0
+            while saved < excess and heap:
+                stats = heapq.heappop(heap)[-1]
+                saved += FileTreeService._collapse(stats, collapsed, heap)
+            text = render()
+            tokens = count_tokens(text)
+
+        return text
+
+    @staticmethod
+    def count_tokens(text: str) -> int:
+        """统计 Token 数，tiktoken 不可用时按 4 字符/Token 估算"""
+        if _num_tokens_from_string is not None and text:
+            tokens = _num_tokens_from_string(text)
+            if tokens:
+                return tokens
+        return (len(text) + 3) // 4
+
+    @staticmethod
+    def _build_collapse_heap(root: FileTreeNode) -> list:
+        """统计各目录子树信息，返回可折叠目录（子目录均已折叠）的优先队列"""
+        root_stats = _DirStats(root, None, -1)
+        order: List[_DirStats] = []
+        stack = [root_stats]
+        while stack:
+            stats = stack.pop()
+            order.append(stats)
+            for name, child in stats.node.children.items():
+                if child.is_directory:
+                    stack.append(_DirStats(child, stats, stats.depth + 1))
+                    stats.pending_dirs += 1
+                else:
+                    stats.files += 1
+                    stats.extensions[os.path.splitext(name)[1].lower()] += 1
+                # 按紧凑格式估算每行字符数：缩进 + 名称 + "/X" + 换行
+                stats.cost += 2 * (stats.depth + 1) + len(name) + 3
+
+        # 后序累加子树统计
+        for stats in reversed(order):
+            if stats.parent is not None:
+                stats.parent.files += stats.files
+                stats.parent.extensions.update(stats.extensions)
+                stats.parent.cost += stats.cost
+
+        heap = []
+        for stats in order:
+            if stats.parent is not None and stats.pending_dirs == 0:
+                FileTreeService._push_candidate(heap, stats)
+        return heap
+
+    @staticmethod
+    def _push_candidate(heap: list, stats: _DirStats) -> None:
+        depth = stats.depth + (2 if stats.node.name.lower() in FileTreeService.LOW_PRIORITY_DIR_NAMES else 0)
+        heapq.heappush(heap, (-depth, -stats.cost, id(stats), stats))
+
+    @staticmethod
+    def _collapse(stats: _DirStats, collapsed: Dict[int, str], heap: list) -> int:
+        """折叠目录，返回节省的字符数"""
+        summary = FileTreeService._summarize(stats)
+        collapsed[id(stats.node)] = summary
+        saved = stats.cost - len(summary) - 1
+        stats.cost = len(summary) + 1
+
+        ancestor = stats.parent
+        while ancestor is not None:
+            ancestor.cost -= saved
+            ancestor = ancestor.parent
+
+        # 子目录全部折叠后，父目录成为候选（根目录除外）
+        parent = stats.parent
+        parent.pending_dirs -= 1
+        if parent.pending_dirs == 0 and parent.parent is not None:
+            FileTreeService._push_candidate(heap, parent)
+        return saved
+
+    @staticmethod
+    def _summarize(stats: _DirStats) -> str:
+        """子树摘要：文件数与主要扩展名"""
+        extension = next((ext for ext, _ in stats.extensions.most_common() if ext), "")
+        unit = "file" if stats.files == 1 else "files"
+        if extension:
+            return f"({stats.files} {unit}, {extension})"
+        return f"({stats.files} {unit})"
@@ -0,0 +1,220 @@
+import os
+import struct
+import logging
+import threading
+import subprocess
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from app.domains.repo_mgmt.services.git_ref_reader import GitRefReader
+
+
+@dataclass(frozen=True)
+class GitIndexEntry:
+    """git 索引中的已跟踪文件"""
+    path: str          # 相对仓库根目录，使用 / 分隔
+    size: int          # 检出时记录的文件大小
+    sha: str           # blob 哈希
+    mode: int          # 文件模式（100644/100755/120000/160000）
+
+
+# 文件模式
+_MODE_SYMLINK = 0o120000
+_MODE_GITLINK = 0o160000
+_MODE_DIR = 0o040000
+
+# 索引条目标志位
+_FLAG_EXTENDED = 0x4000
+_FLAG_STAGE_MASK = 0x3000
+_FLAG_NAME_MASK = 0x0FFF
+_EXT_FLAG_SKIP_WORKTREE = 0x4000
+_EXT_FLAG_INTENT_TO_ADD = 0x2000
+
+# 条目固定部分：ctime(8) mtime(8) dev ino mode uid gid size(24) sha(20) flags(2)
+_ENTRY_HEAD = struct.Struct(">10I20sH")
+
+
+class GitIndexReader:
+    """
+    git 索引（.git/index）读取器
+
+    直接解析索引文件 v2/v3/v4 获取已跟踪文件的路径、大小与 blob 哈希，一次顺序读取即可完成枚举，
+    忽略规则与 git 完全一致（只有被跟踪的文件才会出现）。
+    遇到 split index、sparse index 或无法解析的格式时回退到 `git ls-files -s`
+    """
+
+    # 解析结果缓存：索引文件路径 -> ((mtime_ns, size), 条目)
+    _cache: "OrderedDict[str, Tuple[Tuple[int, int], List[GitIndexEntry]]]" = OrderedDict()
+    _cache_size = 16
+    _cache_lock = threading.Lock()
+
+    @staticmethod
+    def read_entries(repo_path: str) -> Optional[List[GitIndexEntry]]:
+        """
+        读取仓库已跟踪文件列表
+
+        Returns:
+            按路径排序的条目列表（不含子模块、冲突副本、稀疏检出未落盘的文件）；非 git 仓库返回 None
+        """
+        git_dir = GitRefReader.get_git_dir(repo_path)
+        if not git_dir:
+            return None
+
+        index_path = os.path.join(git_dir, "index")
+        try:
+            stat = os.stat(index_path)
+        except OSError:
+            # 空仓库或裸仓库没有索引
+            return None
+
+        version = (stat.st_mtime_ns, stat.st_size)
+        with GitIndexReader._cache_lock:
+            cached = GitIndexReader._cache.get(index_path)
+            if cached and cached[0] == version:
+                GitIndexReader._cache.move_to_end(index_path)
+                return cached[1]
+
+        entries = None
+        try:
+            with open(index_path, "rb") as f:
+                entries = GitIndexReader.parse_index(f.read())
+        except Exception as e:
+            logging.warning(f"解析git索引失败，回退到git ls-files {index_path}: {e}")
+
+        if entries is None:
+            entries = GitIndexReader._ls_files(repo_path)
+            if entries is None:
+                return None
+
+        with GitIndexReader._cache_lock:
+            GitIndexReader._cache[index_path] = (version, entries)
+            while len(GitIndexReader._cache) > GitIndexReader._cache_size:
+                GitIndexReader._cache.popitem(last=False)
+        return entries
+
+    @staticmethod
+    def parse_index(data: bytes) -> Optional[List[GitIndexEntry]]:
+        """
+        解析索引文件内容
+
+        Returns:
+            条目列表；遇到需要 git 处理的格式（split/sparse index）时返回 None
+        """
+        if len(data) < 12 or data[:4] != b"DIRC":
+            raise ValueError("不是有效的git索引文件")
+        version, count = struct.unpack(">II", data[4:12])
+        if version not in (2, 3, 4):
+            raise ValueError(f"不支持的git索引版本: {version}")
+
+        entries: List[GitIndexEntry] = []
+        offset = 12
+        previous_path = b""
+        head_size = _ENTRY_HEAD.size
+
+        for _ in range(count):
+            entry_start = offset
+            fields = _ENTRY_HEAD.unpack_from(data, offset)
+            mode, size, sha, flags = fields[6], fields[9], fields[10], fields[11]
+            offset += head_size
+
+            extended_flags = 0
+            if flags & _FLAG_EXTENDED:
+                if version < 3:
+                    raise ValueError("v2索引不应包含扩展标志")
+                (extended_flags,) = struct.unpack_from(">H", data, offset)
+                offset += 2
+
+            if version == 4:
+                # 路径前缀压缩：先读取需要从上一条路径末尾去掉的字节数
+                strip, offset = GitIndexReader._read_offset_varint(data, offset)
+                end = data.index(b"\0", offset)
+                path = previous_path[:len(previous_path) - strip] + data[offset:end]
+                offset = end + 1
+            else:
+                name_length = flags & _FLAG_NAME_MASK
+                if name_length < _FLAG_NAME_MASK:
+                    end = offset + name_length
+                else:
+                    end = data.index(b"\0", offset)
+                path = data[offset:end]
+                # 条目按 8 字节对齐，路径后至少一个 NUL
+                entry_length = (end - entry_start + 8) & ~7
+                offset = entry_start + entry_length
+            previous_path = path
+
+            if mode == _MODE_DIR:
+                # sparse index 中的目录条目，需要 git 展开
+                return None
+            if flags & _FLAG_STAGE_MASK:
+                continue
+            if extended_flags & (_EXT_FLAG_SKIP_WORKTREE | _EXT_FLAG_INTENT_TO_ADD):
+                continue
+            if mode == _MODE_GITLINK:
+                continue
+
+            entries.append(GitIndexEntry(
+                path=path.decode("utf-8", errors="surrogateescape"),
+                size=size,
+                sha=sha.hex(),
+                mode=mode,
+            ))
+
+        # split index 的条目分散在共享索引中，交给 git 处理
+        if GitIndexReader._has_extension(data, offset, b"link"):
+            return None
+
+        return entries
+
+    @staticmethod
+    def _read_offset_varint(data: bytes, offset: int) -> Tuple[int, int]:
+        """读取 git 的 offset varint 编码"""
+        byte = data[offset]
+        offset += 1
+        value = byte & 0x7F
+        while byte & 0x80:
+            value += 1
+            byte = data[offset]
+            offset += 1
+            value = (value << 7) + (byte & 0x7F)
+        return value, offset
+
+    @staticmethod
+    def _has_extension(data: bytes, offset: int, signature: bytes) -> bool:
+        """检查条目之后是否存在指定扩展（末尾 20 字节为校验和）"""
+        end = len(data) - 20
+        while offset + 8 <= end:
+            ext_signature = data[offset:offset + 4]
+            (ext_size,) = struct.unpack_from(">I", data, offset + 4)
+            if ext_signature == signature:
+                return True
+            offset += 8 + ext_size
+        return False
+
+    @staticmethod
+    def _ls_files(repo_path: str) -> Optional[List[GitIndexEntry]]:
+        """通过 git ls-files -s 获取跟踪文件（大小从文件系统读取）"""
+        try:
+            result = subprocess.run(
+                ["git", "-C", repo_path, "ls-files", "-s", "-z"],
+                capture_output=True, timeout=60, check=True,
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            logging.warning(f"执行git ls-files失败 {repo_path}: {e}")
+            return None
+
+        entries: List[GitIndexEntry] = []
+        for record in result.stdout.split(b"\0"):
+            if not record:
+                continue
+            meta, _, path = record.partition(b"\t")
+            mode, sha, stage = meta.split(b" ")
+            mode = int(mode, 8)
+            if stage != b"0" or mode == _MODE_GITLINK:
+                continue
+            rel_path = path.decode("utf-8", errors="surrogateescape")
+            try:
+                size = os.lstat(os.path.join(repo_path, rel_path)).st_size
+            except OSError:
+                continue
+            entries.append(GitIndexEntry(path=rel_path, size=size, sha=sha.decode("ascii"), mode=mode))
+        return entries
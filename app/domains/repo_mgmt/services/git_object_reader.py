@@ -0,0 +1,297 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from app.config.settings import settings
+from app.domains.repo_mgmt.services.git_driver import AsyncGitDriver, GitCommandError
+from app.domains.repo_mgmt.services.git_index_reader import GitIndexEntry
+
+
+# ls-tree 文件模式
+_MODE_GITLINK = 0o160000
+
+
+class _CatFileProcess:
+    """一个常驻的 `git cat-file --batch` 进程，同一时间只处理一个请求"""
+
+    def __init__(self, repo_path: str):
+        self.repo_path = repo_path
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.last_used = time.monotonic()
+
+    async def start(self) -> None:
+        self.process = await asyncio.create_subprocess_exec(
+            "git", "cat-file", "--batch",
+            cwd=self.repo_path,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            env=AsyncGitDriver._build_env(None),
+        )
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def request(self, object_name: str, max_size: Optional[int]) -> Optional[Tuple[str, str, bytes]]:
+        """
+        读取对象
+
+        Returns:
+            (sha, 类型, 内容)；对象不存在时返回 None
+
+        Raises:
+            ValueError: 对象超过 max_size（内容已读出丢弃，进程可继续使用）
+        """
+        self.last_used = time.monotonic()
+        self.process.stdin.write(object_name.encode("utf-8") + b"\n")
+        await self.process.stdin.drain()
+        header = await self.process.stdout.readline()
+        if not header:
+            raise EOFError("git cat-file 进程已退出")
+        parts = header.decode("utf-8", errors="replace").rstrip("\n").rsplit(" ", 2)
+        if len(parts) != 3 or not parts[2].isdigit():
+            # "<name> missing" / "<name> ambiguous"
+            return None
+        sha, object_type, size = parts[0], parts[1], int(parts[2])
+        if max_size is not None and size > max_size:
+            remaining = size + 1
+            while remaining > 0:
+                chunk = await self.process.stdout.read(min(remaining, 1024 * 1024))
+                if not chunk:
+                    raise EOFError("git cat-file 进程已退出")
+                remaining -= len(chunk)
+            raise ValueError(f"对象过大: {object_name} ({size} 字节)")
+        content = await self.process.stdout.readexactly(size + 1)
+        return sha, object_type, content[:-1]
+
+    async def close(self) -> None:
+        if self.process is None:
+            return
+        if self.process.returncode is None:
+            try:
+                self.process.stdin.close()
+                await asyncio.wait_for(self.process.wait(), timeout=AsyncGitDriver.KILL_GRACE_SECONDS)
+            except (asyncio.TimeoutError, BrokenPipeError, ConnectionResetError):
+                await AsyncGitDriver._kill(self.process)
+        self.process = None
+
+
+class _RepoPool:
+    """单个仓库的 cat-file 进程池"""
+
+    def __init__(self, repo_path: str):
+        self.repo_path = repo_path
+        self.idle: List[_CatFileProcess] = []
+        self.size = 0
+        self.closed = False
+        self.condition = asyncio.Condition()
+
+    async def acquire(self) -> _CatFileProcess:
+        async with self.condition:
+            await self._reap_idle()
+            while not self.idle and self.size >= settings.git_object_reader_pool_size:
+                await self.condition.wait()
+            if self.idle:
+                return self.idle.pop()
+            self.size += 1
+        worker = _CatFileProcess(self.repo_path)
+        try:
+            await worker.start()
+        except Exception:
+            async with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+        return worker
+
+    async def release(self, worker: _CatFileProcess, broken: bool = False) -> None:
+        if broken or self.closed or not worker.alive:
+            await worker.close()
+            async with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            return
+        async with self.condition:
+            self.idle.append(worker)
+            self.condition.notify()
+
+    async def _reap_idle(self) -> None:
+        """关闭空闲超时的进程（调用方持有 condition）"""
+        deadline = time.monotonic() - settings.git_object_reader_idle_timeout
+        expired = [w for w in self.idle if w.last_used < deadline]
+        for worker in expired:
+            self.idle.remove(worker)
+            self.size -= 1
+            await worker.close()
+
+    async def close(self) -> None:
+        async with self.condition:
+            self.closed = True
+            idle, self.idle = self.idle, []
+            self.size -= len(idle)
+        for worker in idle:
+            await worker.close()
+
+
+class GitObjectReader:
+    """
+    不依赖检出的 git 对象读取
+
+    每个仓库维护若干常驻的 `git cat-file --batch` 进程，按 `<rev>:<path>` 直接从对象库读取文件内容，
+    不修改工作区，多个版本可以并发读取。进程池按事件循环隔离（asyncio 子进程不能跨事件循环使用），
+    打开的仓库数超过上限时关闭最久未使用的进程池，空闲超时的进程在下次获取时关闭。
+    目录树按 tree sha 缓存（对象不可变）
+    """
+
+    _pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, OrderedDict[str, _RepoPool]]" = weakref.WeakKeyDictionary()
+
+    _trees: "OrderedDict[str, Dict[str, GitIndexEntry]]" = OrderedDict()
+    _trees_lock = threading.Lock()
+
+    @staticmethod
+    async def _get_pool(repo_path: str) -> _RepoPool:
+        loop = asyncio.get_running_loop()
+        pools = GitObjectReader._pools.setdefault(loop, OrderedDict())
+        key = os.path.realpath(repo_path)
+        pool = pools.get(key)
+        if pool is None:
+            pool = pools[key] = _RepoPool(key)
+        pools.move_to_end(key)
+        while len(pools) > settings.git_object_reader_max_repos:
+            _, evicted = pools.popitem(last=False)
+            # 使用中的进程归还时发现进程池已移除，由 release 关闭
+            await evicted.close()
+        return pool
+
+    @staticmethod
+    async def _request(repo_path: str, object_name: str, max_size: Optional[int] = None) -> Optional[Tuple[str, str, bytes]]:
+        if "\n" in object_name:
+            raise ValueError(f"无效的对象名: {object_name!r}")
+        pool = await GitObjectReader._get_pool(repo_path)
+        worker = await pool.acquire()
+        broken = False
+        try:
+            return await asyncio.wait_for(worker.request(object_name, max_size), timeout=settings.git_command_timeout)
+        except ValueError:
+            raise
+        except BaseException:
+            # 超时、取消或进程异常时协议状态未知，丢弃该进程
+            broken = True
+            raise
+        finally:
+            await pool.release(worker, broken=broken)
+
+    @staticmethod
+    def _normalize_path(path: str) -> str:
+        path = path.replace("\\", "/").lstrip("/")
+        while path.startswith("./"):
+            path = path[2:]
+        return path
+
+    @staticmethod
+    async def read(repo_path: str, path: str, rev: str = "HEAD", max_size: Optional[int] = None) -> Optional[bytes]:
+        """
+        读取指定版本的文件内容
+
+        Args:
+            repo_path: 仓库路径
+            path: 相对仓库根目录的文件路径
+            rev: 分支、标签或提交
+            max_size: 内容大小上限，超过时抛出 ValueError
+
+        Returns:
+            文件内容；文件不存在或不是普通文件时返回 None
+        """
+        result = await GitObjectReader._request(repo_path, f"{rev}:{GitObjectReader._normalize_path(path)}", max_size)
+        if result is None or result[1] != "blob":
+            return None
+        return result[2]
+
+    @staticmethod
+    async def read_text(repo_path: str, path: str, rev: str = "HEAD", max_size: Optional[int] = None) -> Optional[str]:
+        content = await GitObjectReader.read(repo_path, path, rev, max_size)
+        return None if content is None else content.decode("utf-8", errors="ignore")
+
+    @staticmethod
+    async def resolve(repo_path: str, rev: str, object_type: str = "commit") -> Optional[str]:
+        """解析版本对应的对象 sha（默认解析为提交）；不存在时返回 None"""
+        result = await GitObjectReader._request(repo_path, f"{rev}^{{{object_type}}}")
+        return result[0] if result else None
+
+    @staticmethod
+    async def ls_tree(repo_path: str, rev: str = "HEAD") -> Optional[List[GitIndexEntry]]:
+        """
+        列出指定版本的全部文件（递归，不含子模块），按路径排序
+
+        Returns:
+            文件条目列表；版本不存在时返回 None
+        """
+        tree = await GitObjectReader._get_tree(repo_path, rev)
+        return None if tree is None else list(tree.values())
+
+    @staticmethod
+    async def stat(repo_path: str, path: str, rev: str = "HEAD") -> Optional[GitIndexEntry]:
+        """指定版本中的文件条目（含大小），不读取文件内容；不存在时返回 None"""
+        tree = await GitObjectReader._get_tree(repo_path, rev)
+        if tree is None:
+            return None
+        return tree.get(GitObjectReader._normalize_path(path))
+
+    @staticmethod
+    async def _get_tree(repo_path: str, rev: str) -> Optional[Dict[str, GitIndexEntry]]:
+        tree_sha = await GitObjectReader.resolve(repo_path, rev, "tree")
+        if tree_sha is None:
+            return None
+        with GitObjectReader._trees_lock:
+            tree = GitObjectReader._trees.get(tree_sha)
+            if tree is not None:
+                GitObjectReader._trees.move_to_end(tree_sha)
+                return tree
+
+        try:
+            result = await AsyncGitDriver.run(["ls-tree", "-r", "-l", "-z", "--full-tree", tree_sha],
+                                              cwd=repo_path, timeout=settings.git_command_timeout)
+        except GitCommandError as e:
+            logging.warning(f"读取目录树失败 {repo_path} {rev}: {e}")
+            return None
+        tree = GitObjectReader.parse_ls_tree(result.stdout)
+        with GitObjectReader._trees_lock:
+            GitObjectReader._trees[tree_sha] = tree
+            while len(GitObjectReader._trees) > settings.git_tree_cache_size:
+                GitObjectReader._trees.popitem(last=False)
+        return tree
+
+    @staticmethod
+    def parse_ls_tree(output: str) -> Dict[str, GitIndexEntry]:
+        """解析 `ls-tree -r -l -z` 输出：<mode> <type> <sha> <size>\\t<path>\\0"""
+        entries: Dict[str, GitIndexEntry] = {}
+        for record in output.split("\0"):
+            if not record:
+                continue
+            meta, _, path = record.partition("\t")
+            fields = meta.split()
+            if len(fields) != 4:
+                continue
+            mode = int(fields[0], 8)
+            if mode == _MODE_GITLINK or fields[1] != "blob":
+                continue
+            size = int(fields[3]) if fields[3].isdigit() else 0
+            entries[path] = GitIndexEntry(path=path, size=size, sha=fields[2], mode=mode)
+        return entries
+
+    @staticmethod
+    async def close(repo_path: Optional[str] = None) -> None:
+        """关闭当前事件循环中指定仓库（为空时全部）的读取进程"""
+        pools = GitObjectReader._pools.get(asyncio.get_running_loop())
+        if not pools:
+            return
+        keys = [os.path.realpath(repo_path)] if repo_path else list(pools.keys())
+        for key in keys:
+            pool = pools.pop(key, None)
+            if pool is not None:
+                await pool.close()
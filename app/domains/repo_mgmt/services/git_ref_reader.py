@@ -0,0 +1,99 @@
+import os
+import re
+from typing import Optional
+
+
+_SHA_PATTERN = re.compile(r"^[0-9a-f]{40}([0-9a-f]{24})?$")
+
+
+class GitRefReader:
+    """
+    直接读取 .git 目录解析 HEAD 提交
+
+    只读取 HEAD、loose ref 与 packed-refs 文件，不启动 git 进程，适合在热路径上频繁调用
+    """
+
+    @staticmethod
+    def get_git_dir(repo_path: str) -> Optional[str]:
+        """获取仓库的 git 目录，兼容 worktree/submodule 的 .git 文件形式"""
+        dot_git = os.path.join(repo_path, ".git")
+        if os.path.isdir(dot_git):
+            return dot_git
+        if os.path.isfile(dot_git):
+            try:
+                with open(dot_git, "r", encoding="utf-8") as f:
+                    content = f.read().strip()
+            except OSError:
+                return None
+            if content.startswith("gitdir:"):
+                git_dir = content[len("gitdir:"):].strip()
+                if not os.path.isabs(git_dir):
+                    git_dir = os.path.normpath(os.path.join(repo_path, git_dir))
+                return git_dir if os.path.isdir(git_dir) else None
+        return None
+
+    @staticmethod
+    def read_head_sha(repo_path: str) -> Optional[str]:
+        """
+        读取当前 HEAD 指向的提交 sha
+
+        Returns:
+            提交 sha；非 git 仓库或无法解析时返回 None
+        """
+        git_dir = GitRefReader.get_git_dir(repo_path)
+        if not git_dir:
+            return None
+
+        try:
+            with open(os.path.join(git_dir, "HEAD"), "r", encoding="utf-8") as f:
+                head = f.read().strip()
+        except OSError:
+            return None
+
+        # 分离头指针
+        if _SHA_PATTERN.match(head):
+            return head
+        if not head.startswith("ref:"):
+            return None
+        return GitRefReader.resolve_ref(git_dir, head[len("ref:"):].strip())
+
+    @staticmethod
+    def resolve_ref(git_dir: str, ref: str, depth: int = 0) -> Optional[str]:
+        """解析引用名（如 refs/heads/main）对应的 sha"""
+        if depth > 5:
+            return None
+
+        # worktree 的分支引用存放在公共目录
+        common_dir = git_dir
+        commondir_file = os.path.join(git_dir, "commondir")
+        if os.path.isfile(commondir_file):
+            try:
+                with open(commondir_file, "r", encoding="utf-8") as f:
+                    common_dir = os.path.normpath(os.path.join(git_dir, f.read().strip()))
+            except OSError:
+                pass
+
+        for base in dict.fromkeys([git_dir, common_dir]):
+            try:
+                with open(os.path.join(base, ref), "r", encoding="utf-8") as f:
+                    value = f.read().strip()
+            except OSError:
+                continue
+            if _SHA_PATTERN.match(value):
+                return value
+            if value.startswith("ref:"):
+                return GitRefReader.resolve_ref(git_dir, value[len("ref:"):].strip(), depth + 1)
+
+        # 回退到 packed-refs
+        try:
+            with open(os.path.join(common_dir, "packed-refs"), "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.startswith("#") or line.startswith("^"):
+                        continue
+                    parts = line.strip().split(" ", 1)
+                    if len(parts) == 2 and parts[1] == ref:
+                        return parts[0]
+        except OSError:
+            pass
+
+        return None
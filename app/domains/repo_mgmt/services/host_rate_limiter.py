@@ -0,0 +1,115 @@
+"""
+按远端主机限制克隆并发数与启动速率
+
+名额保存在 Redis 中，批量导入、单仓库克隆任务以及所有 worker 节点共用同一上限：
+- clone:host:{host}:holders   持有名额的令牌，分数为租约到期时间；持有者定期续约，进程崩溃后租约到期自动回收
+- clone:host:{host}:next      下一次允许启动克隆的时间（同一主机两次启动间隔不小于 60/rate 秒）
+- clone:host:{host}:lock      修改以上两项时持有的分布式锁
+"""
+import time
+import uuid
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from app.config.settings import settings
+from app.infrastructure.redis import REDIS_CONN, RedisSpaceEnum
+
+
+class HostRateLimiter:
+    """按远端主机限制克隆并发数与启动速率（跨任务、跨 worker 生效）"""
+
+    KEY_PREFIX = "clone:host"
+    LOCK_TIMEOUT = 10
+    # 名额租约时长与续约间隔(秒)
+    LEASE = 60
+    HEARTBEAT = 20
+    # 没有空闲名额时的重试间隔(秒)
+    POLL_INTERVAL = 1.0
+
+    @staticmethod
+    def _key(host: str, part: str) -> str:
+        return f"{HostRateLimiter.KEY_PREFIX}:{host}:{part}"
+
+    @staticmethod
+    async def _try_reserve(host: str, token: str) -> float:
+        """
+        尝试占用一个名额并预约启动时间
+
+        Returns:
+            预约的启动时间；没有空闲名额时返回 -1
+        """
+        max_concurrency = max(1, settings.repo_batch_host_concurrency)
+        interval = 60.0 / settings.repo_batch_host_rate if settings.repo_batch_host_rate > 0 else 0.0
+        holders_key = HostRateLimiter._key(host, "holders")
+        next_key = HostRateLimiter._key(host, "next")
+
+        lock = REDIS_CONN.get_lock(HostRateLimiter._key(host, "lock"), timeout=HostRateLimiter.LOCK_TIMEOUT,
+                                   space=RedisSpaceEnum.BUSINESS)
+        if not await lock.spin_acquire(max_wait_time=HostRateLimiter.LOCK_TIMEOUT):
+            return -1
+        try:
+            now = time.time()
+            pipeline = REDIS_CONN.pipeline(RedisSpaceEnum.BUSINESS)
+            # 回收租约已到期的名额（持有进程已退出）
+            pipeline.zremrangebyscore(holders_key, 0, now)
+            pipeline.zcard(holders_key)
+            pipeline.get(next_key)
+            _, holders, next_start = await pipeline.execute()
+            if holders >= max_concurrency:
+                return -1
+
+            start_at = max(now, float(next_start or 0))
+            pipeline = REDIS_CONN.pipeline(RedisSpaceEnum.BUSINESS)
+            pipeline.zadd(holders_key, {token: now + HostRateLimiter.LEASE})
+            pipeline.expire(holders_key, HostRateLimiter.LEASE * 2)
+            if interval > 0:
+                pipeline.set(next_key, start_at + interval, ex=int(start_at + interval - now) + 1)
+            await pipeline.execute()
+            return start_at
+        finally:
+            await lock.release()
+
+    @staticmethod
+    async def _renew(host: str, token: str) -> None:
+        """持有期间定期续约"""
+        holders_key = HostRateLimiter._key(host, "holders")
+        while True:
+            await asyncio.sleep(HostRateLimiter.HEARTBEAT)
+            try:
+                pipeline = REDIS_CONN.pipeline(RedisSpaceEnum.BUSINESS)
+                pipeline.zadd(holders_key, {token: time.time() + HostRateLimiter.LEASE}, xx=True)
+                pipeline.expire(holders_key, HostRateLimiter.LEASE * 2)
+                await pipeline.execute()
+            except Exception as e:
+                logging.warning(f"克隆名额续约失败 {host}: {e}")
+
+    @staticmethod
+    async def _release(host: str, token: str) -> None:
+        pipeline = REDIS_CONN.pipeline(RedisSpaceEnum.BUSINESS)
+        pipeline.zrem(HostRateLimiter._key(host, "holders"), token)
+        await pipeline.execute()
+
+    @staticmethod
+    @asynccontextmanager
+    async def acquire(host: str):
+        """占用主机的一个克隆名额，等待到预约的启动时间后进入，退出时释放"""
+        token = uuid.uuid4().hex
+        while True:
+            start_at = await HostRateLimiter._try_reserve(host, token)
+            if start_at >= 0:
+                break
+            await asyncio.sleep(HostRateLimiter.POLL_INTERVAL)
+
+        renew_task = asyncio.create_task(HostRateLimiter._renew(host, token))
+        try:
+            delay = start_at - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield
+        finally:
+            renew_task.cancel()
+            try:
+                await HostRateLimiter._release(host, token)
+            except Exception as e:
+                # 释放失败时名额在租约到期后回收
+                logging.warning(f"释放克隆名额失败 {host}: {e}")
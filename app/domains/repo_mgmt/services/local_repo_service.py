@@ -1,8 +1,12 @@
 import os
-import re
-from typing import List, Optional
+import asyncio
+from typing import AsyncIterator, List, Optional
 from loguru import logger
-from app.domains.repo_mgmt.services.file_tree_service import FileTreeService, PathInfo
+from app.config.settings import settings
+from app.domains.repo_mgmt.services.file_tree_service import FileTreeService, FileTreeNode, FileTreeNodeType, PathInfo
+from app.domains.repo_mgmt.services.directory_scanner import DirectoryScanner
+from app.domains.repo_mgmt.services.file_classifier import FileClassifier
+from app.domains.repo_mgmt.services.git_index_reader import GitIndexReader, GitIndexEntry
 
 
 class LocalRepoService:
@@ -41,12 +45,35 @@ class LocalRepoService:
         return "\n".join(lines)
 
     @staticmethod
-    def get_catalogue_optimized(path: str, format: str = "compact") -> str:
-        """获取目录结构，可以指定Token压缩方式。包含文件夹和文件，仅输出相对路径，不包含图标；过滤相对路径以 '.' 开头的项"""
+    def get_catalogue_optimized(path: str, format: str = "compact", max_tokens: int = 0) -> str:
+        """获取目录结构，可以指定Token压缩方式。包含文件夹和文件，仅输出相对路径，不包含图标；过滤相对路径以 '.' 开头的项
+        max_tokens 大于 0 时按 Token 预算折叠次要子树"""
         
         info_list = LocalRepoService.get_folders_and_files(path)
         tree = FileTreeService.build_tree(info_list, path)
+        return LocalRepoService._format_tree(tree, format, max_tokens)
 
+    @staticmethod
+    async def get_catalogue_optimized_async(path: str, format: str = "compact", max_tokens: int = 0) -> str:
+        """get_catalogue_optimized 的异步版本：扫描在后台线程进行，边扫描边构建文件树，不阻塞事件循环"""
+
+        tree = FileTreeNode(name="/", node_type=FileTreeNodeType.Directory)
+        indexed = await asyncio.to_thread(LocalRepoService.get_indexed_folders_and_files, path)
+        if indexed is not None:
+            for info in indexed:
+                FileTreeService.add_path(tree, info, path)
+            return LocalRepoService._format_tree(tree, format, max_tokens)
+
+        async for batch in LocalRepoService._create_scanner(path).aiter_batches():
+            for info in batch:
+                FileTreeService.add_path(tree, info, path)
+        return LocalRepoService._format_tree(tree, format, max_tokens)
+
+    @staticmethod
+    def _format_tree(tree: FileTreeNode, format: str, max_tokens: int = 0) -> str:
+        """按指定格式输出文件树"""
+        if max_tokens > 0 and format in ("compact", "unix", "pathlist"):
+            return FileTreeService.to_budgeted_string(tree, max_tokens, format)
         if format == "json":
             return FileTreeService.to_compact_json(tree)
         elif format == "unix":
@@ -60,12 +87,112 @@ class LocalRepoService:
     
     @staticmethod
     def get_folders_and_files(path: str) -> List[PathInfo]:
-        """获取目录文件列表"""
-        info_list = []
-        ignore_files = LocalRepoService._get_ignore_files(path)
-        LocalRepoService._scan_directory(path, info_list, ignore_files)
+        """
+        获取目录文件列表（按目录层级深度优先、同层按名称排序）
+
+        git 仓库直接读取索引中的跟踪文件；非 git 目录（如上传的压缩包）扫描磁盘
+        """
+        info_list = LocalRepoService.get_indexed_folders_and_files(path)
+        if info_list is None:
+            info_list = list(LocalRepoService._create_scanner(path).scan())
+        info_list.sort(key=lambda info: os.path.relpath(info.path, path).replace("\\", "/").split("/"))
+        return info_list
+
+    @staticmethod
+    def filter_folders_and_files(path: str, info_list: List[PathInfo]) -> List[PathInfo]:
+        """
+        按扫描规则过滤已知的文件列表（如解压压缩包时记录的条目），无需再次遍历磁盘
+
+        结果与 get_folders_and_files 扫描非 git 目录的结果一致
+        """
+        return LocalRepoService._create_scanner(path).filter_entries(info_list)
+
+    @staticmethod
+    async def iter_folders_and_files(path: str) -> AsyncIterator[PathInfo]:
+        """
+        流式获取目录文件列表
+
+        扫描在后台线程池进行，结果按目录批次产出，调用方可在遍历结束前开始处理。
+        父目录总是先于其子项产出，但不同目录之间的顺序不固定
+        """
+        indexed = await asyncio.to_thread(LocalRepoService.get_indexed_folders_and_files, path)
+        if indexed is not None:
+            for info in indexed:
+                yield info
+            return
+
+        async for info in LocalRepoService._create_scanner(path).aiter_entries():
+            yield info
+
+    @staticmethod
+    def get_indexed_folders_and_files(path: str) -> Optional[List[PathInfo]]:
+        """
+        从 git 索引获取目录文件列表
+
+        与磁盘扫描的过滤规则一致（.开头目录、大于1M的文件、第三方/生成/压缩文件），
+        目录由文件路径推导，只包含含有文件的目录。非 git 仓库或未启用时返回 None
+        """
+        if not settings.repo_enumerate_from_git_index:
+            return None
+        entries = GitIndexReader.read_entries(path)
+        if entries is None:
+            return None
+        return LocalRepoService.path_infos_from_entries(path, entries)
+
+    @staticmethod
+    def path_infos_from_entries(path: str, entries: List[GitIndexEntry]) -> List[PathInfo]:
+        """
+        由 git 文件条目（索引或指定版本的目录树）生成目录文件列表
+
+        目录由文件路径推导，按条目顺序输出（目录在其第一个文件之前）
+        """
+        skip_generated = settings.repo_skip_generated_files
+        info_list: List[PathInfo] = []
+        seen_dirs = set()
+        for entry in entries:
+            if not LocalRepoService._accept_index_entry(entry, skip_generated):
+                continue
+
+            parts = entry.path.split("/")
+            for i in range(1, len(parts)):
+                dir_path = "/".join(parts[:i])
+                if dir_path not in seen_dirs:
+                    seen_dirs.add(dir_path)
+                    info_list.append(PathInfo(path=os.path.join(path, dir_path), name=parts[i - 1], is_directory=True, size=0))
+            info_list.append(PathInfo(path=os.path.join(path, entry.path), name=parts[-1], is_directory=False, size=entry.size, sha=entry.sha))
+
         return info_list
 
+    @staticmethod
+    def _accept_index_entry(entry: GitIndexEntry, skip_generated: bool) -> bool:
+        """索引条目过滤"""
+        # 符号链接不作为普通文件处理
+        if entry.mode == 0o120000:
+            return False
+        if entry.size >= 1024 * 1024:
+            return False
+
+        parts = entry.path.split("/")
+        for part in parts[:-1]:
+            if part.startswith("."):
+                return False
+            if skip_generated and FileClassifier.is_vendored_dir(part):
+                return False
+        if skip_generated and FileClassifier.classify_path(parts[-1]):
+            return False
+        return True
+
+    @staticmethod
+    def _create_scanner(path: str) -> DirectoryScanner:
+        """创建目录扫描器"""
+        return DirectoryScanner(
+            path,
+            ignore_patterns=LocalRepoService._get_ignore_files(path),
+            max_file_size=1024 * 1024,
+            skip_generated=settings.repo_skip_generated_files,
+            max_workers=settings.repo_scan_max_workers,
+        )
+
     @staticmethod
     def _get_ignore_files(path: str) -> List[str]:
         """获取忽略文件列表"""
@@ -85,104 +212,3 @@ class LocalRepoService:
                 logger.error(f"读取.gitignore文件失败: {e}")
         
         return ignore_files
-
-
-    # 扫描目录，获取目录结构
-
-    @staticmethod
-    def _scan_directory(path: str, info_list: List[PathInfo], ignore_files: List[str]) -> None:
-        """
-         扫描目录
-         忽略：1）大于1M的文件；2）.开头的目录 3）.gitignore中配置的文件
-         返回格式：PathInfo列表。PathInfo包含路径、名称、是否为目录、大小
-        """        
-        try:
-            # 遍历目录下的所有项目
-            for item in os.listdir(path):
-                # 绝对路径
-                item_path = os.path.join(path, item)
-                
-                if os.path.isfile(item_path):
-                    # 处理文件
-                    # 检查是否应该忽略文件
-                    should_ignore = False
-                    for pattern in ignore_files:
-                        if LocalRepoService._should_ignore_pattern(pattern, item, False):
-                            should_ignore = True
-                            break
-                    
-                    if should_ignore:
-                        continue
-                    
-                    # 过滤大于1M的文件
-                    try:
-                        size = os.path.getsize(item_path)
-                        if size >= 1024 * 1024:  # 1MB
-                            continue
-                        
-                        info_list.append(PathInfo(
-                            path=item_path,
-                            name=item,
-                            is_directory=False,
-                            size=size
-                        ))
-                    except OSError:
-                        continue                        
-                elif os.path.isdir(item_path):
-                    # 处理目录
-                    # 过滤.开头的目录
-                    if item.startswith("."):
-                        continue
-                    
-                    # 检查是否应该忽略目录
-                    should_ignore = False
-                    for pattern in ignore_files:
-                        if LocalRepoService._should_ignore_pattern(pattern, item, True):
-                            should_ignore = True
-                            break
-                    
-                    if should_ignore:
-                        continue
-                    
-                    # 记录目录本身
-                    info_list.append(PathInfo(
-                        path=item_path,
-                        name=item,
-                        is_directory=True,
-                        size=0
-                    ))
-                    
-                    # 递归扫描子目录
-                    LocalRepoService.scan_directory(item_path, info_list, ignore_files)
-                        
-        except PermissionError:
-            logger.warning(f"没有权限访问目录: {path}")
-        except Exception as e:
-            logger.error(f"扫描目录失败 {path}: {e}")
-    
-    @staticmethod
-    def _should_ignore_pattern(pattern: str, name: str, is_directory: bool) -> bool:
-        """检查是否应该忽略该模式"""
-        try:
-            # 跳过空行和注释
-            if not pattern or pattern.startswith('#'):
-                return False
-            
-            trimmed_pattern = pattern.strip()
-            
-            # 如果模式以/结尾，表示只匹配目录
-            if trimmed_pattern.endswith('/'):
-                if not is_directory:
-                    return False
-                trimmed_pattern = trimmed_pattern.rstrip('/')
-            
-            # 转换gitignore模式到正则表达式
-            if '*' in trimmed_pattern:
-                regex_pattern = "^" + re.escape(trimmed_pattern).replace("\\*", ".*") + "$"
-                return bool(re.match(regex_pattern, name, re.IGNORECASE))
-            else:
-                # 精确匹配，大小写不敏感
-                return name.lower() == trimmed_pattern.lower()
-                
-        except Exception:
-            return False 
\ No newline at end of file
@@ -0,0 +1,162 @@
+import json
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.settings import settings
+from app.infrastructure.redis import REDIS_CONN, RedisSpaceEnum
+from app.domains.repo_mgmt.models.repository import RepoRecord, ProcessingStatus
+
+
+# 结束状态，进入后推送流结束
+TERMINAL_STATUSES = (ProcessingStatus.COMPLETED.value, ProcessingStatus.FAILED.value)
+
+
+class ProgressReporter:
+    """
+    仓库处理进度上报
+
+    细粒度进度写入 Redis 哈希并通过 pub/sub 推送给订阅者（SSE）；
+    数据库只在状态变化、结束或距上次写入超过 progress_flush_interval 秒时更新，避免每一步都 UPDATE + COMMIT
+    """
+
+    KEY_PREFIX = "repo:progress"
+
+    def __init__(self, session: AsyncSession, repo_id: str):
+        self.session = session
+        self.repo_id = repo_id
+        self.status: Optional[str] = None
+        self.progress = 0
+        self.message = ""
+        self._seq = 0
+        self._last_flush = 0.0
+
+    @staticmethod
+    def key(repo_id: str) -> str:
+        """进度哈希键，同时作为推送频道名"""
+        return f"{ProgressReporter.KEY_PREFIX}:{repo_id}"
+
+    async def transition(self, status: ProcessingStatus, progress: int, message: str, **values: Any) -> None:
+        """
+        状态变化：推送并立即写入数据库
+
+        Args:
+            values: 同时写入仓库记录的其它字段（如 version、is_cloned、processing_error）
+        """
+        self.status = status.value
+        await self._publish(progress, message, values.get("processing_error"))
+        await self.flush(processing_status=status, **values)
+
+    async def update(self, progress: int, message: str) -> None:
+        """进度变化：推送，数据库按间隔合并写入"""
+        await self._publish(progress, message)
+        if time.monotonic() - self._last_flush >= settings.progress_flush_interval:
+            await self.flush()
+
+    async def fail(self, message: str, error: str) -> None:
+        await self.transition(ProcessingStatus.FAILED, 0, message, processing_error=error)
+
+    async def flush(self, **values: Any) -> None:
+        """将当前进度写入数据库"""
+        await self.session.execute(
+            update(RepoRecord)
+            .where(RepoRecord.id == self.repo_id)
+            .values(
+                processing_progress=self.progress,
+                processing_message=self.message,
+                updated_at=datetime.utcnow(),
+                **values
+            )
+        )
+        await self.session.commit()
+        self._last_flush = time.monotonic()
+
+    async def _publish(self, progress: int, message: str, error: Optional[str] = None) -> None:
+        """写入 Redis 并推送（Redis 操作失败只记录警告，不影响任务执行）"""
+        self.progress = progress
+        self.message = message
+        # 序号取微秒时间戳，任务重试时也保持递增，订阅方据此去重
+        self._seq = max(self._seq + 1, time.time_ns() // 1000)
+        snapshot = {
+            "repo_id": self.repo_id,
+            "seq": self._seq,
+            "status": self.status or "",
+            "progress": progress,
+            "message": message,
+            "error": error or "",
+            "updated_at": datetime.utcnow().isoformat(),
+        }
+        key = ProgressReporter.key(self.repo_id)
+        await REDIS_CONN.hset_mapping(key, snapshot, exp=settings.progress_ttl, space=RedisSpaceEnum.BUSINESS)
+        await REDIS_CONN.publish(key, snapshot, space=RedisSpaceEnum.BUSINESS)
+
+    @staticmethod
+    async def get_snapshot(repo_id: str) -> Optional[Dict[str, Any]]:
+        """读取最近一次进度；没有记录（未开始或已过期）时返回 None"""
+        snapshot = await REDIS_CONN.hgetall(ProgressReporter.key(repo_id), space=RedisSpaceEnum.BUSINESS)
+        return ProgressReporter._normalize(snapshot) if snapshot else None
+
+    @staticmethod
+    async def stream(repo_id: str, initial: Optional[Dict[str, Any]] = None) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        订阅进度变化
+
+        先产出当前进度（Redis 中没有时使用 initial），之后每次进度变化产出一次；
+        超过心跳间隔没有变化时产出 None，调用方可据此发送心跳或检查连接；进入结束状态后停止
+
+        Args:
+            initial: Redis 中没有进度时的初始值（如从数据库读取的状态）
+        """
+        key = ProgressReporter.key(repo_id)
+        # 先订阅再读取当前值，避免两者之间的更新丢失；按 seq 丢弃已读取过的旧消息
+        async with REDIS_CONN.subscribe(key, space=RedisSpaceEnum.BUSINESS) as pubsub:
+            current = await ProgressReporter.get_snapshot(repo_id) or initial
+            last_seq = 0
+            if current:
+                last_seq = current.get("seq", 0)
+                yield current
+                if current.get("status") in TERMINAL_STATUSES:
+                    return
+
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True,
+                                                   timeout=settings.progress_sse_heartbeat)
+                if message is None:
+                    yield None
+                    continue
+                data = message.get("data")
+                if isinstance(data, bytes):
+                    data = data.decode("utf-8")
+                try:
+                    snapshot = ProgressReporter._normalize(json.loads(data))
+                except (TypeError, ValueError):
+                    continue
+                if snapshot["seq"] <= last_seq:
+                    continue
+                last_seq = snapshot["seq"]
+                yield snapshot
+                if snapshot["status"] in TERMINAL_STATUSES:
+                    return
+
+    @staticmethod
+    def _normalize(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+        """统一字段类型（Redis 哈希中的值可能为字符串）"""
+        result = dict(snapshot)
+        for field in ("seq", "progress"):
+            try:
+                result[field] = int(result.get(field) or 0)
+            except (TypeError, ValueError):
+                result[field] = 0
+        for field in ("status", "message", "error"):
+            result[field] = "" if result.get(field) is None else str(result[field])
+        return result
+
+    @staticmethod
+    def format_sse(snapshot: Optional[Dict[str, Any]]) -> str:
+        """格式化为 SSE 消息；None 为心跳注释"""
+        if snapshot is None:
+            return ": ping\n\n"
+        event = "done" if snapshot.get("status") in TERMINAL_STATUSES else "progress"
+        payload = json.dumps(snapshot, ensure_ascii=False, default=str)
+        return f"id: {snapshot.get('seq', 0)}\nevent: {event}\ndata: {payload}\n\n"
@@ -1,12 +1,21 @@
 import os
+import json
 import shutil
+import asyncio
 import logging
-from typing import List, Tuple, Optional
-from datetime import datetime
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, List, Tuple, Optional
 from urllib.parse import urlparse
-import git
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.settings import settings
+from app.domains.repo_mgmt.models.repository import CloneStrategy
+from app.domains.repo_mgmt.services.git_driver import AsyncGitDriver, ProgressCallback
+from app.domains.repo_mgmt.services.commit_log import CommitLog
+from app.domains.repo_mgmt.services.file_history_index import FileHistoryIndexer
+from app.domains.repo_mgmt.services.git_mirror_cache import GitMirrorCache
+from app.domains.repo_mgmt.services.workspace_manager import WorkspaceManager
 from app.domains.repo_mgmt.services.git_auth_mgmt_service import GitAuthMgmtService
+from app.domains.code_search.code_search_service import CodeSearchService
 
 
 class GitRepositoryInfo:
@@ -38,8 +47,48 @@ class GitRepositoryInfo:
         }
 
 
+@dataclass
+class CloneOptions:
+    """克隆选项：浅克隆深度、部分克隆过滤器与稀疏检出路径可组合使用"""
+    depth: int = 0
+    filter: str = ""
+    sparse_paths: List[str] = field(default_factory=list)
+
+    @property
+    def strategy(self) -> CloneStrategy:
+        """主要克隆策略（用于展示，组合使用时按 稀疏 > 部分 > 浅 取值）"""
+        if self.sparse_paths:
+            return CloneStrategy.SPARSE
+        if self.filter:
+            return CloneStrategy.BLOBLESS
+        if self.depth > 0:
+            return CloneStrategy.SHALLOW
+        return CloneStrategy.FULL
+
+    @property
+    def partial(self) -> bool:
+        """是否只获取部分历史或部分文件（浅克隆、部分克隆、稀疏检出）"""
+        return self.depth > 0 or bool(self.filter) or bool(self.sparse_paths)
+
+    @staticmethod
+    def from_record(record) -> "CloneOptions":
+        """从仓库记录读取克隆选项"""
+        sparse_paths = []
+        if record.sparse_paths:
+            try:
+                sparse_paths = json.loads(record.sparse_paths)
+            except ValueError:
+                logging.warning(f"仓库 {record.id} 稀疏检出规则格式错误，忽略: {record.sparse_paths}")
+        return CloneOptions(
+            depth=record.clone_depth or 0,
+            filter=record.clone_filter or "",
+            sparse_paths=sparse_paths,
+        )
+
+
 class RemoteGitService:
-    """Git服务"""
+    """Git服务（所有 git 操作通过 AsyncGitDriver 在子进程中执行，不阻塞事件循环）"""
+
     # 根据git地址识别提供商
     @staticmethod
     def get_git_provider(git_url: str) -> Optional[str]:
@@ -79,63 +128,35 @@ class RemoteGitService:
         repository_url: str, 
         local_repo_path: str, 
         branch: str = "main", 
-        user_id: str = None) -> GitRepositoryInfo:
+        user_id: str = None,
+        options: Optional[CloneOptions] = None,
+        on_progress: Optional[ProgressCallback] = None) -> GitRepositoryInfo:
         """克隆仓库"""
         try:
             
             # 检查仓库是否已存在
             if os.path.exists(local_repo_path):
                 try:
-                    # 获取现有仓库信息
-                    repo = git.Repo(local_repo_path)
-                    
-                    # 检查是否是正确的仓库
-                    current_remote_url = repo.remotes.origin.url
-                    if current_remote_url != repository_url:
-                        logging.info(f"仓库URL已变更，清空目录重新下载: {current_remote_url} -> {repository_url}")
-                        shutil.rmtree(local_repo_path, ignore_errors=True)
+                    # 检查是否是正确的仓库（远端地址可能带有访问令牌，比较前去除）
+                    current_remote_url = await AsyncGitDriver.output(["remote", "get-url", "origin"], cwd=local_repo_path)
+                    if RemoteGitService.strip_credentials(current_remote_url) != RemoteGitService.strip_credentials(repository_url):
+                        logging.info(f"仓库URL已变更，清空目录重新下载: {AsyncGitDriver.redact(current_remote_url)} -> {repository_url}")
+                        await asyncio.to_thread(shutil.rmtree, local_repo_path, True)
                     else:
                         # 更新仓库到最新版本
                         logging.info(f"仓库已存在，正在更新: {local_repo_path}")
-                        origin = repo.remotes.origin
-                        origin.pull()
-                        
-                        # 获取更新后的仓库信息
-                        head = repo.head
-                        commit = head.commit
-                        
-                        # 从路径解析仓库信息
-                        path_parts = local_repo_path.split(os.sep)
-                        if len(path_parts) >= 2:
-                            organization = path_parts[-2]
-                            repository_name = path_parts[-1]
-                        else:
-                            organization = "unknown"
-                            repository_name = os.path.basename(local_repo_path)
-                        
-                        return GitRepositoryInfo(
-                            local_path=local_repo_path,
-                            repository_name=repository_name,
-                            organization=organization,
-                            branch_name=head.ref.name,
-                            commit_time=commit.committed_datetime.isoformat(),
-                            commit_author=commit.author.name,
-                            commit_message=commit.message,
-                            version=commit.hexsha
-                        )
+                        await AsyncGitDriver.pull(local_repo_path, on_progress=on_progress, timeout=settings.git_clone_timeout)
+                        return await RemoteGitService._read_repository_info(local_repo_path)
                 except Exception as e:
                     logging.warning(f"读取或更新现有仓库失败，重新克隆: {e}")
                     # 删除目录后重新克隆
-                    shutil.rmtree(local_repo_path, ignore_errors=True)
+                    await asyncio.to_thread(shutil.rmtree, local_repo_path, True)
             
-            # 创建目录
-            os.makedirs(local_repo_path, exist_ok=True)
+            # 创建父目录（git clone 要求目标目录不存在或为空）
+            os.makedirs(os.path.dirname(os.path.abspath(local_repo_path)), exist_ok=True)
             
             # 克隆选项
-            clone_options = {
-                'branch': branch,
-                'depth': 0
-            }
+            options = options or CloneOptions()
             
             # 从认证表获取令牌
             access_token = None
@@ -156,151 +177,141 @@ class RemoteGitService:
             # 使用令牌认证克隆仓库
             if access_token:
                 # 使用令牌认证
-                auth_url = repository_url.replace('https://', f'https://oauth2:{access_token}@')
+                clone_url = repository_url.replace('https://', f'https://oauth2:{access_token}@')
                 logging.info(f"开始克隆仓库: {repository_url}")
-                repo = git.Repo.clone_from(auth_url, local_repo_path, **clone_options)
             else:
                 # 无认证信息，尝试克隆公开仓库
+                clone_url = repository_url
                 logging.info(f"无认证令牌，尝试克隆公开仓库: {repository_url}")
-                repo = git.Repo.clone_from(repository_url, local_repo_path, **clone_options)
             
-            # 克隆完成
-            logging.info(f"仓库克隆完成: {repository_url}")
+            # 同一上游共享本地镜像，只从上游下载镜像中缺少的对象；
+            # 浅克隆、部分克隆、稀疏检出不使用镜像，否则镜像仍会下载并保留完整历史与全部文件内容
+            mirror_path = None
+            if not options.partial:
+                mirror_path = await GitMirrorCache.ensure_mirror(repository_url, clone_url, on_progress=on_progress,
+                                                                 pin_for=local_repo_path)
             
-            # 获取仓库信息
-            head = repo.head
-            commit = head.commit
+            await AsyncGitDriver.clone(
+                clone_url,
+                local_repo_path,
+                branch=branch,
+                depth=options.depth,
+                filter=options.filter,
+                # 稀疏检出先不检出，设置规则后再检出，避免部分克隆下载全部文件内容
+                no_checkout=bool(options.sparse_paths),
+                reference=mirror_path,
+                dissociate=settings.git_mirror_dissociate,
+                on_progress=on_progress,
+                timeout=settings.git_clone_timeout,
+            )
             
-            # 从路径解析仓库信息
-            path_parts = local_repo_path.split(os.sep)
-            if len(path_parts) >= 2:
-                organization = path_parts[-2]
-                repository_name = path_parts[-1]
-            else:
-                organization = "unknown"
-                repository_name = os.path.basename(local_repo_path)
+            # 稀疏检出：设置路径规则后再检出
+            if options.sparse_paths:
+                await RemoteGitService._apply_sparse_paths(local_repo_path, options.sparse_paths)
+                await AsyncGitDriver.run(["checkout", "--progress", branch], cwd=local_repo_path,
+                                         on_progress=on_progress, timeout=settings.git_clone_timeout)
             
-            return GitRepositoryInfo(
-                local_path=local_repo_path,
-                repository_name=repository_name,
-                organization=organization,
-                branch_name=head.ref.name,
-                commit_time=commit.committed_datetime.isoformat(),
-                commit_author=commit.author.name,
-                commit_message=commit.message,
-                version=commit.hexsha
-            )
+            # 克隆完成
+            logging.info(f"仓库克隆完成: {repository_url}（策略: {options.strategy.value}）")
+            
+            return await RemoteGitService._read_repository_info(local_repo_path)
             
         except Exception as e:
-            logging.error(f"克隆仓库失败: {e}")
+            # 克隆失败的工作副本不会登记，移除对镜像的 pin
+            WorkspaceManager.unpin(local_repo_path)
+            logging.error(f"克隆仓库失败: {AsyncGitDriver.redact(str(e))}")
             raise
     
     @staticmethod
-    def pull_repository(local_repo_path: str, commit_id: str = "") -> Tuple[List[dict], str]:
+    async def pull_repository(local_repo_path: str, commit_id: str = "",
+                              on_progress: Optional[ProgressCallback] = None) -> Tuple[List[dict], str]:
         """拉取仓库更新"""
         try:
             if not os.path.exists(local_repo_path):
                 raise Exception("仓库不存在，请先克隆仓库")
             
-            repo = git.Repo(local_repo_path)
-            
             # 拉取最新代码
-            origin = repo.remotes.origin
-            origin.pull()
+            await AsyncGitDriver.pull(local_repo_path, on_progress=on_progress, timeout=settings.git_clone_timeout)
+
+            # 增量更新代码检索索引
+            try:
+                await asyncio.to_thread(CodeSearchService.update_index, local_repo_path)
+            except Exception as e:
+                logging.warning(f"更新代码索引失败: {e}")
+            
+            # 增量更新文件历史索引
+            try:
+                await FileHistoryIndexer.get_index(local_repo_path)
+            except Exception as e:
+                logging.warning(f"更新文件历史索引失败: {AsyncGitDriver.redact(str(e))}")
+            
+            head_sha = await AsyncGitDriver.output(["rev-parse", "HEAD"], cwd=local_repo_path)
             
-            # 获取提交记录
+            # 获取提交记录（最多 git_log_max_count 条，不再一次性读取完整历史）
+            max_count = settings.git_log_max_count
             if commit_id:
                 try:
-                    # 获取从指定commitId到HEAD的所有提交记录
-                    commits = []
-                    for commit in repo.iter_commits(f'{commit_id}..HEAD'):
-                        commits.append({
-                            'sha': commit.hexsha,
-                            'author': commit.author.name,
-                            'email': commit.author.email,
-                            'message': commit.message,
-                            'committed_datetime': commit.committed_datetime.isoformat()
-                        })
-                    return commits, repo.head.commit.hexsha
+                    # 浅克隆时指定提交可能不在本地历史中，按需加深
+                    async def _has_base() -> bool:
+                        return await RemoteGitService._has_commit(local_repo_path, commit_id)
+                    await RemoteGitService._deepen_until(local_repo_path, _has_base)
+                    
+                    # 获取从指定commitId到HEAD的提交记录
+                    commits = await RemoteGitService.get_commit_log(local_repo_path, since_sha=commit_id, max_count=max_count)
+                    return commits, head_sha
                 except Exception as e:
                     logging.warning(f"获取指定提交记录失败: {e}")
             
-            # 返回所有提交记录
-            commits = []
-            for commit in repo.iter_commits():
-                commits.append({
-                    'sha': commit.hexsha,
-                    'author': commit.author.name,
-                    'email': commit.author.email,
-                    'message': commit.message,
-                    'committed_datetime': commit.committed_datetime.isoformat()
-                })
-            
-            return commits, repo.head.commit.hexsha
+            # 返回最近的提交记录
+            commits = await RemoteGitService.get_commit_log(local_repo_path, max_count=max_count)
+            return commits, head_sha
             
         except Exception as e:
-            logging.error(f"拉取仓库失败: {e}")
+            logging.error(f"拉取仓库失败: {AsyncGitDriver.redact(str(e))}")
             raise
     
     @staticmethod
-    def get_repository_info(local_repo_path: str) -> Optional[GitRepositoryInfo]:
+    async def get_repository_info(local_repo_path: str) -> Optional[GitRepositoryInfo]:
         """获取仓库信息"""
         try:
             if not os.path.exists(local_repo_path):
                 return None
             
-            repo = git.Repo(local_repo_path)
-            head = repo.head
-            commit = head.commit
-            
-            # 从路径解析组织名和仓库名
-            path_parts = local_repo_path.split(os.sep)
-            if len(path_parts) >= 2:
-                organization = path_parts[-2]
-                repository_name = path_parts[-1]
-            else:
-                organization = "unknown"
-                repository_name = os.path.basename(local_repo_path)
-            
-            return GitRepositoryInfo(
-                local_path=local_repo_path,
-                repository_name=repository_name,
-                organization=organization,
-                branch_name=head.ref.name,
-                commit_time=commit.committed_datetime.isoformat(),
-                commit_author=commit.author.name,
-                commit_message=commit.message,
-                version=commit.hexsha
-            )
+            return await RemoteGitService._read_repository_info(local_repo_path)
             
         except Exception as e:
             logging.error(f"获取仓库信息失败: {e}")
             return None
     
     @staticmethod
-    def get_branches(local_repo_path: str) -> List[str]:
+    async def get_branches(local_repo_path: str) -> List[str]:
         """获取仓库分支列表"""
         try:
             if not os.path.exists(local_repo_path):
                 return []
             
-            repo = git.Repo(local_repo_path)
-            branches = [ref.name for ref in repo.references if isinstance(ref, git.refs.RemoteReference)]
-            return branches
+            output = await AsyncGitDriver.output(
+                ["for-each-ref", "--format=%(refname:short)", "refs/remotes"],
+                cwd=local_repo_path, timeout=settings.git_command_timeout,
+            )
+            return [line for line in output.splitlines() if line]
             
         except Exception as e:
             logging.error(f"获取分支列表失败: {e}")
             return []
     
     @staticmethod
-    def checkout_branch(local_repo_path: str, branch_name: str) -> bool:
+    async def checkout_branch(local_repo_path: str, branch_name: str) -> bool:
         """切换分支"""
         try:
             if not os.path.exists(local_repo_path):
                 return False
             
-            repo = git.Repo(local_repo_path)
-            repo.git.checkout(branch_name)
+            if not await RemoteGitService._has_commit(local_repo_path, f"refs/remotes/origin/{branch_name}") and \
+                    not await RemoteGitService._has_commit(local_repo_path, f"refs/heads/{branch_name}"):
+                # 浅克隆默认只跟踪克隆时的分支，切换前按需获取目标分支
+                await RemoteGitService._fetch_branch(local_repo_path, branch_name)
+            await AsyncGitDriver.run(["checkout", branch_name], cwd=local_repo_path, timeout=settings.git_command_timeout)
             return True
             
         except Exception as e:
@@ -308,26 +319,172 @@ class RemoteGitService:
             return False
     
     @staticmethod
-    def get_file_history(local_repo_path: str, file_path: str) -> List[dict]:
-        """获取文件提交历史"""
+    async def get_file_history(local_repo_path: str, file_path: str, max_count: int = 0) -> List[dict]:
+        """获取文件提交历史（max_count 为 0 时返回全部）"""
         try:
             if not os.path.exists(local_repo_path):
                 return []
             
-            repo = git.Repo(local_repo_path)
-            commits = []
+            # 完整历史的仓库直接查文件历史索引，不再为每个文件单独执行 git log
+            if not await RemoteGitService.is_shallow(local_repo_path):
+                shas = await FileHistoryIndexer.get_file_commits(local_repo_path, file_path, max_count)
+                if shas is not None:
+                    return await CommitLog.resolve(local_repo_path, shas)
+            
+            async def _collect() -> List[dict]:
+                return await RemoteGitService.get_commit_log(local_repo_path, max_count=max_count, paths=[file_path])
             
-            for commit in repo.iter_commits(paths=file_path):
-                commits.append({
-                    'sha': commit.hexsha,
-                    'author': commit.author.name,
-                    'email': commit.author.email,
-                    'message': commit.message,
-                    'committed_datetime': commit.committed_datetime.isoformat()
-                })
+            commits = await _collect()
+            if max_count <= 0 or len(commits) < max_count:
+                # 浅克隆的历史被截断，加深后重新统计，直到数量足够或获取到完整历史
+                async def _enough() -> bool:
+                    nonlocal commits
+                    commits = await _collect()
+                    return max_count > 0 and len(commits) >= max_count
+                # 需要完整历史时直接获取全部提交，不再逐轮加深
+                await RemoteGitService._deepen_until(local_repo_path, _enough, rounds=settings.repo_clone_max_deepen_rounds if max_count > 0 else 0)
             
             return commits
             
         except Exception as e:
             logging.error(f"获取文件历史失败: {e}")
-            return [] 
\ No newline at end of file
+            return []
+
+    @staticmethod
+    async def get_file_history_page(local_repo_path: str, file_path: str, cursor: Optional[str] = None,
+                                    page_size: int = 50) -> Tuple[List[dict], Optional[str]]:
+        """
+        分页获取文件提交历史
+
+        Returns:
+            (本页提交, 下一页游标)；没有更多数据时游标为 None
+
+        Raises:
+            ValueError: 游标格式错误
+        """
+        if not os.path.exists(local_repo_path):
+            return [], None
+        
+        commits, next_cursor = await CommitLog.get_page(local_repo_path, cursor=cursor, page_size=page_size, paths=[file_path])
+        if next_cursor is None and await RemoteGitService.is_shallow(local_repo_path):
+            # 浅克隆的历史被截断，本页不满或已到末尾时加深后重新读取
+            async def _enough() -> bool:
+                nonlocal commits, next_cursor
+                commits, next_cursor = await CommitLog.get_page(local_repo_path, cursor=cursor, page_size=page_size, paths=[file_path])
+                return next_cursor is not None
+            await RemoteGitService._deepen_until(local_repo_path, _enough)
+        return commits, next_cursor
+
+    @staticmethod
+    async def get_commit_log(local_repo_path: str, rev_range: str = "HEAD", max_count: int = 0,
+                             paths: Optional[List[str]] = None, since_sha: Optional[str] = None) -> List[dict]:
+        """按时间倒序获取提交记录（流式读取，提交元数据按 sha 缓存）"""
+        return await CommitLog.list_commits(local_repo_path, rev=rev_range, since_sha=since_sha,
+                                            max_count=max_count, paths=paths)
+
+    @staticmethod
+    async def _read_repository_info(local_repo_path: str) -> GitRepositoryInfo:
+        """读取 HEAD 提交信息"""
+        commits = await RemoteGitService.get_commit_log(local_repo_path, max_count=1)
+        if not commits:
+            raise Exception(f"仓库没有提交记录: {local_repo_path}")
+        commit = commits[0]
+        branch_name = await AsyncGitDriver.output(["rev-parse", "--abbrev-ref", "HEAD"], cwd=local_repo_path,
+                                                  timeout=settings.git_command_timeout)
+        
+        # 从路径解析仓库信息
+        path_parts = local_repo_path.split(os.sep)
+        if len(path_parts) >= 2:
+            organization = path_parts[-2]
+            repository_name = path_parts[-1]
+        else:
+            organization = "unknown"
+            repository_name = os.path.basename(local_repo_path)
+        
+        return GitRepositoryInfo(
+            local_path=local_repo_path,
+            repository_name=repository_name,
+            organization=organization,
+            branch_name=branch_name,
+            commit_time=commit['committed_datetime'],
+            commit_author=commit['author'],
+            commit_message=commit['message'],
+            version=commit['sha']
+        )
+
+    @staticmethod
+    def strip_credentials(url: str) -> str:
+        """去除 URL 中的用户名与令牌"""
+        parsed = urlparse(url)
+        if parsed.scheme in ("http", "https") and "@" in parsed.netloc:
+            return parsed._replace(netloc=parsed.netloc.rsplit("@", 1)[1]).geturl()
+        return url
+
+    @staticmethod
+    async def set_sparse_paths(local_repo_path: str, sparse_paths: List[str]) -> bool:
+        """修改稀疏检出规则，空列表表示恢复完整检出（部分克隆会按需下载新增路径的文件内容）"""
+        try:
+            if not os.path.exists(local_repo_path):
+                return False
+            
+            if sparse_paths:
+                await RemoteGitService._apply_sparse_paths(local_repo_path, sparse_paths)
+            else:
+                await AsyncGitDriver.run(["sparse-checkout", "disable"], cwd=local_repo_path, timeout=settings.git_clone_timeout)
+            return True
+            
+        except Exception as e:
+            logging.error(f"修改稀疏检出规则失败: {e}")
+            return False
+
+    @staticmethod
+    async def _apply_sparse_paths(local_repo_path: str, sparse_paths: List[str]) -> None:
+        """设置稀疏检出规则（非 cone 模式，支持 gitignore 风格的通配符）"""
+        await AsyncGitDriver.run(["sparse-checkout", "set", "--no-cone", "--", *sparse_paths],
+                                 cwd=local_repo_path, timeout=settings.git_clone_timeout)
+
+    @staticmethod
+    async def is_shallow(local_repo_path: str) -> bool:
+        """是否为浅克隆仓库"""
+        output = await AsyncGitDriver.output(["rev-parse", "--is-shallow-repository"], cwd=local_repo_path,
+                                             timeout=settings.git_command_timeout)
+        return output == "true"
+
+    @staticmethod
+    async def _has_commit(local_repo_path: str, rev: str) -> bool:
+        """本地是否存在指定提交"""
+        return await AsyncGitDriver.succeeds(["rev-parse", "--verify", "--quiet", f"{rev}^{{commit}}"],
+                                             cwd=local_repo_path, timeout=settings.git_command_timeout)
+
+    @staticmethod
+    async def _deepen_until(local_repo_path: str, satisfied: Callable[[], Awaitable[bool]], rounds: Optional[int] = None) -> None:
+        """
+        浅克隆按需加深历史
+
+        每轮加深的提交数翻倍，直到条件满足；超过最大轮数后获取完整历史。非浅克隆仓库直接返回
+        """
+        if not await RemoteGitService.is_shallow(local_repo_path):
+            return
+        if rounds is None:
+            rounds = settings.repo_clone_max_deepen_rounds
+        step = max(1, settings.repo_clone_deepen_step)
+        for _ in range(rounds):
+            if not await RemoteGitService.is_shallow(local_repo_path) or await satisfied():
+                return
+            logging.info(f"浅克隆历史不足，加深 {step} 个提交: {local_repo_path}")
+            await AsyncGitDriver.fetch(local_repo_path, "origin", f"--deepen={step}", timeout=settings.git_clone_timeout)
+            step *= 2
+
+        if await RemoteGitService.is_shallow(local_repo_path) and not await satisfied():
+            logging.info(f"浅克隆历史仍不足，获取完整历史: {local_repo_path}")
+            await AsyncGitDriver.fetch(local_repo_path, "origin", "--unshallow", timeout=settings.git_clone_timeout)
+            await satisfied()
+
+    @staticmethod
+    async def _fetch_branch(local_repo_path: str, branch_name: str) -> None:
+        """获取远端分支（浅克隆时保持相同深度）"""
+        refspec = f"+refs/heads/{branch_name}:refs/remotes/origin/{branch_name}"
+        fetch_args = ["origin", refspec]
+        if await RemoteGitService.is_shallow(local_repo_path):
+            fetch_args.append(f"--depth={max(1, settings.repo_clone_depth or 1)}")
+        await AsyncGitDriver.fetch(local_repo_path, *fetch_args, timeout=settings.git_clone_timeout)
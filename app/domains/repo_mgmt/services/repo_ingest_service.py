@@ -0,0 +1,109 @@
+import asyncio
+import logging
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.domains.repo_mgmt.models.repository import RepoRecord, ProcessingStatus
+from app.domains.repo_mgmt.services.remote_git_service import RemoteGitService, CloneOptions
+from app.domains.repo_mgmt.services.git_driver import GitProgressEvent
+from app.domains.repo_mgmt.services.progress_reporter import ProgressReporter
+from app.domains.repo_mgmt.services.catalogue_cache import CatalogueCache
+from app.domains.repo_mgmt.services.repo_snapshot_service import RepoSnapshotService
+from app.domains.repo_mgmt.services.workspace_manager import WorkspaceManager
+from app.domains.repo_mgmt.services.artifact_store import ArtifactStore
+from app.domains.repo_mgmt.services.host_rate_limiter import HostRateLimiter
+from app.domains.code_search.code_search_service import CodeSearchService
+
+
+# 克隆各阶段在总进度中的区间
+CLONE_PHASE_PROGRESS = {
+    "Receiving objects": (10, 70),
+    "Resolving deltas": (70, 90),
+    "Updating files": (90, 95),
+}
+
+
+class RepoIngestService:
+    """仓库导入的各个阶段（克隆、扫描目录、发布快照、构建索引），单仓库克隆任务与批量导入流水线共用"""
+
+    @staticmethod
+    async def get_record(session: AsyncSession, repo_id: str) -> RepoRecord:
+        result = await session.execute(select(RepoRecord).where(RepoRecord.id == repo_id))
+        repo_record = result.scalar_one_or_none()
+        if not repo_record:
+            raise Exception(f"仓库 {repo_id} 不存在")
+        return repo_record
+
+    @staticmethod
+    async def clone(session: AsyncSession, repo_record: RepoRecord, reporter: ProgressReporter) -> Optional[str]:
+        """
+        克隆阶段：克隆仓库并按 git 进度上报；同一远端主机的克隆并发数与启动速率受 HostRateLimiter 限制
+
+        Returns:
+            克隆得到的版本（HEAD sha）
+        """
+        await reporter.transition(ProcessingStatus.CLONING, 10, "开始克隆仓库")
+
+        async def _on_progress(event: GitProgressEvent):
+            span = CLONE_PHASE_PROGRESS.get(event.phase)
+            if not span or event.percent is None:
+                return
+            progress = span[0] + (span[1] - span[0]) * event.percent // 100
+            if progress == reporter.progress and not event.done:
+                return
+            message = f"{event.phase}: {event.percent}% ({event.current}/{event.total})"
+            if event.throughput:
+                message += f" {event.throughput}"
+            await reporter.update(progress, message)
+
+        # 执行克隆操作（git 子进程异步执行）
+        async with HostRateLimiter.acquire(RepoIngestService.remote_host(repo_record.repo_url)):
+            git_info = await RemoteGitService.clone_repository(
+                session=session,
+                repository_url=repo_record.repo_url,
+                local_repo_path=repo_record.local_path,
+                branch=repo_record.repo_branch,
+                user_id=repo_record.create_user_id,
+                options=CloneOptions.from_record(repo_record),
+                on_progress=_on_progress
+            )
+        return git_info.version
+
+    @staticmethod
+    async def scan(repo_record: RepoRecord) -> int:
+        """扫描阶段：生成目录快照并写入缓存，返回条目数"""
+        snapshot = await CatalogueCache.get_snapshot(repo_record.local_path, repo_record.id)
+        return snapshot.total_items
+
+    @staticmethod
+    async def publish(repo_record: RepoRecord, remote: bool = True) -> None:
+        """
+        发布阶段（在克隆所在节点执行）：上传工作副本快照、登记工作副本（各步骤失败只记录警告）
+
+        索引任务可能在其它节点执行，快照使其直接水合而不必再次克隆；登记使本节点的工作副本计入磁盘配额
+        """
+        repo_id = repo_record.id
+        # 上传工作副本快照，其它节点可直接水合
+        try:
+            await RepoSnapshotService.publish(repo_id, repo_record.local_path)
+        except Exception as e:
+            logging.warning(f"仓库 {repo_id} 快照上传失败: {e}")
+
+        # 登记工作副本占用，超过磁盘配额时淘汰最久未访问的副本
+        try:
+            await WorkspaceManager.register(repo_id, repo_record.local_path, remote=remote)
+        except Exception as e:
+            logging.warning(f"仓库 {repo_id} 工作副本登记失败: {e}")
+
+    @staticmethod
+    async def index(repo_record: RepoRecord) -> None:
+        """索引阶段：增量构建代码检索索引（CPU 密集，由 analysis 队列的 index_repository_task 执行；失败只记录警告）"""
+        try:
+            await asyncio.to_thread(CodeSearchService.update_index, repo_record.local_path)
+        except Exception as e:
+            logging.warning(f"仓库 {repo_record.id} 代码索引构建失败: {e}")
+
+    @staticmethod
+    def remote_host(repo_url: str) -> str:
+        """远端主机名（含非默认端口），用于按主机限流"""
+        return ArtifactStore.normalize_remote(repo_url).split("/", 1)[0]
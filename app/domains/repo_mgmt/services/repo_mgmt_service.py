@@ -1,20 +1,33 @@
 import uuid
 import os
+import json
+import base64
+import asyncio
 import shutil
-import zipfile
-import tempfile
 import logging
 from datetime import datetime
 from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete, update
+from sqlalchemy import select, delete, update, func
 from fastapi import UploadFile
 from app.config.settings import settings
 from app.domains.repo_mgmt.models.repository import RepoRecord
-from app.domains.repo_mgmt.schemes.repo_mgmt import CreateRepositoryFromUrl, UpdateRepository, RepositoryInfo
-from app.domains.repo_mgmt.services.remote_git_service import RemoteGitService
+from app.domains.repo_mgmt.schemes.repo_mgmt import CreateRepositoryFromUrl, UpdateRepository, RepositoryInfo, \
+    CreateRepositoriesBatch, RepositoryBatchInfo, RejectedRepository
+from app.domains.repo_mgmt.services.remote_git_service import RemoteGitService, CloneOptions
+from app.domains.repo_mgmt.services.archive_extractor import ArchiveExtractor
+from app.domains.repo_mgmt.services.catalogue_cache import CatalogueCache, CatalogueSnapshot
+from app.domains.repo_mgmt.services.file_tree_service import PathInfo
+from app.domains.repo_mgmt.services.file_history_index import FileHistoryIndexer
+from app.domains.repo_mgmt.services.repo_snapshot_service import RepoSnapshotService
+from app.domains.repo_mgmt.services.workspace_manager import WorkspaceManager
+from app.domains.repo_mgmt.services.artifact_store import ArtifactStore
+from app.domains.repo_mgmt.services.local_repo_service import LocalRepoService
 from app.domains.repo_mgmt.models.repository import ProcessingStatus
+from app.infrastructure.celery.fair_scheduler import FairTaskScheduler
 from app.domains.repo_mgmt.tasks.clone_task import clone_repository_task
+from app.domains.repo_mgmt.tasks.batch_ingest_task import ingest_repositories_task
+from app.domains.repo_mgmt.services.batch_ingest_service import BatchProgress
 
 
 class RepoMgmtService:
@@ -32,47 +45,19 @@ class RepoMgmtService:
             # 验证URL
             await RepoMgmtService._validate_url_repository(create_data.repo_url)
             
-            # 从URL解析仓库信息
-            provider = RemoteGitService.get_git_provider(create_data.repo_url)
-            repo_organization, repo_name = RemoteGitService.get_git_url_info(create_data.repo_url)
+            # 从URL解析仓库信息并创建仓库记录，状态为等待克隆
+            repository = RepoMgmtService._build_url_record(user_id, create_data)
             
             # 检查仓库是否已存在
-            existing_repo = await session.execute(
-                select(RepoRecord).where(
-                    RepoRecord.git_provider == provider,
-                    RepoRecord.repo_organization == repo_organization,
-                    RepoRecord.repo_name == repo_name,
-                    RepoRecord.create_user_id == user_id
-                )
-            )
-            if existing_repo.scalar_one_or_none():
+            if await RepoMgmtService._find_existing_url_repositories(session, user_id, [repository]):
                 raise ValueError("仓库已存在")
 
-            # 创建本地路径
-            local_repo_path = os.path.join(RepoMgmtService._get_base_storage_path(), repo_organization, repo_name)
-            
-            # 创建仓库记录，状态为等待克隆
-            repository = RepoRecord(
-                id=str(uuid.uuid4()),
-                create_user_id=user_id,
-                git_type=provider,
-                repo_url=create_data.repo_url,
-                repo_organization=repo_organization,
-                repo_name=repo_name,
-                repo_description=create_data.description,
-                repo_branch=create_data.branch,
-                local_path=local_repo_path,
-                processing_status=ProcessingStatus.INIT,
-                processing_progress=0,
-                processing_message="仓库已创建，等待开始克隆",
-                created_at=datetime.utcnow()
-            )
             session.add(repository)
             await session.commit()
             await session.refresh(repository)
             
-            # 启动异步克隆任务
-            clone_repository_task.delay(repository.id)
+            # 启动异步克隆任务（按用户公平调度，排队位置以仓库ID查询）
+            await FairTaskScheduler.submit(clone_repository_task, user_id, args=[repository.id], job_id=repository.id)
         
             logging.info(f"Created repository: {repository.repo_name} by user {user_id}")
             return repository
@@ -82,6 +67,107 @@ class RepoMgmtService:
             await session.rollback()
             raise
 
+    @staticmethod
+    async def create_repositories_from_urls(session: AsyncSession, user_id: str, batch_data: CreateRepositoriesBatch) -> RepositoryBatchInfo:
+        """
+        批量通过Git URL创建仓库，并提交到批量导入流水线
+
+        无效、已存在或批次内重复的仓库不创建，在结果中列出原因；其余仓库一次提交后由同一个流水线任务导入
+        """
+        if len(batch_data.repos) > settings.repo_batch_max_size:
+            raise ValueError(f"单次最多导入 {settings.repo_batch_max_size} 个仓库")
+
+        records: List[RepoRecord] = []
+        rejected: List[RejectedRepository] = []
+        seen = set()
+        for create_data in batch_data.repos:
+            try:
+                await RepoMgmtService._validate_url_repository(create_data.repo_url)
+                record = RepoMgmtService._build_url_record(user_id, create_data)
+            except Exception as e:
+                rejected.append(RejectedRepository(repo_url=create_data.repo_url, error=str(e)))
+                continue
+            identity = (record.git_type, record.repo_organization, record.repo_name)
+            if identity in seen:
+                rejected.append(RejectedRepository(repo_url=create_data.repo_url, error="批次内重复"))
+                continue
+            seen.add(identity)
+            records.append(record)
+
+        # 一次查询已存在的仓库
+        existing = await RepoMgmtService._find_existing_url_repositories(session, user_id, records)
+        if existing:
+            rejected.extend(RejectedRepository(repo_url=r.repo_url, error="仓库已存在")
+                            for r in records if (r.git_type, r.repo_organization, r.repo_name) in existing)
+            records = [r for r in records if (r.git_type, r.repo_organization, r.repo_name) not in existing]
+
+        try:
+            session.add_all(records)
+            await session.commit()
+        except Exception as e:
+            logging.error(f"Failed to create repositories in batch: {e}")
+            await session.rollback()
+            raise
+
+        batch_id = str(uuid.uuid4())
+        repo_ids = [r.id for r in records]
+        await BatchProgress.init(batch_id, user_id, repo_ids, [r.model_dump() for r in rejected])
+        if repo_ids:
+            await FairTaskScheduler.submit(ingest_repositories_task, user_id, args=[batch_id, repo_ids], job_id=batch_id)
+
+        logging.info(f"Created repository batch {batch_id}: {len(repo_ids)} repositories, {len(rejected)} rejected, by user {user_id}")
+        return RepositoryBatchInfo(batch_id=batch_id, total=len(repo_ids), repo_ids=repo_ids, rejected=rejected)
+
+    @staticmethod
+    def _build_url_record(user_id: str, create_data: CreateRepositoryFromUrl) -> RepoRecord:
+        """由Git URL构造仓库记录（未入库），状态为等待克隆"""
+        provider = RemoteGitService.get_git_provider(create_data.repo_url)
+        repo_organization, repo_name = RemoteGitService.get_git_url_info(create_data.repo_url)
+
+        # 创建本地路径
+        local_repo_path = os.path.join(RepoMgmtService._get_base_storage_path(), repo_organization, repo_name)
+        
+        # 克隆策略，未指定时使用系统默认值
+        clone_options = CloneOptions(
+            depth=create_data.clone_depth if create_data.clone_depth is not None else settings.repo_clone_depth,
+            filter=create_data.clone_filter if create_data.clone_filter is not None else settings.repo_clone_filter,
+            sparse_paths=create_data.sparse_paths or [],
+        )
+        
+        return RepoRecord(
+            id=str(uuid.uuid4()),
+            create_user_id=user_id,
+            git_type=provider,
+            repo_url=create_data.repo_url,
+            repo_organization=repo_organization,
+            repo_name=repo_name,
+            repo_description=create_data.description,
+            repo_branch=create_data.branch,
+            local_path=local_repo_path,
+            clone_strategy=clone_options.strategy,
+            clone_depth=clone_options.depth,
+            clone_filter=clone_options.filter or None,
+            sparse_paths=json.dumps(clone_options.sparse_paths, ensure_ascii=False) if clone_options.sparse_paths else None,
+            processing_status=ProcessingStatus.INIT,
+            processing_progress=0,
+            processing_message="仓库已创建，等待开始克隆",
+            created_at=datetime.utcnow()
+        )
+
+    @staticmethod
+    async def _find_existing_url_repositories(session: AsyncSession, user_id: str, records: List[RepoRecord]) -> set:
+        """用户已有的同名仓库，返回 (类型, 组织, 名称) 集合"""
+        if not records:
+            return set()
+        result = await session.execute(
+            select(RepoRecord.git_type, RepoRecord.repo_organization, RepoRecord.repo_name).where(
+                RepoRecord.create_user_id == user_id,
+                RepoRecord.repo_name.in_({r.repo_name for r in records}),
+            )
+        )
+        wanted = {(r.git_type, r.repo_organization, r.repo_name) for r in records}
+        return {tuple(row) for row in result.all()} & wanted
+
     @staticmethod
     async def _validate_url_repository(repo_url: str):
         """验证URL仓库是否可访问"""
@@ -97,6 +183,7 @@ class RepoMgmtService:
         description: str, 
         file: UploadFile) -> RepoRecord:
         """通过上传压缩包创建仓库"""
+        local_path = None
         try:
             # 检查仓库是否已存在
             existing_repo = await session.execute(
@@ -108,32 +195,38 @@ class RepoMgmtService:
             if existing_repo.scalar_one_or_none():
                 raise ValueError("仓库已存在")
 
+            if not ArchiveExtractor.is_supported(file.filename):
+                raise ValueError("不支持的压缩包格式")
+
+            # 先生成仓库ID，解压时统计的目录快照可以直接按该ID写入缓存
+            repo_id = str(uuid.uuid4())
+
             # 创建本地存储路径 - 使用用户名和仓库名构建路径
             local_path = os.path.join(RepoMgmtService._get_base_storage_path(), "uploads", user_id, name)
             os.makedirs(local_path, exist_ok=True)
             
+            # 压缩包保存在解压目录之外，不会出现在仓库目录结构中
+            archive_path = f"{local_path}.upload"
             try:
-                # 保存上传的文件
-                file_path = os.path.join(local_path, file.filename)
-                with open(file_path, "wb") as buffer:
-                    content = await file.read()
-                    buffer.write(content)
-                
-                # 解压文件
-                await RepoMgmtService._extract_archive(file_path, local_path)
-                
-                # 删除原始压缩包
-                os.remove(file_path)
-                
+                # 分块保存上传的文件，并在线程中逐条解压
+                fingerprint = await ArchiveExtractor.save_upload(file, archive_path)
+                path_infos = await asyncio.to_thread(ArchiveExtractor.extract, archive_path, local_path, file.filename)
             except Exception as e:
                 # 清理失败的文件
                 if os.path.exists(local_path):
-                    shutil.rmtree(local_path)
+                    await asyncio.to_thread(shutil.rmtree, local_path, True)
                 raise ValueError(f"处理上传文件失败: {str(e)}")
+            finally:
+                # 删除原始压缩包
+                if os.path.exists(archive_path):
+                    os.remove(archive_path)
+            
+            # 用解压时记录的文件信息预热目录缓存，首次生成目录结构无需遍历磁盘
+            await RepoMgmtService._seed_catalogue_cache(repo_id, local_path, fingerprint, path_infos)
             
             # 创建仓库记录
             repository = RepoRecord(
-                id=str(uuid.uuid4()),
+                id=repo_id,
                 create_user_id=user_id,
                 git_type="upload",
                 repo_url="",  # 上传方式没有URL
@@ -148,6 +241,13 @@ class RepoMgmtService:
             session.add(repository)
             await session.commit()
             await session.refresh(repository)
+
+            # 上传仓库只存在于接收上传的节点，上传快照供其它节点水合
+            try:
+                await RepoSnapshotService.publish(repo_id, local_path)
+                await WorkspaceManager.register(repo_id, local_path, remote=False)
+            except Exception as e:
+                logging.warning(f"仓库 {repo_id} 快照上传或登记失败: {e}")
         
             logging.info(f"Created repository from package: {repository.repo_name} by user {user_id}")
             return repository
@@ -155,22 +255,23 @@ class RepoMgmtService:
         except Exception as e:
             # 清理失败的文件
             if local_path and os.path.exists(local_path):
-                shutil.rmtree(local_path, ignore_errors=True)
+                await asyncio.to_thread(shutil.rmtree, local_path, True)
+                CatalogueCache.remove_fingerprint(local_path)
             logging.error(f"创建仓库失败: {str(e)}")
             raise
     
     @staticmethod
-    async def _extract_archive(archive_path: str, extract_path: str):
-        """解压压缩包"""
-        if archive_path.endswith('.zip'):
-            with zipfile.ZipFile(archive_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_path)
-        elif archive_path.endswith(('.tar.gz', '.tar')):
-            import tarfile
-            with tarfile.open(archive_path, 'r:*') as tar_ref:
-                tar_ref.extractall(extract_path)
-        else:
-            raise ValueError("不支持的压缩包格式")
+    async def _seed_catalogue_cache(repo_id: str, local_path: str, fingerprint: str, path_infos: List[PathInfo]):
+        """记录上传内容指纹，并写入解压时统计的目录快照"""
+        try:
+            CatalogueCache.write_fingerprint(local_path, f"upload-{fingerprint}")
+            info_list = await asyncio.to_thread(LocalRepoService.filter_folders_and_files, local_path, path_infos)
+            snapshot = CatalogueSnapshot.from_path_infos(local_path, None, info_list)
+            await CatalogueCache.put_snapshot(local_path, snapshot)
+            await CatalogueCache.put_snapshot(local_path, snapshot, repo_id)
+        except Exception as e:
+            # 缓存失败不影响创建，首次使用时会重新扫描
+            logging.warning(f"预热上传仓库目录缓存失败 {local_path}: {e}")
     
     @staticmethod
     async def create_repository_from_path(
@@ -248,39 +349,83 @@ class RepoMgmtService:
         user_id: str, 
         page: int = 1, 
         page_size: int = 10, 
-        keyword: Optional[str] = None
-    ) -> tuple[List[RepoRecord], int]:
-        """获取用户仓库列表"""
+        keyword: Optional[str] = None,
+        cursor: Optional[str] = None,
+        with_total: bool = True
+    ) -> tuple[List[RepoRecord], Optional[int], Optional[str]]:
+        """
+        获取用户仓库列表（按创建时间倒序）
+
+        传入 cursor 时使用键集分页 (created_at, id)，忽略 page；否则按页码分页。
+        总数使用 SQL COUNT，超过 repo_list_count_cap 时只返回上限值，避免大租户全量计数
+
+        Returns:
+            (仓库列表, 总数, 下一页游标)；with_total 为 False 时总数为 None，没有下一页时游标为 None
+
+        Raises:
+            ValueError: 游标格式错误
+        """
         try:
-            query = select(RepoRecord).where(RepoRecord.create_user_id == user_id)
+            conditions = [RepoRecord.create_user_id == user_id]
             
             # 如果有关键词，则按名称或描述搜索
             if keyword:
-                query = query.where(
+                conditions.append(
                     RepoRecord.repo_name.contains(keyword) | 
                     RepoRecord.repo_description.contains(keyword) |
                     RepoRecord.repo_organization.contains(keyword)
                 )
             
-            # 按创建时间降序排序
-            query = query.order_by(RepoRecord.created_at.desc())
-            
-            # 计算总数
-            count_result = await db.execute(
-                select(RepoRecord).where(query.whereclause)
-            )
-            total = len(count_result.scalars().all())
-            
-            # 获取分页数据
-            query = query.offset((page - 1) * page_size).limit(page_size)
-            result = await db.execute(query)
-            repositories = result.scalars().all()
-            
-            return repositories, total
+            # 计算总数（只统计到上限，命中复合索引时为索引范围扫描）
+            total = None
+            if with_total:
+                cap = settings.repo_list_count_cap
+                matched = select(RepoRecord.id).where(*conditions)
+                if cap > 0:
+                    matched = matched.limit(cap)
+                total = (await db.execute(select(func.count()).select_from(matched.subquery()))).scalar_one()
+            
+            # 按创建时间降序排序，ID 保证同一时间的顺序稳定
+            query = select(RepoRecord).where(*conditions)
+            if cursor:
+                created_at, last_id = RepoMgmtService._decode_list_cursor(cursor)
+                # created_at <= 游标 作为索引范围条件，OR 只在范围内过滤
+                query = query.where(
+                    RepoRecord.created_at <= created_at,
+                    (RepoRecord.created_at < created_at) | (RepoRecord.id < last_id)
+                )
+            else:
+                query = query.offset((page - 1) * page_size)
+            query = query.order_by(RepoRecord.created_at.desc(), RepoRecord.id.desc())
+            
+            # 多取一条判断是否还有下一页
+            result = await db.execute(query.limit(page_size + 1))
+            repositories = list(result.scalars().all())
+            next_cursor = None
+            if len(repositories) > page_size:
+                repositories = repositories[:page_size]
+                last = repositories[-1]
+                next_cursor = RepoMgmtService._encode_list_cursor(last.created_at, last.id)
+            
+            return repositories, total, next_cursor
         except Exception as e:
             logging.error(f"Failed to get repository list: {e}")
             raise
 
+    @staticmethod
+    def _encode_list_cursor(created_at: datetime, repository_id: str) -> str:
+        payload = json.dumps({"c": created_at.isoformat(), "i": repository_id}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def _decode_list_cursor(cursor: str) -> tuple[datetime, str]:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            return datetime.fromisoformat(data["c"]), str(data["i"])
+        except Exception:
+            raise ValueError("无效的分页游标")
+
     @staticmethod
     async def update_repository(
         db: AsyncSession,
@@ -304,7 +449,10 @@ class RepoMgmtService:
             if update_data.branch is not None:
                 repository.repo_branch = update_data.branch
                 # 如果更新了分支，需要重新克隆或切换分支
-                await RepoMgmtService._update_repository_branch(repository, update_data.branch)
+                await RepoMgmtService._update_repository_branch(db, repository, update_data.branch)
+            
+            if update_data.sparse_paths is not None:
+                await RepoMgmtService._update_repository_sparse_paths(db, repository, update_data.sparse_paths)
             
             repository.updated_at = datetime.utcnow()
             
@@ -319,7 +467,7 @@ class RepoMgmtService:
             raise
     
     @staticmethod
-    async def _update_repository_branch(repository: RepoRecord, new_branch: str):
+    async def _update_repository_branch(db: AsyncSession, repository: RepoRecord, new_branch: str):
         """更新仓库分支"""
         try:
             # 检查仓库类型
@@ -334,8 +482,12 @@ class RepoMgmtService:
                     logging.warning(f"Repository {repository.repo_name} is not a Git repository, cannot switch branch")
                     return
             
+            # 工作副本可能已被磁盘配额淘汰或在其它节点克隆，先从快照或远端恢复
+            if not await WorkspaceManager.ensure_local(db, repository):
+                raise ValueError(f"仓库 {repository.id} 本地工作副本不可用")
+            
             # 使用GitService切换分支
-            success = RemoteGitService.checkout_branch(repository.local_path, new_branch)
+            success = await RemoteGitService.checkout_branch(repository.local_path, new_branch)
             if success:
                 logging.info(f"Successfully switched repository {repository.repo_name} to branch {new_branch}")
             else:
@@ -346,6 +498,22 @@ class RepoMgmtService:
             logging.error(f"更新仓库分支失败: {e}")
             raise
     
+    @staticmethod
+    async def _update_repository_sparse_paths(db: AsyncSession, repository: RepoRecord, sparse_paths: List[str]):
+        """更新仓库稀疏检出规则"""
+        if repository.git_type in ("upload", "path"):
+            raise ValueError("仅支持修改远程克隆仓库的稀疏检出规则")
+        
+        if repository.is_cloned:
+            if not await WorkspaceManager.ensure_local(db, repository):
+                raise ValueError(f"仓库 {repository.id} 本地工作副本不可用")
+            success = await RemoteGitService.set_sparse_paths(repository.local_path, sparse_paths)
+            if not success:
+                raise ValueError("修改稀疏检出规则失败")
+        
+        repository.sparse_paths = json.dumps(sparse_paths, ensure_ascii=False) if sparse_paths else None
+        repository.clone_strategy = CloneOptions.from_record(repository).strategy
+    
     @staticmethod
     async def delete_repository(db: AsyncSession, repository_id: str, user_id: str) -> bool:
         """删除仓库"""
@@ -360,6 +528,16 @@ class RepoMgmtService:
             # 删除本地文件
             if repository.local_path and os.path.exists(repository.local_path):
                 shutil.rmtree(repository.local_path)
+            if repository.local_path:
+                CatalogueCache.remove_fingerprint(repository.local_path)
+                FileHistoryIndexer.invalidate(repository.local_path)
+                WorkspaceManager.forget(repository.local_path)
+            try:
+                await RepoSnapshotService.delete(repository_id)
+            except Exception as e:
+                logging.warning(f"删除仓库 {repository_id} 快照失败: {e}")
+            # 释放共享产物引用，其它仓库记录不再引用的产物随之删除
+            await ArtifactStore.release(db, repository_id)
             
             await db.execute(delete(RepoRecord).where(RepoRecord.id == repository_id))
             await db.commit()
@@ -0,0 +1,325 @@
+import io
+import os
+import json
+import time
+import uuid
+import shutil
+import asyncio
+import hashlib
+import logging
+import tarfile
+import weakref
+from datetime import datetime
+from typing import Dict, Optional
+from filelock import FileLock
+from app.config.settings import settings
+from app.infrastructure.storage import STORAGE_CONN
+from app.domains.repo_mgmt.services.git_driver import AsyncGitDriver
+from app.domains.repo_mgmt.services.catalogue_cache import CatalogueCache
+from app.domains.repo_mgmt.services.file_history_index import FileHistoryIndexer
+from app.domains.code_search.code_search_service import CodeSearchService
+
+
+# 快照压缩包内的目录：工作副本（含 .git 及其中的文件历史索引）与派生索引
+_WORKTREE_DIR = "worktree"
+_CODE_SEARCH_DIR = "indexes/code_search"
+# 读写对象存储时的块大小
+_CHUNK_SIZE = 1024 * 1024
+
+
+class RepoSnapshotService:
+    """
+    仓库工作副本快照
+
+    克隆完成后将工作副本（含 .git）与代码检索索引打包上传到对象存储，并写入指向最新快照的清单；
+    其它节点首次访问仓库时按清单下载快照并解压到相同的本地路径（水合），无需重新克隆。
+    下载的压缩包按内容哈希缓存在本地，同一节点上同一仓库的水合只执行一次（进程内协程锁 + 跨进程文件锁）
+    """
+
+    # 每个事件循环一组协程锁（Celery 任务各自 asyncio.run，锁不能跨事件循环复用）
+    _flights: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Lock]]" = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def _manifest_key(repo_id: str) -> str:
+        return f"repo-snapshot-{repo_id}.json"
+
+    @staticmethod
+    def _archive_key(digest: str) -> str:
+        return f"repo-snapshot-{digest}.tar.gz"
+
+    @staticmethod
+    def _cache_path(digest: str) -> str:
+        return os.path.join(settings.repo_snapshot_cache_path, "objects", digest[:2], f"{digest}.tar.gz")
+
+    @staticmethod
+    def _is_current(local_path: str, version: Optional[str]) -> bool:
+        if not local_path or not os.path.isdir(local_path):
+            return False
+        return not version or CatalogueCache.get_version(local_path) == version
+
+    @staticmethod
+    async def get_manifest(repo_id: str) -> Optional[dict]:
+        """读取仓库最新快照清单；不存在时返回 None"""
+        stream = await STORAGE_CONN.get(RepoSnapshotService._manifest_key(repo_id))
+        if stream is None:
+            return None
+        try:
+            data = await asyncio.to_thread(stream.read)
+        finally:
+            await asyncio.to_thread(stream.close)
+        try:
+            return json.loads(data)
+        except ValueError:
+            logging.warning(f"仓库 {repo_id} 快照清单损坏")
+            return None
+
+    @staticmethod
+    async def publish(repo_id: str, local_path: str) -> Optional[dict]:
+        """
+        打包并上传工作副本快照（未启用快照或版本未变化时跳过）
+
+        Returns:
+            新的快照清单；跳过时返回 None
+        """
+        if not settings.repo_snapshot_enabled or not os.path.isdir(local_path):
+            return None
+        version = CatalogueCache.get_version(local_path)
+        previous = await RepoSnapshotService.get_manifest(repo_id)
+        if previous and version and previous.get("version") == version:
+            return None
+
+        start = time.perf_counter()
+        # 通过 alternates 引用本地镜像的克隆在其它节点上不完整，打包前先将引用的对象复制到仓库内
+        if os.path.isfile(os.path.join(local_path, ".git", "objects", "info", "alternates")):
+            await AsyncGitDriver.run(["repack", "-a", "-d", "-q"], cwd=local_path, timeout=settings.git_clone_timeout)
+            os.remove(os.path.join(local_path, ".git", "objects", "info", "alternates"))
+
+        tmp_path = os.path.join(settings.repo_snapshot_cache_path, "tmp", f"{uuid.uuid4().hex}.tar.gz")
+        try:
+            digest, size = await asyncio.to_thread(RepoSnapshotService._pack, local_path, tmp_path)
+            cache_path = RepoSnapshotService._cache_path(digest)
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            os.replace(tmp_path, cache_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        archive_key = RepoSnapshotService._archive_key(digest)
+        with open(cache_path, "rb") as f:
+            await STORAGE_CONN.put(archive_key, f, content_type="application/gzip",
+                                   metadata={"repo_id": repo_id, "version": version or ""})
+        manifest = {
+            "repo_id": repo_id,
+            "version": version,
+            "sha256": digest,
+            "size": size,
+            "key": archive_key,
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        await STORAGE_CONN.put(RepoSnapshotService._manifest_key(repo_id),
+                               io.BytesIO(json.dumps(manifest).encode("utf-8")), content_type="application/json")
+        # 清单已指向新快照，旧快照不再被引用
+        if previous and previous.get("key") and previous.get("key") != archive_key:
+            await STORAGE_CONN.delete(previous["key"])
+        await asyncio.to_thread(RepoSnapshotService._evict_cache)
+        logging.info(f"仓库 {repo_id} 快照已上传: {version} {size} 字节，耗时 {time.perf_counter() - start:.1f}s")
+        return manifest
+
+    @staticmethod
+    async def ensure_local(repo_id: str, local_path: str, version: Optional[str] = None) -> bool:
+        """
+        确保本地存在仓库工作副本，不存在或版本不一致时从快照水合
+
+        Args:
+            repo_id: 仓库ID
+            local_path: 工作副本路径
+            version: 期望的版本（HEAD sha 或上传内容指纹），为空时只要求目录存在
+
+        Returns:
+            本地工作副本是否存在（快照版本与期望不一致时记录警告，仍使用已有或快照中的副本）
+        """
+        if RepoSnapshotService._is_current(local_path, version):
+            return True
+        if not settings.repo_snapshot_enabled or not local_path:
+            return os.path.isdir(local_path or "")
+
+        loop = asyncio.get_running_loop()
+        flights = RepoSnapshotService._flights.setdefault(loop, {})
+        lock = flights.setdefault(repo_id, asyncio.Lock())
+        async with lock:
+            # 同进程内已有协程完成水合
+            if RepoSnapshotService._is_current(local_path, version):
+                return True
+            lock_dir = os.path.join(settings.repo_snapshot_cache_path, "locks")
+            os.makedirs(lock_dir, exist_ok=True)
+            file_lock = FileLock(os.path.join(lock_dir, f"{repo_id}.lock"),
+                                 timeout=settings.repo_snapshot_lock_timeout, thread_local=False)
+            await asyncio.to_thread(file_lock.acquire)
+            try:
+                # 同节点其它进程已完成水合
+                if RepoSnapshotService._is_current(local_path, version):
+                    return True
+                await RepoSnapshotService._hydrate(repo_id, local_path, version)
+            except Exception as e:
+                logging.warning(f"仓库 {repo_id} 快照水合失败: {e}")
+            finally:
+                file_lock.release()
+                flights.pop(repo_id, None)
+        return os.path.isdir(local_path)
+
+    @staticmethod
+    async def _hydrate(repo_id: str, local_path: str, version: Optional[str]) -> None:
+        manifest = await RepoSnapshotService.get_manifest(repo_id)
+        if not manifest:
+            logging.info(f"仓库 {repo_id} 没有可用快照")
+            return
+        if version and manifest.get("version") != version:
+            logging.warning(f"仓库 {repo_id} 最新快照版本 {manifest.get('version')} 与期望版本 {version} 不一致")
+            # 本地已有副本时不用另一个不一致的版本覆盖
+            if os.path.isdir(local_path):
+                return
+
+        start = time.perf_counter()
+        digest = manifest["sha256"]
+        cache_path = RepoSnapshotService._cache_path(digest)
+        if os.path.isfile(cache_path):
+            os.utime(cache_path)
+        else:
+            await RepoSnapshotService._download(manifest["key"], digest, cache_path)
+
+        await asyncio.to_thread(RepoSnapshotService._unpack, cache_path, local_path, manifest.get("version"))
+        await asyncio.to_thread(RepoSnapshotService._evict_cache)
+        logging.info(f"仓库 {repo_id} 已从快照水合: {manifest.get('version')}，耗时 {time.perf_counter() - start:.1f}s")
+
+    @staticmethod
+    async def _download(key: str, digest: str, cache_path: str) -> None:
+        """下载快照到本地缓存并校验内容哈希"""
+        stream = await STORAGE_CONN.get(key)
+        if stream is None:
+            raise FileNotFoundError(f"快照不存在: {key}")
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+
+        def _copy():
+            hasher = hashlib.sha256()
+            with open(tmp_path, "wb") as f:
+                while True:
+                    chunk = stream.read(_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    f.write(chunk)
+            return hasher.hexdigest()
+
+        try:
+            actual = await asyncio.to_thread(_copy)
+            if actual != digest:
+                raise ValueError(f"快照校验失败: {key}")
+            os.replace(tmp_path, cache_path)
+        finally:
+            await asyncio.to_thread(stream.close)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def _pack(local_path: str, archive_path: str) -> tuple:
+        """打包工作副本与代码检索索引，返回 (sha256, 字节数)"""
+        os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+        with tarfile.open(archive_path, "w:gz", compresslevel=settings.repo_snapshot_compress_level) as tar:
+            # 跳过 git 运行时的锁文件（工作区中的 *.lock 如 poetry.lock 照常打包）
+            tar.add(local_path, arcname=_WORKTREE_DIR,
+                    filter=lambda info: None if "/.git/" in info.name and info.name.endswith(".lock") else info)
+            index_dir = CodeSearchService.get_index_dir(local_path)
+            if os.path.isdir(index_dir):
+                tar.add(index_dir, arcname=_CODE_SEARCH_DIR)
+
+        hasher = hashlib.sha256()
+        with open(archive_path, "rb") as f:
+            for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+                hasher.update(chunk)
+        return hasher.hexdigest(), os.path.getsize(archive_path)
+
+    @staticmethod
+    def _unpack(archive_path: str, local_path: str, version: Optional[str]) -> None:
+        """解压快照：先解压到临时目录，再替换工作副本与索引目录"""
+        local_path = os.path.normpath(os.path.abspath(local_path))
+        staging = f"{local_path}.hydrate-{uuid.uuid4().hex[:8]}"
+        try:
+            with tarfile.open(archive_path, "r:gz") as tar:
+                members = [m for m in tar.getmembers() if RepoSnapshotService._is_safe_member(m)]
+                kwargs = {"filter": "tar"} if hasattr(tarfile, "tar_filter") else {}
+                tar.extractall(staging, members=members, **kwargs)
+
+            worktree = os.path.join(staging, _WORKTREE_DIR)
+            if not os.path.isdir(worktree):
+                raise ValueError(f"快照内容不完整: {archive_path}")
+            FileHistoryIndexer.invalidate(local_path)
+            RepoSnapshotService._replace_dir(worktree, local_path)
+            if not os.path.isdir(os.path.join(local_path, ".git")) and version:
+                CatalogueCache.write_fingerprint(local_path, version)
+
+            index_src = os.path.join(staging, _CODE_SEARCH_DIR)
+            if os.path.isdir(index_src):
+                RepoSnapshotService._replace_dir(index_src, CodeSearchService.get_index_dir(local_path))
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    @staticmethod
+    def _replace_dir(src: str, dst: str) -> None:
+        """用 src 替换 dst（先移走旧目录再改名，读取方不会看到半解压的目录）"""
+        os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+        backup = None
+        if os.path.exists(dst):
+            backup = f"{dst}.old-{uuid.uuid4().hex[:8]}"
+            os.replace(dst, backup)
+        os.replace(src, dst)
+        if backup:
+            shutil.rmtree(backup, ignore_errors=True)
+
+    @staticmethod
+    def _is_safe_member(member: tarfile.TarInfo) -> bool:
+        """只解压快照目录内的普通文件、目录与符号链接"""
+        name = os.path.normpath(member.name)
+        if os.path.isabs(name) or name.startswith(".."):
+            return False
+        if not (name == _WORKTREE_DIR or name.startswith(f"{_WORKTREE_DIR}/") or name.startswith("indexes/")):
+            return False
+        if member.islnk():
+            target = os.path.normpath(member.linkname)
+            return not os.path.isabs(target) and not target.startswith("..")
+        return member.isfile() or member.isdir() or member.issym()
+
+    @staticmethod
+    def _evict_cache() -> None:
+        """本地快照缓存超过上限时按最近使用时间删除最旧的压缩包"""
+        objects_dir = os.path.join(settings.repo_snapshot_cache_path, "objects")
+        entries = []
+        for root, _, files in os.walk(objects_dir):
+            for name in files:
+                if not name.endswith(".tar.gz"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= settings.repo_snapshot_cache_size:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    @staticmethod
+    async def delete(repo_id: str) -> None:
+        """删除仓库的快照与清单（仓库删除时调用）"""
+        if not settings.repo_snapshot_enabled:
+            return
+        manifest = await RepoSnapshotService.get_manifest(repo_id)
+        if manifest and manifest.get("key"):
+            await STORAGE_CONN.delete(manifest["key"])
+        await STORAGE_CONN.delete(RepoSnapshotService._manifest_key(repo_id))
@@ -0,0 +1,386 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+from filelock import FileLock, Timeout
+from app.config.settings import settings
+
+
+class WorkspaceManager:
+    """
+    本地工作副本磁盘配额管理
+
+    每个由本服务创建的工作副本（克隆、上传、快照水合）在登记目录中有一个条目，记录仓库ID、路径与占用字节数，
+    条目文件的修改时间即最近访问时间（目录、文件与代码分析读取时更新）。
+    总占用超过 workspace_max_bytes 时按最近访问时间淘汰可恢复（有远端地址或快照）的工作副本，
+    再次访问时通过 ensure_local 从快照或远端恢复。服务端路径导入的仓库不登记，不会被淘汰。
+    上游镜像（GitMirrorCache）同样登记并计入配额，没有工作副本通过 alternates 引用时可以淘汰，下次克隆时重新创建；
+    克隆开始到工作副本登记之间，工作副本对镜像的引用通过 pin 记录
+    """
+
+    # 进程内最近一次更新访问时间，用于限制 utime 调用频率
+    _touched: Dict[str, float] = {}
+    _touched_lock = threading.Lock()
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return hashlib.sha1(os.path.normpath(os.path.abspath(path)).encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def _entry_path(path: str) -> str:
+        return os.path.join(settings.workspace_registry_path, f"{WorkspaceManager._key(path)}.json")
+
+    @staticmethod
+    def _lock(path: str, timeout: float) -> FileLock:
+        """单个工作副本的锁：恢复与淘汰互斥"""
+        os.makedirs(settings.workspace_registry_path, exist_ok=True)
+        return FileLock(os.path.join(settings.workspace_registry_path, f"{WorkspaceManager._key(path)}.lock"),
+                        timeout=timeout, thread_local=False)
+
+    @staticmethod
+    def _is_managed_path(path: str) -> bool:
+        """只管理仓库存储目录下的工作副本"""
+        base = os.path.realpath(settings.repo_storage_path)
+        return os.path.realpath(path).startswith(base + os.sep)
+
+    @staticmethod
+    def touch(path: Optional[str]) -> None:
+        """记录一次访问（未登记的路径忽略；同一路径在 workspace_touch_interval 秒内只更新一次）"""
+        if not path:
+            return
+        now = time.time()
+        key = WorkspaceManager._key(path)
+        with WorkspaceManager._touched_lock:
+            if now - WorkspaceManager._touched.get(key, 0) < settings.workspace_touch_interval:
+                return
+            WorkspaceManager._touched[key] = now
+        try:
+            os.utime(WorkspaceManager._entry_path(path))
+        except OSError:
+            pass
+
+    @staticmethod
+    async def register(repo_id: str, path: str, remote: bool) -> None:
+        """
+        登记工作副本并统计占用，随后检查配额
+
+        Args:
+            remote: 是否可从远端重新克隆（上传仓库只能从快照恢复）
+        """
+        if not path:
+            return
+        # 登记后 alternates 中的镜像引用已计入，不再需要 pin
+        WorkspaceManager.unpin(path)
+        if not os.path.isdir(path) or not WorkspaceManager._is_managed_path(path):
+            return
+        size = await asyncio.to_thread(WorkspaceManager._disk_usage, path)
+        WorkspaceManager._write_entry(path, {
+            "kind": "workspace",
+            "repo_id": repo_id,
+            "path": os.path.normpath(os.path.abspath(path)),
+            "size": size,
+            "remote": remote,
+            "registered_at": time.time(),
+        })
+        await WorkspaceManager.enforce(exclude=path)
+
+    @staticmethod
+    async def register_mirror(path: str) -> None:
+        """登记上游镜像并统计占用（创建或刷新后调用），随后检查配额"""
+        if not path or not os.path.isdir(path) or not WorkspaceManager._is_managed_path(path):
+            return
+        size = await asyncio.to_thread(WorkspaceManager._disk_usage, path)
+        WorkspaceManager._write_entry(path, {
+            "kind": "mirror",
+            "repo_id": None,
+            "path": os.path.normpath(os.path.abspath(path)),
+            "size": size,
+            "remote": True,
+            "registered_at": time.time(),
+        })
+        await WorkspaceManager.enforce(exclude=path)
+
+    @staticmethod
+    def _write_entry(path: str, entry: dict) -> None:
+        os.makedirs(settings.workspace_registry_path, exist_ok=True)
+        entry_path = WorkspaceManager._entry_path(path)
+        tmp_path = f"{entry_path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, entry_path)
+
+    @staticmethod
+    def forget(path: Optional[str]) -> None:
+        """移除登记（仓库删除时调用）"""
+        if not path:
+            return
+        WorkspaceManager.unpin(path)
+        try:
+            os.remove(WorkspaceManager._entry_path(path))
+        except OSError:
+            pass
+
+    @staticmethod
+    def pin(path: str, mirror_path: str) -> None:
+        """
+        记录即将通过 clone --reference 引用镜像的工作副本（在持有镜像锁时调用）
+
+        克隆过程中工作副本尚未登记，淘汰时看不到它的 alternates；pin 在工作副本登记、forget 或克隆失败时移除，
+        进程异常退出遗留的 pin 超过 2×git_clone_timeout 后失效
+        """
+        os.makedirs(settings.workspace_registry_path, exist_ok=True)
+        pin_path = os.path.join(settings.workspace_registry_path, f"{WorkspaceManager._key(path)}.pin")
+        tmp_path = f"{pin_path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(os.path.realpath(mirror_path))
+        os.replace(tmp_path, pin_path)
+
+    @staticmethod
+    def unpin(path: Optional[str]) -> None:
+        if not path:
+            return
+        try:
+            os.remove(os.path.join(settings.workspace_registry_path, f"{WorkspaceManager._key(path)}.pin"))
+        except OSError:
+            pass
+
+    @staticmethod
+    def _pinned_mirrors() -> Counter:
+        """各镜像被多少个克隆中的工作副本 pin"""
+        pinned = Counter()
+        registry = settings.workspace_registry_path
+        try:
+            names = os.listdir(registry)
+        except OSError:
+            return pinned
+        deadline = time.time() - settings.git_clone_timeout * 2
+        for name in names:
+            if not name.endswith(".pin"):
+                continue
+            try:
+                pin_path = os.path.join(registry, name)
+                if os.path.getmtime(pin_path) < deadline:
+                    continue
+                with open(pin_path, "r", encoding="utf-8") as f:
+                    pinned[f.read().strip()] += 1
+            except OSError:
+                continue
+        return pinned
+
+    @staticmethod
+    def list_workspaces() -> List[dict]:
+        """所有已登记的工作副本，按最近访问时间升序"""
+        registry = settings.workspace_registry_path
+        entries = []
+        try:
+            names = os.listdir(registry)
+        except OSError:
+            return entries
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            entry_path = os.path.join(registry, name)
+            try:
+                with open(entry_path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+                entry["last_access"] = os.path.getmtime(entry_path)
+            except (OSError, ValueError):
+                continue
+            entries.append(entry)
+        entries.sort(key=lambda e: e["last_access"])
+        return entries
+
+    @staticmethod
+    async def enforce(exclude: Optional[str] = None) -> List[str]:
+        """
+        总占用超过配额时淘汰最久未访问的工作副本与上游镜像
+
+        跳过：exclude 指定的路径、空闲时间不足 workspace_min_idle_seconds 的、正在恢复中的、
+        无法恢复的（上传仓库且没有快照），以及仍被工作副本引用或正在更新的镜像
+
+        Returns:
+            被淘汰的仓库ID列表（镜像以路径表示）
+        """
+        budget = settings.workspace_max_bytes
+        if budget <= 0:
+            return []
+        os.makedirs(settings.workspace_registry_path, exist_ok=True)
+        # 同一时间只有一个进程执行淘汰，其它进程直接跳过
+        evict_lock = FileLock(os.path.join(settings.workspace_registry_path, "evict.lock"), timeout=0, thread_local=False)
+        try:
+            evict_lock.acquire()
+        except Timeout:
+            return []
+
+        evicted = []
+        try:
+            entries = WorkspaceManager.list_workspaces()
+            total = sum(e.get("size", 0) for e in entries)
+            if total <= budget:
+                return []
+            exclude_path = os.path.normpath(os.path.abspath(exclude)) if exclude else None
+            # 各镜像被多少个工作副本通过 alternates 引用（含克隆中、尚未登记的工作副本）
+            mirror_refs = WorkspaceManager._pinned_mirrors()
+            for entry in entries:
+                if entry.get("kind") != "mirror":
+                    mirror_refs.update(WorkspaceManager._alternates(entry["path"]))
+            now = time.time()
+            for entry in entries:
+                if total <= budget:
+                    break
+                path = entry["path"]
+                is_mirror = entry.get("kind") == "mirror"
+                if not os.path.isdir(path):
+                    WorkspaceManager.forget(path)
+                    total -= entry.get("size", 0)
+                    continue
+                if path == exclude_path or now - entry["last_access"] < settings.workspace_min_idle_seconds:
+                    continue
+                if is_mirror:
+                    if mirror_refs[os.path.realpath(path)] > 0:
+                        continue
+                    # 与镜像创建、刷新互斥
+                    lock = FileLock(f"{path}.lock", timeout=0, thread_local=False)
+                else:
+                    if not await WorkspaceManager._is_restorable(entry):
+                        continue
+                    lock = WorkspaceManager._lock(path, timeout=0)
+                try:
+                    lock.acquire()
+                except Timeout:
+                    continue
+                try:
+                    if is_mirror:
+                        # pin 在持有镜像锁时写入，加锁后再检查一次，避免删除刚开始克隆时引用的镜像
+                        if WorkspaceManager._pinned_mirrors()[os.path.realpath(path)] > 0:
+                            continue
+                        await asyncio.to_thread(WorkspaceManager._remove_tree, path)
+                    else:
+                        alternates = WorkspaceManager._alternates(path)
+                        await asyncio.to_thread(WorkspaceManager._remove, path)
+                        mirror_refs.subtract(alternates)
+                    WorkspaceManager.forget(path)
+                finally:
+                    lock.release()
+                total -= entry.get("size", 0)
+                evicted.append(path if is_mirror else entry["repo_id"])
+                logging.info(f"淘汰{'上游镜像' if is_mirror else '工作副本 ' + str(entry['repo_id'])} {path}: "
+                             f"释放 {entry.get('size', 0)} 字节，空闲 {int(now - entry['last_access'])}s")
+            if total > budget:
+                logging.warning(f"工作副本占用 {total} 字节仍超过配额 {budget}（其余副本正在使用或无法恢复）")
+        finally:
+            evict_lock.release()
+        return evicted
+
+    @staticmethod
+    async def _is_restorable(entry: dict) -> bool:
+        if entry.get("remote"):
+            return True
+        if not settings.repo_snapshot_enabled:
+            return False
+        from app.domains.repo_mgmt.services.repo_snapshot_service import RepoSnapshotService
+        try:
+            return await RepoSnapshotService.get_manifest(entry["repo_id"]) is not None
+        except Exception:
+            return False
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        """删除工作副本及其派生数据（代码检索索引、目录指纹、进程内文件历史索引）"""
+        from app.domains.repo_mgmt.services.catalogue_cache import CatalogueCache
+        from app.domains.repo_mgmt.services.file_history_index import FileHistoryIndexer
+        from app.domains.code_search.code_search_service import CodeSearchService
+        FileHistoryIndexer.invalidate(path)
+        WorkspaceManager._remove_tree(path)
+        shutil.rmtree(CodeSearchService.get_index_dir(path), ignore_errors=True)
+        CatalogueCache.remove_fingerprint(path)
+
+    @staticmethod
+    def _remove_tree(path: str) -> None:
+        # 先改名再删除，读取方不会看到删除到一半的目录
+        trash = f"{path}.evicted-{uuid.uuid4().hex[:8]}"
+        os.replace(path, trash)
+        shutil.rmtree(trash, ignore_errors=True)
+
+    @staticmethod
+    def _alternates(path: str) -> List[str]:
+        """工作副本通过 alternates 引用的仓库（clone --reference 写入的镜像 objects 目录）"""
+        alternates_file = os.path.join(path, ".git", "objects", "info", "alternates")
+        try:
+            with open(alternates_file, "r", encoding="utf-8") as f:
+                lines = [line.strip() for line in f]
+        except OSError:
+            return []
+        objects_dir = os.path.join(path, ".git", "objects")
+        return [os.path.realpath(os.path.dirname(os.path.join(objects_dir, line)))
+                for line in lines if line and not line.startswith("#")]
+
+    @staticmethod
+    def _disk_usage(path: str) -> int:
+        """统计目录实际占用的磁盘字节数（不跟随符号链接）"""
+        total = 0
+        for root, dirs, files in os.walk(path):
+            for name in dirs + files:
+                try:
+                    stat = os.lstat(os.path.join(root, name))
+                except OSError:
+                    continue
+                total += stat.st_blocks * 512 if hasattr(stat, "st_blocks") else stat.st_size
+        return total
+
+    @staticmethod
+    async def ensure_local(session, repo_record) -> bool:
+        """
+        确保仓库工作副本在本地可用，被淘汰或在其它节点创建时依次尝试快照水合与从远端重新克隆
+
+        Args:
+            session: 数据库会话（重新克隆时读取用户 git 凭据）
+            repo_record: 仓库记录
+
+        Returns:
+            工作副本是否可用
+        """
+        from app.domains.repo_mgmt.services.repo_snapshot_service import RepoSnapshotService
+        from app.domains.repo_mgmt.services.remote_git_service import RemoteGitService, CloneOptions
+        from app.domains.repo_mgmt.services.repo_ingest_service import RepoIngestService
+        from app.domains.repo_mgmt.services.host_rate_limiter import HostRateLimiter
+
+        path = repo_record.local_path
+        if not path:
+            return False
+        remote = bool(repo_record.repo_url)
+        existed = os.path.isdir(path)
+        lock = WorkspaceManager._lock(path, timeout=settings.workspace_lock_timeout)
+        await asyncio.to_thread(lock.acquire)
+        try:
+            available = await RepoSnapshotService.ensure_local(repo_record.id, path, repo_record.version)
+            if not available and remote:
+                logging.info(f"仓库 {repo_record.id} 本地工作副本不存在，从远端重新克隆")
+                # 与导入时的克隆共用按远端主机的并发与速率限制
+                async with HostRateLimiter.acquire(RepoIngestService.remote_host(repo_record.repo_url)):
+                    await RemoteGitService.clone_repository(
+                        session=session,
+                        repository_url=repo_record.repo_url,
+                        local_repo_path=path,
+                        branch=repo_record.repo_branch,
+                        user_id=repo_record.create_user_id,
+                        options=CloneOptions.from_record(repo_record),
+                    )
+                available = os.path.isdir(path)
+        finally:
+            lock.release()
+
+        if not available:
+            return False
+        if not existed or not os.path.exists(WorkspaceManager._entry_path(path)):
+            await WorkspaceManager.register(repo_record.id, path, remote)
+        else:
+            WorkspaceManager.touch(path)
+        return True
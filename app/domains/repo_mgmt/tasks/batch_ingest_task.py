@@ -0,0 +1,15 @@
+import logging
+from typing import List
+from app.config.settings import settings
+from app.infrastructure.celery.app import celery_app
+from app.infrastructure.celery.event_loop import run_async
+from app.infrastructure.celery.queues import WorkloadQueue, task_options
+from app.domains.repo_mgmt.services.batch_ingest_service import BatchIngestPipeline
+
+
+@celery_app.task(bind=True, **task_options(WorkloadQueue.GIT_IO, time_limit=settings.repo_batch_time_limit,
+                                             soft_time_limit=settings.repo_batch_time_limit - 60))
+def ingest_repositories_task(self, batch_id: str, repo_ids: List[str]):
+    """批量导入仓库任务：克隆、扫描目录、构建索引流水线执行"""
+    logging.info(f"开始批量导入 {batch_id}: {len(repo_ids)} 个仓库")
+    return run_async(BatchIngestPipeline(batch_id, repo_ids).run(), timeout=self.soft_time_limit)
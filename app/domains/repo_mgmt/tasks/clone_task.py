@@ -1,14 +1,17 @@
 import asyncio
 import logging
-from datetime import datetime
-from sqlalchemy import select, update
 from app.infrastructure.celery.app import celery_app
+from app.infrastructure.celery.event_loop import run_async
+from app.infrastructure.celery.queues import WorkloadQueue, task_options
+from app.infrastructure.celery.fair_scheduler import FairTaskScheduler
 from app.infrastructure.database.factory import get_db
-from app.domains.repo_mgmt.models.repository import RepoRecord, ProcessingStatus
-from app.domains.repo_mgmt.services.remote_git_service import RemoteGitService
+from app.domains.repo_mgmt.models.repository import ProcessingStatus
+from app.domains.repo_mgmt.services.progress_reporter import ProgressReporter
+from app.domains.repo_mgmt.services.repo_ingest_service import RepoIngestService
+from app.domains.repo_mgmt.tasks.index_task import index_repository_task
 
 
-@celery_app.task(bind=True)
+@celery_app.task(bind=True, **task_options(WorkloadQueue.GIT_IO))
 def clone_repository_task(self, repo_id: str):
     """异步克隆仓库任务"""
     
@@ -16,67 +19,32 @@ def clone_repository_task(self, repo_id: str):
         async for session in get_db():
             try:                                
                 # 获取仓库信息
-                result = await session.execute(
-                    select(RepoRecord).where(RepoRecord.id == repo_id)
-                )
-                repo_record = result.scalar_one_or_none()
-                if not repo_record:
-                    raise Exception(f"仓库 {repo_id} 不存在")
+                repo_record = await RepoIngestService.get_record(session, repo_id)
 
-                # 更新状态为克隆中
-                await session.execute(
-                    update(RepoRecord)
-                    .where(RepoRecord.id == repo_id)
-                    .values(
-                        processing_status=ProcessingStatus.CLONING,
-                        processing_progress=10,
-                        processing_message="开始克隆仓库",
-                        updated_at=datetime.utcnow()
-                    )
-                )
-                await session.commit()
-                
-                # 执行克隆操作（同步等待完成）
-                git_info = await RemoteGitService.clone_repository(
-                    session=session,
-                    repository_url=repo_record.repo_url,
-                    local_repo_path=repo_record.local_path,
-                    branch=repo_record.repo_branch,
-                    user_id=repo_record.create_user_id
-                )
+                # 进度写入 Redis 并推送，数据库只在状态变化或按间隔写入
+                reporter = ProgressReporter(session, repo_id)
+
+                # 克隆（git 子进程异步执行）
+                version = await RepoIngestService.clone(session, repo_record, reporter)
                 
-                # 克隆成功，更新仓库信息
-                await session.execute(
-                    update(RepoRecord)
-                    .where(RepoRecord.id == repo_id)
-                    .values(
-                        version=git_info.version,
-                        processing_status=ProcessingStatus.COMPLETED,
-                        processing_progress=100,
-                        processing_message="仓库克隆完成",
-                        is_cloned=True,
-                        updated_at=datetime.utcnow()
-                    )
+                # 在本节点上传快照并登记工作副本：analysis worker 可能在其它节点，从快照水合而不必再次克隆
+                await RepoIngestService.publish(repo_record)
+
+                # 克隆成功，更新仓库信息；构建索引为 CPU 密集任务，交给 analysis 队列
+                await reporter.transition(
+                    ProcessingStatus.CHUNKING, 95, "克隆完成，等待构建代码索引",
+                    version=version,
+                    is_cloned=True
                 )
-                await session.commit()
+                await FairTaskScheduler.submit(index_repository_task, repo_record.create_user_id,
+                                               args=[repo_id, version], job_id=repo_id)
                 logging.info(f"仓库 {repo_record.repo_name} 克隆完成")
                 
-            except Exception as e:
+            except (Exception, asyncio.CancelledError) as e:
                 # 更新状态为失败
-                await session.execute(
-                    update(RepoRecord)
-                    .where(RepoRecord.id == repo_id)
-                    .values(
-                        processing_status=ProcessingStatus.FAILED,
-                        processing_progress=0,
-                        processing_message="克隆失败",
-                        processing_error=str(e),
-                        updated_at=datetime.utcnow()
-                    )
-                )
-                await session.commit()
+                await ProgressReporter(session, repo_id).fail("克隆失败", str(e) or "任务超时或被取消")
                 logging.error(f"仓库 {repo_id} 克隆失败: {e}")
                 raise
     
     # 运行异步任务
-    asyncio.run(_clone_repository())
+    run_async(_clone_repository(), timeout=self.soft_time_limit)
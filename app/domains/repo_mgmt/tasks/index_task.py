@@ -0,0 +1,42 @@
+import asyncio
+import logging
+from typing import Optional
+from app.infrastructure.celery.app import celery_app
+from app.infrastructure.celery.event_loop import run_async
+from app.infrastructure.celery.queues import WorkloadQueue, task_options
+from app.infrastructure.database.factory import get_db
+from app.domains.repo_mgmt.models.repository import ProcessingStatus
+from app.domains.repo_mgmt.services.progress_reporter import ProgressReporter
+from app.domains.repo_mgmt.services.repo_ingest_service import RepoIngestService
+from app.domains.repo_mgmt.services.workspace_manager import WorkspaceManager
+
+
+@celery_app.task(bind=True, **task_options(WorkloadQueue.ANALYSIS))
+def index_repository_task(self, repo_id: str, version: Optional[str] = None):
+    """克隆完成后构建代码索引（快照与工作副本登记已在克隆节点完成）"""
+
+    async def _index_repository():
+        async for session in get_db():
+            try:
+                repo_record = await RepoIngestService.get_record(session, repo_id)
+                reporter = ProgressReporter(session, repo_id)
+
+                # analysis worker 可能不在克隆所在节点，本地没有工作副本时从快照或远端恢复
+                if not await WorkspaceManager.ensure_local(session, repo_record):
+                    raise Exception(f"仓库 {repo_id} 本地工作副本不可用")
+
+                await reporter.transition(ProcessingStatus.CHUNKING, 96, "正在构建代码索引")
+                await RepoIngestService.index(repo_record)
+
+                await reporter.transition(
+                    ProcessingStatus.COMPLETED, 100, "仓库导入完成",
+                    version=version or repo_record.version
+                )
+                logging.info(f"仓库 {repo_record.repo_name} 索引构建完成")
+
+            except (Exception, asyncio.CancelledError) as e:
+                await ProgressReporter(session, repo_id).fail("索引构建失败", str(e) or "任务超时或被取消")
+                logging.error(f"仓库 {repo_id} 索引构建失败: {e}")
+                raise
+
+    run_async(_index_repository(), timeout=self.soft_time_limit)
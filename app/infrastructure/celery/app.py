@@ -1,10 +1,14 @@
 from celery import Celery
-from celery.signals import worker_process_init
+from kombu import Queue
+from celery.signals import worker_process_init, worker_process_shutdown, worker_shutdown, task_postrun
 import logging
 import sys
 import os
 from app.config.settings import settings
 from app.logger import ColoredFormatter
+from app.infrastructure.celery.event_loop import WorkerEventLoop, run_async
+from app.infrastructure.celery.queues import QUEUE_PROFILES, TASK_ROUTES, WorkloadQueue
+from app.infrastructure.celery.fair_scheduler import FairTaskScheduler
 
 # 创建 Celery 实例
 celery_app = Celery('knowledge_service')
@@ -24,23 +28,34 @@ celery_app.conf.update({
     'worker_prefetch_multiplier': 1,
     'task_acks_late': True,
     'worker_max_tasks_per_child': 1000,
-    'task_routes': {
-        'app.tasks.document_tasks.parse_document_task': {'queue': 'document'},
-    },
-    'task_default_queue': 'default',
+    # 按负载类型划分队列，各队列由独立的 worker 消费（见 queues.py）
+    'task_queues': [Queue(name, routing_key=name) for name in QUEUE_PROFILES],
+    'task_routes': {task_name: {'queue': queue} for task_name, queue in TASK_ROUTES.items()},
+    'task_default_queue': WorkloadQueue.DEFAULT,
     'task_default_exchange': 'default',
     'task_default_routing_key': 'default',
     'task_remote_control': True,
     'worker_disable_rate_limits': False,
     'broker_connection_retry_on_startup': True,
-    'worker_pool': 'solo',  # Windows平台使用solo模式避免进程问题
+    'worker_pool': 'solo',  # 未指定池类型时的默认值（Windows 平台使用 solo 模式避免进程问题），各队列的池类型见 worker.py
+    # 任务模块
+    'include': [
+        'app.domains.repo_mgmt.tasks.clone_task',
+        'app.domains.repo_mgmt.tasks.index_task',
+        'app.domains.repo_mgmt.tasks.batch_ingest_task',
+        'app.domains.code_wiki.tasks.wiki_task',
+        'app.infrastructure.celery.fair_dispatch_task',
+    ],
+    # 定时派发公平调度排队的任务（需运行 celery beat）
+    'beat_schedule': {
+        'dispatch-fair-queues': {
+            'task': 'app.infrastructure.celery.fair_dispatch_task.dispatch_fair_queues_task',
+            'schedule': settings.fair_dispatch_interval,
+            'options': {'queue': WorkloadQueue.DEFAULT, 'expires': settings.fair_dispatch_interval},
+        },
+    } if settings.fair_scheduler_enabled else {},
 })
 
-# 任务自动发现
-celery_app.autodiscover_tasks(packages=[
-    'app.tasks',
-])
-
 @worker_process_init.connect
 def setup_celery_logging(**kwargs):
     """为Celery worker进程设置自定义日志格式"""
@@ -63,4 +78,29 @@ def setup_celery_logging(**kwargs):
                         return f"[CELERY] {formatted}"
                 handler.setFormatter(CeleryColoredFormatter())
     
-    logging.info("✅ Celery Worker 日志配置已应用（复用主应用格式）")
\ No newline at end of file
+    logging.info("✅ Celery Worker 日志配置已应用（复用主应用格式）")
+
+
+@worker_process_init.connect
+def start_worker_event_loop(**kwargs):
+    """worker 子进程启动常驻事件循环并初始化数据库、Redis 连接，任务之间复用"""
+    if settings.celery_persistent_loop:
+        WorkerEventLoop.get()
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def stop_worker_event_loop(**kwargs):
+    """worker 进程退出时关闭连接并停止事件循环"""
+    WorkerEventLoop.stop()
+
+
+@task_postrun.connect
+def release_fair_slot(sender=None, task_id=None, state=None, **kwargs):
+    """任务结束后释放公平调度的并发名额，并派发下一个排队任务（重试中的任务仍占用名额）"""
+    if not settings.fair_scheduler_enabled or state == "RETRY" or sender is None:
+        return
+    delivery_info = getattr(sender.request, "delivery_info", None) or {}
+    queue = delivery_info.get("routing_key") or TASK_ROUTES.get(sender.name)
+    if queue:
+        run_async(FairTaskScheduler.complete(queue, task_id))
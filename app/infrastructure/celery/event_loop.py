@@ -0,0 +1,166 @@
+"""
+Celery worker 进程内常驻的事件循环
+
+每个任务 asyncio.run 会新建并关闭一个事件循环，绑定在循环上的数据库连接池、Redis 连接池、
+git cat-file 进程池都随之失效，下一个任务重新建立。worker 进程改为在独立线程中常驻一个事件循环，
+进程启动时初始化共享资源，任务协程提交到该循环执行，连接在任务之间复用。
+
+本模块只依赖标准库，应用配置与连接在用到时才导入
+"""
+import os
+import asyncio
+import logging
+import threading
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class PersistentEventLoop:
+    """在独立线程中常驻运行的事件循环，同步代码通过 run 提交协程并等待结果"""
+
+    def __init__(self, name: str = "event-loop"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None and self._thread is not None and self._thread.is_alive()
+
+    @property
+    def loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        return self._loop
+
+    def start(self) -> None:
+        if self.running:
+            return
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def _run():
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            try:
+                loop.run_forever()
+            finally:
+                # 取消停止时仍未完成的协程，关闭异步生成器后再关闭循环
+                pending = asyncio.all_tasks(loop)
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+                loop.run_until_complete(loop.shutdown_asyncgens())
+                loop.close()
+
+        thread = threading.Thread(target=_run, name=self.name, daemon=True)
+        thread.start()
+        ready.wait()
+        self._loop, self._thread = loop, thread
+
+    def run(self, coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """
+        在常驻循环中执行协程并阻塞等待结果
+
+        等待被打断（超时、Celery 软超时等）时取消协程，异常原样抛出
+        """
+        if not self.running:
+            self.start()
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("不能在事件循环线程内同步等待协程")
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        if not self.running:
+            self._loop = self._thread = None
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._loop = self._thread = None
+
+
+class WorkerEventLoop:
+    """
+    worker 进程的常驻事件循环
+
+    prefork 子进程在 worker_process_init 时启动并初始化数据库、Redis 连接；
+    solo/threads 池不触发该信号，在首个任务中懒启动。fork 出的子进程不沿用父进程的循环
+    """
+
+    _instance: Optional[PersistentEventLoop] = None
+    _pid: Optional[int] = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get() -> PersistentEventLoop:
+        """当前进程的常驻循环（必要时启动并初始化共享资源）"""
+        with WorkerEventLoop._lock:
+            instance = WorkerEventLoop._instance
+            if instance is not None and WorkerEventLoop._pid == os.getpid() and instance.running:
+                return instance
+            instance = PersistentEventLoop(name="celery-event-loop")
+            instance.start()
+            WorkerEventLoop._instance, WorkerEventLoop._pid = instance, os.getpid()
+
+        from app.config.settings import settings
+        try:
+            instance.run(WorkerEventLoop._init_resources(), timeout=settings.celery_loop_init_timeout)
+        except Exception as e:
+            logging.warning(f"worker 事件循环初始化连接失败，将在任务中重试: {e!r}")
+        return instance
+
+    @staticmethod
+    def run(coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """
+        在 worker 常驻循环中执行任务协程；未启用常驻循环时退回 asyncio.run
+
+        timeout 到期时取消协程并抛出 TimeoutError（threads 池不支持 Celery 时间限制，以此兜底）
+        """
+        from app.config.settings import settings
+        if not settings.celery_persistent_loop:
+            return asyncio.run(asyncio.wait_for(coro, timeout))
+        return WorkerEventLoop.get().run(coro, timeout)
+
+    @staticmethod
+    def stop() -> None:
+        """关闭共享连接并停止循环（只处理本进程启动的循环）"""
+        with WorkerEventLoop._lock:
+            instance = WorkerEventLoop._instance
+            if instance is None or WorkerEventLoop._pid != os.getpid():
+                return
+            WorkerEventLoop._instance = WorkerEventLoop._pid = None
+
+        from app.config.settings import settings
+        try:
+            instance.run(WorkerEventLoop._close_resources(), timeout=settings.celery_loop_shutdown_timeout)
+        except Exception as e:
+            logging.warning(f"worker 事件循环关闭连接失败: {e!r}")
+        instance.stop(timeout=settings.celery_loop_shutdown_timeout)
+        logging.info("worker 事件循环已停止")
+
+    @staticmethod
+    async def _init_resources() -> None:
+        from app.infrastructure.database.factory import health_check_db
+        from app.infrastructure.redis import REDIS_CONN, RedisSpaceEnum
+
+        db_ok = await health_check_db()
+        redis_ok = await REDIS_CONN.health_check(RedisSpaceEnum.BUSINESS)
+        logging.info(f"worker 事件循环已启动（数据库 {'正常' if db_ok else '不可用'}，Redis {'正常' if redis_ok else '不可用'}）")
+
+    @staticmethod
+    async def _close_resources() -> None:
+        from app.infrastructure.database.factory import close_db
+        from app.infrastructure.redis import REDIS_CONN
+
+        await close_db()
+        await REDIS_CONN.close()
+
+
+def run_async(coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+    """Celery 任务中执行协程的入口，替代 asyncio.run"""
+    return WorkerEventLoop.run(coro, timeout)
@@ -0,0 +1,26 @@
+import logging
+from app.infrastructure.celery.app import celery_app
+from app.infrastructure.celery.event_loop import run_async
+from app.infrastructure.celery.fair_scheduler import FairTaskScheduler
+from app.infrastructure.celery.queues import QUEUE_PROFILES, WorkloadQueue, task_options
+
+
+@celery_app.task(**task_options(WorkloadQueue.DEFAULT, time_limit=5 * 60, soft_time_limit=4 * 60))
+def dispatch_fair_queues_task():
+    """
+    定时派发各队列中排队的任务（celery beat 调度）
+
+    派发只在提交与任务结束时触发；派发失败或回收丢失 worker 的名额后，
+    空闲的队列不会再有这两类事件，由本任务兜底
+    """
+
+    async def _dispatch_all() -> int:
+        dispatched = 0
+        for queue in QUEUE_PROFILES:
+            dispatched += await FairTaskScheduler.dispatch(queue)
+        return dispatched
+
+    dispatched = run_async(_dispatch_all())
+    if dispatched:
+        logging.info(f"定时派发公平调度排队任务 {dispatched} 个")
+    return dispatched
@@ -0,0 +1,267 @@
+"""
+后台任务按用户公平调度
+
+Celery 按 FIFO 消费，一个用户一次提交上百个任务时其他用户的任务排在后面。任务先进入 Redis 中按用户划分的子队列，
+再由调度器轮转（最久未被服务的用户优先）派发到 worker 队列：
+- 每个队列已派发未完成的任务数不超过 节点数×并发数，broker 中不积压长 FIFO，新用户的任务下一个空位即可执行
+- 每个用户在同一队列中同时执行的任务数不超过 fair_user_concurrency
+- 提交任务、任务结束（task_postrun）时派发；worker 丢失导致未结束的任务超过时间限制后回收名额
+
+Redis 结构（均在 BUSINESS 空间）：
+- fair:{queue}:q:{user_id}   用户子队列（LPUSH 入队，RPOP 出队）
+- fair:{queue}:users         有排队任务的用户，分数为最近一次被服务的时间
+- fair:{queue}:inflight      已派发的任务 task_id -> {job_id, user_id, dispatched_at, time_limit}
+- fair:job:{job_id}          任务状态，用于查询排队位置
+"""
+import json
+import time
+import uuid
+import logging
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Sequence
+from app.config.settings import settings
+from app.infrastructure.redis import REDIS_CONN, RedisSpaceEnum
+from app.infrastructure.celery.queues import QUEUE_PROFILES, TASK_ROUTES, WorkloadQueue
+
+
+class FairTaskScheduler:
+    """按用户公平调度的任务派发器"""
+
+    KEY_PREFIX = "fair"
+    LOCK_TIMEOUT = 30
+
+    @staticmethod
+    def _key(queue: str, *parts: str) -> str:
+        return ":".join((FairTaskScheduler.KEY_PREFIX, queue) + parts)
+
+    @staticmethod
+    def _job_key(job_id: str) -> str:
+        return f"{FairTaskScheduler.KEY_PREFIX}:job:{job_id}"
+
+    @staticmethod
+    def _window(queue: str) -> int:
+        return max(1, QUEUE_PROFILES[queue].concurrency * max(1, settings.celery_worker_nodes))
+
+    @staticmethod
+    @asynccontextmanager
+    async def _locked(queue: str):
+        lock = REDIS_CONN.get_lock(FairTaskScheduler._key(queue, "lock"), timeout=FairTaskScheduler.LOCK_TIMEOUT,
+                                   space=RedisSpaceEnum.BUSINESS)
+        if not await lock.spin_acquire(max_wait_time=FairTaskScheduler.LOCK_TIMEOUT):
+            raise RuntimeError(f"获取公平调度锁超时 {queue}")
+        try:
+            yield
+        finally:
+            await lock.release()
+
+    @staticmethod
+    async def submit(task, user_id: str, args: Sequence[Any] = (), kwargs: Optional[Dict[str, Any]] = None,
+                     job_id: Optional[str] = None) -> str:
+        """
+        提交任务到用户子队列并尝试派发，替代 task.delay
+
+        Args:
+            task: Celery 任务，按路由表确定队列
+            job_id: 排队任务ID（查询排队位置用），默认随机生成
+
+        Returns:
+            job_id；调度不可用（未启用、Redis 异常）时直接投递到队列
+        """
+        job_id = job_id or str(uuid.uuid4())
+        queue = TASK_ROUTES.get(task.name, WorkloadQueue.DEFAULT)
+        if not settings.fair_scheduler_enabled:
+            task.apply_async(args=list(args), kwargs=kwargs or {})
+            return job_id
+
+        job = {
+            "job_id": job_id,
+            "task": task.name,
+            "args": list(args),
+            "kwargs": kwargs or {},
+            "user_id": user_id,
+            "submitted_at": time.time(),
+        }
+        try:
+            async with FairTaskScheduler._locked(queue):
+                pipeline = REDIS_CONN.pipeline(RedisSpaceEnum.BUSINESS)
+                pipeline.lpush(FairTaskScheduler._key(queue, "q", user_id), json.dumps(job, ensure_ascii=False))
+                # 已在排队的用户保持原有轮转位置，新用户排在最前
+                pipeline.zadd(FairTaskScheduler._key(queue, "users"), {user_id: 0}, nx=True)
+                pipeline.set(FairTaskScheduler._job_key(job_id),
+                             json.dumps({"queue": queue, "user_id": user_id, "state": "queued"}), ex=settings.fair_job_ttl)
+                await pipeline.execute()
+                try:
+                    await FairTaskScheduler._dispatch(queue)
+                except Exception as e:
+                    # 任务已入队，由后续提交或任务结束时派发
+                    logging.warning(f"公平调度派发失败 {queue}: {e}")
+        except Exception as e:
+            logging.warning(f"公平调度提交失败，直接投递 {task.name} ({job_id}): {e}")
+            task.apply_async(args=list(args), kwargs=kwargs or {})
+        return job_id
+
+    @staticmethod
+    async def complete(queue: str, task_id: str) -> None:
+        """任务结束：释放并发名额并派发后续任务"""
+        if queue not in QUEUE_PROFILES:
+            return
+        try:
+            inflight_key = FairTaskScheduler._key(queue, "inflight")
+            if await REDIS_CONN.hget(inflight_key, task_id, space=RedisSpaceEnum.BUSINESS) is None:
+                return
+            async with FairTaskScheduler._locked(queue):
+                await FairTaskScheduler._release(queue, [task_id])
+                await FairTaskScheduler._dispatch(queue)
+        except Exception as e:
+            logging.warning(f"公平调度释放名额失败 {queue} {task_id}: {e}")
+
+    @staticmethod
+    async def dispatch(queue: str) -> int:
+        """派发排队任务（运维手动或定时调用，恢复 Redis 或 worker 故障期间积压的任务）"""
+        try:
+            async with FairTaskScheduler._locked(queue):
+                return await FairTaskScheduler._dispatch(queue)
+        except Exception as e:
+            logging.warning(f"公平调度派发失败 {queue}: {e}")
+            return 0
+
+    @staticmethod
+    async def position(job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        查询排队位置
+
+        Returns:
+            {queue, state, user_position（本用户子队列中的位置）, position（按轮转估算的全局位置）}；
+            任务不存在或已结束时返回 None
+        """
+        raw = await REDIS_CONN.get(FairTaskScheduler._job_key(job_id), space=RedisSpaceEnum.BUSINESS)
+        if not raw:
+            return None
+        job = json.loads(raw)
+        queue, user_id = job["queue"], job["user_id"]
+        if job["state"] != "queued":
+            return {"queue": queue, "state": job["state"], "user_position": 0, "position": 0}
+
+        pipeline = REDIS_CONN.pipeline(RedisSpaceEnum.BUSINESS)
+        pipeline.lrange(FairTaskScheduler._key(queue, "q", user_id), 0, -1)
+        pipeline.zrange(FairTaskScheduler._key(queue, "users"), 0, -1)
+        entries, users = await pipeline.execute()
+        # 队尾（右侧）先出队，排在右侧的是本用户更早的任务
+        ids = [json.loads(entry)["job_id"] for entry in entries]
+        if job_id not in ids:
+            return None
+        own_ahead = len(ids) - 1 - ids.index(job_id)
+
+        others = [user for user in users if user != user_id]
+        ahead = own_ahead
+        if others:
+            pipeline = REDIS_CONN.pipeline(RedisSpaceEnum.BUSINESS)
+            for user in others:
+                pipeline.llen(FairTaskScheduler._key(queue, "q", user))
+            # 轮转派发：本用户每出队一个任务，其他每个用户最多出队一个
+            ahead += sum(min(length, own_ahead + 1) for length in await pipeline.execute())
+        return {"queue": queue, "state": "queued", "user_position": own_ahead + 1, "position": ahead + 1}
+
+    @staticmethod
+    async def _release(queue: str, task_ids: List[str]) -> None:
+        inflight_key = FairTaskScheduler._key(queue, "inflight")
+        pipeline = REDIS_CONN.pipeline(RedisSpaceEnum.BUSINESS)
+        for task_id in task_ids:
+            pipeline.hget(inflight_key, task_id)
+        entries = await pipeline.execute()
+
+        pipeline = REDIS_CONN.pipeline(RedisSpaceEnum.BUSINESS)
+        pipeline.hdel(inflight_key, *task_ids)
+        job_keys = [FairTaskScheduler._job_key(json.loads(entry)["job_id"]) for entry in entries if entry]
+        for job_key in job_keys:
+            pipeline.get(job_key)
+        results = await pipeline.execute()
+
+        # 同一 job_id 可能已作为下一阶段任务重新排队，只删除仍属于本次派发的状态
+        pipeline = REDIS_CONN.pipeline(RedisSpaceEnum.BUSINESS)
+        for job_key, raw in zip(job_keys, results[1:]):
+            if raw and json.loads(raw).get("task_id") in task_ids:
+                pipeline.delete(job_key)
+        await pipeline.execute()
+
+    @staticmethod
+    async def _dispatch(queue: str) -> int:
+        """在持有调度锁时调用：按轮转从用户子队列取任务派发，直到名额用完或没有可派发的任务"""
+        from app.infrastructure.celery.app import celery_app
+
+        inflight_key = FairTaskScheduler._key(queue, "inflight")
+        users_key = FairTaskScheduler._key(queue, "users")
+        pipeline = REDIS_CONN.pipeline(RedisSpaceEnum.BUSINESS)
+        pipeline.hgetall(inflight_key)
+        pipeline.zrange(users_key, 0, -1, withscores=True)
+        inflight, users = await pipeline.execute()
+        inflight = {task_id: json.loads(entry) for task_id, entry in inflight.items()}
+
+        # 超过任务自身时间限制仍未结束的任务（worker 丢失）回收名额
+        now = time.time()
+        default_limit = QUEUE_PROFILES[queue].time_limit
+        expired = [task_id for task_id, entry in inflight.items()
+                   if now - entry.get("dispatched_at", now) > entry.get("time_limit", default_limit) + 60]
+        if expired:
+            logging.warning(f"公平调度回收 {queue} 中 {len(expired)} 个超时未结束的任务名额")
+            await FairTaskScheduler._release(queue, expired)
+            for task_id in expired:
+                inflight.pop(task_id)
+
+        running = Counter(entry["user_id"] for entry in inflight.values())
+        capacity = FairTaskScheduler._window(queue) - len(inflight)
+        order = [user for user, _ in sorted(users, key=lambda item: item[1])]
+        dispatched = 0
+        while capacity > 0:
+            for user_id in order:
+                if running[user_id] >= settings.fair_user_concurrency:
+                    continue
+                pipeline = REDIS_CONN.pipeline(RedisSpaceEnum.BUSINESS)
+                pipeline.rpop(FairTaskScheduler._key(queue, "q", user_id))
+                raw, = await pipeline.execute()
+                if not raw:
+                    # 子队列已空，用户退出轮转（提交与派发都持有调度锁，不会与入队交错）
+                    pipeline = REDIS_CONN.pipeline(RedisSpaceEnum.BUSINESS)
+                    pipeline.zrem(users_key, user_id)
+                    await pipeline.execute()
+                    order.remove(user_id)
+                    break
+                job = json.loads(raw)
+                task_id = str(uuid.uuid4())
+                # 任务可以覆盖队列的时间限制（如批量导入），回收名额按任务自身的限制计算
+                task = celery_app.tasks.get(job["task"])
+                time_limit = getattr(task, "time_limit", None) or default_limit
+                # 先登记再投递：任务很快结束时 task_postrun 也能找到并释放名额，不会留下孤立的登记
+                pipeline = REDIS_CONN.pipeline(RedisSpaceEnum.BUSINESS)
+                pipeline.hset(inflight_key, task_id, json.dumps({
+                    "job_id": job["job_id"], "user_id": user_id, "dispatched_at": time.time(), "time_limit": time_limit,
+                }))
+                pipeline.zadd(users_key, {user_id: time.time()})
+                pipeline.set(FairTaskScheduler._job_key(job["job_id"]), json.dumps({
+                    "queue": queue, "user_id": user_id, "state": "running", "task_id": task_id,
+                }), ex=settings.fair_job_ttl)
+                await pipeline.execute()
+                try:
+                    celery_app.send_task(job["task"], args=job["args"], kwargs=job["kwargs"], queue=queue, task_id=task_id)
+                except Exception:
+                    # 投递失败：撤销登记，任务放回子队列出队端（下次最先派发）
+                    pipeline = REDIS_CONN.pipeline(RedisSpaceEnum.BUSINESS)
+                    pipeline.hdel(inflight_key, task_id)
+                    pipeline.rpush(FairTaskScheduler._key(queue, "q", user_id), raw)
+                    pipeline.set(FairTaskScheduler._job_key(job["job_id"]), json.dumps({
+                        "queue": queue, "user_id": user_id, "state": "queued",
+                    }), ex=settings.fair_job_ttl)
+                    await pipeline.execute()
+                    raise
+
+                running[user_id] += 1
+                capacity -= 1
+                dispatched += 1
+                # 被服务的用户移到轮转末尾
+                order.remove(user_id)
+                order.append(user_id)
+                break
+            else:
+                break
+        return dispatched
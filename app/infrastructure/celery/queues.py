@@ -0,0 +1,105 @@
+"""
+Celery 任务队列划分
+
+按负载类型划分队列，每个队列由独立的 worker 进程消费，慢的 wiki 生成不会阻塞克隆：
+- git_io：克隆、批量导入，等待网络与 git 子进程为主，线程池高并发
+- analysis：代码索引构建，CPU 密集，多进程池，并发数默认等于 CPU 核数
+- llm：wiki 生成等调用大模型的任务，等待接口为主，线程池
+- default：未登记的任务
+
+各队列的推荐池类型、并发、预取与时间限制见 QUEUE_PROFILES，启动方式见 app/infrastructure/celery/worker.py
+"""
+import os
+from dataclasses import dataclass
+from typing import Any, Dict
+from app.config.settings import settings
+
+
+class WorkloadQueue:
+    """队列名"""
+    GIT_IO = "git_io"
+    ANALYSIS = "analysis"
+    LLM = "llm"
+    DEFAULT = "default"
+
+
+@dataclass(frozen=True)
+class QueueProfile:
+    """队列的 worker 与任务执行配置"""
+    queue: str
+    pool: str                   # 推荐的 worker 池类型
+    concurrency: int
+    prefetch_multiplier: int    # 长任务只预取 1 个，避免任务排在忙碌的 worker 上
+    time_limit: int             # 硬超时(秒)
+    soft_time_limit: int        # 软超时(秒)，任务据此取消协程并写入失败状态
+    acks_late: bool             # 执行完成后才确认，worker 崩溃时任务重新投递（任务需可重入）
+    reject_on_worker_lost: bool
+
+
+QUEUE_PROFILES: Dict[str, QueueProfile] = {
+    # 克隆可重入（已完成的仓库直接跳过），worker 丢失时重新投递
+    WorkloadQueue.GIT_IO: QueueProfile(
+        queue=WorkloadQueue.GIT_IO,
+        pool="threads",
+        concurrency=settings.celery_git_io_concurrency,
+        prefetch_multiplier=1,
+        time_limit=settings.celery_git_io_time_limit,
+        soft_time_limit=settings.celery_git_io_time_limit - 60,
+        acks_late=True,
+        reject_on_worker_lost=True,
+    ),
+    # 索引增量构建可重入；进程因内存不足被杀时不重新投递，避免反复压垮 worker
+    WorkloadQueue.ANALYSIS: QueueProfile(
+        queue=WorkloadQueue.ANALYSIS,
+        pool="prefork",
+        concurrency=settings.celery_analysis_concurrency or os.cpu_count() or 1,
+        prefetch_multiplier=1,
+        time_limit=settings.celery_analysis_time_limit,
+        soft_time_limit=settings.celery_analysis_time_limit - 60,
+        acks_late=True,
+        reject_on_worker_lost=False,
+    ),
+    # 大模型调用成本高，开始执行即确认，不因重新投递重复生成
+    WorkloadQueue.LLM: QueueProfile(
+        queue=WorkloadQueue.LLM,
+        pool="threads",
+        concurrency=settings.celery_llm_concurrency,
+        prefetch_multiplier=1,
+        time_limit=settings.celery_llm_time_limit,
+        soft_time_limit=settings.celery_llm_time_limit - 60,
+        acks_late=False,
+        reject_on_worker_lost=False,
+    ),
+    WorkloadQueue.DEFAULT: QueueProfile(
+        queue=WorkloadQueue.DEFAULT,
+        pool="solo",
+        concurrency=1,
+        prefetch_multiplier=1,
+        time_limit=30 * 60,
+        soft_time_limit=25 * 60,
+        acks_late=True,
+        reject_on_worker_lost=False,
+    ),
+}
+
+# 任务路由表：任务名 -> 队列
+TASK_ROUTES: Dict[str, str] = {
+    "app.domains.repo_mgmt.tasks.clone_task.clone_repository_task": WorkloadQueue.GIT_IO,
+    "app.domains.repo_mgmt.tasks.batch_ingest_task.ingest_repositories_task": WorkloadQueue.GIT_IO,
+    "app.domains.repo_mgmt.tasks.index_task.index_repository_task": WorkloadQueue.ANALYSIS,
+    "app.domains.code_wiki.tasks.wiki_task.generate_wiki_task": WorkloadQueue.LLM,
+    "app.infrastructure.celery.fair_dispatch_task.dispatch_fair_queues_task": WorkloadQueue.DEFAULT,
+}
+
+
+def task_options(queue: str, **overrides: Any) -> Dict[str, Any]:
+    """任务装饰器参数：队列的时间限制与确认语义，overrides 覆盖个别任务的配置"""
+    profile = QUEUE_PROFILES[queue]
+    options = {
+        "time_limit": profile.time_limit,
+        "soft_time_limit": profile.soft_time_limit,
+        "acks_late": profile.acks_late,
+        "reject_on_worker_lost": profile.reject_on_worker_lost,
+    }
+    options.update(overrides)
+    return options
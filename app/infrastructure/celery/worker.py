@@ -0,0 +1,46 @@
+"""
+按队列启动 Celery worker
+
+每个队列使用推荐的池类型、并发数与预取数（见 queues.QUEUE_PROFILES），其余参数原样传给 celery worker，
+命令行中后出现的同名参数覆盖推荐值。
+
+用法：
+    python -m app.infrastructure.celery.worker git_io
+    python -m app.infrastructure.celery.worker analysis --concurrency 4
+    python -m app.infrastructure.celery.worker llm -l debug
+
+公平调度的定时派发由 celery beat 触发（每个部署只运行一个）：
+    celery -A app.infrastructure.celery.app beat
+"""
+import os
+import sys
+from typing import List
+from app.infrastructure.celery.app import celery_app
+from app.infrastructure.celery.queues import QUEUE_PROFILES
+
+
+def build_worker_argv(queue: str, extra: List[str]) -> List[str]:
+    profile = QUEUE_PROFILES[queue]
+    # Windows 不支持 prefork，退回 solo
+    pool = "solo" if os.name == "nt" and profile.pool == "prefork" else profile.pool
+    return [
+        "worker",
+        "--queues", profile.queue,
+        "--pool", pool,
+        "--concurrency", str(profile.concurrency),
+        "--prefetch-multiplier", str(profile.prefetch_multiplier),
+        "--hostname", f"{profile.queue}@%h",
+        "--loglevel", "info",
+        *extra,
+    ]
+
+
+def main() -> None:
+    if len(sys.argv) < 2 or sys.argv[1] not in QUEUE_PROFILES:
+        print(f"用法: python -m app.infrastructure.celery.worker <{'|'.join(QUEUE_PROFILES)}> [celery worker 参数]")
+        sys.exit(2)
+    celery_app.worker_main(build_worker_argv(sys.argv[1], sys.argv[2:]))
+
+
+if __name__ == "__main__":
+    main()
@@ -278,6 +278,26 @@ class RedisClient:
             logging.warning(f"Redis HDEL操作失败 {name}: {e}")
             return 0
     
+    async def hset_mapping(self, name: str, mapping: Dict[str, Any], exp: int = 0, space: RedisSpaceEnum = RedisSpaceEnum.DEFAULT) -> bool:
+        """批量设置哈希表字段，exp 大于 0 时同时刷新过期时间"""
+        try:
+            client = self._connet_pool.get_client(space)
+            str_mapping = {}
+            for key, value in mapping.items():
+                if isinstance(value, (dict, list)):
+                    str_mapping[key] = json.dumps(value, ensure_ascii=False)
+                else:
+                    str_mapping[key] = "" if value is None else str(value)
+            pipeline = client.pipeline(transaction=True)
+            pipeline.hset(name, mapping=str_mapping)
+            if exp > 0:
+                pipeline.expire(name, exp)
+            await pipeline.execute()
+            return True
+        except Exception as e:
+            logging.warning(f"Redis HSET_MAPPING操作失败 {name}: {e}")
+            return False
+    
     # =============================================================================
     # 列表操作
     # =============================================================================
@@ -589,6 +609,42 @@ class RedisClient:
         finally:
             lock.release()
     
+    # =============================================================================
+    # 发布订阅操作
+    # =============================================================================
+    
+    async def publish(self, channel: str, message: Any, space: RedisSpaceEnum = RedisSpaceEnum.DEFAULT) -> int:
+        """发布消息，返回接收到消息的订阅者数量"""
+        try:
+            client = self._connet_pool.get_client(space)
+            if isinstance(message, (dict, list)):
+                message = json.dumps(message, ensure_ascii=False)
+            return await client.publish(channel, message)
+        except Exception as e:
+            logging.warning(f"Redis PUBLISH操作失败 {channel}: {e}")
+            return 0
+    
+    @asynccontextmanager
+    async def subscribe(self, *channels: str, space: RedisSpaceEnum = RedisSpaceEnum.DEFAULT):
+        """
+        订阅频道的上下文管理器，返回 PubSub 对象，退出时取消订阅并释放连接
+
+        用法：
+            async with REDIS_CONN.subscribe("channel") as pubsub:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+        """
+        client = self._connet_pool.get_client(space)
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(*channels)
+            yield pubsub
+        finally:
+            try:
+                await pubsub.unsubscribe(*channels)
+            except Exception as e:
+                logging.warning(f"Redis取消订阅失败 {channels}: {e}")
+            await pubsub.reset()
+    
     # =============================================================================
     # 批量操作
     # =============================================================================
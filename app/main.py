@@ -41,6 +41,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # 列表分页信息通过响应头返回
+    expose_headers=["X-Total-Count", "X-Total-Count-Capped", "X-Next-Cursor"],
 )
 
 # 配置日志中间件 - 直接使用全局中间件实例
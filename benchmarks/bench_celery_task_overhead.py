@@ -0,0 +1,152 @@
+"""
+Celery 任务事件循环开销基准测试（标准库 asyncio，不依赖应用配置）
+
+本地 TCP 服务模拟数据库/Redis：建立连接需要握手（可配置服务端延迟，模拟认证、TLS），
+每个任务执行若干次请求。对比：
+- 每个任务 asyncio.run：新建事件循环，连接池绑定在循环上，每个任务重新建连
+- 常驻事件循环（WorkerEventLoop 使用的 PersistentEventLoop）：连接池在任务之间复用
+
+用法：
+    python benchmarks/bench_celery_task_overhead.py [任务数] [握手延迟毫秒] [每任务请求数]
+"""
+import os
+import sys
+import time
+import asyncio
+import threading
+import weakref
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.infrastructure.celery.event_loop import PersistentEventLoop  # noqa: E402
+
+TASKS = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+HANDSHAKE_MS = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+QUERIES = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+POOL_SIZE = 2
+
+
+async def _serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    # 握手：客户端发送 HELLO，服务端延迟后应答
+    await reader.readline()
+    await asyncio.sleep(HANDSHAKE_MS / 1000)
+    writer.write(b"OK\n")
+    await writer.drain()
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        writer.write(line)
+        await writer.drain()
+    writer.close()
+
+
+def start_server() -> int:
+    """在后台线程启动模拟服务，返回端口"""
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    port = []
+
+    async def _main():
+        server = await asyncio.start_server(_serve, "127.0.0.1", 0)
+        port.append(server.sockets[0].getsockname()[1])
+        ready.set()
+        async with server:
+            await server.serve_forever()
+
+    threading.Thread(target=loop.run_until_complete, args=(_main(),), daemon=True).start()
+    ready.wait()
+    return port[0]
+
+
+class Pool:
+    """绑定在事件循环上的简易连接池（与 SQLAlchemy/redis 异步连接池一样不能跨循环使用）"""
+
+    def __init__(self, port: int):
+        self.port = port
+        self.idle = []
+        self.connects = 0
+
+    async def acquire(self):
+        if self.idle:
+            return self.idle.pop()
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        writer.write(b"HELLO\n")
+        await writer.drain()
+        await reader.readline()
+        self.connects += 1
+        return reader, writer
+
+    def release(self, conn) -> None:
+        if len(self.idle) < POOL_SIZE:
+            self.idle.append(conn)
+        else:
+            conn[1].close()
+
+    async def close(self) -> None:
+        for _, writer in self.idle:
+            writer.close()
+            await writer.wait_closed()
+        self.idle.clear()
+
+
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Pool]" = weakref.WeakKeyDictionary()
+
+
+def get_pool(port: int) -> Pool:
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = Pool(port)
+    return pool
+
+
+async def task(port: int, close_pool: bool) -> int:
+    pool = get_pool(port)
+    conn = await pool.acquire()
+    reader, writer = conn
+    for i in range(QUERIES):
+        writer.write(b"SELECT %d\n" % i)
+        await writer.drain()
+        await reader.readline()
+    pool.release(conn)
+    if close_pool:
+        # asyncio.run 结束时循环关闭，连接池随之失效，先关闭连接避免泄漏
+        await pool.close()
+    return pool.connects
+
+
+def timed(label: str, func):
+    begin = time.perf_counter()
+    connects = func()
+    elapsed = time.perf_counter() - begin
+    print(f"  {label:<28} {elapsed * 1000:10.1f} ms   每任务 {elapsed * 1000 / TASKS:7.3f} ms   建连 {connects:5d} 次")
+    return elapsed
+
+
+def per_task_asyncio_run(port: int) -> int:
+    return sum(asyncio.run(task(port, close_pool=True)) for _ in range(TASKS))
+
+
+def persistent_loop(port: int) -> int:
+    loop = PersistentEventLoop(name="bench-loop")
+    loop.start()
+    try:
+        connects = 0
+        for _ in range(TASKS):
+            connects = loop.run(task(port, close_pool=False))
+        return connects
+    finally:
+        loop.stop(timeout=5)
+
+
+def main() -> None:
+    port = start_server()
+    print(f"{TASKS} 个任务，握手延迟 {HANDSHAKE_MS} ms，每任务 {QUERIES} 次请求")
+    before = timed("每任务 asyncio.run", lambda: per_task_asyncio_run(port))
+    after = timed("常驻事件循环", lambda: persistent_loop(port))
+    print(f"  加速 {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,431 @@
+"""
+代码压缩器吞吐量基准测试（只加载压缩器模块，不依赖应用配置）
+
+对各语言的逐行压缩器分别构造语料（内置示例重复到指定大小，或指定目录下对应扩展名的真实文件），
+测量每个压缩器的吞吐量（MB/s）。
+
+用法：
+    python benchmarks/bench_code_compressors.py [每种语言语料MB数] [语料目录]
+"""
+import os
+import sys
+import time
+import types
+import importlib
+
+CORPUS_MB = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+CORPUS_DIR = sys.argv[2] if len(sys.argv) > 2 else None
+REPEAT = 3
+
+COMPRESSORS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               "app", "domains", "ai_kernel", "functions", "code_compress", "compressors")
+
+SAMPLES = {
+    "python": ("PythonCompressor", (".py",), '''
+import os
+from typing import List
+
+
+@dataclass
+class Repo:
+    """仓库"""
+    name: str
+
+    def load(self, path: str) -> List[str]:
+        # 读取文件
+        result = []
+        for item in os.listdir(path):
+            if item.startswith("."):
+                continue
+            result.append(os.path.join(path, item))
+        total = sum(len(x) for x in result)
+        print(total)
+        return result
+
+
+if __name__ == "__main__":
+    Repo("x").load(".")
+'''),
+    "javascript": ("JavaScriptCompressor", (".js", ".ts"), '''
+import { readFile } from "fs/promises";
+export default class Loader {
+  constructor(root) {
+    this.root = root;
+  }
+  async load(name) {
+    // 读取文件
+    const text = await readFile(`${this.root}/${name}`, "utf8");
+    return text.split("\\n").filter((line) => line.trim());
+  }
+}
+const parse = (text) => JSON.parse(text);
+export function merge(a, b) {
+  return { ...a, ...b };
+}
+let counter = 0;
+'''),
+    "java": ("JavaCompressor", (".java",), '''
+package com.example.repo;
+
+import java.util.List;
+import java.util.ArrayList;
+
+/**
+ * 仓库加载器
+ */
+public class RepoLoader extends BaseLoader implements Loader {
+    private final String root;
+    private int count = 0;
+
+    @Override
+    public List<String> load(String name) throws IOException {
+        List<String> result = new ArrayList<>();
+        for (String line : Files.readAllLines(Path.of(root, name))) {
+            if (line.isBlank()) continue;
+            result.add(line.trim());
+        }
+        return result;
+    }
+}
+'''),
+    "cpp": ("CppCompressor", (".cpp", ".cc", ".h", ".hpp", ".c"), '''
+#include <string>
+#include <vector>
+
+namespace repo {
+
+template <typename T>
+class Loader : public Base {
+public:
+    explicit Loader(const std::string& root) : root_(root) {}
+    virtual ~Loader() = default;
+    std::vector<T> load(const std::string& name) const {
+        std::vector<T> result;
+        for (auto& line : read_lines(root_ + "/" + name)) {
+            if (line.empty()) continue;
+            result.push_back(parse<T>(line));
+        }
+        return result;
+    }
+private:
+    std::string root_;
+};
+
+}  // namespace repo
+'''),
+    "csharp": ("CSharpCompressor", (".cs",), '''
+using System;
+using System.Collections.Generic;
+
+namespace Repo
+{
+    /// <summary>仓库加载器</summary>
+    public class RepoLoader : ILoader
+    {
+        private readonly string _root;
+        public int Count { get; set; }
+
+        public RepoLoader(string root)
+        {
+            _root = root;
+        }
+
+        public async Task<List<string>> LoadAsync(string name)
+        {
+            var result = new List<string>();
+            foreach (var line in await File.ReadAllLinesAsync(Path.Combine(_root, name)))
+            {
+                if (string.IsNullOrWhiteSpace(line)) continue;
+                result.Add(line.Trim());
+            }
+            return result;
+        }
+    }
+}
+'''),
+    "go": ("GoCompressor", (".go",), '''
+package repo
+
+import (
+	"os"
+	"strings"
+)
+
+// Loader 仓库加载器
+type Loader struct {
+	Root string
+}
+
+func (l *Loader) Load(name string) ([]string, error) {
+	data, err := os.ReadFile(l.Root + "/" + name)
+	if err != nil {
+		return nil, err
+	}
+	var result []string
+	for _, line := range strings.Split(string(data), "\\n") {
+		result = append(result, strings.TrimSpace(line))
+	}
+	return result, nil
+}
+'''),
+    "rust": ("RustCompressor", (".rs",), '''
+use std::fs;
+use std::path::Path;
+
+/// 仓库加载器
+pub struct Loader {
+    root: String,
+}
+
+impl Loader {
+    pub fn new(root: &str) -> Self {
+        Loader { root: root.to_string() }
+    }
+
+    pub fn load(&self, name: &str) -> std::io::Result<Vec<String>> {
+        let text = fs::read_to_string(Path::new(&self.root).join(name))?;
+        let mut result = Vec::new();
+        for line in text.lines() {
+            if line.trim().is_empty() {
+                continue;
+            }
+            result.push(line.trim().to_string());
+        }
+        Ok(result)
+    }
+}
+'''),
+    "php": ("PhpCompressor", (".php",), '''
+<?php
+namespace App\\Repo;
+
+use App\\Contracts\\Loader;
+
+class RepoLoader implements Loader
+{
+    private $root;
+
+    public function __construct($root)
+    {
+        $this->root = $root;
+    }
+
+    public function load($name)
+    {
+        // 读取文件
+        $result = [];
+        foreach (file($this->root . '/' . $name) as $line) {
+            if (trim($line) === '') continue;
+            $result[] = trim($line);
+        }
+        return $result;
+    }
+}
+'''),
+    "ruby": ("RubyCompressor", (".rb",), '''
+require "json"
+
+# 仓库加载器
+module Repo
+  class Loader
+    attr_reader :root
+
+    def initialize(root)
+      @root = root
+    end
+
+    def load(name)
+      result = []
+      File.readlines(File.join(root, name)).each do |line|
+        next if line.strip.empty?
+        result << line.strip
+      end
+      result
+    end
+  end
+end
+'''),
+    "swift": ("SwiftCompressor", (".swift",), '''
+import Foundation
+
+/// 仓库加载器
+public struct Loader {
+    let root: String
+
+    public init(root: String) {
+        self.root = root
+    }
+
+    func load(name: String) throws -> [String] {
+        let text = try String(contentsOfFile: root + "/" + name)
+        var result: [String] = []
+        for line in text.split(separator: "\\n") {
+            guard !line.isEmpty else { continue }
+            result.append(String(line))
+        }
+        return result
+    }
+}
+'''),
+    "shell": ("ShellCompressor", (".sh",), '''
+#!/usr/bin/env bash
+set -euo pipefail
+source ./env.sh
+
+# 加载仓库
+function load_repo {
+    local name="$1"
+    if [ -z "$name" ]; then
+        echo "missing name" >&2
+        return 1
+    fi
+    for file in "$ROOT/$name"/*; do
+        echo "$file"
+    done
+}
+
+export ROOT=/data/repos
+load_repo "$@"
+'''),
+    "sql": ("SqlCompressor", (".sql",), '''
+-- 仓库表
+CREATE TABLE repo_records (
+    id VARCHAR(64) PRIMARY KEY,
+    create_user_id VARCHAR(64) NOT NULL,
+    repo_name VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP NOT NULL
+);
+
+SELECT r.id, r.repo_name, COUNT(*) AS files FROM repo_records r
+LEFT JOIN repo_files f ON f.repo_id = r.id
+WHERE r.create_user_id = 'u1'
+GROUP BY r.id, r.repo_name
+ORDER BY r.created_at DESC;
+'''),
+    "css": ("CssCompressor", (".css",), '''
+/* 页面布局 */
+@media (max-width: 768px) {
+  .container {
+    padding: 0 12px;
+  }
+}
+.header {
+  display: flex;
+  align-items: center;
+}
+#main {
+  margin: 0 auto;
+  max-width: 1200px;
+}
+a:hover {
+  color: #1677ff;
+}
+'''),
+    "markdown": ("MarkdownCompressor", (".md",), '''
+# 仓库导入
+
+支持通过 Git 地址批量导入仓库，克隆、扫描目录、构建索引流水线执行。
+
+## 使用方式
+
+1. 提交仓库地址列表
+2. 查询批次进度
+- 克隆失败的仓库不影响其它仓库
+- 已完成的仓库在重试时跳过
+
+> 注意：单次最多导入 500 个仓库
+
+| 参数 | 说明 |
+| --- | --- |
+| repos | 仓库列表 |
+
+```bash
+curl -X POST /repo/create/batch
+```
+'''),
+    "generic": ("GenericCompressor", (".lua", ".kt", ".scala"), '''
+local Loader = {}
+Loader.__index = Loader
+
+-- 仓库加载器
+function Loader.new(root)
+  local self = setmetatable({}, Loader)
+  self.root = root
+  return self
+end
+
+function Loader:load(name)
+  local result = {}
+  for line in io.lines(self.root .. "/" .. name) do
+    if line ~= "" then
+      table.insert(result, line)
+    end
+  end
+  return result
+end
+'''),
+}
+
+
+def load_compressors():
+    """以独立包名加载压缩器模块（跳过应用包的初始化）"""
+    package = types.ModuleType("_bench_compressors")
+    package.__path__ = [COMPRESSORS_DIR]
+    sys.modules["_bench_compressors"] = package
+    classes = {}
+    for language, (class_name, _, _) in SAMPLES.items():
+        module_name = "".join("_" + c.lower() if c.isupper() else c for c in class_name).lstrip("_")
+        module_name = module_name.replace("java_script", "javascript").replace("c_sharp", "csharp")
+        module = importlib.import_module(f"_bench_compressors.{module_name}")
+        classes[language] = getattr(module, class_name)
+    return classes
+
+
+def build_corpus(language: str) -> str:
+    target = int(CORPUS_MB * 1024 * 1024)
+    _, extensions, sample = SAMPLES[language]
+    parts, size = [], 0
+    if CORPUS_DIR:
+        for root, _, files in os.walk(CORPUS_DIR):
+            for name in files:
+                if size >= target:
+                    break
+                if name.endswith(extensions):
+                    try:
+                        with open(os.path.join(root, name), encoding="utf-8") as f:
+                            text = f.read()
+                    except (OSError, UnicodeDecodeError):
+                        continue
+                    parts.append(text)
+                    size += len(text.encode("utf-8"))
+    if not parts:
+        sample = sample.lstrip("\n")
+        parts = [sample] * max(1, target // len(sample.encode("utf-8")))
+    return "\n".join(parts)
+
+
+def timed(label: str, func, size: int):
+    best = float("inf")
+    for _ in range(REPEAT):
+        begin = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - begin)
+    print(f"  {label:<36} {size / 1024 / 1024:8.2f} MB {best * 1000:10.1f} ms {size / 1024 / 1024 / best:10.2f} MB/s")
+    return best
+
+
+def main() -> None:
+    classes = load_compressors()
+    print(f"每种语言语料 {CORPUS_MB} MB{'（' + CORPUS_DIR + '）' if CORPUS_DIR else '（内置示例）'}")
+    total_size, total_time = 0, 0.0
+    for language, compressor_class in classes.items():
+        corpus = build_corpus(language)
+        size = len(corpus.encode("utf-8"))
+        compressor = compressor_class()
+        total_time += timed(f"{language} ({compressor_class.__name__})", lambda: compressor.compress(corpus), size)
+        total_size += size
+    print(f"  {'合计':<34} {total_size / 1024 / 1024:8.2f} MB {total_time * 1000:10.1f} ms {total_size / 1024 / 1024 / total_time:10.2f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+仓库列表分页基准测试（标准库 sqlite3，不依赖应用配置）
+
+对比三种方式获取大租户的深分页与总数：
+- 旧实现：读取全部匹配行计数 + OFFSET 分页
+- COUNT(*) + OFFSET 分页
+- 有上限的 COUNT + (created_at, id) 键集分页
+
+用法：
+    python benchmarks/bench_repo_list_pagination.py [总行数] [大租户行数]
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+
+TOTAL_ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+HEAVY_ROWS = int(sys.argv[2]) if len(sys.argv) > 2 else TOTAL_ROWS // 2
+PAGE_SIZE = 10
+COUNT_CAP = 10_000
+HEAVY_USER = "user-heavy"
+
+
+def build(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE repo_records (
+            id TEXT PRIMARY KEY,
+            create_user_id TEXT NOT NULL,
+            repo_name TEXT NOT NULL,
+            repo_description TEXT,
+            created_at TIMESTAMP NOT NULL
+        )
+        """
+    )
+    rng = random.Random(42)
+    start = datetime(2020, 1, 1)
+
+    def rows():
+        for i in range(TOTAL_ROWS):
+            user = HEAVY_USER if i < HEAVY_ROWS else f"user-{rng.randrange(1000)}"
+            # 有意制造相同创建时间，检验 id 作为次级排序键
+            created = start + timedelta(seconds=rng.randrange(TOTAL_ROWS // 4))
+            yield f"{i:032x}", user, f"repo-{i}", "", created.isoformat(" ")
+
+    conn.executemany("INSERT INTO repo_records VALUES (?, ?, ?, ?, ?)", rows())
+    conn.commit()
+
+
+def timed(label: str, func, repeat: int = 3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - begin)
+    print(f"  {label:<42} {best * 1000:10.2f} ms")
+    return result
+
+
+def old_list(conn: sqlite3.Connection, page: int):
+    """旧实现：加载全部匹配行计数，OFFSET 分页"""
+    total = len(conn.execute(
+        "SELECT * FROM repo_records WHERE create_user_id = ?", (HEAVY_USER,)
+    ).fetchall())
+    rows = conn.execute(
+        "SELECT * FROM repo_records WHERE create_user_id = ? ORDER BY created_at DESC LIMIT ? OFFSET ?",
+        (HEAVY_USER, PAGE_SIZE, (page - 1) * PAGE_SIZE),
+    ).fetchall()
+    return total, rows
+
+
+def count_offset_list(conn: sqlite3.Connection, page: int):
+    total = conn.execute(
+        "SELECT COUNT(*) FROM repo_records WHERE create_user_id = ?", (HEAVY_USER,)
+    ).fetchone()[0]
+    rows = conn.execute(
+        "SELECT * FROM repo_records WHERE create_user_id = ? ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+        (HEAVY_USER, PAGE_SIZE + 1, (page - 1) * PAGE_SIZE),
+    ).fetchall()
+    return total, rows
+
+
+def keyset_list(conn: sqlite3.Connection, cursor):
+    total = conn.execute(
+        "SELECT COUNT(*) FROM (SELECT id FROM repo_records WHERE create_user_id = ? LIMIT ?)",
+        (HEAVY_USER, COUNT_CAP),
+    ).fetchone()[0]
+    if cursor:
+        rows = conn.execute(
+            "SELECT * FROM repo_records WHERE create_user_id = ? "
+            "AND created_at <= ? AND (created_at < ? OR id < ?) "
+            "ORDER BY created_at DESC, id DESC LIMIT ?",
+            (HEAVY_USER, cursor[0], cursor[0], cursor[1], PAGE_SIZE + 1),
+        ).fetchall()
+    else:
+        rows = conn.execute(
+            "SELECT * FROM repo_records WHERE create_user_id = ? ORDER BY created_at DESC, id DESC LIMIT ?",
+            (HEAVY_USER, PAGE_SIZE + 1),
+        ).fetchall()
+    return total, rows
+
+
+def main() -> None:
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    conn = sqlite3.connect(path)
+    print(f"生成 {TOTAL_ROWS} 行（大租户 {HEAVY_ROWS} 行）...")
+    begin = time.perf_counter()
+    build(conn)
+    print(f"  耗时 {time.perf_counter() - begin:.1f} s")
+
+    deep_page = max(1, HEAVY_ROWS // PAGE_SIZE // 2)
+    # 深分页对应的键集游标：取 OFFSET 结果的上一行作为游标
+    anchor = conn.execute(
+        "SELECT created_at, id FROM repo_records WHERE create_user_id = ? ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET ?",
+        (HEAVY_USER, (deep_page - 1) * PAGE_SIZE - 1),
+    ).fetchone() if deep_page > 1 else None
+
+    for label, ddl in (
+        ("仅 create_user_id 索引", "CREATE INDEX idx_repo_user ON repo_records (create_user_id)"),
+        ("复合索引 (create_user_id, created_at, id)", "CREATE INDEX idx_repo_user_created ON repo_records (create_user_id, created_at, id)"),
+    ):
+        conn.execute(ddl)
+        conn.execute("ANALYZE")
+        print(f"\n[{label}] 第 1 页 / 第 {deep_page} 页")
+        timed("旧实现 第1页", lambda: old_list(conn, 1))
+        timed("旧实现 深分页", lambda: old_list(conn, deep_page))
+        timed("COUNT + OFFSET 第1页", lambda: count_offset_list(conn, 1))
+        timed("COUNT + OFFSET 深分页", lambda: count_offset_list(conn, deep_page))
+        timed("上限 COUNT + 键集 第1页", lambda: keyset_list(conn, None))
+        offset_rows = count_offset_list(conn, deep_page)[1][:PAGE_SIZE]
+        keyset_rows = timed("上限 COUNT + 键集 深分页", lambda: keyset_list(conn, anchor))[1][:PAGE_SIZE]
+        assert [r[0] for r in offset_rows] == [r[0] for r in keyset_rows], "键集分页结果与 OFFSET 不一致"
+
+    conn.close()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()